@@ -0,0 +1,295 @@
+import json
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from src.config import AGGREGATES_DATA_DIR, HISTORY_DATA_DIR, STAGING_DATA_DIR
+from src.file_utils import atomic_path
+from src.history_store import HistoryStore, get_latest_cleaned_file, read_cleaned_file
+from src.logger import setup_logger
+from src.profiling import run_stage
+from src.weather_schema import DERIVED_COLUMNS
+
+logger = setup_logger(__name__, log_name="aggregates")
+
+ROLLUP_KEYS: dict[str, list[str]] = {
+    "monthly": ["Year", "Month"],
+    "seasonal": ["SeasonYear", "Season"],
+    "climatology": ["DayOfYear"],
+}
+
+# Schema metadata key of the last day folded into a rollup file
+WATERMARK_KEY = b"watermark"
+
+DEGREE_DAY_COLUMNS = ("HDD", "CDD")
+
+# Month number (1-12) → meteorological season
+SEASONS = np.array(
+    ["DJF", "DJF", "MAM", "MAM", "MAM", "JJA", "JJA", "JJA", "SON", "SON", "SON", "DJF"]
+)
+
+# Cumulative days before each month in a leap year, so Feb 29 always has its own slot
+# and every other calendar day maps to the same DayOfYear in every year
+LEAP_MONTH_OFFSETS = np.array([0, 31, 60, 91, 121, 152, 182, 213, 244, 274, 305, 335])
+
+
+def add_calendar_keys(df: pd.DataFrame) -> pd.DataFrame:
+    dates = pd.to_datetime(df["Date"])
+    months = dates.dt.month.to_numpy()
+    years = dates.dt.year.to_numpy()
+    return df.assign(
+        Year=years,
+        Month=months,
+        Season=SEASONS[months - 1],
+        # December belongs to the winter of the following year
+        SeasonYear=years + (months == 12),
+        DayOfYear=LEAP_MONTH_OFFSETS[months - 1] + dates.dt.day.to_numpy(),
+    )
+
+
+def add_degree_days(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Fills in the HDD/CDD columns a frame lacks from their weather_schema specs;
+    cleaned frames already carry them and keep their values.
+    """
+    missing = {
+        spec.column: np.round(spec.compute(df), spec.decimals)
+        for spec in DERIVED_COLUMNS
+        if spec.column in DEGREE_DAY_COLUMNS and spec.column not in df.columns
+    }
+    return df.assign(**missing)
+
+
+def value_columns(df: pd.DataFrame) -> list[str]:
+    keys = {"Year", "Month", "SeasonYear", "DayOfYear"}
+    return [c for c in df.select_dtypes(include=["number"]).columns if c not in keys]
+
+
+def partial_rollup(df: pd.DataFrame, keys: list[str]) -> pd.DataFrame:
+    """
+    Mergeable sufficient statistics (sum, count, min, max) per group and variable.
+    """
+    grouped = df.groupby(keys)[value_columns(df)]
+    parts = {
+        "sum": grouped.sum(),
+        "count": grouped.count(),
+        "min": grouped.min(),
+        "max": grouped.max(),
+    }
+    rollup = pd.concat(parts, axis=1)
+    rollup.columns = [f"{var}__{stat}" for stat, var in rollup.columns]
+    return rollup.reset_index()
+
+
+def merge_rollups(
+    existing: Optional[pd.DataFrame], new: pd.DataFrame, keys: list[str]
+) -> pd.DataFrame:
+    if existing is None or existing.empty:
+        return new
+    combined = pd.concat([existing, new], ignore_index=True)
+    how = {c: c.rsplit("__", 1)[1] for c in combined.columns if "__" in c}
+    how = {c: "sum" if stat == "count" else stat for c, stat in how.items()}
+    return combined.groupby(keys, as_index=False).agg(how)
+
+
+def replace_groups(
+    existing: Optional[pd.DataFrame], rebuilt: pd.DataFrame, keys: list[str]
+) -> pd.DataFrame:
+    """
+    Drops the groups of `existing` that `rebuilt` covers and merges in their rebuilt
+    statistics. Unlike sums and counts, mins and maxes cannot be retracted, so a
+    revised day is handled by recomputing its whole group.
+    """
+    if existing is None or existing.empty:
+        return rebuilt
+    covered = pd.MultiIndex.from_frame(existing[keys]).isin(pd.MultiIndex.from_frame(rebuilt[keys]))
+    return merge_rollups(existing[~covered], rebuilt, keys)
+
+
+def finalize_rollup(rollup: pd.DataFrame, keys: list[str]) -> pd.DataFrame:
+    """
+    Turns stored sufficient statistics into consumer-facing columns:
+    `<var>_mean`, `<var>_min`, `<var>_max`, `<var>_sum` and `Days`.
+    """
+    out = rollup[keys].copy()
+    variables = sorted({c.rsplit("__", 1)[0] for c in rollup.columns if "__" in c})
+    for var in variables:
+        count = rollup[f"{var}__count"]
+        out[f"{var}_mean"] = (rollup[f"{var}__sum"] / count.where(count > 0)).round(2)
+        out[f"{var}_min"] = rollup[f"{var}__min"]
+        out[f"{var}_max"] = rollup[f"{var}__max"]
+        out[f"{var}_sum"] = rollup[f"{var}__sum"].round(2)
+    if variables:
+        out["Days"] = rollup[[f"{v}__count" for v in variables]].max(axis=1).astype(int)
+    return out.sort_values(keys, ignore_index=True)
+
+
+def rollup_dir(postal: str, root: Path = AGGREGATES_DATA_DIR) -> Path:
+    return Path(root) / f"postal={postal}"
+
+
+def read_watermark(directory: Path) -> Optional[pd.Timestamp]:
+    """
+    Location-wide watermark of rollups written before each file carried its own.
+    """
+    state_path = directory / "state.json"
+    if not state_path.exists():
+        return None
+    try:
+        with open(state_path, "r", encoding="utf-8") as f:
+            return pd.Timestamp(json.load(f)["watermark"])
+    except (OSError, json.JSONDecodeError, KeyError, ValueError) as e:
+        logger.error(f"[STATE] Unreadable state file {state_path} → {e}")
+        return None
+
+
+def read_rollup(
+    path: Path, fallback: Optional[pd.Timestamp] = None
+) -> tuple[Optional[pd.DataFrame], Optional[pd.Timestamp]]:
+    """
+    Loads a rollup file and the watermark committed with it in its schema metadata.
+    """
+    if not path.exists():
+        return None, None
+    table = feather.read_table(path)
+    raw = (table.schema.metadata or {}).get(WATERMARK_KEY)
+    return table.to_pandas(), pd.Timestamp(raw.decode()) if raw else fallback
+
+
+def write_rollup(rollup: pd.DataFrame, path: Path, watermark: pd.Timestamp) -> None:
+    """
+    Replaces a rollup file together with its watermark, so the statistics and the
+    days they cover can never disagree, whichever write a crash interrupts.
+    """
+    table = pa.Table.from_pandas(rollup, preserve_index=False)
+    metadata = {**(table.schema.metadata or {}), WATERMARK_KEY: watermark.isoformat()}
+    with atomic_path(path) as tmp_path:
+        feather.write_feather(
+            table.replace_schema_metadata(metadata), tmp_path, compression="uncompressed"
+        )
+
+
+def _prepare(df: pd.DataFrame) -> pd.DataFrame:
+    return add_degree_days(
+        add_calendar_keys(df.drop(columns=["City", "PostalCode"], errors="ignore"))
+    )
+
+
+def folded_days(
+    refolded: pd.DataFrame, postal: str, watermark: pd.Timestamp, history_root: Path
+) -> pd.DataFrame:
+    """
+    Every day up to the watermark as it should now be folded: the location's history,
+    with the re-delivered `refolded` days laid over it. This holds whether or not the
+    chunk has already been ingested into history.
+    """
+    view = HistoryStore(history_root).read(postal, end=watermark)
+    if view is None:
+        return refolded
+    columns = ["Date", *(c for c in value_columns(refolded) if c in view.schema.names)]
+    stored = view.select(columns).to_pandas()
+    dates = pd.to_datetime(refolded["Date"])
+    stored = stored[~stored["Date"].isin(dates)]
+    return pd.concat([stored, refolded.assign(Date=dates)[columns]], ignore_index=True)
+
+
+def update_location(
+    df: pd.DataFrame,
+    postal: str,
+    root: Path = AGGREGATES_DATA_DIR,
+    history_root: Optional[Path] = None,
+) -> int:
+    """
+    Folds days newer than the stored watermark into the location's rollups.
+
+    Every rollup file carries the watermark it was folded up to. Days at or before it
+    are revisions (archive corrections, interpolated days replaced by real values).
+    Without `history_root` they are skipped; with it, every rollup group holding one
+    is recomputed from history with the new values. Returns the number of newly
+    folded days.
+    """
+    directory = rollup_dir(postal, root)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    legacy = read_watermark(directory)
+    dates = pd.to_datetime(df["Date"])
+    folded, skipped, refolded_days = 0, 0, 0
+    bases: dict[pd.Timestamp, pd.DataFrame] = {}
+    # Each file is checked against its own watermark, so a run interrupted between
+    # two files folds the remaining days into the files that missed them only
+    for kind, keys in ROLLUP_KEYS.items():
+        path = directory / f"{kind}.arrow"
+        merged, watermark = read_rollup(path, legacy)
+        if watermark is None:
+            fresh, refolded = df, df.iloc[:0]
+        else:
+            fresh, refolded = df[dates > watermark], df[dates <= watermark]
+            if history_root is None:
+                skipped = max(skipped, len(refolded))
+                refolded = refolded.iloc[:0]
+        if fresh.empty and refolded.empty:
+            continue
+
+        if not refolded.empty:
+            if watermark not in bases:
+                bases[watermark] = _prepare(folded_days(refolded, postal, watermark, history_root))
+            groups = _prepare(refolded)[keys].drop_duplicates()
+            rebuilt = partial_rollup(bases[watermark].merge(groups, on=keys), keys)
+            merged = replace_groups(merged, rebuilt, keys)
+            refolded_days = max(refolded_days, len(refolded))
+        if not fresh.empty:
+            merged = merge_rollups(merged, partial_rollup(_prepare(fresh), keys), keys)
+            watermark = pd.to_datetime(fresh["Date"]).max()
+            folded = max(folded, len(fresh))
+        write_rollup(merged, path, watermark)
+
+    if skipped:
+        logger.info(f"[AGG] {postal}: skipping {skipped} days already folded")
+    if refolded_days:
+        logger.info(f"[AGG] {postal}: recomputed groups of {refolded_days} re-delivered days")
+    if folded:
+        logger.info(f"[AGG] {postal}: folded {folded} days up to {dates.max().date()}")
+    return folded
+
+
+def update_aggregates(
+    df: pd.DataFrame, root: Path = AGGREGATES_DATA_DIR, history_root: Optional[Path] = None
+) -> int:
+    return sum(
+        update_location(group, str(postal), root, history_root)
+        for postal, group in df.groupby("PostalCode")
+    )
+
+
+def load_rollup(postal: str, kind: str, root: Path = AGGREGATES_DATA_DIR) -> pd.DataFrame:
+    if kind not in ROLLUP_KEYS:
+        raise ValueError(f"Unknown rollup '{kind}', expected one of {list(ROLLUP_KEYS)}")
+    path = rollup_dir(postal, root) / f"{kind}.arrow"
+    if not path.exists():
+        logger.error(f"[READ] No {kind} rollup for postal {postal}")
+        return pd.DataFrame()
+    return finalize_rollup(pd.read_feather(path), ROLLUP_KEYS[kind])
+
+
+def run() -> bool:
+    cleaned_file = get_latest_cleaned_file(STAGING_DATA_DIR)
+    if not cleaned_file:
+        logger.error("[ERROR] No cleaned file found.")
+        return False
+
+    df = read_cleaned_file(cleaned_file)
+    if df is None:
+        logger.error("[ERROR] Cleaned file could not be loaded.")
+        return False
+
+    folded = update_aggregates(df, AGGREGATES_DATA_DIR, HISTORY_DATA_DIR)
+    logger.info(f"[DONE] Aggregates updated with {folded} new days.")
+    return True
+
+
+if __name__ == "__main__":
+    run_stage(run, "aggregates")
@@ -0,0 +1,352 @@
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from src.aggregates import LEAP_MONTH_OFFSETS
+from src.config import ANOMALY_DATA_DIR, HISTORY_DATA_DIR, STAGING_DATA_DIR
+from src.data_cleaner import save_cleaned_data
+from src.file_utils import atomic_path, atomic_write
+from src.history_store import HistoryStore, get_latest_cleaned_file, read_cleaned_file
+from src.logger import setup_logger
+from src.profiling import run_stage
+from src.settings import AnomalySettings, get_settings
+
+logger = setup_logger(__name__, log_name="anomalies")
+
+DAYS_OF_YEAR = 366
+FLAG_COLUMNS = ["Anomaly_Flag", "Shift_Flag"]
+
+
+def z_column(variable: str) -> str:
+    return f"{variable}_Z"
+
+
+def output_columns(variables: list[str]) -> list[str]:
+    return [*(z_column(v) for v in variables), *FLAG_COLUMNS]
+
+
+def is_output_column(column: str) -> bool:
+    """
+    Whether `column` is an anomaly score or flag. Matched by name rather than against
+    the configured variables, which a settings reload may have changed since the
+    column was written.
+    """
+    return column.endswith("_Z") or column in FLAG_COLUMNS
+
+
+def drop_output_columns(df: pd.DataFrame) -> pd.DataFrame:
+    return df.drop(columns=[c for c in df.columns if is_output_column(c)])
+
+
+def day_of_year_index(dates: pd.Series) -> np.ndarray:
+    # Leap-year day numbering as in aggregates, so Feb 29 has its own slot; 0-based
+    dates = pd.to_datetime(dates)
+    return LEAP_MONTH_OFFSETS[dates.dt.month.to_numpy() - 1] + dates.dt.day.to_numpy() - 1
+
+
+@dataclass
+class LocationState:
+    """
+    Streaming statistics of one location. Per day-of-year slot and variable:
+    count, mean and M2 (sum of squared deviations, Welford), plus the fast and slow
+    EWMA of z-scores and the last folded date.
+    """
+
+    count: np.ndarray
+    mean: np.ndarray
+    m2: np.ndarray
+    fast: np.ndarray
+    slow: np.ndarray
+    watermark: Optional[pd.Timestamp] = None
+
+    @classmethod
+    def empty(cls, n_vars: int) -> "LocationState":
+        zeros = np.zeros((DAYS_OF_YEAR, n_vars))
+        nans = np.full(n_vars, np.nan)
+        return cls(zeros, zeros.copy(), zeros.copy(), nans, nans.copy())
+
+
+def state_dir(postal: str, root: Path = ANOMALY_DATA_DIR) -> Path:
+    return Path(root) / f"postal={postal}"
+
+
+def load_state(postal: str, variables: list[str], root: Path = ANOMALY_DATA_DIR) -> LocationState:
+    directory = state_dir(postal, root)
+    state = LocationState.empty(len(variables))
+    path = directory / "climatology.arrow"
+    if path.exists():
+        clim = pd.read_feather(path)
+        for i, var in enumerate(variables):
+            if f"{var}__count" in clim.columns:
+                state.count[:, i] = clim[f"{var}__count"].to_numpy()
+                state.mean[:, i] = clim[f"{var}__mean"].to_numpy()
+                state.m2[:, i] = clim[f"{var}__m2"].to_numpy()
+    try:
+        with open(directory / "state.json", "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        state.fast = np.array([saved["fast"].get(v, np.nan) for v in variables], dtype="float64")
+        state.slow = np.array([saved["slow"].get(v, np.nan) for v in variables], dtype="float64")
+        state.watermark = pd.Timestamp(saved["watermark"]) if saved.get("watermark") else None
+    except FileNotFoundError:
+        pass
+    except (OSError, json.JSONDecodeError, KeyError, ValueError) as e:
+        logger.error(f"[STATE] Unreadable anomaly state for {postal} → {e}")
+    return state
+
+
+def save_state(
+    postal: str, variables: list[str], state: LocationState, root: Path = ANOMALY_DATA_DIR
+) -> None:
+    directory = state_dir(postal, root)
+    directory.mkdir(parents=True, exist_ok=True)
+    clim = {"DayOfYear": np.arange(1, DAYS_OF_YEAR + 1)}
+    for i, var in enumerate(variables):
+        clim[f"{var}__count"] = state.count[:, i]
+        clim[f"{var}__mean"] = state.mean[:, i]
+        clim[f"{var}__m2"] = state.m2[:, i]
+    with atomic_path(directory / "climatology.arrow") as tmp_path:
+        pd.DataFrame(clim).to_feather(tmp_path, compression="uncompressed")
+
+    def by_var(values: np.ndarray) -> dict[str, Optional[float]]:
+        return {v: None if np.isnan(x) else float(x) for v, x in zip(variables, values)}
+
+    with atomic_write(directory / "state.json") as f:
+        json.dump(
+            {
+                "watermark": state.watermark.isoformat() if state.watermark is not None else None,
+                "fast": by_var(state.fast),
+                "slow": by_var(state.slow),
+            },
+            f,
+        )
+
+
+def pooled_climatology(
+    count: np.ndarray, mean: np.ndarray, m2: np.ndarray, window: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Merges each day-of-year slot with its ±`window` neighbours (wrapping around the
+    year) using Chan's parallel formula. Arrays are (..., 366, variables).
+    """
+    offsets = range(-window, window + 1)
+    n = sum(np.roll(count, k, axis=-2) for k in offsets)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mu = sum(np.roll(count * mean, k, axis=-2) for k in offsets) / n
+        spread = sum(
+            np.roll(m2, k, axis=-2)
+            + np.roll(count, k, axis=-2) * (np.roll(mean, k, axis=-2) - mu) ** 2
+            for k in offsets
+        )
+    return n, mu, spread
+
+
+def fold_batch(
+    count: np.ndarray,
+    mean: np.ndarray,
+    m2: np.ndarray,
+    slots: tuple[np.ndarray, ...],
+    values: np.ndarray,
+) -> None:
+    """
+    Folds `values` (rows × variables, NaN skipped) into the slots they index, in place:
+    batch count/mean/M2 per slot, then Chan's merge with the stored statistics, which
+    equals feeding the values one by one through Welford's update.
+    """
+    valid = ~np.isnan(values)
+    x = np.where(valid, values, 0.0)
+    batch_n = np.zeros_like(count)
+    batch_sum = np.zeros_like(count)
+    np.add.at(batch_n, slots, valid.astype("float64"))
+    np.add.at(batch_sum, slots, x)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        batch_mean = np.where(batch_n > 0, batch_sum / batch_n, 0.0)
+    batch_m2 = np.zeros_like(count)
+    np.add.at(batch_m2, slots, np.where(valid, (x - batch_mean[slots]) ** 2, 0.0))
+
+    total = count + batch_n
+    delta = batch_mean - mean
+    with np.errstate(invalid="ignore", divide="ignore"):
+        share = np.where(total > 0, batch_n / total, 0.0)
+    mean += delta * share
+    m2 += batch_m2 + delta**2 * count * share
+    count[...] = total
+
+
+def ewma(initial: np.ndarray, series: pd.DataFrame, span: int) -> pd.DataFrame:
+    """
+    Continues an EWMA per column from `initial` over the rows of `series`; NaNs keep
+    the previous value. Seeding the recursion with the stored value as a leading row
+    makes pandas' adjust=False EWMA exactly the streaming update.
+    """
+    seeded = pd.concat([pd.DataFrame([initial], columns=series.columns), series])
+    smoothed = seeded.ewm(span=span, adjust=False, ignore_na=True).mean().ffill()
+    return smoothed.iloc[1:]
+
+
+def annotate_anomalies(
+    df: pd.DataFrame,
+    root: Path = ANOMALY_DATA_DIR,
+    params: Optional[AnomalySettings] = None,
+    history_root: Optional[Path] = None,
+) -> pd.DataFrame:
+    """
+    Adds `<var>_Z`, `Anomaly_Flag` and `Shift_Flag` to cleaned rows of any number of
+    locations and folds days newer than each location's watermark into its state.
+
+    - `<var>_Z`: z-score against the location's climatology of that calendar day
+      (±window days pooled), as it stood before this batch; NaN until min_samples
+    - `Anomaly_Flag`: 1 when any |z| exceeds z_threshold
+    - `Shift_Flag`: 1 when the fast and slow EWMA of any z-score drift apart by more
+      than shift_threshold, i.e. the series moved to a new level (e.g. a station was
+      relocated or re-instrumented) rather than having one odd day. Only computed for
+      days past the watermark
+
+    Days are scored once, when they pass the watermark. Every run re-publishes its
+    whole rolling window, so with `history_root` the days at or before the watermark
+    take the scores and flags already stored in history, and the history upsert
+    leaves them unchanged. Re-published days missing from history are scored against
+    the current climatology, with Shift_Flag NaN.
+
+    All locations are processed in one set of array operations; of the stored history
+    only the annotations of re-published days are read.
+    """
+    # Read per call so reloaded thresholds apply to the next published chunk
+    params = params or get_settings().anomalies
+    variables = [v for v in params.columns if v in df.columns]
+    if df.empty or not variables:
+        return df
+
+    df = df.reset_index(drop=True)
+    postals = df["PostalCode"].astype(str).to_numpy()
+    codes, locations = pd.factorize(postals)
+    states = [load_state(p, variables, root) for p in locations]
+    count = np.stack([s.count for s in states])
+    mean = np.stack([s.mean for s in states])
+    m2 = np.stack([s.m2 for s in states])
+
+    dates = pd.to_datetime(df["Date"])
+    doy = day_of_year_index(dates)
+    values = df[variables].to_numpy(dtype="float64")
+
+    n, mu, spread = pooled_climatology(count, mean, m2, params.window_days)
+    n, mu, spread = n[codes, doy], mu[codes, doy], spread[codes, doy]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        std = np.sqrt(spread / (n - 1))
+        z = np.where((n >= params.min_samples) & (std > 0), (values - mu) / std, np.nan)
+
+    watermarks = pd.Series([s.watermark for s in states], dtype="datetime64[ns]").to_numpy()
+    watermarks = watermarks[codes]
+    new = np.isnat(watermarks) | (dates.to_numpy() > watermarks)
+
+    shift = np.full(z.shape, np.nan)
+    if new.any():
+        fold_batch(count, mean, m2, (codes[new], doy[new]), values[new])
+        shift[new] = _shift_scores(states, codes[new], dates[new], z[new], params)
+
+    for i, state in enumerate(states):
+        state.count, state.mean, state.m2 = count[i], mean[i], m2[i]
+        mine = new & (codes == i)
+        if mine.any():
+            state.watermark = max(d for d in (state.watermark, dates[mine].max()) if d is not None)
+            save_state(locations[i], variables, state, root)
+
+    out = df.copy()
+    for i, var in enumerate(variables):
+        out[z_column(var)] = np.round(z[:, i], 2)
+    with np.errstate(invalid="ignore"):
+        out["Anomaly_Flag"] = (np.abs(z) > params.z_threshold).any(axis=1).astype("float64")
+        shifted = (np.abs(shift) > params.shift_threshold).any(axis=1).astype("float64")
+    out["Shift_Flag"] = np.where(new, shifted, np.nan)
+    if history_root is not None and not new.all():
+        _restore_published(out, ~new, output_columns(variables), history_root)
+
+    logger.info(
+        f"[ANOMALY] {len(locations)} locations, {int(new.sum())} new days folded, "
+        f"{int(out['Anomaly_Flag'].sum())} anomalous, {int(np.nansum(out['Shift_Flag']))} shifted"
+    )
+    return out
+
+
+def _restore_published(
+    out: pd.DataFrame, republished: np.ndarray, columns: list[str], history_root: Path
+) -> None:
+    """
+    Overwrites `columns` of re-published rows, in place, with the values stored in
+    history for the same location and date, where history has them.
+    """
+    store = HistoryStore(history_root)
+    known = set(store.locations())
+    rows = out[republished]
+    for postal, group in rows.groupby(rows["PostalCode"].astype(str)):
+        if postal not in known:
+            continue
+        dates = pd.to_datetime(group["Date"])
+        view = store.read(postal, dates.min(), dates.max())
+        if view is None:
+            continue
+        stored_columns = [c for c in columns if c in view.column_names]
+        if not stored_columns:
+            continue
+        stored = view.select(["Date", *stored_columns]).to_pandas().set_index("Date")
+        matched = dates.isin(stored.index).to_numpy()
+        index = group.index[matched]
+        values = stored.loc[dates[matched], stored_columns].to_numpy()
+        out.loc[index, stored_columns] = values
+    store.close()
+
+
+def _shift_scores(
+    states: list[LocationState],
+    codes: np.ndarray,
+    dates: pd.Series,
+    z: np.ndarray,
+    params: AnomalySettings,
+) -> np.ndarray:
+    """
+    Fast minus slow EWMA of z-scores for new rows, advancing each location's stored
+    EWMAs. Locations become column blocks of one Date × (location, variable) frame,
+    so a single EWMA pass covers every location and variable.
+    """
+    n_vars = z.shape[1]
+    used, blocks = np.unique(codes, return_inverse=True)
+    days, rows = np.unique(dates.to_numpy(), return_inverse=True)
+    columns = blocks[:, None] * n_vars + np.arange(n_vars)
+    wide = np.full((len(days), len(used) * n_vars), np.nan)
+    wide[rows[:, None], columns] = z
+    wide = pd.DataFrame(wide)
+
+    fast = ewma(np.concatenate([states[i].fast for i in used]), wide, params.fast_span)
+    slow = ewma(np.concatenate([states[i].slow for i in used]), wide, params.slow_span)
+    last_fast, last_slow = fast.to_numpy()[-1], slow.to_numpy()[-1]
+    for block, i in enumerate(used):
+        states[i].fast = last_fast[block * n_vars : (block + 1) * n_vars]
+        states[i].slow = last_slow[block * n_vars : (block + 1) * n_vars]
+
+    return (fast - slow).to_numpy()[rows[:, None], columns]
+
+
+def run() -> bool:
+    cleaned_file = get_latest_cleaned_file(STAGING_DATA_DIR)
+    if not cleaned_file:
+        logger.error("[ERROR] No cleaned file found.")
+        return False
+
+    df = read_cleaned_file(cleaned_file)
+    if df is None:
+        logger.error("[ERROR] Cleaned file could not be loaded.")
+        return False
+
+    # Re-running on an annotated file rescores it instead of duplicating columns
+    annotated = annotate_anomalies(drop_output_columns(df), history_root=HISTORY_DATA_DIR)
+    if not save_cleaned_data(annotated, cleaned_file):
+        return False
+    logger.info(f"[DONE] Anomaly flags written to {cleaned_file}")
+    return True
+
+
+if __name__ == "__main__":
+    run_stage(run, "anomaly_detector")
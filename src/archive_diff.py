@@ -0,0 +1,246 @@
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from src.config import DELTAS_DATA_DIR, RAW_DATA_DIR, SYSTEM_LOCATION_PATH, TIMEZONE
+from src.data_cleaner import get_latest_raw_file, load_location_info, load_raw_weather
+from src.file_utils import atomic_path
+from src.logger import setup_logger
+from src.profiling import run_stage
+from src.raw_store import ref_digest
+
+logger = setup_logger(__name__, log_name="archive_diff")
+
+DELTA_DTYPES = {"Date": "datetime64[ns]", "Variable": object, "Old": float, "New": float}
+# Schema metadata key of the last logged revision folded into a snapshot
+REVISION_KEY = b"revision"
+
+
+@dataclass
+class ArchiveDelta:
+    postal: str
+    # Full payload as a Date-indexed float frame; merged into the snapshot on commit
+    frame: pd.DataFrame
+    # Changed cells only: Date, Variable, Old (NaN for newly seen cells), New
+    changes: pd.DataFrame
+    source: Optional[str] = None
+
+    @property
+    def empty(self) -> bool:
+        return self.changes.empty
+
+
+def snapshot_path(postal: str, root: Path = DELTAS_DATA_DIR) -> Path:
+    return Path(root) / f"postal={postal}.snapshot.arrow"
+
+
+def log_path(postal: str, root: Path = DELTAS_DATA_DIR) -> Path:
+    return Path(root) / f"postal={postal}.deltas.jsonl"
+
+
+def payload_frame(payload: dict[str, Any]) -> Optional[pd.DataFrame]:
+    daily = payload.get("daily") or {}
+    if "time" not in daily:
+        return None
+    variables = sorted(k for k in daily if k != "time")
+    frame = pd.DataFrame(
+        {v: pd.to_numeric(pd.Series(daily[v], dtype=object), errors="coerce") for v in variables}
+    ).astype("float64")
+    frame.index = pd.DatetimeIndex(pd.to_datetime(daily["time"]), name="Date")
+    return frame[~frame.index.duplicated(keep="last")].sort_index()
+
+
+def read_log(postal: str, root: Path = DELTAS_DATA_DIR) -> list[dict[str, Any]]:
+    """
+    Revision records of a location's delta log, oldest first. A record torn by a
+    crash mid-append is skipped.
+    """
+    path = log_path(postal, root)
+    records = []
+    if path.exists():
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning(f"[DIFF] Skipping torn record in {path}")
+    return records
+
+
+def _record_frame(record: dict[str, Any]) -> pd.DataFrame:
+    rows = [
+        (pd.Timestamp(d), variable, np.nan if n is None else n)
+        for variable, cells in record["changes"].items()
+        for d, _, n in cells
+    ]
+    frame = pd.DataFrame(rows, columns=["Date", "Variable", "New"])
+    return frame.pivot(index="Date", columns="Variable", values="New").rename_axis(columns=None)
+
+
+def load_snapshot(postal: str, root: Path = DELTAS_DATA_DIR) -> pd.DataFrame:
+    """
+    The location's last committed payload state. Revisions logged after the snapshot
+    was written, whose snapshot write a crash interrupted, are replayed onto it.
+    """
+    path = snapshot_path(postal, root)
+    if not path.exists():
+        snapshot = pd.DataFrame(index=pd.DatetimeIndex([], name="Date"), dtype="float64")
+        revision = 0
+    else:
+        table = feather.read_table(path)
+        snapshot = table.to_pandas().set_index("Date")
+        raw = (table.schema.metadata or {}).get(REVISION_KEY)
+        # Snapshots from before the log was written first cover every logged revision
+        revision = int(raw) if raw else None
+    if revision is None:
+        return snapshot
+    for record in read_log(postal, root):
+        if record["revision"] > revision:
+            snapshot = _record_frame(record).combine_first(snapshot)
+            snapshot.index.name = "Date"
+    return snapshot
+
+
+def diff_frames(old: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cell-level diff of `new` against `old`, one column at a time over aligned dates.
+    NaN equals NaN; a value where `old` had no cell counts as a change with Old=NaN.
+    """
+    aligned = old.reindex(index=new.index, columns=new.columns)
+    frames = []
+    for variable in new.columns:
+        before = aligned[variable].to_numpy()
+        after = new[variable].to_numpy()
+        changed = ~((before == after) | (np.isnan(before) & np.isnan(after)))
+        if changed.any():
+            frames.append(
+                pd.DataFrame(
+                    {
+                        "Date": new.index[changed],
+                        "Variable": variable,
+                        "Old": before[changed],
+                        "New": after[changed],
+                    }
+                )
+            )
+    if not frames:
+        return pd.DataFrame({c: pd.Series(dtype=t) for c, t in DELTA_DTYPES.items()})
+    return pd.concat(frames, ignore_index=True).sort_values(["Date", "Variable"], ignore_index=True)
+
+
+def compute_delta(
+    raw_file: Path, postal: str, root: Path = DELTAS_DATA_DIR
+) -> Optional[ArchiveDelta]:
+    """
+    Diffs a fetched payload against the stored snapshot for its location.
+    Returns None when the payload cannot be read; nothing is persisted until commit.
+    """
+    payload = load_raw_weather(Path(raw_file))
+    frame = payload_frame(payload) if payload else None
+    if frame is None:
+        logger.warning(f"[DIFF] No daily data in {raw_file}. Skipping diff.")
+        return None
+
+    changes = diff_frames(load_snapshot(postal, root), frame)
+    revised = int(changes["Old"].notna().sum())
+    logger.info(
+        f"[DIFF] {postal}: {len(changes)} changed cells "
+        f"({revised} revised, {len(changes) - revised} new) in {raw_file.name}"
+    )
+    return ArchiveDelta(postal, frame, changes, ref_digest(raw_file) or Path(raw_file).name)
+
+
+def _encode(value: float) -> Optional[float]:
+    return None if np.isnan(value) else float(value)
+
+
+def commit_delta(delta: ArchiveDelta, root: Path = DELTAS_DATA_DIR) -> Optional[int]:
+    """
+    Appends the changed cells to the location's delta log and folds the payload into
+    its snapshot. The log record is made durable first: a crash before the snapshot
+    is replaced leaves a revision that load_snapshot replays, never a lost one.
+    Returns the new revision number, or None when nothing changed.
+    """
+    if delta.empty:
+        return None
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+
+    log = log_path(delta.postal, root)
+    snapshot = delta.frame.combine_first(load_snapshot(delta.postal, root))
+    revision = max((r["revision"] for r in read_log(delta.postal, root)), default=0) + 1
+
+    changes: dict[str, list] = {}
+    for row in delta.changes.itertuples(index=False):
+        changes.setdefault(row.Variable, []).append(
+            [row.Date.strftime("%Y-%m-%d"), _encode(row.Old), _encode(row.New)]
+        )
+    record = {
+        "revision": revision,
+        "detected_at": datetime.now(TIMEZONE).isoformat(),
+        "source": delta.source,
+        "cells": len(delta.changes),
+        "changes": changes,
+    }
+
+    line = json.dumps(record) + "\n"
+    with open(log, "ab+") as f:
+        # Terminate a record torn by an earlier crash so this one stays parseable
+        if f.seek(0, os.SEEK_END):
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                line = "\n" + line
+        f.write(line.encode("utf-8"))
+        f.flush()
+        os.fsync(f.fileno())
+
+    table = pa.Table.from_pandas(snapshot.reset_index(), preserve_index=False)
+    metadata = {**(table.schema.metadata or {}), REVISION_KEY: str(revision)}
+    with atomic_path(snapshot_path(delta.postal, root)) as tmp_path:
+        feather.write_feather(table.replace_schema_metadata(metadata), tmp_path)
+
+    logger.info(f"[DIFF] {delta.postal}: revision {revision} logged ({len(delta.changes)} cells)")
+    return revision
+
+
+def read_deltas(postal: str, since_revision: int = 0, root: Path = DELTAS_DATA_DIR) -> pd.DataFrame:
+    """
+    Changed cells logged after `since_revision`, oldest first, for consumers that
+    apply deltas instead of reloading whole locations.
+    """
+    rows = []
+    for record in read_log(postal, root):
+        if record["revision"] <= since_revision:
+            continue
+        for variable, cells in record["changes"].items():
+            rows.extend((record["revision"], d, variable, o, n) for d, o, n in cells)
+
+    df = pd.DataFrame(rows, columns=["Revision", *DELTA_DTYPES])
+    return df.astype({"Revision": int, **DELTA_DTYPES})
+
+
+def run() -> bool:
+    raw_file = get_latest_raw_file(RAW_DATA_DIR)
+    _, postal = load_location_info(SYSTEM_LOCATION_PATH)
+    if not raw_file or not postal:
+        logger.error("[ERROR] Raw file or location missing.")
+        return False
+
+    delta = compute_delta(raw_file, postal, DELTAS_DATA_DIR)
+    if delta is None:
+        return False
+    commit_delta(delta, DELTAS_DATA_DIR)
+    logger.info(f"[DONE] {len(delta.changes)} changed cells recorded for {postal}.")
+    return True
+
+
+if __name__ == "__main__":
+    run_stage(run, "archive_diff")
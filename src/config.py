@@ -2,27 +2,99 @@ import os
 from pathlib import Path
 from zoneinfo import ZoneInfo
 
-import yaml
 from dotenv import load_dotenv
 
+from src.settings import get_settings
+
 load_dotenv()
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-SYSTEM_LOCATION_PATH = Path(os.getenv("SYSTEM_LOCATION_PATH", "data/sources/location.json"))
-RAW_DATA_DIR = Path(os.getenv("RAW_DATA_DIR", "data/sources"))
-STAGING_DATA_DIR = Path(os.getenv("STAGING_DATA_DIR", "data/staging"))
-WAREHOUSE_DATA_DIR = Path(os.getenv("WAREHOUSE_DATA_DIR", "data/warehouse"))
-LOG_DIR = Path(os.getenv("LOG_DIR", "logs"))
+# Relative data and log paths below, defaults and overrides alike, resolve under
+# DATA_ROOT; absolute overrides are used as given. Relocating it moves a whole
+# working tree, e.g. one per parallel test worker.
+DATA_ROOT = Path(os.getenv("DATA_ROOT", "."))
+
+
+def data_path(name: str, default: str) -> Path:
+    return DATA_ROOT / os.getenv(name, default)
+
 
+SYSTEM_LOCATION_PATH = data_path("SYSTEM_LOCATION_PATH", "data/sources/location.json")
+RAW_DATA_DIR = data_path("RAW_DATA_DIR", "data/sources")
+STAGING_DATA_DIR = data_path("STAGING_DATA_DIR", "data/staging")
+WAREHOUSE_DATA_DIR = data_path("WAREHOUSE_DATA_DIR", "data/warehouse")
+LOG_DIR = data_path("LOG_DIR", "logs")
+TRACE_DIR = data_path("TRACE_DIR", "logs/traces")
+PROFILE_DIR = data_path("PROFILE_DIR", "logs/profiles")
+JOURNAL_PATH = data_path("JOURNAL_PATH", "data/run_journal.jsonl")
+HISTORY_DATA_DIR = data_path("HISTORY_DATA_DIR", "data/warehouse/history")
+AGGREGATES_DATA_DIR = data_path("AGGREGATES_DATA_DIR", "data/warehouse/aggregates")
+FEATURES_DATA_DIR = data_path("FEATURES_DATA_DIR", "data/warehouse/features")
+FORECASTS_PATH = data_path("FORECASTS_PATH", "data/warehouse/forecasts.csv")
+EVALUATION_DATA_DIR = data_path("EVALUATION_DATA_DIR", "data/warehouse/evaluation")
+DELTAS_DATA_DIR = data_path("DELTAS_DATA_DIR", "data/warehouse/deltas")
+PREVIEW_DATA_DIR = data_path("PREVIEW_DATA_DIR", "data/preview")
+ANOMALY_DATA_DIR = data_path("ANOMALY_DATA_DIR", "data/warehouse/anomalies")
+SERIES_DATA_DIR = data_path("SERIES_DATA_DIR", "data/warehouse/series")
+VALIDATION_CACHE_PATH = data_path("VALIDATION_CACHE_PATH", "data/warehouse/validation_cache.json")
 
-def load_yaml_config(path=BASE_DIR / "config" / "settings.yaml"):
-    with open(path, "r") as f:
-        return yaml.safe_load(f)
+LOCATIONS_INPUT_PATH = data_path("LOCATIONS_INPUT_PATH", "config/locations.txt")
+RESOLVED_LOCATIONS_PATH = data_path("RESOLVED_LOCATIONS_PATH", "data/sources/locations.json")
+RESOLVED_IP_LOCATIONS_PATH = data_path(
+    "RESOLVED_IP_LOCATIONS_PATH", "data/sources/ip_locations.json"
+)
+LOCATION_CACHE_PATH = data_path("LOCATION_CACHE_PATH", "data/sources/location_cache.sqlite")
+GAZETTEER_PATH = data_path("GAZETTEER_PATH", "data/sources/gazetteer.csv")
+IPS_INPUT_PATH = data_path("IPS_INPUT_PATH", "config/ips.txt")
+IP_RANGES_PATH = data_path("IP_RANGES_PATH", "data/sources/ip_ranges.csv")
+WEATHER_DUMP_DIR = data_path("WEATHER_DUMP_DIR", "data/sources/dumps")
 
 
-SETTINGS = load_yaml_config()
-DAYS_TO_PULL = int(os.getenv("DAYS_TO_PULL", SETTINGS.get("weather", {}).get("days_to_pull", 90)))
+# Typed, validated view of config/settings.yaml with environment overrides applied.
+# Values below are fixed at import; knobs that long-running processes re-read on
+# change (pipeline, scheduler) are taken from get_settings() at call time.
+SETTINGS = get_settings()
 
-TIMEZONE_NAME = os.getenv("TIMEZONE", SETTINGS.get("timezone", "Europe/Berlin"))
+DAYS_TO_PULL = SETTINGS.weather.days_to_pull
+CHUNK_DAYS = SETTINGS.weather.chunk_days
+WEATHER_PROVIDERS = list(SETTINGS.weather.providers)
+WEATHER_PROVIDER_STRATEGY = SETTINGS.weather.provider_strategy
+
+TIMEZONE_NAME = SETTINGS.timezone
 TIMEZONE = ZoneInfo(TIMEZONE_NAME)
+
+GEOCODING_MAX_WORKERS = SETTINGS.geocoding.max_workers
+GEOCODING_COUNTRY_CODE = SETTINGS.geocoding.country_code
+
+HDD_BASE_C = SETTINGS.aggregates.hdd_base_c
+CDD_BASE_C = SETTINGS.aggregates.cdd_base_c
+
+FEATURE_TARGET = SETTINGS.features.target
+FEATURE_COLUMNS = list(SETTINGS.features.columns)
+FEATURE_LAGS = list(SETTINGS.features.lags)
+FEATURE_ROLLING_WINDOWS = list(SETTINGS.features.rolling_windows)
+LSTM_LOOKBACK = SETTINGS.features.lookback
+LSTM_HORIZON = SETTINGS.features.horizon
+
+EVALUATION_MAX_WORKERS = SETTINGS.evaluation.max_workers
+EVALUATION_PARALLEL_MIN_ROWS = SETTINGS.evaluation.parallel_min_rows
+
+PREVIEW_SAMPLE_SIZE = SETTINGS.preview.sample_size
+PREVIEW_POINTS_PER_YEAR = SETTINGS.preview.points_per_year
+
+ANOMALY_COLUMNS = list(SETTINGS.anomalies.columns)
+
+SERIES_SEGMENT_ROWS = SETTINGS.series.segment_rows
+
+EXPORT_HOST = SETTINGS.export.host
+EXPORT_PORT = SETTINGS.export.port
+EXPORT_BATCH_ROWS = SETTINGS.export.batch_rows
+EXPORT_GZIP_LEVEL = SETTINGS.export.gzip_level
+
+VALIDATION_MAX_WORKERS = SETTINGS.validation.max_workers
+
+OPEN_METEO_ARCHIVE_URL = SETTINGS.api.open_meteo_archive_url
+IPINFO_URL = SETTINGS.api.ipinfo_url
+IPINFO_IP_URL = SETTINGS.api.ipinfo_ip_url
+GEOCODING_URL = SETTINGS.api.geocoding_url
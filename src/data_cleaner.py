@@ -6,7 +6,20 @@ from typing import Any, Optional, Tuple
 import pandas as pd
 
 from src.config import RAW_DATA_DIR, STAGING_DATA_DIR, SYSTEM_LOCATION_PATH, TIMEZONE
+from src.file_utils import atomic_path
+from src.history_store import CLEANED_SUFFIXES
 from src.logger import setup_logger
+from src.profiling import run_stage
+from src.raw_store import is_ref, mark_processed, processed_output, resolve_ref
+from src.settings import get_settings
+from src.tracing import span
+from src.weather_schema import (
+    COLUMN_DECIMALS,
+    SCHEMA_VERSION,
+    add_derived_metrics,
+    normalize_units,
+    required_source_keys,
+)
 
 logger = setup_logger(__name__, log_name="data_cleaner")
 
@@ -57,6 +70,8 @@ def load_raw_weather(filepath: Path) -> Optional[dict[str, Any]]:
     try:
         with open(filepath, "r", encoding="utf-8") as f:
             data: dict[str, Any] = json.load(f)
+        if is_ref(data):
+            data = resolve_ref(filepath, data)
         logger.info(f"[LOAD] Raw weather data loaded from {filepath}")
         return data
     except (FileNotFoundError, PermissionError, OSError) as e:
@@ -73,42 +88,17 @@ def load_raw_weather(filepath: Path) -> Optional[dict[str, Any]]:
 def build_dataframe(raw_data: dict[str, Any], city: str, postal: str) -> pd.DataFrame:
     daily = raw_data.get("daily")
 
-    required_keys = [
-        "time",
-        "temperature_2m_max",
-        "temperature_2m_min",
-        "temperature_2m_mean",
-        "precipitation_sum",
-        "rain_sum",
-        "snowfall_sum",
-        "windspeed_10m_max",
-        "shortwave_radiation_sum",
-        "sunshine_duration",
-    ]
-
     if not daily:
         logger.error("[BUILD] Missing 'daily' section in raw weather data.")
         return pd.DataFrame()
 
-    missing_keys = [k for k in required_keys if k not in daily]
+    missing_keys = [k for k in required_source_keys() if k not in daily]
     if missing_keys:
         logger.error(f"[BUILD] Missing keys in 'daily': {missing_keys}")
         return pd.DataFrame()
 
-    df = pd.DataFrame(
-        {
-            "Date": daily["time"],
-            "Temp_Max_C": daily["temperature_2m_max"],
-            "Temp_Min_C": daily["temperature_2m_min"],
-            "Temp_Mean_C": daily["temperature_2m_mean"],
-            "Precipitation_mm": daily["precipitation_sum"],
-            "Rain_mm": daily["rain_sum"],
-            "Snowfall_mm": daily["snowfall_sum"],
-            "WindSpeed_Max_kph": daily["windspeed_10m_max"],
-            "Radiation_Sum_kWh": daily["shortwave_radiation_sum"],
-            "Sunshine_Minutes": daily["sunshine_duration"],
-        }
-    )
+    # Converts sunshine s → min, radiation MJ/m² → kWh/m², snowfall cm → mm
+    df = normalize_units(daily)
 
     df["City"] = city
     df["PostalCode"] = postal
@@ -131,7 +121,8 @@ def clean_data(df: pd.DataFrame) -> pd.DataFrame:
 
     # Interpolate numeric columns
     numeric_cols = df.select_dtypes(include=["number"]).columns
-    df[numeric_cols] = df[numeric_cols].interpolate(method="linear").round(1)
+    decimals = {col: COLUMN_DECIMALS.get(col, 1) for col in numeric_cols}
+    df[numeric_cols] = df[numeric_cols].interpolate(method="linear").round(decimals)
     logger.debug(f"[CLEAN] Interpolated numeric columns: {list(numeric_cols)}")
 
     # Fill non-numeric nulls
@@ -146,14 +137,18 @@ def clean_data(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def save_cleaned_data(df: pd.DataFrame) -> bool:
+def save_cleaned_data(df: pd.DataFrame, csv_path: Optional[Path] = None) -> bool:
     STAGING_DATA_DIR.mkdir(parents=True, exist_ok=True)
-    timestamp = datetime.now(TIMEZONE).strftime("%Y%m%d_%H%M%S")
-
-    csv_path = STAGING_DATA_DIR / f"cleaned_weather_{timestamp}.csv"
+    if csv_path is None:
+        timestamp = datetime.now(TIMEZONE).strftime("%Y%m%d_%H%M%S")
+        csv_path = STAGING_DATA_DIR / f"cleaned_weather_{timestamp}{cleaned_suffix()}"
 
     try:
-        df.to_csv(csv_path, index=False)
+        with atomic_path(csv_path) as tmp_path:
+            if csv_path.suffix == ".arrow":
+                df.reset_index(drop=True).to_feather(tmp_path, compression="uncompressed")
+            else:
+                df.to_csv(tmp_path, index=False)
         logger.info(f"[SAVE] File written to: {csv_path}")
         return True
     except (PermissionError, FileNotFoundError, OSError) as e:
@@ -167,6 +162,66 @@ def save_cleaned_data(df: pd.DataFrame) -> bool:
         return False
 
 
+def cleaned_suffix() -> str:
+    # Read per call so a reloaded cleaned_format applies to the next file written
+    return CLEANED_SUFFIXES[get_settings().pipeline.cleaned_format]
+
+
+def cleaned_path_for(raw_file: Path) -> Path:
+    """
+    Derives a deterministic staging path from the raw file name, so re-cleaning
+    the same raw file overwrites its output instead of adding a new file.
+    """
+    name = raw_file.name.split(".", 1)[0].replace("raw_weather_", "cleaned_weather_", 1)
+    return STAGING_DATA_DIR / f"{name}{cleaned_suffix()}"
+
+
+def process_raw_file(raw_file: Path, city: str, postal: str) -> Optional[Path]:
+    with span("clean", postal=postal, raw_file=raw_file.name) as s:
+        cached = processed_output(raw_file, postal, city, SCHEMA_VERSION)
+        s.set(cached=bool(cached))
+        if cached:
+            logger.info(f"[SKIP] Payload already cleaned for {postal} → {cached}")
+            return cached
+        return _clean_raw_file(raw_file, city, postal)
+
+
+def _clean_raw_file(raw_file: Path, city: str, postal: str) -> Optional[Path]:
+    with span("load.raw") as s:
+        raw_data = load_raw_weather(raw_file)
+        s.set(days=len(raw_data.get("daily", {}).get("time", [])) if raw_data else 0)
+    if not raw_data:
+        logger.error("[ERROR] Failed to load raw weather data.")
+        return None
+
+    with span("parse.daily") as s:
+        df = build_dataframe(raw_data, city, postal)
+        s.set(rows=len(df))
+    if df.empty:
+        logger.error("[ERROR] Empty DataFrame after building.")
+        return None
+
+    with span("transform") as s:
+        df = clean_data(df)
+        if not df.empty:
+            df = add_derived_metrics(df)
+        s.set(rows=len(df), columns=len(df.columns))
+    if df.empty:
+        logger.error("[ERROR] Empty DataFrame after cleaning.")
+        return None
+
+    csv_path = cleaned_path_for(raw_file)
+    with span("write.cleaned", path=csv_path.name, rows=len(df)) as s:
+        if not save_cleaned_data(df, csv_path):
+            return None
+        s.set(bytes=csv_path.stat().st_size)
+    try:
+        mark_processed(raw_file, postal, city, csv_path, SCHEMA_VERSION)
+    except OSError as e:
+        logger.warning(f"[SAVE] Could not record processed payload → {e}")
+    return csv_path
+
+
 def run() -> bool:
     raw_file = get_latest_raw_file(RAW_DATA_DIR)
     if not raw_file:
@@ -178,25 +233,12 @@ def run() -> bool:
         logger.error("[ERROR] Invalid location metadata.")
         return False
 
-    raw_data = load_raw_weather(raw_file)
-    if not raw_data:
-        logger.error("[ERROR] Failed to load raw weather data.")
-        return False
-
-    df = build_dataframe(raw_data, city, postal)
-    if df.empty:
-        logger.error("[ERROR] Empty DataFrame after building.")
-        return False
-
-    df = clean_data(df)
-    if df.empty:
-        logger.error("[ERROR] Empty DataFrame after cleaning.")
+    if not process_raw_file(raw_file, city, postal):
         return False
 
-    save_cleaned_data(df)
     logger.info("[DONE] Cleaned data saved successfully.")
     return True
 
 
 if __name__ == "__main__":
-    run()
+    run_stage(run, "data_cleaner")
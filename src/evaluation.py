@@ -0,0 +1,264 @@
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from src.aggregates import SEASONS
+from src.config import (
+    EVALUATION_DATA_DIR,
+    EVALUATION_MAX_WORKERS,
+    EVALUATION_PARALLEL_MIN_ROWS,
+    FORECASTS_PATH,
+    HISTORY_DATA_DIR,
+    SERIES_DATA_DIR,
+    TIMEZONE,
+)
+from src.file_utils import atomic_path
+from src.history_store import DateLike, HistoryStore
+from src.logger import setup_logger
+from src.profiling import run_stage
+from src.series_store import SeriesStore
+
+logger = setup_logger(__name__, log_name="evaluation")
+
+FORECAST_COLUMNS = ["Model", "PostalCode", "Date", "Horizon", "Variable", "Forecast"]
+GROUP_KEYS = ["Model", "PostalCode", "Horizon", "Variable", "Season"]
+
+# Offset keeps pre-1970 day numbers positive inside the packed (postal, day) key
+DAY_OFFSET = 1 << 31
+
+
+def read_forecasts(path: Union[str, Path] = FORECASTS_PATH) -> Optional[pd.DataFrame]:
+    path = Path(path)
+    try:
+        if path.suffix in (".arrow", ".feather"):
+            df = pd.read_feather(path)
+        else:
+            df = pd.read_csv(path, dtype={"PostalCode": str})
+    except (PermissionError, FileNotFoundError, OSError) as e:
+        logger.error(f"[LOAD] File access error → {e}")
+        return None
+    except (ValueError, pd.errors.ParserError) as e:
+        logger.error(f"[LOAD] Could not parse forecasts → {e}")
+        return None
+
+    missing = [c for c in FORECAST_COLUMNS if c not in df.columns]
+    if missing:
+        logger.error(f"[LOAD] Forecasts missing columns: {missing}")
+        return None
+
+    logger.info(f"[LOAD] {len(df)} forecast rows loaded from {path}")
+    return df.assign(Date=pd.to_datetime(df["Date"]), PostalCode=df["PostalCode"].astype(str))
+
+
+def load_actuals(
+    postals: Sequence[str],
+    variables: Sequence[str],
+    start: Optional[DateLike] = None,
+    end: Optional[DateLike] = None,
+    root: Path = SERIES_DATA_DIR,
+    history_root: Path = HISTORY_DATA_DIR,
+) -> pd.DataFrame:
+    """
+    Actuals for start <= Date <= end from the series store, which decodes only the
+    segments and columns the forecasts touch. Locations published before the series
+    store existed are read from their history partitions instead.
+    """
+    series = SeriesStore(root)
+    stored = set(series.locations())
+    history = HistoryStore(history_root)
+    frames = []
+    for postal in postals:
+        if postal in stored:
+            df = series.read_frame(postal, start, end, columns=variables)
+        else:
+            df = history.read_frame(postal, start, end)
+        if df.empty:
+            continue
+        columns = ["Date"] + [v for v in variables if v in df.columns]
+        frames.append(df[columns].assign(PostalCode=postal))
+    if not frames:
+        return pd.DataFrame(columns=["PostalCode", "Date", *variables])
+    return pd.concat(frames, ignore_index=True)
+
+
+def _packed_keys(codes: np.ndarray, dates: pd.Series) -> np.ndarray:
+    days = dates.to_numpy("datetime64[D]").astype(np.int64) + DAY_OFFSET
+    return (codes.astype(np.int64) << 32) | days
+
+
+def attach_actuals(forecasts: pd.DataFrame, actuals: pd.DataFrame) -> pd.DataFrame:
+    """
+    Joins every forecast row to its actual value via a sorted merge on (PostalCode, Date).
+
+    Both sides are reduced to one packed int64 key; actuals are sorted once and each
+    forecast key is located with a single vectorized binary search. The actual value
+    is then gathered from the wide actuals matrix by (row, variable) fancy indexing.
+    """
+    categories = pd.Index(pd.unique(pd.concat([forecasts["PostalCode"], actuals["PostalCode"]])))
+    actual_keys = _packed_keys(
+        categories.get_indexer(actuals["PostalCode"]), pd.to_datetime(actuals["Date"])
+    )
+    order = np.argsort(actual_keys, kind="stable")
+    actual_keys = actual_keys[order]
+
+    forecast_keys = _packed_keys(categories.get_indexer(forecasts["PostalCode"]), forecasts["Date"])
+    pos = np.searchsorted(actual_keys, forecast_keys)
+    pos_clipped = np.minimum(pos, max(len(actual_keys) - 1, 0))
+    matched = (pos < len(actual_keys)) & (actual_keys[pos_clipped] == forecast_keys)
+
+    variables = [c for c in actuals.columns if c not in ("PostalCode", "Date")]
+    var_index = pd.Index(variables).get_indexer(forecasts["Variable"])
+    matched &= var_index >= 0
+
+    actual = np.full(len(forecasts), np.nan)
+    if len(actual_keys) and variables:
+        matrix = actuals[variables].to_numpy(np.float64)[order]
+        actual[matched] = matrix[pos_clipped[matched], var_index[matched]]
+
+    return forecasts.assign(Actual=actual)
+
+
+def score(joined: pd.DataFrame) -> pd.DataFrame:
+    """
+    Error metrics per (Model, PostalCode, Horizon, Variable, Season) in one groupby pass.
+    """
+    joined = joined[np.isfinite(joined["Actual"]) & np.isfinite(joined["Forecast"])]
+    error = joined["Forecast"].to_numpy(np.float64) - joined["Actual"].to_numpy(np.float64)
+    frame = pd.DataFrame(
+        {
+            "Model": joined["Model"].to_numpy(),
+            "PostalCode": joined["PostalCode"].to_numpy(),
+            "Horizon": joined["Horizon"].to_numpy(),
+            "Variable": joined["Variable"].to_numpy(),
+            "Season": SEASONS[joined["Date"].dt.month.to_numpy() - 1],
+            "AbsError": np.abs(error),
+            "SqError": error * error,
+            "Error": error,
+        }
+    )
+    grouped = frame.groupby(GROUP_KEYS, sort=True)
+    metrics = grouped.agg(
+        N=("Error", "size"),
+        MAE=("AbsError", "mean"),
+        MSE=("SqError", "mean"),
+        Bias=("Error", "mean"),
+    ).reset_index()
+    metrics["RMSE"] = np.sqrt(metrics.pop("MSE"))
+    return metrics
+
+
+def _evaluate_shard(args: tuple[pd.DataFrame, pd.DataFrame]) -> pd.DataFrame:
+    forecasts, actuals = args
+    return score(attach_actuals(forecasts, actuals))
+
+
+def evaluate(
+    forecasts: pd.DataFrame,
+    actuals: pd.DataFrame,
+    max_workers: int = EVALUATION_MAX_WORKERS,
+    parallel_min_rows: int = EVALUATION_PARALLEL_MIN_ROWS,
+) -> pd.DataFrame:
+    """
+    Scores a forecast grid. Large grids are sharded by location across processes;
+    shards are disjoint in PostalCode, so their metric rows simply concatenate.
+    """
+    if len(forecasts) < parallel_min_rows or max_workers <= 1:
+        return _evaluate_shard((forecasts, actuals))
+
+    postals = pd.unique(forecasts["PostalCode"])
+    shard_of = {postal: i % max_workers for i, postal in enumerate(postals)}
+    forecast_shards = forecasts.groupby(forecasts["PostalCode"].map(shard_of))
+    actual_shard = actuals["PostalCode"].map(shard_of)
+    shards = [(group, actuals[actual_shard == shard]) for shard, group in forecast_shards]
+
+    logger.info(f"[EVAL] Scoring {len(forecasts)} rows in {len(shards)} process shards")
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        results = list(pool.map(_evaluate_shard, shards))
+    return pd.concat(results, ignore_index=True).sort_values(GROUP_KEYS, ignore_index=True)
+
+
+def summarize(
+    metrics: pd.DataFrame, by: Sequence[str] = ("Model", "Variable", "Horizon")
+) -> pd.DataFrame:
+    """
+    Re-aggregates group metrics to a coarser level, weighting by sample count.
+    """
+    weighted = metrics.assign(
+        AbsSum=metrics["MAE"] * metrics["N"],
+        SqSum=metrics["RMSE"] ** 2 * metrics["N"],
+        ErrSum=metrics["Bias"] * metrics["N"],
+    )
+    totals = weighted.groupby(list(by)).agg(
+        N=("N", "sum"), AbsSum=("AbsSum", "sum"), SqSum=("SqSum", "sum"), ErrSum=("ErrSum", "sum")
+    )
+    return pd.DataFrame(
+        {
+            "N": totals["N"],
+            "MAE": totals["AbsSum"] / totals["N"],
+            "RMSE": np.sqrt(totals["SqSum"] / totals["N"]),
+            "Bias": totals["ErrSum"] / totals["N"],
+        }
+    ).reset_index()
+
+
+def save_metrics(
+    metrics: pd.DataFrame, directory: Path = EVALUATION_DATA_DIR, prefix: str = "evaluation"
+) -> Optional[Path]:
+    directory.mkdir(parents=True, exist_ok=True)
+    timestamp = datetime.now(TIMEZONE).strftime("%Y%m%d_%H%M%S")
+    path = directory / f"{prefix}_{timestamp}.csv"
+    try:
+        with atomic_path(path) as tmp_path:
+            metrics.to_csv(tmp_path, index=False)
+        logger.info(f"[SAVE] Metrics written to: {path}")
+        return path
+    except (PermissionError, FileNotFoundError, OSError) as e:
+        logger.error(f"[SAVE] File access error → {e}")
+        return None
+
+
+def run(forecast_path: Union[str, Path] = FORECASTS_PATH) -> bool:
+    forecasts = read_forecasts(forecast_path)
+    if forecasts is None or forecasts.empty:
+        logger.error("[ERROR] No forecasts to evaluate.")
+        return False
+
+    actuals = load_actuals(
+        pd.unique(forecasts["PostalCode"]),
+        pd.unique(forecasts["Variable"]),
+        forecasts["Date"].min(),
+        forecasts["Date"].max(),
+        SERIES_DATA_DIR,
+        HISTORY_DATA_DIR,
+    )
+    if actuals.empty:
+        logger.error("[ERROR] No actuals found for the forecast locations.")
+        return False
+
+    metrics = evaluate(forecasts, actuals)
+    if metrics.empty:
+        logger.error("[ERROR] No forecast rows could be matched to actuals.")
+        return False
+
+    summary = summarize(metrics)
+    if not save_metrics(metrics, EVALUATION_DATA_DIR):
+        return False
+    if not save_metrics(summary, EVALUATION_DATA_DIR, prefix="evaluation_summary"):
+        return False
+
+    best = summary.loc[summary.groupby(["Variable", "Horizon"])["RMSE"].idxmin()]
+    for row in best.itertuples(index=False):
+        logger.info(
+            f"[EVAL] Best for {row.Variable} h={row.Horizon} → {row.Model} "
+            f"(MAE {row.MAE:.2f}, RMSE {row.RMSE:.2f})"
+        )
+    logger.info(f"[DONE] Evaluated {int(metrics['N'].sum())} forecast-actual pairs.")
+    return True
+
+
+if __name__ == "__main__":
+    run_stage(run, "evaluation")
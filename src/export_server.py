@@ -0,0 +1,389 @@
+import argparse
+import hashlib
+import itertools
+import json
+import zlib
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Iterator, Optional
+from urllib.parse import parse_qs, urlsplit
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pcsv
+
+from src.config import (
+    EXPORT_BATCH_ROWS,
+    EXPORT_GZIP_LEVEL,
+    EXPORT_HOST,
+    EXPORT_PORT,
+    HISTORY_DATA_DIR,
+)
+from src.logger import setup_logger
+from src.query_service import QueryService
+
+logger = setup_logger(__name__, log_name="export_server")
+
+# format query parameter → response media type
+MEDIA_TYPES = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "csv": "text/csv; charset=utf-8",
+}
+# Encoded bytes collected before a chunk goes on the wire; the Arrow and CSV
+# writers emit many small buffers per record batch
+CHUNK_BYTES = 64 * 1024
+
+LIST_PARAMETERS = ("columns", "postal", "group_by", "agg")
+
+
+class ExportRequest:
+    """
+    The query of one /export call, parsed from its URL parameters.
+
+    List parameters (columns, postal, group_by, agg) take comma-separated values or
+    repeat; `where` repeats, one condition each. Parameters are the same as for
+    `main.py query`, plus `format` (arrow or csv).
+    """
+
+    def __init__(self, query_string: str):
+        params = parse_qs(query_string, keep_blank_values=False)
+        unknown = set(params) - {*LIST_PARAMETERS, "start", "end", "where", "limit", "format"}
+        if unknown:
+            raise ValueError(f"Unknown parameters: {', '.join(sorted(unknown))}")
+
+        def values(name: str) -> list[str]:
+            return [v for raw in params.get(name, []) for v in raw.split(",") if v]
+
+        def single(name: str) -> Optional[str]:
+            given = params.get(name, [])
+            if len(given) > 1:
+                raise ValueError(f"Parameter '{name}' given more than once")
+            return given[0] if given else None
+
+        self.columns = values("columns") or None
+        self.postals = values("postal") or None
+        self.group_by = values("group_by")
+        self.aggregates = values("agg")
+        self.where = params.get("where", [])
+        self.start = single("start")
+        self.end = single("end")
+        limit = single("limit")
+        self.limit = int(limit) if limit is not None else None
+        if self.limit is not None and self.limit < 0:
+            raise ValueError("Parameter 'limit' must not be negative")
+        self.format = single("format") or "arrow"
+        if self.format not in MEDIA_TYPES:
+            raise ValueError(
+                f"Unknown format '{self.format}'. Choose from {', '.join(MEDIA_TYPES)}"
+            )
+
+    def key(self) -> str:
+        """
+        Canonical form of the query, equal for requests that select the same data.
+        """
+        return json.dumps(vars(self), sort_keys=True, default=str)
+
+
+def partition_etag(files: list[Path], key: str = "") -> str:
+    """
+    Weak validator for a response built from `files`: it changes whenever one of
+    them is rewritten, added or removed. Weak, because gzip and identity encodings
+    of one response share it.
+    """
+    digest = hashlib.sha1(key.encode())
+    for f in files:
+        stat = f.stat()
+        digest.update(f"{f.name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return f'W/"{digest.hexdigest()[:20]}"'
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+
+def accepts_gzip(header: Optional[str]) -> bool:
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "").lower() not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+class ChunkedBody:
+    """
+    File-like sink that sends what is written to it as an HTTP/1.1 chunked body,
+    gzip-compressed if `gzip_level` is given. Writes are coalesced into chunks of
+    about CHUNK_BYTES; `close()` sends the rest and the terminating chunk.
+    """
+
+    closed = False
+
+    def __init__(self, wfile, gzip_level: Optional[int] = None):
+        self.wfile = wfile
+        self.compressor = (
+            zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            if gzip_level is not None
+            else None
+        )
+        self.pending = bytearray()
+        self.bytes_sent = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.pending += self.compressor.compress(data) if self.compressor else data
+        if len(self.pending) >= CHUNK_BYTES:
+            self._send(self.pending)
+            self.pending = bytearray()
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        if self.compressor:
+            self.pending += self.compressor.flush()
+        self._send(self.pending)
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+        self.closed = True
+
+    def _send(self, data: bytes) -> None:
+        if data:
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.bytes_sent += len(data)
+
+
+def csv_schema(schema: pa.Schema) -> pa.Schema:
+    return pa.schema(
+        [f.with_type(pa.date32()) if pa.types.is_timestamp(f.type) else f for f in schema]
+    )
+
+
+def csv_batch(batch: pa.RecordBatch) -> pa.RecordBatch:
+    """
+    Makes a batch CSV-friendly for BI tools: daily timestamps become plain dates and
+    NaN becomes an empty field.
+    """
+    arrays = []
+    for column in batch.columns:
+        if pa.types.is_timestamp(column.type):
+            column = pc.cast(column, pa.date32())
+        elif pa.types.is_floating(column.type):
+            column = pc.if_else(pc.is_nan(column), pa.scalar(None, column.type), column)
+        arrays.append(column)
+    return pa.RecordBatch.from_arrays(arrays, names=batch.schema.names)
+
+
+def export_batches(
+    service: QueryService, request: ExportRequest, batch_rows: int = EXPORT_BATCH_ROWS
+) -> tuple[pa.Schema, Iterator[pa.RecordBatch]]:
+    """
+    Schema and record batches answering `request`. Row selections are streamed
+    from the dataset scan, so only one batch per request is held in memory;
+    aggregates are small and computed in full first.
+    """
+    if request.aggregates:
+        table = service.query(
+            start=request.start,
+            end=request.end,
+            postals=request.postals,
+            where=request.where,
+            group_by=request.group_by,
+            aggregates=request.aggregates,
+            limit=request.limit,
+        )
+        return table.schema, iter(table.to_batches(max_chunksize=batch_rows))
+
+    scanner = service.scanner(
+        columns=request.columns,
+        start=request.start,
+        end=request.end,
+        postals=request.postals,
+        where=request.where,
+        batch_size=batch_rows,
+    )
+    if scanner is None:
+        return pa.schema([]), iter(())
+
+    def batches() -> Iterator[pa.RecordBatch]:
+        remaining = request.limit
+        for batch in scanner.to_batches():
+            if remaining is not None:
+                batch = batch.slice(0, remaining)
+                remaining -= batch.num_rows
+            if batch.num_rows:
+                yield batch
+            if remaining == 0:
+                return
+
+    return scanner.projected_schema, batches()
+
+
+class ExportHandler(BaseHTTPRequestHandler):
+    """
+    GET /partitions       JSON list of history partitions with their ETags
+    GET /export?...       query result as an Arrow IPC stream (default) or CSV
+
+    Both answer `If-None-Match` with 304 while the partitions they read are
+    unchanged, so a consumer polling one location per request only re-downloads
+    the locations that were republished.
+    """
+
+    protocol_version = "HTTP/1.1"
+    server_version = "SkylyticsExport/1.0"
+
+    service: QueryService
+    batch_rows: int = EXPORT_BATCH_ROWS
+    gzip_level: int = EXPORT_GZIP_LEVEL
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        if url.path == "/partitions":
+            self._partitions()
+        elif url.path == "/export":
+            self._export(url.query)
+        else:
+            self._error(HTTPStatus.NOT_FOUND, f"Unknown path {url.path}")
+
+    def _partitions(self) -> None:
+        files = self.service.partitions()
+        etag = partition_etag(files)
+        if self._not_modified(etag):
+            return
+        listing = [
+            {
+                "postal": f.stem.removeprefix("postal="),
+                "etag": partition_etag([f]),
+                "bytes": f.stat().st_size,
+            }
+            for f in files
+        ]
+        body = json.dumps(listing).encode()
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _export(self, query_string: str) -> None:
+        try:
+            request = ExportRequest(query_string)
+            etag = partition_etag(self.service.partitions(request.postals), request.key())
+            if self._not_modified(etag):
+                return
+            schema, batches = export_batches(self.service, request, self.batch_rows)
+            first = next(batches, None)
+        except (ValueError, KeyError, pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+            logger.warning(f"[EXPORT] Invalid request {self.path} → {e}")
+            self._error(HTTPStatus.BAD_REQUEST, str(e))
+            return
+
+        gzip = accepts_gzip(self.headers.get("Accept-Encoding"))
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", MEDIA_TYPES[request.format])
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("ETag", etag)
+        self.send_header("Vary", "Accept-Encoding")
+        if gzip:
+            self.send_header("Content-Encoding", "gzip")
+        self.end_headers()
+
+        body = ChunkedBody(self.wfile, self.gzip_level if gzip else None)
+        rows = 0
+        try:
+            if request.format == "csv":
+                writer = pcsv.CSVWriter(body, csv_schema(schema))
+            else:
+                writer = pa.ipc.new_stream(body, schema)
+            for batch in itertools.chain([first] if first is not None else [], batches):
+                writer.write_batch(csv_batch(batch) if request.format == "csv" else batch)
+                rows += batch.num_rows
+            writer.close()
+            body.close()
+        except (OSError, pa.ArrowException) as e:
+            # Without the terminating chunk the client sees a truncated body, not a
+            # short but complete one
+            logger.error(f"[EXPORT] Stream aborted after {rows} rows for {self.path} → {e}")
+            self.close_connection = True
+            return
+        logger.info(
+            f"[EXPORT] {rows} rows as {request.format}{'+gzip' if gzip else ''} "
+            f"({body.bytes_sent} bytes) for {self.path}"
+        )
+
+    def _not_modified(self, etag: str) -> bool:
+        if not etag_matches(self.headers.get("If-None-Match"), etag):
+            return False
+        self.send_response(HTTPStatus.NOT_MODIFIED)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+        return True
+
+    def _error(self, status: HTTPStatus, message: str) -> None:
+        body = json.dumps({"error": message}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        logger.debug(f"[HTTP] {self.address_string()} {format % args}")
+
+
+def make_server(
+    host: str = EXPORT_HOST,
+    port: int = EXPORT_PORT,
+    root: Path = HISTORY_DATA_DIR,
+    batch_rows: int = EXPORT_BATCH_ROWS,
+    gzip_level: int = EXPORT_GZIP_LEVEL,
+) -> ThreadingHTTPServer:
+    """
+    Export server over the history partitions under `root`; port 0 picks a free
+    port. Requests are served on one thread each, sharing one QueryService.
+    """
+    handler = type(
+        "BoundExportHandler",
+        (ExportHandler,),
+        {"service": QueryService(root), "batch_rows": batch_rows, "gzip_level": gzip_level},
+    )
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def serve(host: str = EXPORT_HOST, port: int = EXPORT_PORT, root: Path = HISTORY_DATA_DIR) -> bool:
+    try:
+        server = make_server(host, port, root)
+    except OSError as e:
+        logger.error(f"[EXPORT] Cannot listen on {host}:{port} → {e}")
+        return False
+    logger.info(f"[EXPORT] Serving {root} on http://{host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("[EXPORT] Shutting down")
+    finally:
+        server.server_close()
+    return True
+
+
+if __name__ == "__main__":
+    cli = argparse.ArgumentParser(description="Serve the warehouse history over HTTP")
+    cli.add_argument("--host", default=EXPORT_HOST)
+    cli.add_argument("--port", type=int, default=EXPORT_PORT)
+    args = cli.parse_args()
+    serve(args.host, args.port)
@@ -0,0 +1,232 @@
+import json
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from src.config import (
+    FEATURE_COLUMNS,
+    FEATURE_LAGS,
+    FEATURE_ROLLING_WINDOWS,
+    FEATURE_TARGET,
+    FEATURES_DATA_DIR,
+    HISTORY_DATA_DIR,
+    LSTM_HORIZON,
+    LSTM_LOOKBACK,
+)
+from src.file_utils import atomic_path, atomic_write
+from src.history_store import HistoryStore
+from src.logger import setup_logger
+from src.profiling import run_stage
+
+logger = setup_logger(__name__, log_name="feature_builder")
+
+# Number of windows materialized at once while streaming to the output memmap
+WRITE_CHUNK_SIZE = 4096
+
+
+def lag_features(values: np.ndarray, lags: Sequence[int]) -> np.ndarray:
+    """
+    Returns a (n, len(lags)) matrix where column j holds values shifted by lags[j].
+    """
+    out = np.full((len(values), len(lags)), np.nan, dtype=np.float32)
+    for j, lag in enumerate(lags):
+        if 0 < lag < len(values):
+            out[lag:, j] = values[:-lag]
+    return out
+
+
+def rolling_features(values: np.ndarray, window: int) -> dict[str, np.ndarray]:
+    """
+    Trailing window statistics computed on a strided view; the first window-1 rows are NaN.
+    """
+    stats = {
+        name: np.full(len(values), np.nan, dtype=np.float32)
+        for name in ("mean", "std", "min", "max")
+    }
+    if window > len(values):
+        return stats
+    view = sliding_window_view(values, window)
+    stats["mean"][window - 1 :] = view.mean(axis=-1)
+    stats["std"][window - 1 :] = view.std(axis=-1)
+    stats["min"][window - 1 :] = view.min(axis=-1)
+    stats["max"][window - 1 :] = view.max(axis=-1)
+    return stats
+
+
+def calendar_features(dates: pd.Series) -> pd.DataFrame:
+    dates = pd.to_datetime(dates)
+    day_of_year = dates.dt.dayofyear.to_numpy()
+    month = dates.dt.month.to_numpy()
+    weekday = dates.dt.weekday.to_numpy()
+    year_length = np.where(dates.dt.is_leap_year.to_numpy(), 366.0, 365.0)
+
+    doy_angle = 2 * np.pi * (day_of_year - 1) / year_length
+    month_angle = 2 * np.pi * (month - 1) / 12
+    return pd.DataFrame(
+        {
+            "DayOfYear": day_of_year.astype(np.int16),
+            "Month": month.astype(np.int8),
+            "Weekday": weekday.astype(np.int8),
+            "DayOfYear_sin": np.sin(doy_angle).astype(np.float32),
+            "DayOfYear_cos": np.cos(doy_angle).astype(np.float32),
+            "Month_sin": np.sin(month_angle).astype(np.float32),
+            "Month_cos": np.cos(month_angle).astype(np.float32),
+        },
+        index=dates.index,
+    )
+
+
+def build_tabular_features(
+    df: pd.DataFrame,
+    columns: Sequence[str] = FEATURE_COLUMNS,
+    lags: Sequence[int] = FEATURE_LAGS,
+    windows: Sequence[int] = FEATURE_ROLLING_WINDOWS,
+) -> pd.DataFrame:
+    """
+    Lags, trailing rolling statistics and calendar encodings for a single location.
+    Expects one row per day sorted by Date.
+    """
+    columns = [c for c in columns if c in df.columns]
+    features = {"Date": pd.to_datetime(df["Date"]).to_numpy()}
+    for col in columns:
+        values = df[col].to_numpy(dtype=np.float32)
+        features[col] = values
+        lagged = lag_features(values, lags)
+        for j, lag in enumerate(lags):
+            features[f"{col}_lag{lag}"] = lagged[:, j]
+        for window in windows:
+            for stat, series in rolling_features(values, window).items():
+                features[f"{col}_roll{window}_{stat}"] = series
+
+    table = pd.DataFrame(features)
+    calendar = calendar_features(table["Date"])
+    return pd.concat([table, calendar], axis=1)
+
+
+def sliding_windows(
+    matrix: np.ndarray, target: np.ndarray, lookback: int, horizon: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Builds LSTM samples as strided views without copying.
+
+    X[i] = matrix[i : i + lookback]                      shape (N, lookback, n_features)
+    y[i] = target[i + lookback : i + lookback + horizon] shape (N, horizon)
+
+    Also returns a boolean mask of windows that contain no NaN in X or y.
+    """
+    n_windows = len(matrix) - lookback - horizon + 1
+    if n_windows <= 0:
+        empty = np.empty((0, lookback, matrix.shape[1]), dtype=matrix.dtype)
+        return empty, np.empty((0, horizon), dtype=target.dtype), np.empty(0, dtype=bool)
+
+    X = sliding_window_view(matrix, lookback, axis=0)[:n_windows].transpose(0, 2, 1)
+    y = sliding_window_view(target[lookback:], horizon)[:n_windows]
+
+    # Prefix sums of NaN rows give each window's NaN count in O(1)
+    bad_rows = np.isnan(matrix).any(axis=1) | np.isnan(target)
+    bad_prefix = np.concatenate([[0], np.cumsum(bad_rows)])
+    span = lookback + horizon
+    valid = bad_prefix[span : span + n_windows] - bad_prefix[:n_windows] == 0
+    return X, y, valid
+
+
+def write_windows(X: np.ndarray, y: np.ndarray, valid: np.ndarray, prefix: Path) -> int:
+    """
+    Streams valid windows into float32 `.npy` memmaps in chunks, so at most
+    WRITE_CHUNK_SIZE windows are materialized in memory at once. Both are written to
+    temp files and only renamed into place once complete.
+    """
+    indices = np.flatnonzero(valid)
+    with atomic_path(f"{prefix}_X.npy") as X_path, atomic_path(f"{prefix}_y.npy") as y_path:
+        X_out = np.lib.format.open_memmap(
+            X_path, mode="w+", dtype=np.float32, shape=(len(indices), *X.shape[1:])
+        )
+        y_out = np.lib.format.open_memmap(
+            y_path, mode="w+", dtype=np.float32, shape=(len(indices), *y.shape[1:])
+        )
+        for start in range(0, len(indices), WRITE_CHUNK_SIZE):
+            chunk = indices[start : start + WRITE_CHUNK_SIZE]
+            X_out[start : start + len(chunk)] = X[chunk]
+            y_out[start : start + len(chunk)] = y[chunk]
+        X_out.flush()
+        y_out.flush()
+        del X_out, y_out
+    return len(indices)
+
+
+def build_location(
+    df: pd.DataFrame,
+    postal: str,
+    out_dir: Path = FEATURES_DATA_DIR,
+    target: str = FEATURE_TARGET,
+    lookback: int = LSTM_LOOKBACK,
+    horizon: int = LSTM_HORIZON,
+) -> Optional[dict]:
+    if df.empty or target not in df.columns:
+        logger.error(f"[FEATURES] {postal}: no rows or missing target column '{target}'")
+        return None
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    # Lags and windows assume one row per calendar day; missing days become NaN rows
+    df = (
+        df.assign(Date=pd.to_datetime(df["Date"]))
+        .drop_duplicates("Date", keep="last")
+        .set_index("Date")
+        .sort_index()
+        .asfreq("D")
+        .reset_index()
+    )
+
+    tabular = build_tabular_features(df)
+    tabular.insert(1, "PostalCode", postal)
+    with atomic_path(out_dir / f"postal={postal}_tabular.arrow") as tmp_path:
+        tabular.to_feather(tmp_path)
+
+    window_features = [c for c in FEATURE_COLUMNS if c in df.columns]
+    window_features += ["DayOfYear_sin", "DayOfYear_cos"]
+    matrix = tabular[window_features].to_numpy(np.float32)
+    X, y, valid = sliding_windows(matrix, df[target].to_numpy(np.float32), lookback, horizon)
+    n_windows = write_windows(X, y, valid, out_dir / f"postal={postal}_lstm")
+
+    # Written last: a manifest always describes complete data files
+    manifest = {
+        "postal": postal,
+        "rows": len(tabular),
+        "tabular_columns": list(tabular.columns),
+        "window_features": window_features,
+        "target": target,
+        "lookback": lookback,
+        "horizon": horizon,
+        "windows": n_windows,
+    }
+    with atomic_write(out_dir / f"postal={postal}_manifest.json") as f:
+        json.dump(manifest, f, indent=2)
+
+    logger.info(f"[FEATURES] {postal}: {len(tabular)} rows, {n_windows} LSTM windows")
+    return manifest
+
+
+def run() -> bool:
+    store = HistoryStore(HISTORY_DATA_DIR)
+    locations = store.locations()
+    if not locations:
+        logger.error("[ERROR] History store is empty. Nothing to build.")
+        return False
+
+    built = 0
+    for postal in locations:
+        # One location at a time keeps peak memory bounded by a single history
+        if build_location(store.read_frame(postal), postal, FEATURES_DATA_DIR):
+            built += 1
+        store.close()
+
+    logger.info(f"[DONE] Feature datasets built for {built}/{len(locations)} locations.")
+    return built > 0
+
+
+if __name__ == "__main__":
+    run_stage(run, "feature_builder")
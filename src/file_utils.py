@@ -0,0 +1,54 @@
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Iterator, Union
+
+
+def _temp_path_for(path: Path) -> Path:
+    # Same directory as the target so os.replace stays an atomic rename; unique per
+    # thread so concurrent writers of the same file never share a temp file
+    return path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def _discard(tmp_path: Path) -> None:
+    try:
+        os.remove(tmp_path)
+    except FileNotFoundError:
+        pass
+
+
+@contextmanager
+def atomic_path(path: Union[str, Path]) -> Iterator[Path]:
+    """
+    Yields a temporary path next to `path` and renames it over `path` on success.
+    For writers that take a filename (DataFrame.to_csv, feather, np.save, ...).
+    Readers never observe a partially written file; on error the target is untouched.
+    """
+    path = Path(path)
+    tmp_path = _temp_path_for(path)
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    except BaseException:
+        _discard(tmp_path)
+        raise
+
+
+@contextmanager
+def atomic_write(path: Union[str, Path], mode: str = "w", encoding: str = "utf-8") -> Iterator[IO]:
+    """
+    Like `open(path, mode)`, but the data only replaces `path` once it is fully
+    written and fsynced, so a crash mid-write never leaves a truncated file behind.
+    """
+    path = Path(path)
+    tmp_path = _temp_path_for(path)
+    try:
+        with open(tmp_path, mode, encoding=None if "b" in mode else encoding) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        _discard(tmp_path)
+        raise
@@ -0,0 +1,288 @@
+import csv
+import json
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Iterable, Optional, Sequence, Union
+from urllib.parse import urlencode
+
+from src.config import (
+    GAZETTEER_PATH,
+    GEOCODING_COUNTRY_CODE,
+    GEOCODING_MAX_WORKERS,
+    GEOCODING_URL,
+    LOCATION_CACHE_PATH,
+    LOCATIONS_INPUT_PATH,
+    RESOLVED_LOCATIONS_PATH,
+)
+from src.file_utils import atomic_write
+from src.location_resolver import LocationDict, get_with_retry
+from src.logger import setup_logger
+from src.profiling import run_stage
+from src.settings import LocationSettings
+
+logger = setup_logger(__name__, log_name="geocoder")
+
+# SQLite limits the number of bound parameters per statement
+SQLITE_BATCH_SIZE = 500
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.strip().lower().split())
+
+
+class LocationCache:
+    """
+    Persistent key-value cache of resolved locations backed by SQLite.
+    Keys are normalized queries (postal codes or city names).
+    """
+
+    def __init__(self, path: Union[str, Path] = LOCATION_CACHE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS locations (
+                key TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                source TEXT NOT NULL,
+                updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, LocationDict]:
+        keys = list(keys)
+        found: dict[str, LocationDict] = {}
+        for i in range(0, len(keys), SQLITE_BATCH_SIZE):
+            batch = keys[i : i + SQLITE_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT key, payload FROM locations WHERE key IN ({placeholders})", batch
+            )
+            for key, payload in rows:
+                found[key] = json.loads(payload)
+        return found
+
+    def put_many(self, items: dict[str, LocationDict], source: str) -> None:
+        if not items:
+            return
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO locations (key, payload, source) VALUES (?, ?, ?)",
+                [(key, json.dumps(loc), source) for key, loc in items.items()],
+            )
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "LocationCache":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def read_location_queries(path: Union[str, Path] = LOCATIONS_INPUT_PATH) -> list[str]:
+    """
+    Reads one postal code or city name per line. Blank lines and `#` comments are skipped.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = [line.split("#", 1)[0].strip() for line in f]
+    except (PermissionError, FileNotFoundError, OSError) as e:
+        logger.error(f"[INPUT] Could not read location queries → {e}")
+        return []
+
+    queries = [line for line in lines if line]
+    logger.info(f"[INPUT] Loaded {len(queries)} location queries from {path}")
+    return queries
+
+
+def load_gazetteer(path: Union[str, Path] = GAZETTEER_PATH) -> dict[str, LocationDict]:
+    """
+    Loads an offline gazetteer CSV with columns postal, city, latitude, longitude.
+    Every row is indexed by its postal code and by its normalized city name;
+    malformed rows are skipped.
+    """
+    path = Path(path)
+    if not path.exists():
+        logger.info(f"[GAZETTEER] No gazetteer found at {path}, skipping offline tier")
+        return {}
+
+    index: dict[str, LocationDict] = {}
+    skipped = 0
+    try:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                try:
+                    loc: LocationDict = {
+                        "city": row["city"],
+                        "postal": row["postal"],
+                        "latitude": float(row["latitude"]),
+                        "longitude": float(row["longitude"]),
+                    }
+                    keys = (normalize_query(loc["postal"]), normalize_query(loc["city"]))
+                except (KeyError, ValueError, TypeError, AttributeError):
+                    skipped += 1
+                    continue
+                for key in keys:
+                    index.setdefault(key, loc)
+    except (PermissionError, OSError) as e:
+        logger.error(f"[GAZETTEER] File access error → {e}")
+        return {}
+
+    logger.info(f"[GAZETTEER] Loaded {len(index)} keys from {path} ({skipped} rows skipped)")
+    return index
+
+
+def geocode_query(
+    query: str, country_code: Optional[str] = GEOCODING_COUNTRY_CODE
+) -> Optional[LocationDict]:
+    params: dict[str, Any] = {"name": query, "count": 1, "format": "json"}
+    if country_code:
+        params["countryCode"] = country_code
+
+    response = get_with_retry(f"{GEOCODING_URL}?{urlencode(params)}")
+    if response is None:
+        return None
+
+    try:
+        results = response.json().get("results") or []
+    except ValueError as e:
+        logger.error(f"[GEOCODE] Invalid JSON for '{query}' → {e}")
+        return None
+
+    if not results:
+        logger.warning(f"[GEOCODE] No match for '{query}'")
+        return None
+
+    match = results[0]
+    postcodes = match.get("postcodes") or []
+    postal = query if query.isdigit() else (postcodes[0] if postcodes else None)
+    if not postal:
+        logger.warning(f"[GEOCODE] No postal code for '{query}'")
+        return None
+
+    try:
+        return {
+            "city": match.get("name", "Unknown"),
+            "postal": postal,
+            "latitude": float(match["latitude"]),
+            "longitude": float(match["longitude"]),
+        }
+    except (KeyError, TypeError, ValueError) as e:
+        logger.error(f"[GEOCODE] Malformed match for '{query}' → {e!r}")
+        return None
+
+
+def resolve_locations(
+    queries: Iterable[str],
+    cache_path: Union[str, Path] = LOCATION_CACHE_PATH,
+    gazetteer_path: Union[str, Path] = GAZETTEER_PATH,
+    max_workers: int = GEOCODING_MAX_WORKERS,
+) -> dict[str, Optional[LocationDict]]:
+    """
+    Resolves many queries in three tiers: offline gazetteer, SQLite cache, geocoding API.
+    Only cache misses hit the network; they are looked up concurrently and cached.
+    """
+    keyed = {query: normalize_query(query) for query in queries}
+    pending = set(keyed.values())
+    resolved: dict[str, LocationDict] = {}
+
+    gazetteer = load_gazetteer(gazetteer_path)
+    for key in list(pending):
+        if key in gazetteer:
+            resolved[key] = gazetteer[key]
+            pending.discard(key)
+    logger.info(f"[BATCH] Gazetteer hits: {len(resolved)}")
+
+    with LocationCache(cache_path) as cache:
+        cached = cache.get_many(pending)
+        resolved.update(cached)
+        pending -= cached.keys()
+        logger.info(f"[BATCH] Cache hits: {len(cached)}, misses: {len(pending)}")
+
+        if pending:
+            misses = sorted(pending)
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                fetched = dict(zip(misses, pool.map(geocode_query, misses)))
+            found = {key: loc for key, loc in fetched.items() if loc}
+            cache.put_many(found, source="open-meteo-geocoding")
+            resolved.update(found)
+            logger.info(f"[BATCH] Geocoded {len(found)}/{len(misses)} cache misses")
+
+    return {query: resolved.get(key) for query, key in keyed.items()}
+
+
+def resolve_configured_locations(
+    entries: Sequence[Union[str, LocationSettings]],
+) -> list[LocationDict]:
+    """
+    Resolves the `locations` list from settings.yaml: complete mappings are used as
+    given, postal codes and city names go through `resolve_locations`.
+    """
+    locations: list[LocationDict] = []
+    queries: list[str] = []
+    for entry in entries:
+        if isinstance(entry, str):
+            queries.append(entry)
+        elif entry.complete:
+            locations.append(entry.as_location())
+        elif entry.postal or entry.city:
+            queries.append(entry.postal or entry.city)
+    if queries:
+        results = resolve_locations(queries)
+        unresolved = [query for query, loc in results.items() if loc is None]
+        if unresolved:
+            logger.warning(
+                f"[BATCH] {len(unresolved)} configured locations unresolved: {unresolved}"
+            )
+        locations += [loc for loc in results.values() if loc]
+    return list({loc["postal"]: loc for loc in locations}.values())
+
+
+def save_locations(
+    locations: list[LocationDict], path: Union[str, Path] = RESOLVED_LOCATIONS_PATH
+) -> bool:
+    try:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with atomic_write(path) as f:
+            json.dump(locations, f, indent=2)
+        logger.info(f"[SAVE] {len(locations)} locations saved to → {path}")
+        return True
+    except (PermissionError, FileNotFoundError, OSError) as e:
+        logger.error(f"[SAVE] File system error while saving → {e}")
+        return False
+    except (ValueError, TypeError) as e:
+        logger.error(f"[SAVE] Data format issue → {e}")
+        return False
+
+
+def run(input_path: Union[str, Path] = LOCATIONS_INPUT_PATH) -> Optional[list[LocationDict]]:
+    queries = read_location_queries(input_path)
+    if not queries:
+        logger.error("[ERROR] No location queries to resolve.")
+        return None
+
+    results = resolve_locations(queries)
+    unresolved = [query for query, loc in results.items() if loc is None]
+    if unresolved:
+        logger.warning(f"[BATCH] {len(unresolved)} queries unresolved: {unresolved[:10]}")
+
+    locations = list({loc["postal"]: loc for loc in results.values() if loc}.values())
+    if not locations:
+        logger.error("[ERROR] Could not resolve any location.")
+        return None
+
+    save_locations(locations)
+    logger.info(f"[DONE] Resolved {len(locations)} unique locations")
+    return locations
+
+
+if __name__ == "__main__":
+    run_stage(run, "geocoder")
@@ -0,0 +1,273 @@
+from collections import OrderedDict
+from datetime import date
+from pathlib import Path
+from typing import Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from src.config import HISTORY_DATA_DIR, STAGING_DATA_DIR
+from src.file_utils import atomic_path
+from src.logger import setup_logger
+from src.profiling import run_stage
+from src.settings import get_settings
+from src.weather_schema import SCHEMA_VERSION
+
+logger = setup_logger(__name__, log_name="history_store")
+
+DateLike = Union[str, date, pd.Timestamp, np.datetime64]
+
+# Partitions record the weather_schema version of their units in the Arrow schema
+# metadata; files written before versioning carry none and hold version "1" units
+VERSION_KEY = b"schema_version"
+UNVERSIONED = "1"
+
+# pipeline.cleaned_format → staging file suffix
+CLEANED_SUFFIXES = {"csv": ".csv", "arrow": ".arrow"}
+
+
+def cleaned_files(directory: Path = STAGING_DATA_DIR) -> list[Path]:
+    suffixes = set(CLEANED_SUFFIXES.values())
+    return sorted(p for p in Path(directory).glob("cleaned_weather_*") if p.suffix in suffixes)
+
+
+def partition_path(postal: str, root: Path = HISTORY_DATA_DIR) -> Path:
+    return Path(root) / f"postal={postal}.arrow"
+
+
+def get_latest_cleaned_file(directory: Path = STAGING_DATA_DIR) -> Optional[Path]:
+    files = cleaned_files(directory)
+    if not files:
+        logger.error("[FILE] No cleaned weather files found.")
+        return None
+    latest = max(files, key=lambda f: f.stat().st_ctime)
+    logger.info(f"[FILE] Latest cleaned file selected: {latest}")
+    return latest
+
+
+def read_cleaned_file(path: Path) -> Optional[pd.DataFrame]:
+    try:
+        if Path(path).suffix == ".arrow":
+            return pd.read_feather(path)
+        return pd.read_csv(path, parse_dates=["Date"], dtype={"PostalCode": str})
+    except (PermissionError, FileNotFoundError, OSError) as e:
+        logger.error(f"[LOAD] File access error → {e}")
+        return None
+    except (ValueError, pd.errors.ParserError) as e:
+        logger.error(f"[LOAD] Could not parse cleaned file → {e}")
+        return None
+
+
+def frame_to_table(df: pd.DataFrame) -> pa.Table:
+    """
+    Converts a cleaned frame to an Arrow table that can be read back zero-copy.
+    Floats keep NaN instead of becoming nulls, so numeric columns stay null-free.
+    """
+    arrays = {}
+    for col in df.columns:
+        values = df[col]
+        if col == "Date":
+            arrays[col] = pa.array(pd.to_datetime(values).to_numpy("datetime64[ns]"))
+        elif pd.api.types.is_numeric_dtype(values):
+            arrays[col] = pa.array(values.to_numpy(dtype="float64"))
+        else:
+            arrays[col] = pa.array(values.astype(str).tolist(), type=pa.string())
+    return pa.table(arrays)
+
+
+def _version(schema: pa.Schema) -> str:
+    return (schema.metadata or {}).get(VERSION_KEY, UNVERSIONED.encode()).decode()
+
+
+def _stale_message(path: Path, version: str) -> str:
+    return (
+        f"{path} holds schema version {version} units, expected {SCHEMA_VERSION}; "
+        "run `make migrate` first"
+    )
+
+
+def partition_version(path: Path) -> str:
+    return _version(pa.ipc.open_file(pa.memory_map(str(path), "r")).schema)
+
+
+def check_version(path: Path) -> None:
+    version = partition_version(path)
+    if version != SCHEMA_VERSION:
+        raise ValueError(_stale_message(path, version))
+
+
+def write_partition(df: pd.DataFrame, postal: str, root: Path = HISTORY_DATA_DIR) -> Path:
+    """
+    Upserts rows for one location into its Arrow file. Newer rows win on duplicate dates.
+    A file written under another schema version is refused rather than mixed with rows
+    in the current units.
+    """
+    path = partition_path(postal, root)
+    if path.exists():
+        check_version(path)
+        existing = feather.read_feather(path, memory_map=True)
+        df = pd.concat([existing, df], ignore_index=True)
+    return replace_partition(df, postal, root)
+
+
+def replace_partition(df: pd.DataFrame, postal: str, root: Path = HISTORY_DATA_DIR) -> Path:
+    """
+    Writes `df` as the location's whole Arrow file, stamped with SCHEMA_VERSION. The
+    file is written uncompressed as a single record batch so it can be memory-mapped.
+    """
+    path = partition_path(postal, root)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    df = df.drop_duplicates(subset="Date", keep="last").sort_values("Date", ignore_index=True)
+    table = frame_to_table(df).replace_schema_metadata({VERSION_KEY: SCHEMA_VERSION})
+
+    with atomic_path(path) as tmp_path:
+        feather.write_feather(
+            table, tmp_path, compression="uncompressed", chunksize=max(table.num_rows, 1)
+        )
+    logger.info(f"[WRITE] {table.num_rows} rows written to {path}")
+    return path
+
+
+def ingest_frame(df: pd.DataFrame, root: Path = HISTORY_DATA_DIR) -> list[Path]:
+    df = df.assign(Date=pd.to_datetime(df["Date"]), PostalCode=df["PostalCode"].astype(str))
+    return [write_partition(group, postal, root) for postal, group in df.groupby("PostalCode")]
+
+
+def _to_datetime64(value: Optional[DateLike]) -> Optional[np.datetime64]:
+    if value is None:
+        return None
+    return np.datetime64(pd.Timestamp(value).to_datetime64(), "ns")
+
+
+class HistoryStore:
+    """
+    Read API over the per-location Arrow history files.
+
+    Each file is memory-mapped on first access and kept open together with its Date
+    column, so later slices are a binary search plus a zero-copy `Table.slice`.
+    Files rewritten by `write_partition` are detected by mtime and reopened; the least
+    recently used partitions are unmapped beyond `max_open`. Files from another schema
+    version are not read, so callers never mix units.
+    """
+
+    def __init__(self, root: Path = HISTORY_DATA_DIR, max_open: Optional[int] = None):
+        self.root = Path(root)
+        self.max_open = max_open or get_settings().cache.history_open_partitions
+        self._open: OrderedDict[str, tuple[int, pa.Table, np.ndarray]] = OrderedDict()
+
+    def locations(self) -> list[str]:
+        return sorted(p.stem.split("=", 1)[1] for p in self.root.glob("postal=*.arrow"))
+
+    def _partition(self, postal: str) -> Optional[tuple[pa.Table, np.ndarray]]:
+        path = partition_path(postal, self.root)
+        try:
+            mtime = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            logger.error(f"[READ] No history for postal {postal}")
+            return None
+
+        cached = self._open.get(postal)
+        if cached and cached[0] == mtime:
+            self._open.move_to_end(postal)
+            return cached[1], cached[2]
+
+        table = pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+        version = _version(table.schema)
+        if version != SCHEMA_VERSION:
+            logger.error(f"[READ] {_stale_message(path, version)}")
+            return None
+        dates = table.column("Date").combine_chunks().to_numpy(zero_copy_only=False)
+        self._open[postal] = (mtime, table, dates)
+        self._open.move_to_end(postal)
+        while len(self._open) > self.max_open:
+            self._open.popitem(last=False)
+        logger.debug(f"[READ] Memory-mapped {path} ({table.num_rows} rows)")
+        return table, dates
+
+    def read(
+        self,
+        postal: str,
+        start: Optional[DateLike] = None,
+        end: Optional[DateLike] = None,
+        columns: Optional[Sequence[str]] = None,
+    ) -> Optional[pa.Table]:
+        """
+        Returns rows with start <= Date <= end as a zero-copy view of the mapped file.
+        """
+        partition = self._partition(postal)
+        if partition is None:
+            return None
+        table, dates = partition
+
+        lo = 0 if start is None else int(np.searchsorted(dates, _to_datetime64(start), "left"))
+        hi = (
+            len(dates) if end is None else int(np.searchsorted(dates, _to_datetime64(end), "right"))
+        )
+        view = table.slice(lo, max(hi - lo, 0))
+        if columns is not None:
+            view = view.select(["Date", *[c for c in columns if c != "Date"]])
+        return view
+
+    def read_frame(
+        self,
+        postal: str,
+        start: Optional[DateLike] = None,
+        end: Optional[DateLike] = None,
+        columns: Optional[Sequence[str]] = None,
+    ) -> pd.DataFrame:
+        view = self.read(postal, start, end, columns)
+        if view is None:
+            return pd.DataFrame()
+        return view.to_pandas(split_blocks=True)
+
+    def read_arrays(
+        self,
+        postal: str,
+        start: Optional[DateLike] = None,
+        end: Optional[DateLike] = None,
+        columns: Optional[Sequence[str]] = None,
+    ) -> dict[str, np.ndarray]:
+        """
+        Returns NumPy views over the mapped buffers. Arrays are read-only.
+        """
+        view = self.read(postal, start, end, columns)
+        if view is None:
+            return {}
+        arrays = {}
+        for name in view.column_names:
+            column = view.column(name)
+            chunk = column.chunk(0) if column.num_chunks == 1 else column.combine_chunks()
+            arrays[name] = chunk.to_numpy(
+                zero_copy_only=chunk.null_count == 0 and _is_primitive(chunk)
+            )
+        return arrays
+
+    def close(self) -> None:
+        self._open.clear()
+
+
+def _is_primitive(array: pa.Array) -> bool:
+    return pa.types.is_floating(array.type) or pa.types.is_timestamp(array.type)
+
+
+def run() -> bool:
+    cleaned_file = get_latest_cleaned_file(STAGING_DATA_DIR)
+    if not cleaned_file:
+        logger.error("[ERROR] No cleaned file found.")
+        return False
+
+    df = read_cleaned_file(cleaned_file)
+    if df is None or df.empty:
+        logger.error("[ERROR] Cleaned file could not be loaded or is empty.")
+        return False
+
+    paths = ingest_frame(df, HISTORY_DATA_DIR)
+    logger.info(f"[DONE] History store updated for {len(paths)} locations.")
+    return True
+
+
+if __name__ == "__main__":
+    run_stage(run, "history_store")
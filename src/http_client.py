@@ -0,0 +1,63 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from src.settings import get_settings
+from src.tracing import span, tracer
+
+_local = threading.local()
+
+
+def pooled_session(retries: int = 3, backoff_factor: float = 0.5) -> requests.Session:
+    """
+    Returns this thread's session for the given retry policy, creating it on first use.
+
+    Sessions are reused across calls so keep-alive connections (and their TLS handshakes)
+    survive between requests; that matters for the long-running scheduler, where the same
+    API hosts are hit every cycle. Sessions are per thread because requests.Session is not
+    guaranteed to be thread-safe.
+    """
+    sessions = getattr(_local, "sessions", None)
+    if sessions is None:
+        sessions = _local.sessions = {}
+
+    key = (retries, backoff_factor)
+    session = sessions.get(key)
+    if session is None:
+        session = requests.Session()
+        retry_strategy = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["GET"],
+        )
+        adapter = HTTPAdapter(
+            max_retries=retry_strategy, pool_maxsize=get_settings().cache.http_pool_size
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        sessions[key] = session
+    return session
+
+
+def close_sessions() -> None:
+    """
+    Closes the calling thread's pooled sessions.
+    """
+    for session in getattr(_local, "sessions", {}).values():
+        session.close()
+    _local.sessions = {}
+
+
+def traced_get(session: requests.Session, url: str, **kwargs) -> requests.Response:
+    """
+    session.get wrapped in an `http.get` span carrying the status code and body size.
+    """
+    with span("http.get", url=url) as s:
+        response = session.get(url, **kwargs)
+        # Only touch the body when tracing, as reading it defeats streamed responses
+        if tracer.enabled:
+            s.set(status_code=response.status_code, bytes=len(response.content))
+        return response
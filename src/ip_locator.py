@@ -0,0 +1,205 @@
+import csv
+import ipaddress
+import socket
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+from src.config import (
+    GEOCODING_MAX_WORKERS,
+    IP_RANGES_PATH,
+    IPS_INPUT_PATH,
+    LOCATION_CACHE_PATH,
+    RESOLVED_IP_LOCATIONS_PATH,
+)
+from src.geocoder import LocationCache, read_location_queries, save_locations
+from src.location_resolver import LocationDict, fetch_location_from_ip
+from src.logger import setup_logger
+from src.profiling import run_stage
+
+logger = setup_logger(__name__, log_name="ip_logs")
+
+IPAddress = Union[ipaddress.IPv4Address, ipaddress.IPv6Address]
+
+
+def cache_key(ip: IPAddress) -> str:
+    # Namespaced so IP entries never collide with postal code / city keys
+    return f"ip:{ip.compressed}"
+
+
+def parse_ip(text: str) -> Optional[IPAddress]:
+    try:
+        return ipaddress.ip_address(text.strip())
+    except ValueError:
+        logger.warning(f"[IP] Not an IP address: '{text}'")
+        return None
+
+
+def address_value(text: str) -> tuple[int, int]:
+    """
+    Returns (IP version, integer value) of an address. inet_pton is several times
+    faster than ipaddress for the millions of rows a range database can hold.
+    """
+    text = text.strip()
+    family, version = (socket.AF_INET6, 6) if ":" in text else (socket.AF_INET, 4)
+    try:
+        return version, int.from_bytes(socket.inet_pton(family, text), "big")
+    except OSError:
+        raise ValueError(f"Not an IP address: '{text}'")
+
+
+class IpRangeTable:
+    """
+    Offline IP-range database: non-overlapping [start, end] address ranges, each
+    mapped to a location. Ranges are kept sorted by start per IP version, so a
+    lookup is one binary search over the starts plus a bound check on the end.
+    """
+
+    def __init__(self, ranges: Iterable[tuple[int, int, int, LocationDict]] = ()):
+        """
+        `ranges` holds (IP version, first address, last address, location) with the
+        addresses as integers, see address_value().
+        """
+        by_version: dict[int, list[tuple[int, int, LocationDict]]] = {4: [], 6: []}
+        for version, start, end, location in ranges:
+            by_version[version].append((start, end, location))
+        self._starts: dict[int, list[int]] = {}
+        self._ends: dict[int, list[int]] = {}
+        self._locations: dict[int, list[LocationDict]] = {}
+        for version, rows in by_version.items():
+            rows.sort(key=lambda row: row[0])
+            self._starts[version] = [row[0] for row in rows]
+            self._ends[version] = [row[1] for row in rows]
+            self._locations[version] = [row[2] for row in rows]
+
+    def __len__(self) -> int:
+        return sum(len(starts) for starts in self._starts.values())
+
+    def lookup(self, ip: IPAddress) -> Optional[LocationDict]:
+        starts = self._starts[ip.version]
+        i = bisect_right(starts, int(ip)) - 1
+        if i >= 0 and int(ip) <= self._ends[ip.version][i]:
+            return self._locations[ip.version][i]
+        return None
+
+    @classmethod
+    def load(cls, path: Union[str, Path] = IP_RANGES_PATH) -> "IpRangeTable":
+        """
+        Loads a CSV with columns start_ip, end_ip, city, postal, latitude, longitude.
+        A missing file gives an empty table; malformed rows are skipped.
+        """
+        path = Path(path)
+        if not path.exists():
+            logger.info(f"[IP] No IP range table found at {path}, skipping offline tier")
+            return cls()
+
+        ranges = []
+        skipped = 0
+        try:
+            with open(path, "r", encoding="utf-8", newline="") as f:
+                for row in csv.DictReader(f):
+                    try:
+                        version, start = address_value(row["start_ip"])
+                        end_version, end = address_value(row["end_ip"])
+                        if version != end_version or start > end:
+                            raise ValueError(f"Bad range {row['start_ip']} - {row['end_ip']}")
+                        location: LocationDict = {
+                            "city": row["city"],
+                            "postal": row["postal"],
+                            "latitude": float(row["latitude"]),
+                            "longitude": float(row["longitude"]),
+                        }
+                    except (KeyError, ValueError, AttributeError):
+                        skipped += 1
+                        continue
+                    ranges.append((version, start, end, location))
+        except (PermissionError, OSError) as e:
+            logger.error(f"[IP] File access error → {e}")
+            return cls()
+
+        table = cls(ranges)
+        logger.info(f"[IP] Loaded {len(table)} IP ranges from {path} ({skipped} rows skipped)")
+        return table
+
+
+def resolve_ips(
+    ips: Iterable[str],
+    table: Optional[IpRangeTable] = None,
+    cache_path: Union[str, Path] = LOCATION_CACHE_PATH,
+    max_workers: int = GEOCODING_MAX_WORKERS,
+) -> dict[str, Optional[LocationDict]]:
+    """
+    Resolves many IP addresses in three tiers: offline range table, SQLite cache,
+    IPinfo API. Only addresses missing from both are looked up over the network,
+    concurrently, and non-public addresses never are. Every resolved address is
+    written to the cache, so later runs without the range table stay offline too.
+    """
+    table = table if table is not None else IpRangeTable.load()
+    parsed = {text: parse_ip(text) for text in ips}
+    keys = {ip: cache_key(ip) for ip in parsed.values() if ip is not None}
+    resolved: dict[str, LocationDict] = {}
+
+    for ip, key in keys.items():
+        location = table.lookup(ip)
+        if location is not None:
+            resolved[key] = location
+    table_hits = dict(resolved)
+    logger.info(f"[IP] Range table hits: {len(table_hits)}/{len(keys)}")
+
+    with LocationCache(cache_path) as cache:
+        # Table hits are looked up too, so only new or changed ones are written back
+        cached = cache.get_many(keys.values())
+        pending = {ip: key for ip, key in keys.items() if key not in resolved}
+        cache_hits = {key: cached[key] for key in pending.values() if key in cached}
+        resolved.update(cache_hits)
+        pending = {ip: key for ip, key in pending.items() if key not in cache_hits}
+        logger.info(f"[IP] Cache hits: {len(cache_hits)}, misses: {len(pending)}")
+
+        # Private, loopback and reserved addresses are unknown to public IP databases
+        misses = [ip for ip in pending if ip.is_global]
+        if len(misses) < len(pending):
+            logger.warning(f"[IP] {len(pending) - len(misses)} non-public addresses unresolved")
+        found: dict[str, LocationDict] = {}
+        if misses:
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                fetched = pool.map(fetch_location_from_ip, [ip.compressed for ip in misses])
+                found = {pending[ip]: loc for ip, loc in zip(misses, fetched) if loc}
+            logger.info(f"[IP] Resolved {len(found)}/{len(misses)} misses through IPinfo")
+        resolved.update(found)
+
+        uncached = {key: loc for key, loc in table_hits.items() if cached.get(key) != loc}
+        cache.put_many(uncached, source="ip-range-table")
+        cache.put_many(found, source="ipinfo")
+
+    return {text: resolved.get(keys[ip]) if ip else None for text, ip in parsed.items()}
+
+
+def run(
+    input_path: Union[str, Path] = IPS_INPUT_PATH,
+    output_path: Union[str, Path] = RESOLVED_IP_LOCATIONS_PATH,
+) -> Optional[list[LocationDict]]:
+    ips = read_location_queries(input_path)
+    if not ips:
+        logger.error("[ERROR] No IP addresses to resolve.")
+        return None
+
+    results = resolve_ips(ips)
+    unresolved = [ip for ip, loc in results.items() if loc is None]
+    if unresolved:
+        logger.warning(f"[IP] {len(unresolved)} addresses unresolved: {unresolved[:10]}")
+
+    locations = list({loc["postal"]: loc for loc in results.values() if loc}.values())
+    if not locations:
+        logger.error("[ERROR] Could not resolve any location.")
+        return None
+
+    save_locations(locations, output_path)
+    logger.info(
+        f"[DONE] Resolved {len(results) - len(unresolved)} IPs to {len(locations)} locations"
+    )
+    return locations
+
+
+if __name__ == "__main__":
+    run_stage(run, "ip_locator")
@@ -3,11 +3,13 @@ from pathlib import Path
 from typing import Any, Optional, TypedDict, Union
 
 import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 
-from src.config import SETTINGS, SYSTEM_LOCATION_PATH
+from src.config import IPINFO_IP_URL, IPINFO_URL, SETTINGS, SYSTEM_LOCATION_PATH
+from src.file_utils import atomic_write
+from src.http_client import pooled_session, traced_get
 from src.logger import setup_logger
+from src.profiling import run_stage
+from src.tracing import span
 
 logger = setup_logger(__name__, log_name="ip_logs")
 
@@ -22,19 +24,9 @@ class LocationDict(TypedDict):
 def get_with_retry(
     url: str, retries: int = 3, backoff_factor: float = 0.5, timeout: int = 10
 ) -> requests.Response | None:
-    session = requests.Session()
-    retry_strategy = Retry(
-        total=retries,
-        backoff_factor=backoff_factor,
-        status_forcelist=[429, 500, 502, 503, 504],
-        allowed_methods=["GET"],
-    )
-    adapter = HTTPAdapter(max_retries=retry_strategy)
-    session.mount("http://", adapter)
-    session.mount("https://", adapter)
-
+    session = pooled_session(retries, backoff_factor)
     try:
-        response = session.get(url, timeout=timeout)
+        response = traced_get(session, url, timeout=timeout)
         response.raise_for_status()
         return response
     except requests.exceptions.RequestException as e:
@@ -42,9 +34,12 @@ def get_with_retry(
         return None
 
 
-def fetch_location_from_ip() -> Optional[LocationDict]:
-    url: str = "https://ipinfo.io/json"
-    logger.info("[FETCH] Fetching location from IPinfo API")
+def fetch_location_from_ip(ip: Optional[str] = None) -> Optional[LocationDict]:
+    """
+    Locates `ip` through the IPinfo API, or this machine's public IP when None.
+    """
+    url: str = IPINFO_URL if ip is None else IPINFO_IP_URL.format(ip=ip)
+    logger.info(f"[FETCH] Fetching location{f' of {ip}' if ip else ''} from IPinfo API")
     try:
         response: Optional[requests.Response] = get_with_retry(url)
         if response is None:
@@ -92,7 +87,7 @@ def save_location(
         return False
     try:
         Path(path).parent.mkdir(parents=True, exist_ok=True)
-        with open(path, "w", encoding="utf-8") as f:
+        with atomic_write(path) as f:
             json.dump(location, f, indent=2)
         logger.info(f"[SAVE] Location saved to → {path}")
         return True
@@ -126,28 +121,26 @@ def read_location_file(path: Union[str, Path]) -> Optional[LocationDict]:
 
 
 def resolve_location() -> Optional[LocationDict]:
-    # 1. Try from settings.yaml
-    loc = SETTINGS.get("location", {})
-    lat = loc.get("latitude")
-    lon = loc.get("longitude")
-    postal = loc.get("postal")
-    city = loc.get("city", "Unknown")
-
-    if lat and lon and postal and city:
-        logger.info("[CONFIG] Location loaded from settings.yaml")
-        return {"latitude": lat, "longitude": lon, "postal": postal, "city": city}
-
-    # 2. Try from cached file
-    if Path(SYSTEM_LOCATION_PATH).exists():
-        logger.info("[CONFIG] Using cached location from disk")
-        return read_location_file(SYSTEM_LOCATION_PATH)
-
-    # 3. Fallback to IP lookup
-    logger.info("[CONFIG] No config or cache found. Falling back to IP-based location")
-    location = fetch_location_from_ip()
-    if location:
-        save_location(location)
-    return location
+    with span("resolve_location") as s:
+        # 1. Try from settings.yaml
+        if SETTINGS.location.complete:
+            logger.info("[CONFIG] Location loaded from settings.yaml")
+            s.set(source="settings")
+            return SETTINGS.location.as_location()
+
+        # 2. Try from cached file
+        if Path(SYSTEM_LOCATION_PATH).exists():
+            logger.info("[CONFIG] Using cached location from disk")
+            s.set(source="cache")
+            return read_location_file(SYSTEM_LOCATION_PATH)
+
+        # 3. Fallback to IP lookup
+        logger.info("[CONFIG] No config or cache found. Falling back to IP-based location")
+        s.set(source="ip")
+        location = fetch_location_from_ip()
+        if location:
+            save_location(location)
+        return location
 
 
 def run() -> Optional[LocationDict]:
@@ -160,4 +153,4 @@ def run() -> Optional[LocationDict]:
 
 
 if __name__ == "__main__":
-    run()
+    run_stage(run, "location_resolver")
@@ -1,32 +1,404 @@
-from src.data_cleaner import run as clean_weather_data
+import argparse
+import signal
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import partial
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+from src.aggregates import update_aggregates
+from src.anomaly_detector import annotate_anomalies
+from src.archive_diff import ArchiveDelta, commit_delta, compute_delta
+from src.config import (
+    AGGREGATES_DATA_DIR,
+    ANOMALY_DATA_DIR,
+    DELTAS_DATA_DIR,
+    HISTORY_DATA_DIR,
+    JOURNAL_PATH,
+    PREVIEW_DATA_DIR,
+    PROFILE_DIR,
+    SERIES_DATA_DIR,
+    TIMEZONE,
+    TRACE_DIR,
+)
+from src.data_cleaner import process_raw_file
+from src.geocoder import resolve_configured_locations
+from src.geocoder import run as resolve_batch_locations
+from src.history_store import ingest_frame, read_cleaned_file
+from src.ip_locator import run as resolve_ip_locations
+from src.location_resolver import LocationDict
 from src.location_resolver import run as resolve_location
 from src.logger import setup_logger
-from src.weather_data_fetcher import run as fetch_weather_data
+from src.output_validator import check_frame
+from src.preview import update_previews
+from src.profiling import profile_stage, set_run_id, start_profiling, stop_profiling
+from src.query_service import add_query_arguments, run_query
+from src.run_journal import RunJournal
+from src.scheduler import CronSchedule, Scheduler
+from src.series_store import append_frame
+from src.settings import Settings, get_settings, settings_store
+from src.streaming_pipeline import Stage, StreamingPipeline, WorkItem
+from src.tracing import Span, current_span, span, start_tracing, stop_tracing
+from src.weather_data_fetcher import (
+    fetch_and_store_weather,
+    prepare_date_chunks,
+    prepare_date_range,
+)
 
 logger = setup_logger(__name__, log_name="pipeline")
 
 
-def main():
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Skylytics ETL pipeline")
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue the last run and skip units recorded as completed in the run journal",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Stay running and refresh every location on the configured cron schedule",
+    )
+    parser.add_argument(
+        "--locations",
+        type=Path,
+        help="File with one postal code or city name per line to process instead of one location",
+    )
+    parser.add_argument(
+        "--ips",
+        type=Path,
+        help="File with one IP address per line; processes the locations of those edge sites",
+    )
+    parser.add_argument(
+        "--trace",
+        nargs="?",
+        const=True,
+        type=Path,
+        help="Record per-location, HTTP, parse and write spans to a Chrome trace JSON file "
+        f"(default: {TRACE_DIR}/trace_<timestamp>.json)",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help=f"Save per-stage cProfile hotspots and tracemalloc allocation sites to {PROFILE_DIR}/<run id>; "
+        "profiled stages run one at a time",
+    )
+    commands = parser.add_subparsers(dest="command")
+    add_query_arguments(
+        commands.add_parser("query", help="Filter, project and aggregate the warehouse history")
+    )
+    return parser.parse_args(argv)
+
+
+def resolve_run_locations(
+    locations_file: Optional[Path], ips_file: Optional[Path] = None
+) -> list[LocationDict]:
+    if locations_file or ips_file:
+        locations: list[LocationDict] = []
+        if locations_file:
+            locations += resolve_batch_locations(locations_file) or []
+        if ips_file:
+            locations += resolve_ip_locations(ips_file) or []
+        return list({loc["postal"]: loc for loc in locations}.values())
+    configured = get_settings().locations
+    if configured:
+        logger.info(f"[CONFIG] {len(configured)} locations configured in settings.yaml")
+        return resolve_configured_locations(configured)
+    location = resolve_location()
+    return [location] if location else []
+
+
+@dataclass
+class ChunkUnit:
+    """
+    One (location, date chunk) unit of work as it moves through fetch → clean → publish.
+    """
+
+    location: LocationDict
+    start_date: str
+    end_date: str
+    raw_file: Optional[Path] = None
+    delta: Optional[ArchiveDelta] = None
+    df: Optional[pd.DataFrame] = None
+    # Set when nothing needs publishing: already published, or archive data unchanged
+    skip_publish: bool = False
+    unchanged: bool = False
+
+    @property
+    def postal(self) -> str:
+        return self.location["postal"]
+
+    @property
+    def chunk(self) -> str:
+        return f"{self.start_date}_{self.end_date}"
+
+
+def fetch_chunk(unit: ChunkUnit, journal: RunJournal) -> bool:
+    if journal.is_done(unit.postal, unit.chunk, "publish"):
+        unit.skip_publish = True
+        return True
+
+    unit.raw_file = journal.artifact(unit.postal, unit.chunk, "fetch")
+    if unit.raw_file is None:
+        location = unit.location
+        unit.raw_file = fetch_and_store_weather(
+            location["latitude"], location["longitude"], unit.postal, unit.start_date, unit.end_date
+        )
+        if not unit.raw_file:
+            logger.error(f"[UNIT] Fetch failed → {unit.postal} {unit.chunk}")
+            return False
+        journal.mark_done(unit.postal, unit.chunk, "fetch", unit.raw_file)
+    return True
+
+
+def clean_chunk(unit: ChunkUnit, journal: RunJournal) -> bool:
+    if unit.skip_publish:
+        return True
+
+    unit.delta = compute_delta(unit.raw_file, unit.postal, DELTAS_DATA_DIR)
+    if unit.delta is not None and unit.delta.empty:
+        logger.info(f"[UNIT] Archive unchanged, nothing to publish → {unit.postal} {unit.chunk}")
+        unit.skip_publish = unit.unchanged = True
+        return True
+
+    cleaned_file = journal.artifact(unit.postal, unit.chunk, "clean")
+    if cleaned_file is None:
+        cleaned_file = process_raw_file(unit.raw_file, unit.location["city"], unit.postal)
+        if not cleaned_file:
+            logger.error(f"[UNIT] Cleaning failed → {unit.postal} {unit.chunk}")
+            return False
+        journal.mark_done(unit.postal, unit.chunk, "clean", cleaned_file)
+
+    unit.df = read_cleaned_file(cleaned_file)
+    if unit.df is None:
+        logger.error(f"[UNIT] Publishing failed → {unit.postal} {unit.chunk}")
+        return False
+    violations = check_frame(unit.df)
+    if violations:
+        logger.error(
+            f"[UNIT] Cleaned data breaks the contract → {unit.postal} {unit.chunk}: {violations}"
+        )
+        return False
+    return True
+
+
+def publish_chunk(unit: ChunkUnit, journal: RunJournal) -> bool:
+    """
+    Writes one cleaned chunk, with anomaly flags, to history, the series store and
+    aggregates. Chunks of a location must be published in date order, as anomaly
+    statistics and aggregates only fold days after their watermark; re-delivered days
+    before it are recomputed from history.
+    """
+    if unit.df is not None:
+        published = annotate_anomalies(unit.df, ANOMALY_DATA_DIR, history_root=HISTORY_DATA_DIR)
+        ingest_frame(published, HISTORY_DATA_DIR)
+        append_frame(published, SERIES_DATA_DIR)
+        update_aggregates(unit.df, AGGREGATES_DATA_DIR, HISTORY_DATA_DIR)
+        update_previews(unit.df, PREVIEW_DATA_DIR, HISTORY_DATA_DIR)
+        # Only advance the snapshot once the data is published, so a failed
+        # publish is retried with the same delta
+        if unit.delta is not None:
+            commit_delta(unit.delta, DELTAS_DATA_DIR)
+        journal.mark_done(unit.postal, unit.chunk, "publish")
+    elif unit.unchanged:
+        journal.mark_done(unit.postal, unit.chunk, "publish")
+
+    logger.info(f"[UNIT] Completed → {unit.postal} {unit.chunk}")
+    return True
+
+
+def _run_step(step, unit: ChunkUnit, journal: RunJournal, root: Optional[Span] = None) -> bool:
+    name = step.__name__.removesuffix("_chunk")
+    # Stage threads outlive any one span, so streamed units are parented to the run's span
+    with (
+        span(f"stage.{name}", parent=root, postal=unit.postal, chunk=unit.chunk),
+        profile_stage(name),
+    ):
+        return step(unit, journal)
+
+
+def _stage_func(step, journal: RunJournal, root: Optional[Span] = None):
+    def run(unit: ChunkUnit):
+        return unit if _run_step(step, unit, journal, root) else False
+
+    return run
+
+
+def run_streaming(
+    locations: list[LocationDict], chunks: list[tuple[str, str]], journal: RunJournal
+) -> list[str]:
+    """
+    Runs all (location, chunk) units through overlapped fetch, clean and publish
+    stages. Returns the postal codes of locations that failed.
+    """
+    tuning = get_settings().pipeline
+    with span("pipeline", locations=len(locations), chunks=len(chunks)):
+        root = current_span()
+        pipeline = StreamingPipeline(
+            [
+                Stage("fetch", _stage_func(fetch_chunk, journal, root), tuning.fetch_workers),
+                Stage("clean", _stage_func(clean_chunk, journal, root), tuning.clean_workers),
+                Stage("publish", _stage_func(publish_chunk, journal, root), ordered=True),
+            ],
+            queue_size=tuning.queue_size,
+        )
+        items = (
+            WorkItem(location["postal"], seq, ChunkUnit(location, start_date, end_date))
+            for location in locations
+            for seq, (start_date, end_date) in enumerate(chunks)
+        )
+        failed = pipeline.run(items)
+    return [location["postal"] for location in locations if location["postal"] in failed]
+
+
+def daemon_journal_path(postal: str) -> Path:
+    return JOURNAL_PATH.with_name(f"{JOURNAL_PATH.stem}_{postal}{JOURNAL_PATH.suffix}")
+
+
+def run_cycle(location: LocationDict) -> bool:
+    """
+    One scheduled refresh of a single location with its own journal, so concurrent
+    cycles for different locations never interleave in one file. `weather.chunk_days`
+    and the `pipeline` section are read from the current settings on every cycle, so
+    a reload applies from the next cycle on.
+    """
+    start_date, end_date = prepare_date_range()
+    journal = RunJournal(daemon_journal_path(location["postal"]))
+    chunk_days = get_settings().weather.chunk_days
+    plan = journal.start({"start_date": start_date, "end_date": end_date, "chunk_days": chunk_days})
+    chunks = prepare_date_chunks(plan["start_date"], plan["end_date"], plan["chunk_days"])
+    return not run_streaming([location], chunks, journal)
+
+
+def apply_scheduler_settings(scheduler: Scheduler, old: Settings, new: Settings) -> None:
+    """
+    Hot-reload hook: pushes changed scheduler knobs into the running daemon.
+    """
+    before, after = old.scheduler, new.scheduler
+    try:
+        schedule = CronSchedule(after.cron) if after.cron != before.cron else None
+    except ValueError as e:
+        logger.error(f"[DAEMON] Ignoring invalid cron '{after.cron}' → {e}")
+        schedule = None
+    stagger = (
+        timedelta(minutes=after.stagger_minutes)
+        if after.stagger_minutes != before.stagger_minutes
+        else None
+    )
+    scheduler.reconfigure(schedule, stagger, after.max_workers)
+
+
+def run_daemon(locations: list[LocationDict]) -> bool:
+    """
+    Long-running mode: the interpreter, config, HTTP pools and caches stay warm while
+    each location is refreshed on the cron schedule, offset by a stable per-location
+    delay so API calls are spread over the stagger window. Edits to settings.yaml are
+    picked up without a restart: the `scheduler` section at once, `weather.chunk_days`
+    and `pipeline` from each location's next cycle. Values bound at import, such as
+    data paths, still need a restart.
+    """
+    tuning = get_settings().scheduler
+    scheduler = Scheduler(max_workers=tuning.max_workers)
+    schedule = CronSchedule(tuning.cron)
+    stagger = timedelta(minutes=tuning.stagger_minutes)
+    for location in locations:
+        scheduler.add(
+            f"weather:{location['postal']}",
+            schedule,
+            partial(run_cycle, location),
+            stagger=stagger,
+            run_now=tuning.run_on_start,
+        )
+
+    store = settings_store()
+    store.on_change(partial(apply_scheduler_settings, scheduler))
+    stop_watching = store.watch(tuning.reload_seconds) if tuning.reload_seconds > 0 else None
+
+    def shutdown(signum, _frame):
+        logger.info(f"[DAEMON] Received signal {signum}. Finishing running cycles...")
+        scheduler.stop()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    scheduler.run_forever()
+    if stop_watching is not None:
+        stop_watching.set()
+    return True
+
+
+def trace_path(requested) -> Path:
+    if isinstance(requested, Path):
+        return requested
+    timestamp = datetime.now(TIMEZONE).strftime("%Y%m%d_%H%M%S")
+    return TRACE_DIR / f"trace_{timestamp}.json"
+
+
+def main(argv: Optional[list[str]] = None) -> bool:
+    args = parse_args(argv)
+    if args.command == "query":
+        return run_query(args, HISTORY_DATA_DIR)
+
+    if args.profile:
+        start_profiling(directory=PROFILE_DIR)
+    if args.trace:
+        start_tracing()
+    try:
+        return run_pipeline(args)
+    finally:
+        if args.trace:
+            stop_tracing(trace_path(args.trace))
+        if args.profile:
+            stop_profiling()
+
+
+def run_pipeline(args: argparse.Namespace) -> bool:
     logger.info("[PIPELINE] Starting data pipeline")
 
     try:
-        logger.info("[STEP 1] Resolving location")
-        location = resolve_location()
-        if not location:
+        logger.info("[STEP 1] Resolving locations")
+        with span("resolve_locations") as s, profile_stage("resolve"):
+            locations = resolve_run_locations(args.locations, args.ips)
+            s.set(locations=len(locations))
+        if not locations:
             logger.error("[ABORT] Location step failed.")
-            return
+            return False
+
+        if args.daemon:
+            cron = get_settings().scheduler.cron
+            logger.info(f"[DAEMON] Scheduling {len(locations)} locations on '{cron}'")
+            return run_daemon(locations)
 
-        logger.info("[STEP 2] Fetching weather data")
-        if not fetch_weather_data():
-            logger.error("[ABORT] Weather data fetch step failed.")
-            return
+        start_date, end_date = prepare_date_range()
+        journal = RunJournal(JOURNAL_PATH)
+        plan = journal.start(
+            {
+                "start_date": start_date,
+                "end_date": end_date,
+                "chunk_days": get_settings().weather.chunk_days,
+            },
+            resume=args.resume,
+        )
+        set_run_id(journal.run_id)
+        chunks = prepare_date_chunks(plan["start_date"], plan["end_date"], plan["chunk_days"])
 
-        logger.info("[STEP 3] Cleaning and saving data")
-        if not clean_weather_data():
-            logger.error("[ABORT] Data cleaning step failed.")
-            return
+        logger.info(
+            f"[STEP 2] Fetching, cleaning and publishing {len(locations)} locations "
+            f"in {len(chunks)} date chunks"
+        )
+        failed = run_streaming(locations, chunks, journal)
+        if failed:
+            logger.error(
+                f"[ABORT] {len(failed)} locations failed: {failed[:10]}. "
+                "Re-run with --resume to continue."
+            )
+            return False
 
         logger.info("[PIPELINE DONE] All steps completed successfully")
+        return True
 
     except Exception as e:
         logger.exception(f"[PIPELINE ERROR] Unhandled exception → {e}")
@@ -34,4 +406,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,316 @@
+import hashlib
+import json
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+
+from src.anomaly_detector import FLAG_COLUMNS, z_column
+from src.config import (
+    ANOMALY_COLUMNS,
+    HISTORY_DATA_DIR,
+    STAGING_DATA_DIR,
+    VALIDATION_CACHE_PATH,
+    VALIDATION_MAX_WORKERS,
+)
+from src.file_utils import atomic_write
+from src.history_store import cleaned_files, read_cleaned_file
+from src.logger import setup_logger
+from src.profiling import run_stage
+from src.weather_schema import DERIVED_COLUMNS, SCHEMA_VERSION, SOURCE_COLUMNS
+
+logger = setup_logger(__name__, log_name="output_validator")
+
+# Bump with any change to the checks below; cached results of other versions are ignored
+CONTRACT_VERSION = f"{SCHEMA_VERSION}.2"
+KEY_COLUMNS = ["PostalCode", "Date"]
+HASH_CHUNK_BYTES = 1 << 20
+
+
+@dataclass(frozen=True)
+class ColumnContract:
+    name: str
+    kind: str  # "datetime", "number" or "string"
+    required: bool = True
+    nullable: bool = True
+    min: Optional[float] = None
+    max: Optional[float] = None
+
+
+# Value bounds mirror the extreme-value filter in data_cleaner.clean_data
+BOUNDS: dict[str, tuple[Optional[float], Optional[float]]] = {
+    "Temp_Max_C": (None, 60.0),
+    "Temp_Min_C": (-30.0, None),
+    "WindSpeed_Max_kph": (0.0, 200.0),
+    "Precipitation_mm": (0.0, None),
+    "Rain_mm": (0.0, None),
+    "Snowfall_mm": (0.0, None),
+    "Radiation_Sum_kWh": (0.0, None),
+    "Sunshine_Minutes": (0.0, 24 * 60),
+}
+
+CONTRACT: list[ColumnContract] = [
+    ColumnContract("Date", "datetime", nullable=False),
+    *(
+        ColumnContract(spec.column, "number", min=low, max=high)
+        for spec in SOURCE_COLUMNS
+        for low, high in [BOUNDS.get(spec.column, (None, None))]
+    ),
+    # Derived metrics are absent from history published before they existed
+    *(ColumnContract(spec.column, "number", required=False) for spec in DERIVED_COLUMNS),
+    # Anomaly scores and flags are added on publish; NaN where not scored
+    *(ColumnContract(z_column(c), "number", required=False) for c in ANOMALY_COLUMNS),
+    *(ColumnContract(c, "number", required=False, min=0.0, max=1.0) for c in FLAG_COLUMNS),
+    ColumnContract("City", "string", nullable=False),
+    ColumnContract("PostalCode", "string", nullable=False),
+]
+
+KIND_CHECKS = {
+    "datetime": pd.api.types.is_datetime64_any_dtype,
+    "number": lambda dtype: pd.api.types.is_numeric_dtype(dtype)
+    and not pd.api.types.is_bool_dtype(dtype),
+    "string": lambda dtype: pd.api.types.is_object_dtype(dtype)
+    or pd.api.types.is_string_dtype(dtype),
+}
+
+
+def check_frame(df: pd.DataFrame, contract: Sequence[ColumnContract] = CONTRACT) -> dict[str, int]:
+    """
+    Runs every contract check over whole columns and returns violation → offending
+    row count (1 for frame-level problems such as a missing column). Empty means valid.
+    """
+    violations: dict[str, int] = {}
+
+    def report(name: str, count: int) -> None:
+        if count:
+            violations[name] = violations.get(name, 0) + int(count)
+
+    typed: set[str] = set()
+    for column in contract:
+        if column.name not in df.columns:
+            report(f"missing_column:{column.name}", column.required)
+            continue
+        series = df[column.name]
+        if not KIND_CHECKS[column.kind](series.dtype):
+            report(f"dtype:{column.name}", 1)
+            continue
+        typed.add(column.name)
+        if not column.nullable:
+            report(f"null:{column.name}", series.isna().sum())
+        if column.min is not None or column.max is not None:
+            values = series.to_numpy(dtype="float64")
+            low = -np.inf if column.min is None else column.min
+            high = np.inf if column.max is None else column.max
+            report(f"range:{column.name}", np.count_nonzero((values < low) | (values > high)))
+
+    if {"Temp_Min_C", "Temp_Max_C"} <= typed:
+        report(
+            "temp_min_above_max",
+            np.count_nonzero(
+                df["Temp_Min_C"].to_numpy(dtype="float64")
+                > df["Temp_Max_C"].to_numpy(dtype="float64")
+            ),
+        )
+
+    if set(KEY_COLUMNS) <= typed:
+        codes = pd.factorize(df["PostalCode"])[0]
+        days = df["Date"].to_numpy("datetime64[ns]").astype(np.int64)
+        same_location = codes[1:] == codes[:-1]
+        report("duplicate_key", df.duplicated(KEY_COLUMNS).sum())
+        # Rows of a location must be contiguous and strictly increasing in Date
+        report("date_not_increasing", np.count_nonzero(same_location & (days[1:] < days[:-1])))
+        runs = np.count_nonzero(~same_location) + 1 if len(codes) else 0
+        report("location_not_contiguous", runs - len(np.unique(codes)))
+
+    return violations
+
+
+def read_partition(path: Path) -> Optional[pd.DataFrame]:
+    if path.suffix == ".arrow":
+        return feather.read_feather(path, memory_map=True)
+    return read_cleaned_file(path)
+
+
+def file_digest(path: Path) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK_BYTES):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass
+class PartitionResult:
+    partition: str
+    digest: str
+    rows: int
+    violations: dict[str, int] = field(default_factory=dict)
+    cached: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return not self.violations
+
+
+def validate_partition(path: Path, known_digest: Optional[str] = None) -> Optional[PartitionResult]:
+    """
+    Validates one partition file. Returns None when its content hash equals
+    `known_digest`, i.e. the cached result still applies.
+    """
+    digest = file_digest(path)
+    if digest == known_digest:
+        return None
+    try:
+        df = read_partition(path)
+    except (OSError, ValueError) as e:
+        return PartitionResult(str(path), digest, 0, {f"unreadable:{e.__class__.__name__}": 1})
+    if df is None:
+        return PartitionResult(str(path), digest, 0, {"unreadable": 1})
+    return PartitionResult(str(path), digest, len(df), check_frame(df))
+
+
+def _validate_task(args: tuple[Path, Optional[str]]) -> Optional[PartitionResult]:
+    return validate_partition(*args)
+
+
+@dataclass
+class ValidationReport:
+    results: list[PartitionResult]
+
+    @property
+    def failed(self) -> list[PartitionResult]:
+        return [r for r in self.results if not r.ok]
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+    def summary(self) -> str:
+        cached = sum(r.cached for r in self.results)
+        rows = sum(r.rows for r in self.results)
+        lines = [
+            f"{len(self.results)} partitions, {rows} rows "
+            f"({cached} unchanged, {len(self.results) - cached} checked), "
+            f"{len(self.failed)} failed"
+        ]
+        for result in self.failed:
+            details = ", ".join(f"{k}={v}" for k, v in sorted(result.violations.items()))
+            lines.append(f"  {Path(result.partition).name}: {details}")
+        return "\n".join(lines)
+
+
+class ValidationCache:
+    """
+    Last result per partition file, keyed by path and tagged with size, mtime and
+    content hash. A file whose stat is unchanged is not even re-read; one that was
+    touched but has the same hash is not re-validated.
+    """
+
+    def __init__(self, path: Path = VALIDATION_CACHE_PATH):
+        self.path = Path(path)
+        self.entries: dict[str, dict[str, Any]] = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == CONTRACT_VERSION:
+                self.entries = data.get("partitions", {})
+        except (OSError, json.JSONDecodeError):
+            pass
+
+    def lookup(self, path: Path) -> tuple[Optional[PartitionResult], Optional[str]]:
+        """
+        Returns (result if the stat still matches, last known content hash).
+        """
+        entry = self.entries.get(str(path))
+        if entry is None:
+            return None, None
+        stat = path.stat()
+        result = PartitionResult(
+            str(path), entry["digest"], entry["rows"], entry["violations"], cached=True
+        )
+        if entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return result, entry["digest"]
+        return None, entry["digest"]
+
+    def store(self, result: PartitionResult) -> None:
+        stat = Path(result.partition).stat()
+        self.entries[result.partition] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "digest": result.digest,
+            "rows": result.rows,
+            "violations": result.violations,
+        }
+
+    def save(self, keep: Sequence[Path]) -> None:
+        live = {str(p) for p in keep}
+        self.entries = {k: v for k, v in self.entries.items() if k in live}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_write(self.path) as f:
+            json.dump({"version": CONTRACT_VERSION, "partitions": self.entries}, f)
+
+
+def discover_partitions(
+    history_root: Path = HISTORY_DATA_DIR, staging_dir: Path = STAGING_DATA_DIR
+) -> list[Path]:
+    return sorted(Path(history_root).glob("postal=*.arrow")) + cleaned_files(staging_dir)
+
+
+def validate_partitions(
+    paths: Sequence[Path],
+    cache: Optional[ValidationCache] = None,
+    max_workers: int = VALIDATION_MAX_WORKERS,
+) -> ValidationReport:
+    """
+    Validates partition files in parallel processes, skipping those whose cached
+    result still applies, and records the new results in `cache`.
+    """
+    cache = cache or ValidationCache()
+    results: dict[Path, PartitionResult] = {}
+    pending: list[tuple[Path, Optional[str]]] = []
+    for path in paths:
+        cached, digest = cache.lookup(path)
+        if cached is not None:
+            results[path] = cached
+        else:
+            pending.append((path, digest))
+
+    if len(pending) > 1 and max_workers > 1:
+        logger.info(f"[VALIDATE] Checking {len(pending)} partitions in {max_workers} processes")
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            checked = list(pool.map(_validate_task, pending, chunksize=8))
+    else:
+        checked = [_validate_task(task) for task in pending]
+
+    for (path, digest), result in zip(pending, checked):
+        if result is None:
+            # Content unchanged since the last check; only the stat moved
+            cached = cache.entries[str(path)]
+            result = PartitionResult(
+                str(path), digest, cached["rows"], cached["violations"], cached=True
+            )
+        results[path] = result
+        cache.store(result)
+
+    cache.save(paths)
+    return ValidationReport([results[p] for p in paths])
+
+
+def run() -> bool:
+    paths = discover_partitions(HISTORY_DATA_DIR, STAGING_DATA_DIR)
+    if not paths:
+        logger.error("[ERROR] No cleaned or history partitions to validate.")
+        return False
+
+    report = validate_partitions(paths)
+    log = logger.info if report.ok else logger.error
+    log(f"[VALIDATE] {report.summary()}")
+    return report.ok
+
+
+if __name__ == "__main__":
+    run_stage(run, "output_validator")
@@ -0,0 +1,245 @@
+import json
+import zlib
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from src.anomaly_detector import is_output_column
+from src.config import (
+    HISTORY_DATA_DIR,
+    PREVIEW_DATA_DIR,
+    PREVIEW_POINTS_PER_YEAR,
+    PREVIEW_SAMPLE_SIZE,
+)
+from src.file_utils import atomic_path, atomic_write
+from src.history_store import HistoryStore
+from src.logger import setup_logger
+from src.profiling import run_stage
+
+logger = setup_logger(__name__, log_name="preview")
+
+PREVIEW_KINDS = ("sample", "lttb")
+LTTB_COLUMNS = ["Year", "Variable", "Date", "Value"]
+
+
+def preview_dir(postal: str, root: Path = PREVIEW_DATA_DIR) -> Path:
+    return Path(root) / f"postal={postal}"
+
+
+def value_columns(df: pd.DataFrame) -> list[str]:
+    # Anomaly scores and flags are published to history but are not weather variables
+    numeric = df.select_dtypes(include=["number"]).columns
+    return [c for c in numeric if not is_output_column(c)]
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets selection for every column of `y` (n × m) at once.
+
+    Keeps the first and last point and, per bucket, the point forming the largest
+    triangle with the point kept in the previous bucket and the mean of the next one,
+    which preserves peaks and troughs far better than every-k-th-point thinning.
+    Returns an index array of shape (min(threshold, n), m).
+    """
+    n, m = y.shape
+    if threshold >= n or threshold < 3:
+        return np.repeat(np.arange(n)[:, None], m, axis=1)
+
+    # NaNs would poison the triangle areas; a flat value keeps them selectable but unlikely
+    y = np.where(np.isnan(y), np.nanmean(y, axis=0, keepdims=True), y)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty((threshold, m), dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    cols = np.arange(m)
+
+    for b in range(threshold - 2):
+        lo, hi = edges[b], edges[b + 1]
+        next_hi = edges[b + 2] if b + 2 < len(edges) else n
+        avg_x = x[hi:next_hi].mean()
+        avg_y = y[hi:next_hi].mean(axis=0)
+        prev = selected[b]
+        px, py = x[prev], y[prev, cols]
+        area = np.abs((px - avg_x) * (y[lo:hi] - py) - (px - x[lo:hi, None]) * (avg_y - py))
+        selected[b + 1] = lo + np.nan_to_num(area, nan=-1.0).argmax(axis=0)
+    return selected
+
+
+def downsample(df: pd.DataFrame, columns: list[str], points: int) -> pd.DataFrame:
+    """
+    LTTB-downsamples each column of a Date-sorted frame to `points` points in long format.
+    """
+    if df.empty or not columns:
+        return pd.DataFrame(columns=LTTB_COLUMNS[1:])
+    dates = pd.to_datetime(df["Date"]).to_numpy("datetime64[ns]")
+    x = dates.astype(np.int64) / 86_400e9
+    y = df[columns].to_numpy(dtype="float64")
+    picked = lttb_indices(x, y, points)
+    return pd.DataFrame(
+        {
+            "Variable": np.repeat(np.array(columns, dtype=object), picked.shape[0]),
+            "Date": dates[picked.T.ravel()],
+            "Value": y[picked, np.arange(len(columns))].T.ravel(),
+        }
+    )
+
+
+def reservoir_update(
+    sample: pd.DataFrame, rows: pd.DataFrame, seen: int, size: int, rng: np.random.Generator
+) -> pd.DataFrame:
+    """
+    Feeds `rows` into a uniform reservoir sample (Algorithm R) over all `seen` rows
+    so far. Row i of the stream replaces a random slot with probability size / (i + 1);
+    the draws are made for all new rows in one vectorized call.
+    """
+    fill = max(min(size - len(sample), len(rows)), 0)
+    if fill:
+        head = rows.iloc[:fill]
+        sample = head if sample.empty else pd.concat([sample, head], ignore_index=True)
+    sample = sample.reset_index(drop=True)
+    rest = rows.iloc[fill:]
+    if rest.empty:
+        return sample
+
+    stream_pos = seen + fill + np.arange(len(rest))
+    slots = rng.integers(0, stream_pos + 1)
+    hit = slots < size
+    # When several new rows draw the same slot, the latest one wins as in the serial loop
+    hits = pd.Series(np.flatnonzero(hit), index=slots[hit])
+    winners = hits[~hits.index.duplicated(keep="last")]
+    slots, sources = winners.index.to_numpy(), winners.to_numpy()
+    replaced = {}
+    for col in sample.columns:
+        values = sample[col].to_numpy(copy=True)
+        values[slots] = rest[col].to_numpy()[sources]
+        replaced[col] = values
+    return pd.DataFrame(replaced)
+
+
+def _read_state(directory: Path) -> dict:
+    try:
+        with open(directory / "state.json", "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def _read(path: Path) -> Optional[pd.DataFrame]:
+    return pd.read_feather(path) if path.exists() else None
+
+
+def update_location(
+    df: pd.DataFrame,
+    postal: str,
+    root: Path = PREVIEW_DATA_DIR,
+    history_root: Path = HISTORY_DATA_DIR,
+    sample_size: int = PREVIEW_SAMPLE_SIZE,
+    points_per_year: int = PREVIEW_POINTS_PER_YEAR,
+) -> int:
+    """
+    Refreshes one location's previews with newly published rows:
+
+    - `sample.arrow`: uniform reservoir sample of daily rows; only rows after the
+      stored watermark are streamed in, sampled rows revised by `df` are refreshed
+    - `lttb.arrow`: per-variable LTTB downsample built per calendar year, so only the
+      years touched by `df` are recomputed from the history store
+
+    Returns the number of rows streamed into the sample.
+    """
+    directory = preview_dir(postal, root)
+    directory.mkdir(parents=True, exist_ok=True)
+    state = _read_state(directory)
+    seen = int(state.get("seen", 0))
+    watermark = pd.Timestamp(state["watermark"]) if state.get("watermark") else None
+
+    df = df.assign(Date=pd.to_datetime(df["Date"])).sort_values("Date", ignore_index=True)
+    columns = ["Date", *value_columns(df)]
+
+    sample = _read(directory / "sample.arrow")
+    if sample is None:
+        sample = pd.DataFrame({c: pd.Series(dtype=df[c].dtype) for c in columns})
+    else:
+        sample = sample.reindex(columns=columns)
+        revised = df.set_index("Date")[columns[1:]]
+        dates = sample["Date"].isin(revised.index)
+        if dates.any():
+            sample.loc[dates, columns[1:]] = revised.loc[sample.loc[dates, "Date"]].to_numpy()
+
+    fresh = df[columns] if watermark is None else df.loc[df["Date"] > watermark, columns]
+    rng = np.random.default_rng([zlib.crc32(postal.encode("utf-8")), seen])
+    sample = reservoir_update(sample, fresh.reset_index(drop=True), seen, sample_size, rng)
+    with atomic_path(directory / "sample.arrow") as tmp_path:
+        sample.sort_values("Date", ignore_index=True).to_feather(
+            tmp_path, compression="uncompressed"
+        )
+
+    years = sorted(df["Date"].dt.year.unique())
+    history = HistoryStore(history_root).read_frame(
+        postal, start=f"{years[0]}-01-01", end=f"{years[-1]}-12-31"
+    )
+    if history.empty:
+        history = df
+    blocks = [
+        downsample(group, value_columns(history), points_per_year).assign(Year=year)
+        for year, group in history.groupby(pd.to_datetime(history["Date"]).dt.year)
+    ]
+    lttb = _read(directory / "lttb.arrow")
+    if lttb is not None:
+        blocks.insert(0, lttb[~lttb["Year"].isin(years)])
+    lttb = pd.concat(blocks, ignore_index=True)[LTTB_COLUMNS].sort_values(
+        ["Variable", "Date"], ignore_index=True
+    )
+    with atomic_path(directory / "lttb.arrow") as tmp_path:
+        lttb.to_feather(tmp_path, compression="uncompressed")
+
+    new_watermark = df["Date"].max() if watermark is None else max(watermark, df["Date"].max())
+    with atomic_write(directory / "state.json") as f:
+        json.dump({"seen": seen + len(fresh), "watermark": new_watermark.isoformat()}, f)
+
+    logger.info(
+        f"[PREVIEW] {postal}: {len(fresh)} new rows sampled, "
+        f"{len(years)} years downsampled ({len(sample)} sample rows)"
+    )
+    return len(fresh)
+
+
+def update_previews(
+    df: pd.DataFrame, root: Path = PREVIEW_DATA_DIR, history_root: Path = HISTORY_DATA_DIR
+) -> int:
+    return sum(
+        update_location(group, str(postal), root, history_root)
+        for postal, group in df.groupby("PostalCode")
+    )
+
+
+def load_preview(postal: str, kind: str = "lttb", root: Path = PREVIEW_DATA_DIR) -> pd.DataFrame:
+    """
+    Loads a location's preview. `lttb` is long format (Year, Variable, Date, Value);
+    pivot one Variable for plotting. `sample` has the cleaned columns.
+    """
+    if kind not in PREVIEW_KINDS:
+        raise ValueError(f"Unknown preview '{kind}', expected one of {list(PREVIEW_KINDS)}")
+    path = preview_dir(postal, root) / f"{kind}.arrow"
+    if not path.exists():
+        logger.error(f"[READ] No {kind} preview for postal {postal}")
+        return pd.DataFrame()
+    return pd.read_feather(path)
+
+
+def run() -> bool:
+    store = HistoryStore(HISTORY_DATA_DIR)
+    postals = store.locations()
+    if not postals:
+        logger.error("[ERROR] No history to preview.")
+        return False
+
+    for postal in postals:
+        update_location(store.read_frame(postal), postal, PREVIEW_DATA_DIR, HISTORY_DATA_DIR)
+    logger.info(f"[DONE] Previews refreshed for {len(postals)} locations.")
+    return True
+
+
+if __name__ == "__main__":
+    run_stage(run, "preview")
@@ -0,0 +1,240 @@
+import argparse
+import cProfile
+import io
+import json
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterator, Optional, Sequence
+
+from src.config import PROFILE_DIR, TIMEZONE
+from src.file_utils import atomic_write
+from src.logger import setup_logger
+
+logger = setup_logger(__name__, log_name="pipeline")
+
+# Frames kept per traced allocation; deeper stacks attribute pandas/numpy allocations
+# back to pipeline code at a higher tracing cost
+TRACEMALLOC_FRAMES = 10
+TOP_ENTRIES = 25
+# A stage's memory snapshot is retaken only when its footprint grows by this factor
+SNAPSHOT_GROWTH = 1.1
+# Our own bookkeeping and import machinery, left out of allocation reports
+IGNORED_ALLOCATIONS = (tracemalloc.__file__, "<frozen importlib._bootstrap")
+
+
+@dataclass
+class StageProfile:
+    name: str
+    calls: int = 0
+    wall_seconds: float = 0.0
+    # Traced memory after the stage returned, at its largest seen
+    peak_bytes: int = 0
+    snapshot: Optional[tracemalloc.Snapshot] = None
+    profile: cProfile.Profile = field(default_factory=cProfile.Profile)
+
+    def stats(self) -> Optional[pstats.Stats]:
+        if not self.profile.getstats():
+            return None
+        return pstats.Stats(self.profile)
+
+
+class RunProfiler:
+    """
+    CPU and memory profile of one run, broken down by pipeline stage.
+
+    Every `stage()` block runs under that stage's cProfile profiler. Profiled blocks
+    take turns on a process-wide lock, so exactly one profiler is enabled at any time:
+    from Python 3.12 cProfile sits on sys.monitoring, which allows a single active
+    profiler per process and lets it observe every thread. Stages therefore don't
+    overlap under `--profile`, and their time is attributed the same way on every
+    version. Stage blocks wrap one unit of work and never wait on another stage, so
+    taking turns cannot deadlock. tracemalloc traces the whole process; each stage
+    keeps the snapshot taken at its largest post-stage footprint, whose top allocation
+    sites show what stayed live.
+    """
+
+    def __init__(self, run_id: str, directory: Path = PROFILE_DIR, top: int = TOP_ENTRIES):
+        self.run_id = run_id
+        self.directory = Path(directory)
+        self.top = top
+        self.stages: dict[str, StageProfile] = {}
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        # Held while a stage runs; reentrant for stages nested on one thread
+        self._running = threading.RLock()
+        # Profilers of the running stage and the stages it is nested in, innermost
+        # last; only touched by the thread holding _running
+        self._stack: list[cProfile.Profile] = []
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        tracemalloc.reset_peak()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        with self._lock:
+            stage = self.stages.setdefault(name, StageProfile(name))
+        with self._running:
+            # Only one profiler may be active; pause the enclosing stage's
+            if self._stack:
+                self._stack[-1].disable()
+            started = time.perf_counter()
+            try:
+                self._stack.append(stage.profile)
+                stage.profile.enable()
+                yield
+            finally:
+                stage.profile.disable()
+                self._stack.pop()
+                if self._stack:
+                    self._stack[-1].enable()
+                self._record(stage, time.perf_counter() - started)
+
+    def _record(self, stage: StageProfile, elapsed: float) -> None:
+        current, _ = tracemalloc.get_traced_memory()
+        with self._lock:
+            stage.calls += 1
+            stage.wall_seconds += elapsed
+            grown = current > stage.peak_bytes * SNAPSHOT_GROWTH
+            stage.peak_bytes = max(stage.peak_bytes, current)
+        if grown and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            with self._lock:
+                stage.snapshot = snapshot
+
+    def report(self, peak_bytes: int) -> str:
+        lines = [
+            f"Run {self.run_id}: {time.perf_counter() - self.started:.1f}s wall, "
+            f"traced memory peak {_mib(peak_bytes)}",
+        ]
+        for stage in sorted(self.stages.values(), key=lambda s: -s.wall_seconds):
+            lines += [
+                "",
+                f"=== {stage.name}: {stage.calls} calls, {stage.wall_seconds:.2f}s, "
+                f"largest footprint after a call {_mib(stage.peak_bytes)} ===",
+                "",
+                f"-- Top {self.top} cumulative-time hotspots --",
+            ]
+            stats = stage.stats()
+            if stats is not None:
+                out = stats.stream = io.StringIO()
+                stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top)
+                lines.append(out.getvalue().strip())
+            if stage.snapshot is not None:
+                lines += ["", f"-- Top {self.top} allocation sites (live at largest footprint) --"]
+                # Filtering grouped sites is far cheaper than Snapshot.filter_traces
+                sites = [
+                    stat
+                    for stat in stage.snapshot.statistics("lineno")
+                    if not stat.traceback[0].filename.startswith(IGNORED_ALLOCATIONS)
+                ]
+                for stat in sites[: self.top]:
+                    frame = stat.traceback[0]
+                    lines.append(
+                        f"{_mib(stat.size):>10} {stat.count:>9} blocks  "
+                        f"{frame.filename}:{frame.lineno}"
+                    )
+        return "\n".join(lines) + "\n"
+
+    def finish(self) -> Path:
+        """
+        Stops memory tracing and writes, under `<directory>/<run_id>/`:
+        one `<stage>.prof` per stage (pstats format, for snakeviz or `python -m pstats`),
+        `report.txt` with hotspots and allocation sites, and `summary.json`.
+        """
+        _, peak = tracemalloc.get_traced_memory()
+        report = self.report(peak)
+        tracemalloc.stop()
+
+        out_dir = self.directory / self.run_id
+        out_dir.mkdir(parents=True, exist_ok=True)
+        summary = {"run_id": self.run_id, "peak_traced_bytes": peak, "stages": {}}
+        for stage in self.stages.values():
+            stats = stage.stats()
+            if stats is not None:
+                stats.dump_stats(out_dir / f"{stage.name}.prof")
+            summary["stages"][stage.name] = {
+                "calls": stage.calls,
+                "wall_seconds": round(stage.wall_seconds, 3),
+                "peak_bytes": stage.peak_bytes,
+            }
+        with atomic_write(out_dir / "report.txt") as f:
+            f.write(report)
+        with atomic_write(out_dir / "summary.json") as f:
+            json.dump(summary, f, indent=2)
+        logger.info(f"[PROFILE] {len(self.stages)} stages profiled → {out_dir}")
+        return out_dir
+
+
+def _mib(size: int) -> str:
+    return f"{size / 2**20:.1f} MiB"
+
+
+_active: Optional[RunProfiler] = None
+
+
+def new_run_id() -> str:
+    # Same format as RunJournal run ids
+    return datetime.now(TIMEZONE).strftime("%Y%m%d_%H%M%S")
+
+
+def start_profiling(run_id: Optional[str] = None, directory: Path = PROFILE_DIR) -> RunProfiler:
+    global _active
+    _active = RunProfiler(run_id or new_run_id(), directory)
+    _active.start()
+    return _active
+
+
+def stop_profiling() -> Optional[Path]:
+    global _active
+    profiler, _active = _active, None
+    return profiler.finish() if profiler is not None else None
+
+
+def set_run_id(run_id: str) -> None:
+    """
+    Files the active profile under `run_id`, e.g. once the journal has started a run.
+    """
+    if _active is not None:
+        _active.run_id = run_id
+
+
+@contextmanager
+def profile_stage(name: str) -> Iterator[None]:
+    """
+    Profiles the enclosed block as stage `name` when profiling is on; otherwise a
+    single global lookup, so stage code can stay wrapped permanently.
+    """
+    profiler = _active
+    if profiler is None:
+        yield
+        return
+    with profiler.stage(name):
+        yield
+
+
+def run_stage(run: Callable[[], object], name: str, argv: Optional[Sequence[str]] = None) -> object:
+    """
+    Entry point for a stage module run as a script; `--profile` writes a profile of
+    the stage's run() under logs/profiles.
+    """
+    parser = argparse.ArgumentParser(description=f"Run the {name} stage")
+    parser.add_argument(
+        "--profile", action="store_true", help="Save cProfile and tracemalloc reports"
+    )
+    if not parser.parse_args(argv).profile:
+        return run()
+
+    start_profiling(f"{new_run_id()}_{name}", PROFILE_DIR)
+    try:
+        with profile_stage(name):
+            return run()
+    finally:
+        stop_profiling()
@@ -0,0 +1,301 @@
+import argparse
+import re
+import sys
+import threading
+from pathlib import Path
+from typing import Optional, Sequence, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from pyarrow import fs
+
+from src.config import HISTORY_DATA_DIR
+from src.history_store import DateLike, partition_path, partition_version
+from src.logger import setup_logger
+from src.weather_schema import SCHEMA_VERSION
+
+logger = setup_logger(__name__, log_name="query_service")
+
+# Grouping keys derived from Date on the fly
+DERIVED_KEYS = {
+    "Year": pc.year,
+    "Month": pc.month,
+    "Day": pc.day,
+    "DayOfYear": pc.day_of_year,
+}
+AGGREGATES = ("min", "max", "mean", "sum", "count", "stddev", "variance", "approximate_median")
+
+CONDITION_PATTERN = re.compile(r"^\s*(\w+)\s*(==|!=|>=|<=|=|>|<)\s*(.+?)\s*$")
+OPERATORS = {
+    "=": "equal",
+    "==": "equal",
+    "!=": "not_equal",
+    ">": "greater",
+    ">=": "greater_equal",
+    "<": "less",
+    "<=": "less_equal",
+}
+
+
+def parse_condition(text: str, schema: Optional[pa.Schema] = None) -> ds.Expression:
+    """
+    Parses a simple `column <op> value` condition such as `Temp_Max_C >= 30` or
+    `City = Berlin` into a dataset filter expression.
+
+    With a `schema` the value is cast to the column's type, so `PostalCode = 69115`
+    compares strings and `Date >= 2024-07-01` timestamps. Without one, or for columns
+    it does not have, numeric-looking values become floats.
+    """
+    match = CONDITION_PATTERN.match(text)
+    if not match:
+        raise ValueError(f"Cannot parse condition '{text}'. Expected: <column> <op> <value>")
+    column, op, raw = match.groups()
+    raw = raw.strip("'\"")
+    if schema is not None and column in schema.names:
+        value = pa.scalar(raw).cast(schema.field(column).type)
+    else:
+        try:
+            value = pa.scalar(float(raw))
+        except ValueError:
+            value = pa.scalar(raw)
+    return getattr(pc, OPERATORS[op])(ds.field(column), value)
+
+
+def parse_aggregate(text: str) -> tuple[str, str]:
+    column, _, func = text.partition(":")
+    func = func or "mean"
+    if func not in AGGREGATES:
+        raise ValueError(f"Unknown aggregate '{func}'. Choose from {', '.join(AGGREGATES)}")
+    return column, func
+
+
+class QueryService:
+    """
+    Embedded query layer over the warehouse history files.
+
+    All `postal=*.arrow` files are scanned as one Arrow dataset over memory-mapped
+    files. Column projection and row filters are pushed into the scan, so only the
+    needed columns of matching record batches are materialized, and grouped aggregates
+    run in Arrow's multithreaded hash aggregation without going through pandas.
+    """
+
+    def __init__(self, root: Path = HISTORY_DATA_DIR):
+        self.root = Path(root)
+        self._dataset: Optional[ds.Dataset] = None
+        self._signature: Optional[tuple] = None
+        self._filesystem = fs.LocalFileSystem(use_mmap=True)
+        # Guards the cached dataset when one service answers concurrent requests
+        self._lock = threading.Lock()
+        self._versions: dict[Path, tuple[int, str]] = {}
+
+    def partitions(self, postals: Optional[Sequence[str]] = None) -> list[Path]:
+        """
+        History files, all or those of `postals` that exist, sorted by name. Files in
+        another schema version's units are left out, so no scan mixes units.
+        """
+        if postals is None:
+            paths = set(self.root.glob("postal=*.arrow"))
+        else:
+            paths = {partition_path(str(p), self.root) for p in postals}
+        return sorted(p for p in paths if p.exists() and self._current(p))
+
+    def _current(self, path: Path) -> bool:
+        mtime = path.stat().st_mtime_ns
+        cached = self._versions.get(path)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, partition_version(path))
+            self._versions[path] = cached
+            if cached[1] != SCHEMA_VERSION:
+                logger.error(
+                    f"[QUERY] Skipping {path}: schema version {cached[1]} units, expected "
+                    f"{SCHEMA_VERSION}; run `make migrate` first"
+                )
+        return cached[1] == SCHEMA_VERSION
+
+    def dataset(self) -> Optional[ds.Dataset]:
+        """
+        Returns the dataset, rebuilt only when history files were added or rewritten.
+        """
+        files = self.partitions()
+        signature = tuple((f.name, f.stat().st_mtime_ns) for f in files)
+        with self._lock:
+            if signature != self._signature:
+                self._dataset = self._open(files) if files else None
+                self._signature = signature
+                if files:
+                    logger.debug(f"[QUERY] Dataset opened over {len(files)} history files")
+            return self._dataset
+
+    def _open(self, files: Sequence[Path], schema: Optional[pa.Schema] = None) -> ds.Dataset:
+        paths = [str(f) for f in files]
+        if schema is None:
+            schemas = [
+                ds.dataset(p, format="ipc", filesystem=self._filesystem).schema for p in paths
+            ]
+            schema = pa.unify_schemas(schemas)
+        return ds.dataset(paths, schema=schema, format="ipc", filesystem=self._filesystem)
+
+    def _filter(
+        self,
+        start: Optional[DateLike],
+        end: Optional[DateLike],
+        postals: Optional[Sequence[str]],
+        where: Sequence[Union[str, ds.Expression]],
+        schema: Optional[pa.Schema] = None,
+    ) -> Optional[ds.Expression]:
+        conditions: list[ds.Expression] = []
+        if start is not None:
+            conditions.append(
+                ds.field("Date") >= pa.scalar(pd.Timestamp(start), pa.timestamp("ns"))
+            )
+        if end is not None:
+            conditions.append(ds.field("Date") <= pa.scalar(pd.Timestamp(end), pa.timestamp("ns")))
+        if postals:
+            conditions.append(ds.field("PostalCode").isin([str(p) for p in postals]))
+        conditions.extend(parse_condition(w, schema) if isinstance(w, str) else w for w in where)
+
+        combined = None
+        for condition in conditions:
+            combined = condition if combined is None else combined & condition
+        return combined
+
+    def scanner(
+        self,
+        columns: Optional[Sequence[str]] = None,
+        start: Optional[DateLike] = None,
+        end: Optional[DateLike] = None,
+        postals: Optional[Sequence[str]] = None,
+        where: Sequence[Union[str, ds.Expression]] = (),
+        batch_size: Optional[int] = None,
+    ) -> Optional[ds.Scanner]:
+        """
+        Lazy scan of the filtered projection, for consumers that stream record batches
+        instead of materializing a table. With `postals` only their files are opened.
+        """
+        dataset = self.dataset()
+        if dataset is None:
+            logger.warning(f"[QUERY] No history files under {self.root}")
+            return None
+        if postals:
+            files = self.partitions(postals)
+            if len(files) < len(dataset.files):
+                dataset = self._open(files, dataset.schema)
+        options = {"batch_size": batch_size} if batch_size else {}
+        return dataset.scanner(
+            columns=list(columns) if columns else None,
+            filter=self._filter(start, end, postals, where, dataset.schema),
+            **options,
+        )
+
+    def query(
+        self,
+        columns: Optional[Sequence[str]] = None,
+        start: Optional[DateLike] = None,
+        end: Optional[DateLike] = None,
+        postals: Optional[Sequence[str]] = None,
+        where: Sequence[Union[str, ds.Expression]] = (),
+        group_by: Sequence[str] = (),
+        aggregates: Sequence[Union[str, tuple[str, str]]] = (),
+        limit: Optional[int] = None,
+    ) -> pa.Table:
+        """
+        Runs one query and returns an Arrow table.
+
+        Without `aggregates` this is a filtered projection of `columns` (all columns if
+        None). With `aggregates` (e.g. `[("Temp_Max_C", "max")]` or `"Temp_Max_C:max"`)
+        rows are grouped by `group_by`, which may include the derived Date keys Year,
+        Month, Day and DayOfYear; result columns are named `{column}_{function}`.
+        A `limit` on a projection stops the scan once enough rows are read; on an
+        aggregation it caps the grouped result.
+        """
+        specs = [parse_aggregate(a) if isinstance(a, str) else tuple(a) for a in aggregates]
+        stored_keys = [k for k in group_by if k not in DERIVED_KEYS]
+        derived = [k for k in group_by if k in DERIVED_KEYS]
+        if specs:
+            needed = [*stored_keys, *(c for c, _ in specs)] + (["Date"] if derived else [])
+            projection = list(dict.fromkeys(needed))
+        else:
+            projection = list(columns) if columns else None
+
+        scanner = self.scanner(projection, start, end, postals, where)
+        if scanner is None:
+            return pa.table({})
+        if not specs:
+            return scanner.to_table() if limit is None else scanner.head(limit)
+
+        table = scanner.to_table()
+        for key in derived:
+            table = table.append_column(key, DERIVED_KEYS[key](table.column("Date")))
+        table = table.group_by(list(group_by)).aggregate([(column, func) for column, func in specs])
+        ordered = [*group_by, *(f"{c}_{f}" for c, f in specs)]
+        table = table.select(ordered)
+        if group_by:
+            table = table.sort_by([(k, "ascending") for k in group_by])
+        if limit is not None:
+            table = table.slice(0, limit)
+        return table
+
+    def query_frame(self, **kwargs) -> pd.DataFrame:
+        return self.query(**kwargs).to_pandas()
+
+
+def add_query_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--columns", nargs="+", help="Columns to return (default: all)")
+    parser.add_argument("--start", help="First date (inclusive), e.g. 2024-07-01")
+    parser.add_argument("--end", help="Last date (inclusive), e.g. 2024-07-31")
+    parser.add_argument("--postal", nargs="+", dest="postals", help="Restrict to postal codes")
+    parser.add_argument(
+        "--where",
+        action="append",
+        default=[],
+        help="Row condition '<column> <op> <value>'; repeat to AND several",
+    )
+    parser.add_argument(
+        "--group-by",
+        nargs="+",
+        default=[],
+        help=f"Grouping columns; may include derived keys {', '.join(DERIVED_KEYS)}",
+    )
+    parser.add_argument(
+        "--agg",
+        nargs="+",
+        default=[],
+        dest="aggregates",
+        help=f"Aggregates as column:function ({', '.join(AGGREGATES)})",
+    )
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--output", type=Path, help="Write CSV here instead of printing")
+
+
+def run_query(args: argparse.Namespace, root: Path = HISTORY_DATA_DIR) -> bool:
+    try:
+        table = QueryService(root).query(
+            columns=args.columns,
+            start=args.start,
+            end=args.end,
+            postals=args.postals,
+            where=args.where,
+            group_by=args.group_by,
+            aggregates=args.aggregates,
+            limit=args.limit,
+        )
+    except (ValueError, KeyError, pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+        logger.error(f"[QUERY] Invalid query → {e}")
+        return False
+
+    df = table.to_pandas()
+    if args.output:
+        df.to_csv(args.output, index=False)
+        logger.info(f"[QUERY] {len(df)} rows written to {args.output}")
+    else:
+        df.to_string(sys.stdout, index=False)
+        sys.stdout.write("\n")
+    return True
+
+
+if __name__ == "__main__":
+    cli = argparse.ArgumentParser(description="Query the warehouse history")
+    add_query_arguments(cli)
+    run_query(cli.parse_args())
@@ -0,0 +1,118 @@
+import hashlib
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional
+
+from src.config import TIMEZONE
+from src.file_utils import atomic_write
+from src.logger import setup_logger
+
+logger = setup_logger(__name__, log_name="raw_store")
+
+BLOB_DIR_NAME = "blobs"
+PROCESSED_DIR_NAME = "processed"
+REF_SUFFIX = ".ref.json"
+REF_KEY = "blob_sha256"
+
+# Response fields that change on every request without the data changing
+VOLATILE_KEYS = ("generationtime_ms",)
+
+
+def normalize_payload(data: dict[str, Any]) -> dict[str, Any]:
+    return {k: v for k, v in data.items() if k not in VOLATILE_KEYS}
+
+
+def canonical_bytes(data: dict[str, Any]) -> bytes:
+    return json.dumps(
+        normalize_payload(data), sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    ).encode("utf-8")
+
+
+def blob_path(raw_dir: Path, digest: str) -> Path:
+    return Path(raw_dir) / BLOB_DIR_NAME / digest[:2] / f"{digest}.json"
+
+
+def write_blob(data: dict[str, Any], raw_dir: Path) -> tuple[str, bool]:
+    """
+    Stores the normalized payload once under its SHA-256 and returns (digest, stored),
+    where `stored` is False when an identical payload was already present.
+    """
+    body = canonical_bytes(data)
+    digest = hashlib.sha256(body).hexdigest()
+    path = blob_path(raw_dir, digest)
+    if path.exists():
+        logger.info(f"[DEDUP] Payload already stored → {digest[:12]}")
+        return digest, False
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with atomic_write(path, "wb") as f:
+        f.write(body)
+    logger.info(f"[DEDUP] Stored new payload → {digest[:12]} ({len(body)} bytes)")
+    return digest, True
+
+
+def make_ref(digest: str, **meta: Any) -> dict[str, Any]:
+    return {REF_KEY: digest, "created_at": datetime.now(TIMEZONE).isoformat(), **meta}
+
+
+def is_ref(data: dict[str, Any]) -> bool:
+    return REF_KEY in data and "daily" not in data
+
+
+def resolve_ref(ref_file: Path, ref: dict[str, Any]) -> dict[str, Any]:
+    """
+    Loads the payload a run reference points to. Blobs live next to their refs, so a
+    raw directory stays self-contained when moved or mounted into another container.
+    """
+    with open(blob_path(Path(ref_file).parent, ref[REF_KEY]), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def ref_digest(raw_file: Path) -> Optional[str]:
+    raw_file = Path(raw_file)
+    if not raw_file.name.endswith(REF_SUFFIX):
+        return None
+    try:
+        with open(raw_file, "r", encoding="utf-8") as f:
+            return json.load(f).get(REF_KEY)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def _marker_path(raw_file: Path, digest: str, postal: str) -> Path:
+    return Path(raw_file).parent / BLOB_DIR_NAME / PROCESSED_DIR_NAME / f"{digest}_{postal}.json"
+
+
+def processed_output(raw_file: Path, postal: str, city: str, version: str = "") -> Optional[Path]:
+    """
+    Returns the cleaned file already produced from the same blob for this location,
+    if it still exists and was built with the same cleaning schema `version`.
+    """
+    digest = ref_digest(raw_file)
+    if digest is None:
+        return None
+    marker = _marker_path(raw_file, digest, postal)
+    try:
+        with open(marker, "r", encoding="utf-8") as f:
+            record = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    cleaned = Path(record.get("cleaned", ""))
+    if record.get("city") != city or record.get("version", "") != version:
+        return None
+    if not cleaned.is_file():
+        return None
+    return cleaned
+
+
+def mark_processed(
+    raw_file: Path, postal: str, city: str, cleaned_file: Path, version: str = ""
+) -> None:
+    digest = ref_digest(raw_file)
+    if digest is None:
+        return
+    marker = _marker_path(raw_file, digest, postal)
+    marker.parent.mkdir(parents=True, exist_ok=True)
+    with atomic_write(marker) as f:
+        json.dump({"city": city, "cleaned": str(cleaned_file), "version": version}, f)
@@ -0,0 +1,115 @@
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional, Union
+
+from src.config import JOURNAL_PATH, TIMEZONE
+from src.logger import setup_logger
+
+logger = setup_logger(__name__, log_name="run_journal")
+
+Unit = tuple[str, str, str]
+
+
+class RunJournal:
+    """
+    Append-only JSONL record of completed (location, chunk, stage) units.
+
+    A fresh run writes a `start` record with its run plan; `--resume` continues the
+    most recent run, reusing its plan and skipping every unit it already completed.
+    Each record is flushed and fsynced before the unit counts as done. Safe to share
+    between the threads of one pipeline run.
+    """
+
+    def __init__(self, path: Union[str, Path] = JOURNAL_PATH):
+        self.path = Path(path)
+        self.run_id: Optional[str] = None
+        self.plan: dict[str, Any] = {}
+        self._done: dict[Unit, Optional[str]] = {}
+        self._lock = threading.Lock()
+
+    def _read_records(self) -> list[dict[str, Any]]:
+        if not self.path.exists():
+            return []
+        records = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A crash mid-append can leave one torn line at the end
+                    logger.warning("[JOURNAL] Skipping unreadable journal line")
+        return records
+
+    def _append(self, record: dict[str, Any]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def start(self, plan: dict[str, Any], resume: bool = False) -> dict[str, Any]:
+        """
+        Starts or resumes a run and returns the plan in effect.
+        """
+        if resume:
+            records = self._read_records()
+            starts = [r for r in records if r.get("event") == "start"]
+            if starts:
+                last = starts[-1]
+                self.run_id, self.plan = last["run_id"], last["plan"]
+                self._done = {
+                    (r["location"], r["chunk"], r["stage"]): r.get("artifact")
+                    for r in records
+                    if r.get("event") == "done" and r.get("run_id") == self.run_id
+                }
+                logger.info(
+                    f"[JOURNAL] Resuming run {self.run_id} with {len(self._done)} completed units"
+                )
+                return self.plan
+            logger.warning("[JOURNAL] Nothing to resume. Starting a fresh run.")
+
+        self.run_id = datetime.now(TIMEZONE).strftime("%Y%m%d_%H%M%S")
+        self.plan = plan
+        self._done = {}
+        self._append({"event": "start", "run_id": self.run_id, "plan": plan})
+        logger.info(f"[JOURNAL] Started run {self.run_id}")
+        return self.plan
+
+    def is_done(self, location: str, chunk: str, stage: str) -> bool:
+        return (location, chunk, stage) in self._done
+
+    def artifact(self, location: str, chunk: str, stage: str) -> Optional[Path]:
+        """
+        Returns the file a completed unit produced, if it still exists on disk.
+        """
+        artifact = self._done.get((location, chunk, stage))
+        if artifact and Path(artifact).exists():
+            return Path(artifact)
+        return None
+
+    def mark_done(
+        self,
+        location: str,
+        chunk: str,
+        stage: str,
+        artifact: Optional[Union[str, Path]] = None,
+    ) -> None:
+        if self.run_id is None:
+            raise RuntimeError("RunJournal.start() must be called before mark_done()")
+        artifact_str = str(artifact) if artifact is not None else None
+        with self._lock:
+            self._append(
+                {
+                    "event": "done",
+                    "run_id": self.run_id,
+                    "location": location,
+                    "chunk": chunk,
+                    "stage": stage,
+                    "artifact": artifact_str,
+                    "completed_at": datetime.now(TIMEZONE).isoformat(),
+                }
+            )
+            self._done[(location, chunk, stage)] = artifact_str
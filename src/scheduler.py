@@ -0,0 +1,227 @@
+import heapq
+import threading
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from src.config import TIMEZONE
+from src.logger import setup_logger
+
+logger = setup_logger(__name__, log_name="scheduler")
+
+# (field name, lowest value, highest value) for the five cron fields
+CRON_FIELDS = [
+    ("minute", 0, 59),
+    ("hour", 0, 23),
+    ("day", 1, 31),
+    ("month", 1, 12),
+    ("weekday", 0, 7),
+]
+
+
+def _parse_field(expr: str, low: int, high: int) -> frozenset[int]:
+    values: set[int] = set()
+    for part in expr.split(","):
+        body, _, step_str = part.partition("/")
+        step = int(step_str) if step_str else 1
+        if body == "*":
+            start, stop = low, high
+        elif "-" in body:
+            start, stop = (int(v) for v in body.split("-", 1))
+        else:
+            start = int(body)
+            stop = high if step_str else start
+        if step < 1 or not low <= start <= stop <= high:
+            raise ValueError(f"Cron field '{expr}' out of range {low}-{high}")
+        values.update(range(start, stop + 1, step))
+    return frozenset(values)
+
+
+class CronSchedule:
+    """
+    Standard five-field cron expression ("m h dom mon dow"; Sunday is 0 or 7) with
+    `*`, lists, ranges and steps. As in cron, when both day fields are restricted a
+    day matches if either one does.
+    """
+
+    def __init__(self, expression: str):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"Cron expression needs 5 fields, got '{expression}'")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            _parse_field(part, low, high) for part, (_, low, high) in zip(parts, CRON_FIELDS)
+        )
+        self.weekdays = frozenset(d % 7 for d in weekdays)
+        self.any_day = parts[2] == "*"
+        self.any_weekday = parts[4] == "*"
+
+    def _day_matches(self, dt: datetime) -> bool:
+        day_ok = dt.day in self.days
+        # Python: Monday=0; cron: Sunday=0
+        weekday_ok = (dt.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, after: datetime) -> datetime:
+        """
+        First matching minute strictly after `after`. Skips whole days and hours that
+        cannot match, so even sparse schedules resolve in a few hundred steps.
+        """
+        dt = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = dt + timedelta(days=366 * 5)
+        while dt < limit:
+            if dt.month not in self.months or not self._day_matches(dt):
+                dt = (dt + timedelta(days=1)).replace(hour=0, minute=0)
+            elif dt.hour not in self.hours:
+                dt = (dt + timedelta(hours=1)).replace(minute=0)
+            elif dt.minute not in self.minutes:
+                dt += timedelta(minutes=1)
+            else:
+                return dt
+        raise ValueError(f"Cron expression '{self.expression}' never matches")
+
+
+def stagger_offset(key: str, window: timedelta) -> timedelta:
+    """
+    Stable per-key delay in [0, window), so locations sharing a schedule are spread
+    evenly over the window instead of all hitting the API at the same minute.
+    """
+    seconds = int(window.total_seconds())
+    if seconds <= 0:
+        return timedelta(0)
+    return timedelta(seconds=zlib.crc32(key.encode("utf-8")) % seconds)
+
+
+class Job:
+    def __init__(
+        self, name: str, schedule: CronSchedule, func: Callable[[], object], offset: timedelta
+    ):
+        self.name = name
+        self.schedule = schedule
+        self.func = func
+        self.offset = offset
+        self.running: Optional[Future] = None
+        self.next_run: Optional[datetime] = None
+
+    def plan_next(self, now: datetime) -> datetime:
+        # Offsets are applied after the cron tick, so look back by the offset to find
+        # the tick whose staggered slot is the next one after `now`
+        self.next_run = self.schedule.next_after(now - self.offset) + self.offset
+        return self.next_run
+
+
+class Scheduler:
+    """
+    In-process cron scheduler. Due jobs run on a small thread pool; a job whose
+    previous run is still in progress is skipped for that slot rather than stacked.
+    """
+
+    def __init__(self, max_workers: int = 4, clock: Optional[Callable[[], datetime]] = None):
+        self.clock = clock or (lambda: datetime.now(TIMEZONE))
+        self.max_workers = max_workers
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self.jobs: list[Job] = []
+        self._queue: list[tuple[datetime, int, Job]] = []
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def add(
+        self,
+        name: str,
+        schedule: CronSchedule,
+        func: Callable[[], object],
+        stagger: timedelta = timedelta(0),
+        run_now: bool = False,
+    ) -> Job:
+        job = Job(name, schedule, func, stagger_offset(name, stagger))
+        now = self.clock()
+        when = now if run_now else job.plan_next(now)
+        job.next_run = when
+        with self._lock:
+            self.jobs.append(job)
+            heapq.heappush(self._queue, (when, len(self.jobs), job))
+        logger.info(f"[SCHEDULE] {name} → next run {when.isoformat()}")
+        return job
+
+    def _launch(self, job: Job) -> bool:
+        if job.running is not None and not job.running.done():
+            logger.warning(f"[SCHEDULE] {job.name} still running. Skipping this slot.")
+            return False
+
+        def execute() -> None:
+            started = self.clock()
+            try:
+                result = job.func()
+                elapsed = (self.clock() - started).total_seconds()
+                status = "succeeded" if result is not False else "failed"
+                logger.info(f"[JOB] {job.name} {status} in {elapsed:.1f}s")
+            except Exception as e:
+                logger.exception(f"[JOB] {job.name} raised → {e}")
+
+        job.running = self.pool.submit(execute)
+        return True
+
+    def run_pending(self) -> int:
+        """
+        Starts every job that is due and reschedules it. Returns the number started.
+        """
+        now = self.clock()
+        started = 0
+        with self._lock:
+            while self._queue and self._queue[0][0] <= now:
+                _, seq, job = heapq.heappop(self._queue)
+                started += self._launch(job)
+                heapq.heappush(self._queue, (job.plan_next(now), seq, job))
+        return started
+
+    def reconfigure(
+        self,
+        schedule: Optional[CronSchedule] = None,
+        stagger: Optional[timedelta] = None,
+        max_workers: Optional[int] = None,
+    ) -> None:
+        """
+        Applies new settings to a running scheduler: every job moves to `schedule`
+        and/or a new stagger window and is re-planned; a new worker count swaps in a
+        fresh pool while runs already in progress finish on the old one.
+        """
+        now = self.clock()
+        with self._lock:
+            if max_workers and max_workers != self.max_workers:
+                old_pool, self.max_workers = self.pool, max_workers
+                self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+                old_pool.shutdown(wait=False)
+            if schedule is None and stagger is None:
+                return
+            for job in self.jobs:
+                if schedule is not None:
+                    job.schedule = schedule
+                if stagger is not None:
+                    job.offset = stagger_offset(job.name, stagger)
+            self._queue = [(job.plan_next(now), seq, job) for seq, job in enumerate(self.jobs, 1)]
+            heapq.heapify(self._queue)
+        logger.info(f"[SCHEDULE] Re-planned {len(self.jobs)} jobs")
+
+    def seconds_until_next(self) -> Optional[float]:
+        with self._lock:
+            if not self._queue:
+                return None
+            return max((self._queue[0][0] - self.clock()).total_seconds(), 0.0)
+
+    def run_forever(self, poll_seconds: float = 30.0) -> None:
+        """
+        Blocks until `stop()` is called, sleeping until the next job is due.
+        """
+        logger.info(f"[SCHEDULE] Daemon started with {len(self.jobs)} jobs")
+        while not self._stop.is_set():
+            self.run_pending()
+            wait = self.seconds_until_next()
+            self._stop.wait(poll_seconds if wait is None else min(wait, poll_seconds))
+        self.pool.shutdown(wait=True)
+        logger.info("[SCHEDULE] Daemon stopped")
+
+    def stop(self) -> None:
+        self._stop.set()
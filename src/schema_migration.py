@@ -0,0 +1,109 @@
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+
+from src.aggregates import rollup_dir
+from src.aggregates import update_location as update_rollups
+from src.anomaly_detector import drop_output_columns
+from src.config import AGGREGATES_DATA_DIR, HISTORY_DATA_DIR, PREVIEW_DATA_DIR
+from src.history_store import partition_path, partition_version, replace_partition
+from src.logger import setup_logger
+from src.preview import preview_dir
+from src.preview import update_location as update_previews
+from src.profiling import run_stage
+from src.weather_schema import (
+    DERIVED_COLUMNS,
+    SCHEMA_VERSION,
+    SOURCE_COLUMNS,
+    add_derived_metrics,
+)
+
+logger = setup_logger(__name__, log_name="schema_migration")
+
+
+def legacy_rows(df: pd.DataFrame) -> np.ndarray:
+    """
+    Rows still in version "1" units. Those predate the derived metrics, and a
+    version "2" row always has its Frost_Day flag, so the flag tells the two apart
+    even in a partition that received rows of both versions.
+    """
+    if "Frost_Day" not in df.columns:
+        return np.ones(len(df), dtype=bool)
+    return df["Frost_Day"].isna().to_numpy()
+
+
+def upgrade_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converts legacy rows to the current units (snowfall cm → mm, radiation MJ/m² →
+    kWh/m², sunshine s → min) and fills in their derived metrics. The conversion
+    starts from the stored one-decimal values, so converted radiation is only as
+    precise as the old MJ/m² figure.
+    """
+    legacy = legacy_rows(df)
+    if not legacy.any():
+        return df
+    df = df.copy()
+    for spec in SOURCE_COLUMNS:
+        if spec.factor != 1.0 and spec.column in df.columns:
+            values = df.loc[legacy, spec.column].to_numpy(dtype="float64")
+            df.loc[legacy, spec.column] = np.round(values * spec.factor, spec.decimals)
+    derived = add_derived_metrics(df.loc[legacy])
+    for spec in DERIVED_COLUMNS:
+        df.loc[legacy, spec.column] = derived[spec.column].to_numpy()
+    return df
+
+
+def migrate_location(
+    postal: str,
+    root: Path = HISTORY_DATA_DIR,
+    aggregates_root: Path = AGGREGATES_DATA_DIR,
+    preview_root: Path = PREVIEW_DATA_DIR,
+) -> int:
+    """
+    Rewrites one location's history partition in the current units, then rebuilds
+    its rollups and previews from it, as both were folded from the old values.
+    Anomaly statistics cover only unconverted columns and are kept. Returns the
+    number of converted rows.
+    """
+    path = partition_path(postal, root)
+    version = partition_version(path)
+    if version == SCHEMA_VERSION:
+        return 0
+
+    df = feather.read_feather(path)
+    converted = int(legacy_rows(df).sum())
+    df = upgrade_frame(df)
+    replace_partition(df, postal, root)
+    logger.info(f"[MIGRATE] {postal}: {converted} rows from version {version} units")
+
+    shutil.rmtree(rollup_dir(postal, aggregates_root), ignore_errors=True)
+    update_rollups(drop_output_columns(df), postal, aggregates_root)
+    shutil.rmtree(preview_dir(postal, preview_root), ignore_errors=True)
+    update_previews(df, postal, preview_root, root)
+    logger.info(f"[MIGRATE] {postal}: rollups and previews rebuilt")
+    return converted
+
+
+def run() -> bool:
+    paths = sorted(Path(HISTORY_DATA_DIR).glob("postal=*.arrow"))
+    if not paths:
+        logger.info("[DONE] No history partitions to migrate.")
+        return True
+
+    postals = [p.stem.split("=", 1)[1] for p in paths]
+    converted = sum(
+        migrate_location(postal, HISTORY_DATA_DIR, AGGREGATES_DATA_DIR, PREVIEW_DATA_DIR)
+        for postal in postals
+    )
+    logger.info(
+        f"[DONE] {len(postals)} partitions at schema version {SCHEMA_VERSION}, "
+        f"{converted} rows converted."
+    )
+    return True
+
+
+if __name__ == "__main__":
+    run_stage(run, "schema_migration")
@@ -0,0 +1,461 @@
+import json
+import struct
+from pathlib import Path
+from typing import Any, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.anomaly_detector import is_output_column
+from src.config import SERIES_DATA_DIR, SERIES_SEGMENT_ROWS, STAGING_DATA_DIR
+from src.file_utils import atomic_path, atomic_write
+from src.history_store import DateLike, get_latest_cleaned_file, read_cleaned_file
+from src.logger import setup_logger
+from src.profiling import run_stage
+
+logger = setup_logger(__name__, log_name="series_store")
+
+SEGMENT_MAGIC = b"SKYSEG1\n"
+# Decimal places tried when looking for an exact scaled-integer form of a column
+MAX_DECIMALS = 6
+# Scaled integers must stay exactly representable as float64
+MAX_EXACT_INT = 2**53
+KEY_COLUMNS = ("Date", "City", "PostalCode")
+EPOCH = np.datetime64("1970-01-01", "D")
+
+
+def pack_bits(values: np.ndarray, widths: np.ndarray) -> bytes:
+    """
+    Concatenates the low `widths[i]` bits of each uint64 `values[i]`, most significant
+    first, into a byte string padded with zero bits.
+    """
+    values = np.ascontiguousarray(values, dtype=np.uint64).ravel()
+    if values.size == 0:
+        return b""
+    bits = np.unpackbits(values.astype(">u8").view(np.uint8)).reshape(-1, 64)
+    keep = np.arange(64) >= 64 - np.asarray(widths, dtype=np.int64).reshape(-1, 1)
+    return np.packbits(bits[keep]).tobytes()
+
+
+def unpack_bits(data: bytes, widths: np.ndarray) -> np.ndarray:
+    """
+    Inverse of pack_bits: splits `data` into consecutive fields of `widths` bits and
+    returns them right-aligned as uint64.
+    """
+    widths = np.asarray(widths, dtype=np.int64).ravel()
+    if widths.size == 0 or not data:
+        return np.zeros(widths.size, dtype=np.uint64)
+    bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8))
+    starts = np.cumsum(widths) - widths
+    column = np.arange(64)
+    # Row i holds field i in its last widths[i] bit positions
+    offset = column - (64 - widths[:, None])
+    valid = offset >= 0
+    index = np.clip(starts[:, None] + offset, 0, len(bits) - 1)
+    rows = np.where(valid, bits[index], 0).astype(np.uint8)
+    return np.packbits(rows, axis=1).view(">u8").ravel().astype(np.uint64)
+
+
+def encode_words(words: np.ndarray) -> tuple[bytes, bytes, bytes]:
+    """
+    Gorilla-style word encoding: a bitmap marks non-zero words; each non-zero word is
+    stored as a 12-bit header (leading zero count, meaningful bit count - 1) and only
+    its meaningful bits. Headers are fixed-width, so decoding needs no sequential scan.
+    """
+    nonzero = words != 0
+    meaningful = words[nonzero]
+    bits = np.unpackbits(meaningful.astype(">u8").view(np.uint8)).reshape(-1, 64)
+    leading = bits.argmax(axis=1)
+    trailing = bits[:, ::-1].argmax(axis=1)
+    length = 64 - leading - trailing
+    headers = pack_bits(
+        np.column_stack([leading, length - 1]).astype(np.uint64), np.full(2 * len(length), 6)
+    )
+    payload = pack_bits(meaningful >> trailing.astype(np.uint64), length)
+    return np.packbits(nonzero).tobytes(), headers, payload
+
+
+def decode_words(n: int, bitmap: bytes, headers: bytes, payload: bytes) -> np.ndarray:
+    nonzero = np.unpackbits(np.frombuffer(bitmap, dtype=np.uint8), count=n).astype(bool)
+    k = int(nonzero.sum())
+    header = unpack_bits(headers, np.full(2 * k, 6)).reshape(k, 2).astype(np.int64)
+    leading, length = header[:, 0], header[:, 1] + 1
+    trailing = (64 - leading - length).astype(np.uint64)
+    words = np.zeros(n, dtype=np.uint64)
+    words[nonzero] = unpack_bits(payload, length) << trailing
+    return words
+
+
+def zigzag(values: np.ndarray) -> np.ndarray:
+    values = values.astype(np.int64)
+    return ((values << 1) ^ (values >> 63)).view(np.uint64)
+
+
+def unzigzag(words: np.ndarray) -> np.ndarray:
+    return ((words >> np.uint64(1)) ^ (np.uint64(0) - (words & np.uint64(1)))).view(np.int64)
+
+
+def delta_encode(values: np.ndarray, order: int) -> np.ndarray:
+    for _ in range(order):
+        values = np.diff(values, prepend=0)
+    return zigzag(values)
+
+
+def delta_decode(words: np.ndarray, order: int) -> np.ndarray:
+    values = unzigzag(words)
+    for _ in range(order):
+        values = np.cumsum(values)
+    return values
+
+
+def decimal_scale(values: np.ndarray) -> Optional[int]:
+    """
+    Smallest number of decimals d such that values * 10**d are integers that map back
+    to exactly the same floats, or None. Cleaned columns are rounded to 1-2 decimals,
+    and their scaled integers delta-encode far tighter than XORed float bits.
+    """
+    for decimals in range(MAX_DECIMALS + 1):
+        factor = 10.0**decimals
+        scaled = np.round(values * factor)
+        if np.all(np.abs(scaled) < MAX_EXACT_INT) and np.array_equal(scaled / factor, values):
+            return decimals
+    return None
+
+
+def encode_column(values: np.ndarray) -> tuple[dict[str, Any], list[bytes]]:
+    """
+    Compresses one float column. NaNs go to a null bitmap; the remaining values are
+    delta-encoded as scaled integers when an exact decimal form exists, otherwise
+    XORed with their predecessor (Gorilla floats).
+    """
+    nulls = np.isnan(values)
+    present = values[~nulls]
+    meta: dict[str, Any] = {"nulls": bool(nulls.any())}
+    decimals = decimal_scale(present)
+    if decimals is not None:
+        meta.update(codec="delta", decimals=decimals)
+        words = delta_encode(np.round(present * 10.0**decimals).astype(np.int64), 1)
+    else:
+        meta["codec"] = "xor"
+        bits = present.view(np.uint64)
+        words = bits ^ np.concatenate([np.zeros(1, dtype=np.uint64), bits[:-1]])
+    blobs = list(encode_words(words))
+    if meta["nulls"]:
+        blobs.append(np.packbits(nulls).tobytes())
+    return meta, blobs
+
+
+def decode_column(n: int, meta: dict[str, Any], blobs: list[bytes]) -> np.ndarray:
+    nulls = np.zeros(n, dtype=bool)
+    if meta["nulls"]:
+        nulls = np.unpackbits(np.frombuffer(blobs[3], dtype=np.uint8), count=n).astype(bool)
+    words = decode_words(int(n - nulls.sum()), *blobs[:3])
+    if meta["codec"] == "delta":
+        present = delta_decode(words, 1) / 10.0 ** meta["decimals"]
+    else:
+        present = np.bitwise_xor.accumulate(words).view(np.float64)
+    values = np.full(n, np.nan)
+    values[~nulls] = present
+    return values
+
+
+def write_segment(path: Path, days: np.ndarray, columns: dict[str, np.ndarray]) -> int:
+    """
+    Writes one sealed segment: a JSON header with per-column codec and blob sizes,
+    followed by the blobs. Dates are stored as delta-of-delta day numbers, which is
+    a run of zero bits for a gap-free daily series. Returns the file size.
+    """
+    header: dict[str, Any] = {"rows": len(days), "columns": []}
+    blobs = list(encode_words(delta_encode(days, 2)))
+    header["date"] = [len(b) for b in blobs]
+    for name, values in columns.items():
+        meta, column_blobs = encode_column(values)
+        header["columns"].append({"name": name, **meta, "sizes": [len(b) for b in column_blobs]})
+        blobs.extend(column_blobs)
+
+    encoded = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    with atomic_path(path) as tmp_path:
+        with open(tmp_path, "wb") as f:
+            f.write(SEGMENT_MAGIC + struct.pack("<I", len(encoded)) + encoded)
+            for blob in blobs:
+                f.write(blob)
+    return len(SEGMENT_MAGIC) + 4 + len(encoded) + sum(len(b) for b in blobs)
+
+
+def read_segment(
+    path: Path, columns: Optional[Sequence[str]] = None
+) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+    """
+    Returns (day numbers, {column: values}), decoding only the requested columns.
+    """
+    data = path.read_bytes()
+    if not data.startswith(SEGMENT_MAGIC):
+        raise ValueError(f"Not a series segment: {path}")
+    start = len(SEGMENT_MAGIC)
+    (length,) = struct.unpack_from("<I", data, start)
+    header = json.loads(data[start + 4 : start + 4 + length])
+    offset = start + 4 + length
+    n = header["rows"]
+
+    def take(sizes: list[int]) -> list[bytes]:
+        nonlocal offset
+        blobs = []
+        for size in sizes:
+            blobs.append(data[offset : offset + size])
+            offset += size
+        return blobs
+
+    days = delta_decode(decode_words(n, *take(header["date"])), 2)
+    wanted = None if columns is None else set(columns)
+    values = {}
+    for meta in header["columns"]:
+        blobs = take(meta["sizes"])
+        if wanted is None or meta["name"] in wanted:
+            values[meta["name"]] = decode_column(n, meta, blobs)
+    return days, values
+
+
+def to_days(dates: Any) -> np.ndarray:
+    return (pd.to_datetime(dates).to_numpy("datetime64[D]") - EPOCH).astype(np.int64)
+
+
+def from_days(days: np.ndarray) -> np.ndarray:
+    return (EPOCH + days.astype("timedelta64[D]")).astype("datetime64[ns]")
+
+
+class SeriesStore:
+    """
+    Append-only store for the cleaned daily series, one directory per location:
+
+    - `head.bin`: the open segment, fixed-size uncompressed records appended in place,
+      with its column list in `head.json`. Appending a day writes one record.
+    - `seg-NNNNNN.bin`: sealed segments of `segment_rows` rows, compressed per column
+      (see write_segment). A full head is sealed into one.
+    - `index.json`: date range and row count of every sealed segment, so range reads
+      only open and decode the segments they overlap.
+
+    Revised days are appended like new ones; on read, the last written row of a date
+    wins, as in the history store's upserts.
+    """
+
+    def __init__(self, root: Path = SERIES_DATA_DIR, segment_rows: int = SERIES_SEGMENT_ROWS):
+        self.root = Path(root)
+        self.segment_rows = segment_rows
+
+    def location_dir(self, postal: str) -> Path:
+        return self.root / f"postal={postal}"
+
+    def locations(self) -> list[str]:
+        return sorted(p.name.split("=", 1)[1] for p in self.root.glob("postal=*") if p.is_dir())
+
+    def index(self, postal: str) -> dict[str, Any]:
+        path = self.location_dir(postal) / "index.json"
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"city": None, "next": 1, "segments": []}
+
+    def _head(self, directory: Path) -> tuple[list[str], np.ndarray]:
+        """
+        Returns the open segment's columns and records. A record cut short by a crash
+        mid-append is ignored.
+        """
+        try:
+            with open(directory / "head.json", "r", encoding="utf-8") as f:
+                columns = json.load(f)["columns"]
+        except FileNotFoundError:
+            return [], np.empty(0, dtype=_record_dtype([]))
+        dtype = _record_dtype(columns)
+        data = (directory / "head.bin").read_bytes() if (directory / "head.bin").exists() else b""
+        usable = len(data) - len(data) % dtype.itemsize
+        return columns, np.frombuffer(data[:usable], dtype=dtype)
+
+    def _start_head(self, directory: Path, columns: list[str], records: np.ndarray) -> None:
+        with atomic_write(directory / "head.json") as f:
+            json.dump({"columns": columns}, f)
+        with atomic_path(directory / "head.bin") as tmp_path:
+            records.tofile(tmp_path)
+
+    def _seal(self, directory: Path, index: dict[str, Any], records: np.ndarray) -> None:
+        name = f"seg-{index['next']:06d}.bin"
+        columns = {c: records[c].copy() for c in records.dtype.names[1:]}
+        size = write_segment(directory / name, records["Date"].copy(), columns)
+        # Min/max rather than first/last: revised days may be appended out of order
+        index["segments"].append(
+            {
+                "file": name,
+                "rows": len(records),
+                "min_day": int(records["Date"].min()),
+                "max_day": int(records["Date"].max()),
+                "bytes": size,
+            }
+        )
+        index["next"] += 1
+
+    def append_location(self, df: pd.DataFrame, postal: str) -> int:
+        """
+        Appends one location's rows. Rows already stored with the same values are
+        dropped, so re-publishing an overlapping chunk only appends revised days. While
+        the open segment has room this is a single write at the end of `head.bin`; rows
+        beyond it seal full segments. A change in the column set seals the open segment
+        early. Returns the rows appended.
+        """
+        if df.empty:
+            return 0
+        directory = self.location_dir(postal)
+        directory.mkdir(parents=True, exist_ok=True)
+        columns = value_columns(df)
+        df = df.sort_values("Date", kind="stable").drop_duplicates("Date", keep="last")
+        records = to_records(self._changed_rows(df, postal, columns), columns)
+        if len(records) == 0:
+            return 0
+
+        index = self.index(postal)
+        index_changed = index["city"] is None
+        index["city"] = index["city"] or str(df["City"].iloc[0])
+        head_columns, head = self._head(directory)
+        if head_columns != columns:
+            if len(head):
+                self._seal(directory, index, head)
+                self._write_index(directory, index)
+            head = np.empty(0, dtype=records.dtype)
+            self._start_head(directory, columns, head)
+
+        if len(head) + len(records) < self.segment_rows:
+            path = directory / "head.bin"
+            with open(path, "r+b" if path.exists() else "wb") as f:
+                # Write after the last whole record, overwriting any torn one
+                f.seek(head.nbytes)
+                f.write(records.tobytes())
+                f.truncate()
+            if index_changed:
+                self._write_index(directory, index)
+            return len(records)
+
+        combined = np.concatenate([head, records])
+        full = len(combined) - len(combined) % self.segment_rows
+        for i in range(0, full, self.segment_rows):
+            self._seal(directory, index, combined[i : i + self.segment_rows])
+        # Segments and index first: a crash before the head is cut back only leaves
+        # rows stored twice, which reads resolve
+        self._write_index(directory, index)
+        self._start_head(directory, columns, combined[full:])
+        logger.info(f"[SERIES] {postal}: sealed {full // self.segment_rows} segments")
+        return len(records)
+
+    def _changed_rows(self, df: pd.DataFrame, postal: str, columns: list[str]) -> pd.DataFrame:
+        if not (self.location_dir(postal) / "head.json").exists():
+            return df
+        stored = self.read_frame(postal, df["Date"].min(), df["Date"].max(), columns)
+        if stored.empty or not set(columns) <= set(stored.columns):
+            return df
+        dates = pd.to_datetime(df["Date"]).to_numpy("datetime64[ns]")
+        known = np.isin(dates, stored["Date"].to_numpy())
+        stored = stored.set_index("Date").reindex(dates)[columns].to_numpy(dtype="float64")
+        new = df[columns].to_numpy(dtype="float64")
+        same = known & ((stored == new) | (np.isnan(stored) & np.isnan(new))).all(axis=1)
+        return df[~same]
+
+    def append(self, df: pd.DataFrame) -> int:
+        return sum(
+            self.append_location(group, str(postal))
+            for postal, group in df.groupby(df["PostalCode"].astype(str))
+        )
+
+    def _write_index(self, directory: Path, index: dict[str, Any]) -> None:
+        with atomic_write(directory / "index.json") as f:
+            json.dump(index, f)
+
+    def read_frame(
+        self,
+        postal: str,
+        start: Optional[DateLike] = None,
+        end: Optional[DateLike] = None,
+        columns: Optional[Sequence[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        Returns rows with start <= Date <= end, decoding only the segments whose date
+        range overlaps it (and only the requested columns of them).
+        """
+        directory = self.location_dir(postal)
+        if not directory.exists():
+            logger.error(f"[READ] No series for postal {postal}")
+            return pd.DataFrame()
+
+        lo = None if start is None else int(to_days([start])[0])
+        hi = None if end is None else int(to_days([end])[0])
+        index = self.index(postal)
+        parts = []
+        for segment in index["segments"]:
+            if (lo is not None and segment["max_day"] < lo) or (
+                hi is not None and segment["min_day"] > hi
+            ):
+                continue
+            days, values = read_segment(directory / segment["file"], columns)
+            parts.append(pd.DataFrame({"Date": days, **values}))
+        head_columns, head = self._head(directory)
+        if len(head):
+            wanted = [c for c in head_columns if columns is None or c in columns]
+            parts.append(pd.DataFrame({"Date": head["Date"], **{c: head[c] for c in wanted}}))
+        if not parts:
+            return pd.DataFrame()
+
+        df = pd.concat(parts, ignore_index=True)
+        keep = np.ones(len(df), dtype=bool)
+        if lo is not None:
+            keep &= df["Date"].to_numpy() >= lo
+        if hi is not None:
+            keep &= df["Date"].to_numpy() <= hi
+        df = df[keep].drop_duplicates("Date", keep="last").sort_values("Date", ignore_index=True)
+        df["Date"] = from_days(df["Date"].to_numpy())
+        return df.assign(City=index["city"], PostalCode=postal)
+
+    def disk_usage(self, postal: str) -> int:
+        return sum(p.stat().st_size for p in self.location_dir(postal).iterdir())
+
+
+def value_columns(df: pd.DataFrame) -> list[str]:
+    # Anomaly scores and flags are recomputed on every publish; storing them would make
+    # each re-published day look revised
+    return [
+        c
+        for c in df.columns
+        if c not in KEY_COLUMNS and not is_output_column(c) and pd.api.types.is_numeric_dtype(df[c])
+    ]
+
+
+def _record_dtype(columns: Sequence[str]) -> np.dtype:
+    return np.dtype([("Date", "<i8"), *((c, "<f8") for c in columns)])
+
+
+def to_records(df: pd.DataFrame, columns: list[str]) -> np.ndarray:
+    records = np.empty(len(df), dtype=_record_dtype(columns))
+    records["Date"] = to_days(df["Date"])
+    for column in columns:
+        records[column] = df[column].to_numpy(dtype="float64")
+    return records
+
+
+def append_frame(df: pd.DataFrame, root: Path = SERIES_DATA_DIR) -> int:
+    return SeriesStore(root).append(df)
+
+
+def run() -> bool:
+    cleaned_file = get_latest_cleaned_file(STAGING_DATA_DIR)
+    if not cleaned_file:
+        logger.error("[ERROR] No cleaned file found.")
+        return False
+
+    df = read_cleaned_file(cleaned_file)
+    if df is None or df.empty:
+        logger.error("[ERROR] Cleaned file could not be loaded or is empty.")
+        return False
+
+    rows = append_frame(df, SERIES_DATA_DIR)
+    logger.info(f"[DONE] Appended {rows} rows to the series store.")
+    return True
+
+
+if __name__ == "__main__":
+    run_stage(run, "series_store")
@@ -0,0 +1,397 @@
+import dataclasses
+import logging
+import os
+import threading
+import typing
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Optional, Union
+
+import yaml
+from dotenv import load_dotenv
+
+# Logged through the standard logger: src.logger itself depends on config, which
+# is built from these settings
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+SETTINGS_PATH = Path(
+    os.getenv("SETTINGS_PATH", Path(__file__).resolve().parent.parent / "config" / "settings.yaml")
+)
+
+
+class SettingsError(ValueError):
+    pass
+
+
+def setting(
+    default: Any,
+    env: Optional[str] = None,
+    min: Optional[float] = None,
+    choices: Optional[tuple] = None,
+) -> Any:
+    """
+    Declares a settings field with its default, optional environment override and
+    validation bounds.
+    """
+    metadata = {"env": env, "min": min, "choices": choices}
+    if isinstance(default, (list, dict)):
+        return field(default_factory=lambda: type(default)(default), metadata=metadata)
+    return field(default=default, metadata=metadata)
+
+
+@dataclass(frozen=True)
+class WeatherSettings:
+    days_to_pull: int = setting(90, env="DAYS_TO_PULL", min=1)
+    chunk_days: int = setting(365, env="CHUNK_DAYS", min=1)
+    # Sources queried concurrently per request: open_meteo, era5, local_dump
+    providers: tuple[str, ...] = setting(("open_meteo",), env="WEATHER_PROVIDERS")
+    provider_strategy: str = setting(
+        "first", env="WEATHER_PROVIDER_STRATEGY", choices=("first", "cheapest")
+    )
+
+
+@dataclass(frozen=True)
+class LocationSettings:
+    latitude: Optional[float] = setting(None)
+    longitude: Optional[float] = setting(None)
+    postal: Optional[str] = setting(None)
+    city: Optional[str] = setting(None)
+
+    @property
+    def complete(self) -> bool:
+        return None not in (self.latitude, self.longitude, self.postal)
+
+    def as_location(self) -> dict[str, Any]:
+        return {
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "postal": self.postal,
+            "city": self.city or "Unknown",
+        }
+
+
+@dataclass(frozen=True)
+class GeocodingSettings:
+    max_workers: int = setting(8, env="GEOCODING_MAX_WORKERS", min=1)
+    country_code: Optional[str] = setting(None, env="GEOCODING_COUNTRY_CODE")
+
+
+@dataclass(frozen=True)
+class AggregateSettings:
+    hdd_base_c: float = setting(18.0)
+    cdd_base_c: float = setting(18.0)
+
+
+@dataclass(frozen=True)
+class FeatureSettings:
+    target: str = setting("Temp_Mean_C")
+    columns: tuple[str, ...] = setting(
+        ("Temp_Max_C", "Temp_Min_C", "Temp_Mean_C", "Precipitation_mm", "WindSpeed_Max_kph")
+    )
+    lags: tuple[int, ...] = setting((1, 2, 3, 7, 14, 365))
+    rolling_windows: tuple[int, ...] = setting((7, 30))
+    lookback: int = setting(30, min=1)
+    horizon: int = setting(7, min=1)
+
+
+@dataclass(frozen=True)
+class EvaluationSettings:
+    max_workers: int = setting(4, env="EVALUATION_MAX_WORKERS", min=1)
+    parallel_min_rows: int = setting(1_000_000, min=0)
+
+
+@dataclass(frozen=True)
+class PipelineSettings:
+    fetch_workers: int = setting(4, env="PIPELINE_FETCH_WORKERS", min=1)
+    clean_workers: int = setting(2, env="PIPELINE_CLEAN_WORKERS", min=1)
+    queue_size: int = setting(8, env="PIPELINE_QUEUE_SIZE", min=1)
+    cleaned_format: str = setting("csv", env="CLEANED_FORMAT", choices=("csv", "arrow"))
+
+
+@dataclass(frozen=True)
+class CacheSettings:
+    # Keep-alive connections per host in each thread's HTTP pool
+    http_pool_size: int = setting(16, env="HTTP_POOL_SIZE", min=1)
+    # History partitions a HistoryStore keeps memory-mapped at once
+    history_open_partitions: int = setting(256, env="HISTORY_OPEN_PARTITIONS", min=1)
+
+
+@dataclass(frozen=True)
+class PreviewSettings:
+    sample_size: int = setting(365, min=1)
+    points_per_year: int = setting(120, min=3)
+
+
+@dataclass(frozen=True)
+class AnomalySettings:
+    columns: tuple[str, ...] = setting(
+        ("Temp_Max_C", "Temp_Min_C", "Temp_Mean_C", "Precipitation_mm", "WindSpeed_Max_kph")
+    )
+    window_days: int = setting(7, min=0)
+    min_samples: int = setting(30, min=2)
+    z_threshold: float = setting(3.0, env="ANOMALY_Z_THRESHOLD", min=0)
+    fast_span: int = setting(7, min=1)
+    slow_span: int = setting(90, min=1)
+    shift_threshold: float = setting(2.0, env="ANOMALY_SHIFT_THRESHOLD", min=0)
+
+
+@dataclass(frozen=True)
+class SeriesSettings:
+    # Days per sealed, compressed segment of the append-only series store
+    segment_rows: int = setting(366, env="SERIES_SEGMENT_ROWS", min=1)
+
+
+@dataclass(frozen=True)
+class ExportSettings:
+    host: str = setting("127.0.0.1", env="EXPORT_HOST")
+    port: int = setting(8780, env="EXPORT_PORT", min=0)
+    # Rows per streamed record batch
+    batch_rows: int = setting(65_536, env="EXPORT_BATCH_ROWS", min=1)
+    gzip_level: int = setting(6, env="EXPORT_GZIP_LEVEL", choices=tuple(range(10)))
+
+
+@dataclass(frozen=True)
+class ValidationSettings:
+    max_workers: int = setting(4, env="VALIDATION_MAX_WORKERS", min=1)
+
+
+@dataclass(frozen=True)
+class ApiSettings:
+    open_meteo_archive_url: str = setting(
+        "https://archive-api.open-meteo.com/v1/archive", env="OPEN_METEO_ARCHIVE_URL"
+    )
+    ipinfo_url: str = setting("https://ipinfo.io/json", env="IPINFO_URL")
+    # Lookup of a given address; `{ip}` is replaced by the address
+    ipinfo_ip_url: str = setting("https://ipinfo.io/{ip}/json", env="IPINFO_IP_URL")
+    geocoding_url: str = setting(
+        "https://geocoding-api.open-meteo.com/v1/search", env="GEOCODING_URL"
+    )
+
+
+@dataclass(frozen=True)
+class SchedulerSettings:
+    cron: str = setting("30 8 * * *", env="SCHEDULER_CRON")
+    stagger_minutes: float = setting(60.0, env="SCHEDULER_STAGGER_MINUTES", min=0)
+    max_workers: int = setting(4, env="SCHEDULER_MAX_WORKERS", min=1)
+    run_on_start: bool = setting(False, env="SCHEDULER_RUN_ON_START")
+    # Seconds between checks of settings.yaml for changes in daemon mode (0 disables)
+    reload_seconds: float = setting(10.0, env="SETTINGS_RELOAD_SECONDS", min=0)
+
+
+@dataclass(frozen=True)
+class Settings:
+    timezone: str = setting("Europe/Berlin", env="TIMEZONE")
+    weather: WeatherSettings = field(default_factory=WeatherSettings)
+    location: LocationSettings = field(default_factory=LocationSettings)
+    # Postal codes / city names or full location mappings processed in one run
+    locations: tuple[Union[str, LocationSettings], ...] = ()
+    geocoding: GeocodingSettings = field(default_factory=GeocodingSettings)
+    aggregates: AggregateSettings = field(default_factory=AggregateSettings)
+    features: FeatureSettings = field(default_factory=FeatureSettings)
+    evaluation: EvaluationSettings = field(default_factory=EvaluationSettings)
+    pipeline: PipelineSettings = field(default_factory=PipelineSettings)
+    cache: CacheSettings = field(default_factory=CacheSettings)
+    preview: PreviewSettings = field(default_factory=PreviewSettings)
+    anomalies: AnomalySettings = field(default_factory=AnomalySettings)
+    series: SeriesSettings = field(default_factory=SeriesSettings)
+    export: ExportSettings = field(default_factory=ExportSettings)
+    validation: ValidationSettings = field(default_factory=ValidationSettings)
+    api: ApiSettings = field(default_factory=ApiSettings)
+    scheduler: SchedulerSettings = field(default_factory=SchedulerSettings)
+
+
+def _coerce(value: Any, annotation: Any, where: str) -> Any:
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+
+    if origin is Union:
+        if value is None and type(None) in args:
+            return None
+        errors = []
+        for arg in (a for a in args if a is not type(None)):
+            try:
+                return _coerce(value, arg, where)
+            except SettingsError as e:
+                errors.append(str(e))
+        raise SettingsError("; ".join(errors))
+    if origin is tuple:
+        if isinstance(value, str):
+            value = [v.strip() for v in value.split(",") if v.strip()]
+        if not isinstance(value, (list, tuple)):
+            raise SettingsError(f"{where}: expected a list, got {value!r}")
+        return tuple(_coerce(v, args[0], f"{where}[{i}]") for i, v in enumerate(value))
+    if dataclasses.is_dataclass(annotation):
+        if not isinstance(value, dict):
+            raise SettingsError(f"{where}: expected a mapping, got {value!r}")
+        return _build(annotation, value, where)
+    if annotation is bool:
+        if isinstance(value, bool):
+            return value
+        if str(value).lower() in ("1", "true", "yes", "on"):
+            return True
+        if str(value).lower() in ("0", "false", "no", "off"):
+            return False
+        raise SettingsError(f"{where}: expected true/false, got {value!r}")
+    if annotation in (int, float):
+        if isinstance(value, bool) or (annotation is int and isinstance(value, float)):
+            raise SettingsError(f"{where}: expected {annotation.__name__}, got {value!r}")
+        try:
+            return annotation(value)
+        except (TypeError, ValueError):
+            raise SettingsError(f"{where}: expected {annotation.__name__}, got {value!r}")
+    if annotation is str:
+        if isinstance(value, (dict, list)) or value is None:
+            raise SettingsError(f"{where}: expected text, got {value!r}")
+        return str(value)
+    return value
+
+
+def _build(cls: type, data: dict[str, Any], where: str = "") -> Any:
+    hints = typing.get_type_hints(cls)
+    names = {f.name for f in dataclasses.fields(cls)}
+    unknown = sorted(set(data) - names)
+    if unknown:
+        raise SettingsError(f"{where or 'settings'}: unknown keys {unknown}")
+
+    values = {}
+    for f in dataclasses.fields(cls):
+        key = f"{where}.{f.name}" if where else f.name
+        env = f.metadata.get("env")
+        if env and os.getenv(env) not in (None, ""):
+            raw = os.environ[env]
+        elif f.name in data and data[f.name] is not None:
+            raw = data[f.name]
+        elif dataclasses.is_dataclass(hints[f.name]):
+            # Sections missing from the file still pick up their env overrides
+            raw = {}
+        else:
+            continue
+
+        value = _coerce(raw, hints[f.name], key)
+        low, choices = f.metadata.get("min"), f.metadata.get("choices")
+        if low is not None and value < low:
+            raise SettingsError(f"{key}: must be >= {low}, got {value}")
+        if choices and value not in choices:
+            raise SettingsError(f"{key}: must be one of {list(choices)}, got {value!r}")
+        values[f.name] = value
+    return cls(**values)
+
+
+def parse_settings(data: Optional[dict[str, Any]]) -> Settings:
+    """
+    Builds validated settings from a parsed YAML mapping plus environment overrides.
+    Raises SettingsError naming the offending key.
+    """
+    if data is None:
+        data = {}
+    if not isinstance(data, dict):
+        raise SettingsError("settings: expected a mapping at the top level")
+    return _build(Settings, data)
+
+
+def load_settings(path: Union[str, Path] = SETTINGS_PATH) -> Settings:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = yaml.safe_load(f)
+    except yaml.YAMLError as e:
+        raise SettingsError(f"{path}: invalid YAML → {e}")
+    return parse_settings(data)
+
+
+class SettingsStore:
+    """
+    Parsed settings cached per file, re-parsed only when the file's mtime changes.
+    A file that no longer validates keeps the last good settings in effect.
+    """
+
+    def __init__(self, path: Union[str, Path] = SETTINGS_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._mtime = self._stat()
+        self._settings = load_settings(self.path)
+        self._listeners: list[Callable[[Settings, Settings], None]] = []
+
+    def _stat(self) -> Optional[int]:
+        try:
+            return self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    @property
+    def current(self) -> Settings:
+        return self._settings
+
+    def on_change(self, listener: Callable[[Settings, Settings], None]) -> None:
+        self._listeners.append(listener)
+
+    def reload_if_changed(self) -> bool:
+        """
+        Re-parses the file if it changed on disk and notifies listeners with
+        (old, new). Returns True when new settings took effect.
+        """
+        with self._lock:
+            mtime = self._stat()
+            if mtime == self._mtime:
+                return False
+            self._mtime = mtime
+            try:
+                new = load_settings(self.path)
+            except (OSError, SettingsError) as e:
+                logger.error(f"[SETTINGS] Reload rejected, keeping current settings → {e}")
+                return False
+            old, self._settings = self._settings, new
+        if new == old:
+            return False
+        logger.info(f"[SETTINGS] Reloaded {self.path}: {', '.join(changed_keys(old, new))}")
+        for listener in self._listeners:
+            listener(old, new)
+        return True
+
+    def watch(self, interval: float) -> threading.Event:
+        """
+        Polls the file every `interval` seconds on a daemon thread. Set the returned
+        event to stop watching.
+        """
+        stop = threading.Event()
+
+        def loop() -> None:
+            while not stop.wait(interval):
+                try:
+                    self.reload_if_changed()
+                except Exception as e:
+                    logger.exception(f"[SETTINGS] Reload failed → {e}")
+
+        threading.Thread(target=loop, name="settings-watch", daemon=True).start()
+        return stop
+
+
+def changed_keys(old: Any, new: Any, prefix: str = "") -> list[str]:
+    if not (dataclasses.is_dataclass(old) and dataclasses.is_dataclass(new)):
+        return [prefix] if old != new else []
+    keys = []
+    for f in dataclasses.fields(old):
+        name = f"{prefix}.{f.name}" if prefix else f.name
+        keys += changed_keys(getattr(old, f.name), getattr(new, f.name), name)
+    return keys
+
+
+_stores: dict[Path, SettingsStore] = {}
+_stores_lock = threading.Lock()
+
+
+def settings_store(path: Union[str, Path] = SETTINGS_PATH) -> SettingsStore:
+    path = Path(path)
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = SettingsStore(path)
+        return _stores[path]
+
+
+def get_settings() -> Settings:
+    """
+    The process-wide settings, parsed once; long-running processes pick up edits
+    through `settings_store().watch()` or `reload_if_changed()`.
+    """
+    return settings_store().current
@@ -0,0 +1,149 @@
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, Optional, Sequence
+
+from src.logger import setup_logger
+
+logger = setup_logger(__name__, log_name="pipeline")
+
+# A stage function gets the payload from the previous stage and returns the payload
+# for the next one, or False when the unit failed
+StageFunc = Callable[[Any], Any]
+
+_DONE = object()
+
+
+@dataclass
+class Stage:
+    name: str
+    func: StageFunc
+    workers: int = 1
+    # Ordered stages see each key's items in `seq` order; they run on a single worker
+    ordered: bool = False
+    busy_seconds: float = field(default=0.0, init=False)
+    processed: int = field(default=0, init=False)
+
+
+@dataclass
+class WorkItem:
+    key: str
+    seq: int
+    payload: Any
+
+
+class StreamingPipeline:
+    """
+    Producer/consumer chain of stages connected by bounded queues.
+
+    Every stage has its own worker threads, so network waits, pandas work and disk
+    writes of different items overlap, and a full queue blocks the stage feeding it
+    instead of letting finished-but-unconsumed payloads pile up in memory. End-to-end
+    time therefore tends to the busiest stage's time rather than the sum of all stages.
+
+    Items sharing a key (e.g. the date chunks of one location) are independent until
+    an ordered stage, which applies them strictly by `seq`. When a key's item fails,
+    its later items are dropped as in a sequential run; earlier ones still complete.
+    """
+
+    def __init__(self, stages: Sequence[Stage], queue_size: int = 8):
+        if not stages:
+            raise ValueError("StreamingPipeline needs at least one stage")
+        self.stages = list(stages)
+        self.queue_size = max(queue_size, 1)
+        self._failed: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _fail(self, item: WorkItem) -> None:
+        with self._lock:
+            self._failed[item.key] = min(self._failed.get(item.key, item.seq), item.seq)
+
+    def _dropped(self, item: WorkItem) -> bool:
+        with self._lock:
+            return item.key in self._failed and item.seq > self._failed[item.key]
+
+    def _apply(self, stage: Stage, item: WorkItem) -> Optional[WorkItem]:
+        started = time.perf_counter()
+        try:
+            result = stage.func(item.payload)
+        except Exception as e:
+            logger.exception(f"[STREAM] {stage.name} raised for {item.key} #{item.seq} → {e}")
+            result = False
+        with self._lock:
+            stage.busy_seconds += time.perf_counter() - started
+            stage.processed += 1
+        if result is False:
+            self._fail(item)
+            return None
+        return WorkItem(item.key, item.seq, result)
+
+    def _worker(self, stage: Stage, inbox: queue.Queue, outbox: Optional[queue.Queue]) -> None:
+        # Next expected seq and buffered early arrivals per key, for ordered stages
+        next_seq: dict[str, int] = {}
+        waiting: dict[str, dict[int, WorkItem]] = {}
+
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                break
+            ready = [item]
+            if stage.ordered:
+                waiting.setdefault(item.key, {})[item.seq] = item
+                ready = []
+                buffered = waiting[item.key]
+                while next_seq.get(item.key, 0) in buffered:
+                    ready.append(buffered.pop(next_seq.get(item.key, 0)))
+                    next_seq[item.key] = next_seq.get(item.key, 0) + 1
+
+            for current in ready:
+                if self._dropped(current):
+                    continue
+                result = self._apply(stage, current)
+                if result is not None and outbox is not None:
+                    outbox.put(result)
+
+    def run(self, items: Iterable[WorkItem]) -> set[str]:
+        """
+        Streams `items` through all stages and returns the keys that failed.
+        Items of one key must be numbered 0, 1, 2, ... for ordered stages.
+        """
+        started = time.perf_counter()
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        threads: list[list[threading.Thread]] = []
+        for i, stage in enumerate(self.stages):
+            outbox = queues[i + 1] if i + 1 < len(queues) else None
+            workers = 1 if stage.ordered else max(stage.workers, 1)
+            stage_threads = [
+                threading.Thread(
+                    target=self._worker,
+                    args=(stage, queues[i], outbox),
+                    name=f"{stage.name}-{n}",
+                    daemon=True,
+                )
+                for n in range(workers)
+            ]
+            for thread in stage_threads:
+                thread.start()
+            threads.append(stage_threads)
+
+        count = 0
+        for item in items:
+            queues[0].put(item)
+            count += 1
+
+        # Close stages front to back: once every worker of a stage has exited, nothing
+        # more can reach the next queue
+        for inbox, stage_threads in zip(queues, threads):
+            for _ in stage_threads:
+                inbox.put(_DONE)
+            for thread in stage_threads:
+                thread.join()
+
+        elapsed = time.perf_counter() - started
+        stats = ", ".join(
+            f"{s.name} {s.processed} in {s.busy_seconds:.1f}s busy/{len(t)}w"
+            for s, t in zip(self.stages, threads)
+        )
+        logger.info(f"[STREAM] {count} items in {elapsed:.1f}s ({stats})")
+        return set(self._failed)
@@ -0,0 +1,219 @@
+import contextvars
+import json
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional, Union
+
+from src.file_utils import atomic_write
+from src.logger import setup_logger
+
+logger = setup_logger(__name__, log_name="pipeline")
+
+# Finished spans kept per trace; beyond this they are counted but not stored
+MAX_SPANS = 200_000
+
+_current: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+
+class Span:
+    """
+    One timed operation. Ids, parent links, attributes and status follow the
+    OpenTelemetry span model, so an exported trace maps one-to-one onto OTel spans.
+    """
+
+    __slots__ = (
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "attributes",
+        "status",
+        "start_ns",
+        "end_ns",
+        "_started",
+        "thread_id",
+        "thread_name",
+    )
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: dict[str, Any]):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes
+        self.status = "OK"
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self._started = time.perf_counter_ns()
+        thread = threading.current_thread()
+        self.thread_id = thread.ident or 0
+        self.thread_name = thread.name
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def finish(self) -> None:
+        # Wall clock marks the start; the monotonic clock measures the duration
+        self.end_ns = self.start_ns + time.perf_counter_ns() - self._started
+
+    @property
+    def duration_ns(self) -> int:
+        return (self.end_ns or self.start_ns) - self.start_ns
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    def set(self, **attributes: Any) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """
+    Collects finished spans in memory while enabled. Disabled tracing costs one
+    attribute check per span, so instrumentation can stay in hot paths.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.spans: list[Span] = []
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            self.spans, self.dropped, self.enabled = [], 0, True
+
+    def stop(self) -> list[Span]:
+        with self._lock:
+            self.enabled = False
+            spans, self.spans = self.spans, []
+        return spans
+
+    def record(self, span: Span) -> None:
+        with self._lock:
+            if len(self.spans) < MAX_SPANS:
+                self.spans.append(span)
+            else:
+                self.dropped += 1
+
+
+tracer = Tracer()
+
+
+@contextmanager
+def span(name: str, parent: Optional[Span] = None, **attributes: Any) -> Iterator[Any]:
+    """
+    Times the enclosed block as a child of the current span (or of `parent`, for
+    work handed to another thread). Yields the span so attributes such as rows or
+    bytes can be added once known; an exception marks it as an error.
+    """
+    if not tracer.enabled:
+        yield NOOP_SPAN
+        return
+
+    current = Span(name, parent or _current.get(), attributes)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.status = "ERROR"
+        current.attributes["exception.type"] = e.__class__.__name__
+        raise
+    finally:
+        current.finish()
+        _current.reset(token)
+        tracer.record(current)
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def propagate(func: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Binds `func` to a copy of the caller's context, so spans it opens on a pool
+    thread nest under the span that submitted it. Each call runs in its own copy:
+    a Context can be entered by one thread at a time, and pool.map shares the
+    wrapper across workers.
+    """
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.copy().run(func, *args, **kwargs)
+
+
+def to_chrome_trace(spans: list[Span]) -> dict[str, Any]:
+    """
+    Converts spans to the Chrome Trace Event format, which chrome://tracing,
+    Perfetto (ui.perfetto.dev) and speedscope open directly. Each span becomes a
+    complete ("X") event on its thread's track; times are in microseconds.
+    """
+    pid = os.getpid()
+    events: list[dict[str, Any]] = []
+    threads: dict[int, str] = {}
+    for s in sorted(spans, key=lambda s: s.start_ns):
+        threads.setdefault(s.thread_id, s.thread_name)
+        events.append(
+            {
+                "name": s.name,
+                "cat": s.name.split(".", 1)[0],
+                "ph": "X",
+                "ts": s.start_ns / 1000,
+                "dur": s.duration_ns / 1000,
+                "pid": pid,
+                "tid": s.thread_id,
+                "args": {
+                    **s.attributes,
+                    "status": s.status,
+                    "trace_id": s.trace_id,
+                    "span_id": s.span_id,
+                    "parent_span_id": s.parent_id,
+                },
+            }
+        )
+    events.extend(
+        {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+        for tid, name in threads.items()
+    )
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def start_tracing() -> None:
+    tracer.start()
+
+
+def stop_tracing(path: Union[str, Path]) -> Optional[Path]:
+    """
+    Stops collecting and writes the spans recorded since start_tracing to `path`.
+    """
+    dropped = tracer.dropped
+    spans = tracer.stop()
+    if not spans:
+        logger.warning("[TRACE] No spans recorded, nothing written.")
+        return None
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with atomic_write(path) as f:
+        json.dump(to_chrome_trace(spans), f, default=str)
+    suffix = f", {dropped} dropped over the {MAX_SPANS} limit" if dropped else ""
+    logger.info(f"[TRACE] {len(spans)} spans written to {path}{suffix}")
+    return path
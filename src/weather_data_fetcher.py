@@ -1,42 +1,28 @@
 import json
 from datetime import date, datetime, timedelta
-from typing import Any, Optional, Tuple
-
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-
-from src.config import DAYS_TO_PULL, RAW_DATA_DIR, SYSTEM_LOCATION_PATH, TIMEZONE
+from pathlib import Path
+from typing import Any, Optional, Sequence, Tuple
+
+from src.config import (
+    CHUNK_DAYS,
+    DAYS_TO_PULL,
+    RAW_DATA_DIR,
+    SYSTEM_LOCATION_PATH,
+    TIMEZONE,
+    WEATHER_PROVIDERS,
+)
+from src.file_utils import atomic_write
 from src.logger import setup_logger
+from src.profiling import run_stage
+from src.raw_store import REF_SUFFIX, make_ref, write_blob
+from src.tracing import span
+from src.weather_providers import WeatherProvider, build_providers, fetch_from_providers
 
 logger = setup_logger(__name__, log_name="weather_openmeteo_logs")
 
 RAW_DATA_DIR.mkdir(parents=True, exist_ok=True)
 
 
-def get_with_retry(
-    url: str,
-    params: dict[str, Any],
-    retries: int = 3,
-    backoff_factor: float = 0.5,
-    timeout: int = 10,
-) -> requests.Response:
-    session = requests.Session()
-    retry_strategy = Retry(
-        total=retries,
-        backoff_factor=backoff_factor,
-        status_forcelist=[429, 500, 502, 503, 504],
-        allowed_methods=["GET"],
-    )
-    adapter = HTTPAdapter(max_retries=retry_strategy)
-    session.mount("http://", adapter)
-    session.mount("https://", adapter)
-
-    response = session.get(url, params=params, timeout=timeout)
-    response.raise_for_status()
-    return response
-
-
 def get_location_info(
     filename: str = SYSTEM_LOCATION_PATH,
 ) -> Tuple[Optional[float], Optional[float], Optional[str]]:
@@ -68,54 +54,22 @@ def get_weather_data(
     lon: float,
     start_date: str,
     end_date: str,
+    providers: Optional[Sequence[WeatherProvider]] = None,
 ) -> Optional[dict[str, Any]]:
     """
-    Fetches historical weather data from Open-Meteo API.
+    Fetches historical weather data from the configured providers, queried concurrently.
     """
-    url: str = "https://archive-api.open-meteo.com/v1/archive"
-    ALL_DAILY_VARIABLES: list[str] = [
-        "temperature_2m_max",
-        "temperature_2m_min",
-        "temperature_2m_mean",
-        "precipitation_sum",
-        "rain_sum",
-        "snowfall_sum",
-        "windspeed_10m_max",
-        "shortwave_radiation_sum",
-        "sunshine_duration",
-    ]
-
-    params: dict[str, Any] = {
-        "latitude": lat,
-        "longitude": lon,
-        "start_date": start_date,
-        "end_date": end_date,
-        "daily": ",".join(ALL_DAILY_VARIABLES),
-        "timezone": "Europe/Berlin",
-    }
-
     logger.info(
         f"[FETCH] Requesting weather data: {start_date} → {end_date} | lat:{lat}, lon:{lon}"
     )
-    try:
-        response: requests.Response = get_with_retry(url, params)
-        response.raise_for_status()
-        logger.info("[FETCH] Data fetched successfully from Open-Meteo API")
-        return response.json()
-    except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
-        logger.error(f"[FETCH] Network error during request → {e}")
-        return None
-    except requests.exceptions.HTTPError as e:
-        logger.error(f"[FETCH] HTTP error → {e.response.status_code}: {e.response.text}")
-        return None
-    except requests.exceptions.RequestException as e:
-        logger.error(f"[FETCH] Unexpected request exception → {e}")
-        return None
+    if providers is None:
+        providers = build_providers(WEATHER_PROVIDERS)
+    return fetch_from_providers(providers, lat, lon, start_date, end_date)
 
 
 def save_to_file(data: dict[str, Any], filename: str) -> bool:
     try:
-        with open(filename, "w", encoding="utf-8") as f:
+        with atomic_write(filename) as f:
             json.dump(data, f, indent=2)
         logger.info(f"[SAVE] Weather data saved to: {filename}")
         return True
@@ -139,21 +93,64 @@ def prepare_date_range() -> Tuple[str, str]:
     return start_date.isoformat(), end_date.isoformat()
 
 
-def fetch_and_store_weather(lat: float, lon: float, postal: str) -> None:
-    start_date, end_date = prepare_date_range()
+def prepare_date_chunks(
+    start_date: str, end_date: str, chunk_days: int = CHUNK_DAYS
+) -> list[Tuple[str, str]]:
+    """
+    Splits the inclusive [start_date, end_date] range into consecutive chunks of at most
+    chunk_days days, so long backfills can be fetched and checkpointed piece by piece.
+    """
+    start, end = date.fromisoformat(start_date), date.fromisoformat(end_date)
+    chunks: list[Tuple[str, str]] = []
+    while start <= end:
+        chunk_end = min(start + timedelta(days=chunk_days - 1), end)
+        chunks.append((start.isoformat(), chunk_end.isoformat()))
+        start = chunk_end + timedelta(days=1)
+    return chunks
+
+
+def fetch_and_store_weather(
+    lat: float,
+    lon: float,
+    postal: str,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+) -> Optional[Path]:
+    if start_date is None or end_date is None:
+        start_date, end_date = prepare_date_range()
+    with span("fetch", postal=postal, start_date=start_date, end_date=end_date):
+        return _fetch_and_store(lat, lon, postal, start_date, end_date)
+
+
+def _fetch_and_store(
+    lat: float, lon: float, postal: str, start_date: str, end_date: str
+) -> Optional[Path]:
     data = get_weather_data(lat, lon, start_date, end_date)
 
     if not data:
         logger.error("[PIPELINE] No data fetched. Aborting save.")
-        return
+        return None
+
+    try:
+        with span("write.raw") as s:
+            digest, stored = write_blob(data, RAW_DATA_DIR)
+            s.set(digest=digest[:12], stored=stored)
+    except (PermissionError, FileNotFoundError, OSError) as e:
+        logger.error(f"[SAVE] File system error while storing payload → {e}")
+        return None
 
     timestamp = datetime.now(TIMEZONE).strftime("%Y-%m-%d_%H-%M")
-    filename = RAW_DATA_DIR / f"raw_weather_{postal}_{timestamp}.json"
-    save_to_file(data, str(filename))
+    filename = (
+        RAW_DATA_DIR / f"raw_weather_{postal}_{start_date}_{end_date}_{timestamp}{REF_SUFFIX}"
+    )
+    ref = make_ref(digest, postal=postal, start_date=start_date, end_date=end_date)
+    if not save_to_file(ref, str(filename)):
+        return None
+    return filename
 
 
 def run() -> bool:
-    lat, lon, postal = get_location_info()
+    lat, lon, postal = get_location_info(SYSTEM_LOCATION_PATH)
     if not lat or not lon:
         logger.error("[ERROR] Coordinates missing. Exiting.")
         return False
@@ -162,10 +159,12 @@ def run() -> bool:
         logger.error("[ERROR] Postal code missing. Exiting.")
         return False
 
-    fetch_and_store_weather(lat, lon, postal)
+    if not fetch_and_store_weather(lat, lon, postal):
+        logger.error("[ERROR] Weather data could not be fetched or saved.")
+        return False
     logger.info("[DONE] Weather data fetched and saved successfully.")
     return True
 
 
 if __name__ == "__main__":
-    run()
+    run_stage(run, "weather_data_fetcher")
@@ -0,0 +1,328 @@
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Any, Callable, Optional, Sequence
+
+import pandas as pd
+import requests
+
+from src.config import (
+    OPEN_METEO_ARCHIVE_URL,
+    TIMEZONE_NAME,
+    WEATHER_DUMP_DIR,
+    WEATHER_PROVIDER_STRATEGY,
+    WEATHER_PROVIDERS,
+)
+from src.http_client import pooled_session, traced_get
+from src.logger import setup_logger
+from src.tracing import propagate, span
+
+logger = setup_logger(__name__, log_name="weather_openmeteo_logs")
+
+# Normalized schema every provider returns: Open-Meteo's `daily` block, which the cleaner consumes
+DAILY_VARIABLES: list[str] = [
+    "temperature_2m_max",
+    "temperature_2m_min",
+    "temperature_2m_mean",
+    "precipitation_sum",
+    "rain_sum",
+    "snowfall_sum",
+    "windspeed_10m_max",
+    "shortwave_radiation_sum",
+    "sunshine_duration",
+]
+
+# Nearest dump grid point must lie within this many degrees of the requested location
+DUMP_MAX_DISTANCE_DEG = 0.25
+
+# Threads shared by all concurrent provider fan-ins. They live as long as the process, so
+# each keeps its pooled HTTP sessions (and keep-alive connections) between requests
+PROVIDER_POOL_WORKERS = 16
+
+WeatherPayload = dict[str, Any]
+
+
+def get_with_retry(
+    url: str,
+    params: dict[str, Any],
+    retries: int = 3,
+    backoff_factor: float = 0.5,
+    timeout: int = 10,
+) -> requests.Response:
+    session = pooled_session(retries, backoff_factor)
+    response = traced_get(session, url, params=params, timeout=timeout)
+    response.raise_for_status()
+    return response
+
+
+class WeatherProvider(ABC):
+    """
+    One source of daily weather history. `cost` ranks providers for the "cheapest"
+    strategy (lower is cheaper); `fetch` returns the normalized payload or None.
+    """
+
+    name = "provider"
+    cost = 1.0
+
+    @abstractmethod
+    def fetch(
+        self, lat: float, lon: float, start_date: str, end_date: str
+    ) -> Optional[WeatherPayload]: ...
+
+
+class OpenMeteoArchiveProvider(WeatherProvider):
+    """
+    Open-Meteo historical archive. `models` selects a specific reanalysis (e.g. "era5");
+    None lets Open-Meteo pick its best-match blend.
+    """
+
+    def __init__(
+        self,
+        name: str = "open_meteo",
+        models: Optional[str] = None,
+        url: Optional[str] = None,
+        cost: float = 1.0,
+    ):
+        self.name = name
+        self.models = models
+        self.url = url
+        self.cost = cost
+
+    def fetch(
+        self, lat: float, lon: float, start_date: str, end_date: str
+    ) -> Optional[WeatherPayload]:
+        params: dict[str, Any] = {
+            "latitude": lat,
+            "longitude": lon,
+            "start_date": start_date,
+            "end_date": end_date,
+            "daily": ",".join(DAILY_VARIABLES),
+            "timezone": TIMEZONE_NAME,
+        }
+        if self.models:
+            params["models"] = self.models
+
+        try:
+            response: requests.Response = get_with_retry(self.url or OPEN_METEO_ARCHIVE_URL, params)
+            response.raise_for_status()
+            logger.info(f"[FETCH] Data fetched successfully from Open-Meteo API ({self.name})")
+            with span("parse.json", provider=self.name):
+                return response.json()
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+            logger.error(f"[FETCH] Network error during request ({self.name}) → {e}")
+            return None
+        except requests.exceptions.HTTPError as e:
+            logger.error(
+                f"[FETCH] HTTP error ({self.name}) → {e.response.status_code}: {e.response.text}"
+            )
+            return None
+        except requests.exceptions.RequestException as e:
+            logger.error(f"[FETCH] Unexpected request exception ({self.name}) → {e}")
+            return None
+
+
+@dataclass(frozen=True)
+class DumpGrid:
+    """
+    A parsed CSV dump: grid point coordinates and each point's rows indexed by time.
+    """
+
+    points: pd.DataFrame
+    series: dict[tuple[float, float], pd.DataFrame]
+
+
+_dump_cache: dict[Path, tuple[tuple[int, int], DumpGrid]] = {}
+_dump_lock = threading.Lock()
+
+
+def load_dump_grid(path: Path) -> DumpGrid:
+    """
+    Parses a CSV dump once per version of the file; later requests for any location or
+    chunk reuse the grid until the file's mtime or size changes.
+    """
+    stat = path.stat()
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with _dump_lock:
+        cached = _dump_cache.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    df = pd.read_csv(path, parse_dates=["time"])
+    series = {
+        (float(lat), float(lon)): group.drop(columns=["latitude", "longitude"])
+        .set_index("time")
+        .sort_index()
+        for (lat, lon), group in df.groupby(["latitude", "longitude"])
+    }
+    points = pd.DataFrame(list(series), columns=["latitude", "longitude"])
+    grid = DumpGrid(points, series)
+    with _dump_lock:
+        _dump_cache[path] = (signature, grid)
+    return grid
+
+
+class LocalDumpProvider(WeatherProvider):
+    """
+    Serves requests from local CSV or NetCDF dumps (e.g. ERA5 extracts) under `directory`.
+
+    CSV dumps hold one row per (latitude, longitude, time) with Open-Meteo variable
+    names as columns; NetCDF dumps need `xarray` and the same variable names. A dump
+    answers only when its nearest grid point covers every requested day.
+    """
+
+    name = "local_dump"
+    cost = 0.0
+
+    def __init__(self, directory: Path = WEATHER_DUMP_DIR):
+        self.directory = Path(directory)
+
+    def _from_csv(self, path: Path, lat: float, lon: float, start: date, end: date):
+        grid = load_dump_grid(path)
+        points = grid.points
+        distance = (points["latitude"] - lat).abs() + (points["longitude"] - lon).abs()
+        if distance.empty or distance.min() > DUMP_MAX_DISTANCE_DEG:
+            return None
+        nearest = points.loc[distance.idxmin()]
+        point = grid.series[(nearest["latitude"], nearest["longitude"])]
+        return point.loc[str(start) : str(end)]
+
+    def _from_netcdf(self, path: Path, lat: float, lon: float, start: date, end: date):
+        try:
+            import xarray as xr
+        except ImportError:
+            logger.warning(f"[FETCH] xarray is not installed. Skipping NetCDF dump {path.name}")
+            return None
+        with xr.open_dataset(path) as ds:
+            point = ds.sel(latitude=lat, longitude=lon, method="nearest")
+            if (
+                abs(float(point["latitude"]) - lat) + abs(float(point["longitude"]) - lon)
+                > DUMP_MAX_DISTANCE_DEG
+            ):
+                return None
+            return point.sel(time=slice(str(start), str(end))).to_dataframe()
+
+    def fetch(
+        self, lat: float, lon: float, start_date: str, end_date: str
+    ) -> Optional[WeatherPayload]:
+        start, end = date.fromisoformat(start_date), date.fromisoformat(end_date)
+        expected_days = (end - start).days + 1
+        readers: dict[str, Callable] = {".csv": self._from_csv, ".nc": self._from_netcdf}
+
+        for path in sorted(self.directory.glob("*")) if self.directory.exists() else []:
+            reader = readers.get(path.suffix)
+            if reader is None:
+                continue
+            try:
+                frame = reader(path, lat, lon, start, end)
+            except (OSError, KeyError, ValueError) as e:
+                logger.error(f"[FETCH] Could not read dump {path.name} → {e}")
+                continue
+            if frame is None or len(frame) != expected_days:
+                continue
+
+            daily: dict[str, Any] = {"time": [d.strftime("%Y-%m-%d") for d in frame.index]}
+            for var in DAILY_VARIABLES:
+                values = frame[var] if var in frame.columns else pd.Series(index=frame.index)
+                daily[var] = values.astype(object).where(values.notna(), None).tolist()
+            logger.info(f"[FETCH] Data served from local dump {path.name}")
+            return {"latitude": lat, "longitude": lon, "timezone": TIMEZONE_NAME, "daily": daily}
+        return None
+
+
+PROVIDER_REGISTRY: dict[str, Callable[[], WeatherProvider]] = {
+    "open_meteo": OpenMeteoArchiveProvider,
+    "era5": lambda: OpenMeteoArchiveProvider(name="era5", models="era5", cost=2.0),
+    "local_dump": LocalDumpProvider,
+}
+
+
+def register_provider(name: str, factory: Callable[[], WeatherProvider]) -> None:
+    PROVIDER_REGISTRY[name] = factory
+
+
+def build_providers(names: Sequence[str] = WEATHER_PROVIDERS) -> list[WeatherProvider]:
+    unknown = [n for n in names if n not in PROVIDER_REGISTRY]
+    if unknown:
+        raise ValueError(f"Unknown weather providers {unknown}. Known: {sorted(PROVIDER_REGISTRY)}")
+    return [PROVIDER_REGISTRY[n]() for n in names]
+
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def provider_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=PROVIDER_POOL_WORKERS, thread_name_prefix="provider"
+            )
+        return _pool
+
+
+def _traced_fetch(
+    provider: WeatherProvider, lat: float, lon: float, start_date: str, end_date: str
+) -> Optional[WeatherPayload]:
+    with span("provider.fetch", provider=provider.name) as s:
+        payload = provider.fetch(lat, lon, start_date, end_date)
+        s.set(answered=bool(payload))
+        return payload
+
+
+def fetch_from_providers(
+    providers: Sequence[WeatherProvider],
+    lat: float,
+    lon: float,
+    start_date: str,
+    end_date: str,
+    strategy: str = WEATHER_PROVIDER_STRATEGY,
+) -> Optional[WeatherPayload]:
+    """
+    Queries all providers concurrently and fans their answers in.
+
+    "first" returns whichever provider answers successfully first. "cheapest" returns
+    the lowest-cost successful answer, but only waits on providers cheaper than the best
+    answer seen so far, so one slow or failing source never blocks the request.
+    """
+    if strategy not in ("first", "cheapest"):
+        raise ValueError(f"Unknown provider strategy '{strategy}'")
+    if not providers:
+        return None
+    if len(providers) == 1:
+        with span("provider.fetch", provider=providers[0].name):
+            return providers[0].fetch(lat, lon, start_date, end_date)
+
+    ranked = sorted(providers, key=lambda p: p.cost) if strategy == "cheapest" else list(providers)
+    pool = provider_pool()
+    futures: dict[Future, WeatherProvider] = {
+        pool.submit(propagate(_traced_fetch), p, lat, lon, start_date, end_date): p for p in ranked
+    }
+    try:
+        results: dict[Future, Optional[WeatherPayload]] = {}
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    results[future] = future.result()
+                except Exception as e:
+                    logger.error(f"[FETCH] Provider {futures[future].name} failed → {e}")
+                    results[future] = None
+
+            for future in futures:
+                if future not in results:
+                    if strategy == "cheapest":
+                        break
+                    continue
+                if results[future]:
+                    return results[future]
+        logger.error("[FETCH] No weather provider could serve the request")
+        return None
+    finally:
+        # Don't wait on slower providers once an answer is chosen; queued ones never start
+        for future in futures:
+            future.cancel()
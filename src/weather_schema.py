@@ -0,0 +1,106 @@
+from typing import Any, Callable, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from src.config import CDD_BASE_C, HDD_BASE_C
+
+# Bump whenever conversions or derived metrics change, so cached cleaned outputs are rebuilt.
+# History partitions are stamped with it and refused until `make migrate` upgrades them.
+SCHEMA_VERSION = "2"
+
+
+class SourceColumn(NamedTuple):
+    source: str
+    column: str
+    source_unit: str
+    unit: str
+    factor: float
+    decimals: int = 1
+
+
+# Open-Meteo daily variable → cleaned column, converted by one multiplication per column
+SOURCE_COLUMNS: list[SourceColumn] = [
+    SourceColumn("temperature_2m_max", "Temp_Max_C", "°C", "°C", 1.0),
+    SourceColumn("temperature_2m_min", "Temp_Min_C", "°C", "°C", 1.0),
+    SourceColumn("temperature_2m_mean", "Temp_Mean_C", "°C", "°C", 1.0),
+    SourceColumn("precipitation_sum", "Precipitation_mm", "mm", "mm", 1.0),
+    SourceColumn("rain_sum", "Rain_mm", "mm", "mm", 1.0),
+    # Open-Meteo reports snowfall in centimetres
+    SourceColumn("snowfall_sum", "Snowfall_mm", "cm", "mm", 10.0),
+    SourceColumn("windspeed_10m_max", "WindSpeed_Max_kph", "km/h", "km/h", 1.0),
+    SourceColumn("shortwave_radiation_sum", "Radiation_Sum_kWh", "MJ/m²", "kWh/m²", 1 / 3.6, 2),
+    SourceColumn("sunshine_duration", "Sunshine_Minutes", "s", "min", 1 / 60),
+]
+
+
+class DerivedColumn(NamedTuple):
+    column: str
+    unit: str
+    compute: Callable[[pd.DataFrame], np.ndarray]
+    decimals: int = 1
+
+
+def _values(df: pd.DataFrame, column: str) -> np.ndarray:
+    return df[column].to_numpy(dtype="float64")
+
+
+# Metrics computed from cleaned columns; later entries may use earlier ones
+DERIVED_COLUMNS: list[DerivedColumn] = [
+    DerivedColumn(
+        "Temp_Range_C", "°C", lambda df: _values(df, "Temp_Max_C") - _values(df, "Temp_Min_C")
+    ),
+    DerivedColumn(
+        "HDD", "°C·d", lambda df: np.clip(HDD_BASE_C - _values(df, "Temp_Mean_C"), 0, None)
+    ),
+    DerivedColumn(
+        "CDD", "°C·d", lambda df: np.clip(_values(df, "Temp_Mean_C") - CDD_BASE_C, 0, None)
+    ),
+    DerivedColumn(
+        "Frost_Day", "flag", lambda df: (_values(df, "Temp_Min_C") < 0).astype("float64"), 0
+    ),
+    DerivedColumn(
+        "Wet_Day", "flag", lambda df: (_values(df, "Precipitation_mm") >= 1.0).astype("float64"), 0
+    ),
+    DerivedColumn("Sunshine_Hours", "h", lambda df: _values(df, "Sunshine_Minutes") / 60),
+]
+
+COLUMN_DECIMALS: dict[str, int] = {
+    **{spec.column: spec.decimals for spec in SOURCE_COLUMNS},
+    **{spec.column: spec.decimals for spec in DERIVED_COLUMNS},
+}
+
+
+def required_source_keys() -> list[str]:
+    return ["time", *(spec.source for spec in SOURCE_COLUMNS)]
+
+
+def normalize_units(daily: dict[str, Any]) -> pd.DataFrame:
+    """
+    Builds the cleaned-column frame from an Open-Meteo `daily` block, converting each
+    variable to its target unit as one vectorized multiplication. Missing values (None)
+    become NaN.
+    """
+    columns: dict[str, Any] = {"Date": daily["time"]}
+    for spec in SOURCE_COLUMNS:
+        values = np.asarray(daily[spec.source], dtype="float64")
+        columns[spec.column] = values * spec.factor if spec.factor != 1.0 else values
+    return pd.DataFrame(columns)
+
+
+def add_derived_metrics(df: pd.DataFrame) -> pd.DataFrame:
+    derived: dict[str, np.ndarray] = {}
+    for spec in DERIVED_COLUMNS:
+        derived[spec.column] = np.round(spec.compute(df.assign(**derived)), spec.decimals)
+    return df.assign(**derived)
+
+
+def units() -> dict[str, str]:
+    """
+    Unit of every cleaned and derived column, e.g. for documentation or exports.
+    """
+    return {
+        "Date": "date",
+        **{spec.column: spec.unit for spec in SOURCE_COLUMNS},
+        **{spec.column: spec.unit for spec in DERIVED_COLUMNS},
+    }
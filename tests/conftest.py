@@ -0,0 +1,154 @@
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import pandas as pd
+import pytest
+import requests
+
+# src modules are imported inside fixtures only: importing src.config here would fix
+# its paths before pytest_configure has set DATA_ROOT
+
+# Days generated by the raw_payload fixture start from this date by default
+PAYLOAD_START = "2024-01-01"
+
+HEIDELBERG = {"city": "Heidelberg", "postal": "69115", "latitude": 49.41, "longitude": 8.69}
+BERLIN = {"city": "Berlin", "postal": "10115", "latitude": 52.52, "longitude": 13.405}
+
+DATA_ROOT_KEY = pytest.StashKey[Path]()
+
+
+def pytest_configure(config):
+    """
+    Gives this test process (the controller, or each xdist worker) a private DATA_ROOT
+    before any src module is imported. src.config resolves every relative data and
+    log path under it at import, so import-time constants, default arguments bound
+    to them and import-time mkdir calls all stay inside the process's own tree, and
+    parallel workers never share files.
+    """
+    worker = os.environ.get("PYTEST_XDIST_WORKER", "main")
+    root = Path(tempfile.mkdtemp(prefix=f"skylytics-tests-{worker}-"))
+    os.environ["DATA_ROOT"] = str(root)
+    config.stash[DATA_ROOT_KEY] = root
+
+
+def pytest_unconfigure(config):
+    root = config.stash.get(DATA_ROOT_KEY, None)
+    if root is not None:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def data_root(pytestconfig) -> Path:
+    return pytestconfig.stash[DATA_ROOT_KEY]
+
+
+@pytest.fixture
+def data_dirs(tmp_path, monkeypatch) -> SimpleNamespace:
+    """
+    Fresh data tree for one test: every path constant of src.config is re-pointed
+    under tmp_path, in src.config and in each imported src module that bound it via
+    `from src.config import ...`. Returns the new paths by constant name.
+    """
+    from src import config
+
+    root = Path(config.DATA_ROOT)
+    paths = {}
+    for name, value in vars(config).items():
+        if name.isupper() and isinstance(value, Path) and value.is_relative_to(root):
+            paths[name] = tmp_path / value.relative_to(root)
+
+    originals = {name: getattr(config, name) for name in paths}
+    modules = [m for n, m in list(sys.modules.items()) if n == "src" or n.startswith("src.")]
+    for module in modules:
+        for name, path in paths.items():
+            if getattr(module, name, None) == originals[name]:
+                monkeypatch.setattr(module, name, path)
+    for name in ("RAW_DATA_DIR", "STAGING_DATA_DIR", "LOG_DIR"):
+        paths[name].mkdir(parents=True, exist_ok=True)
+    return SimpleNamespace(**paths)
+
+
+@pytest.fixture
+def location() -> dict:
+    return dict(HEIDELBERG)
+
+
+@pytest.fixture
+def locations() -> list[dict]:
+    return [dict(HEIDELBERG), dict(BERLIN)]
+
+
+@pytest.fixture
+def raw_payload():
+    """
+    Factory for in-memory Open-Meteo archive payloads: `raw_payload(days=3)` gives a
+    `daily` block with every source variable, deterministic smooth values, and
+    `overrides` replacing whole variable lists.
+    """
+    from src.weather_schema import SOURCE_COLUMNS
+
+    def make(days: int = 3, start: str = PAYLOAD_START, **overrides) -> dict:
+        dates = pd.date_range(start, periods=days)
+        daily = {"time": [d.strftime("%Y-%m-%d") for d in dates]}
+        for i, spec in enumerate(SOURCE_COLUMNS):
+            daily[spec.source] = [round(1.0 + i + 0.5 * (day % 7), 1) for day in range(days)]
+        daily.update(overrides)
+        return {
+            "latitude": HEIDELBERG["latitude"],
+            "longitude": HEIDELBERG["longitude"],
+            "daily": daily,
+        }
+
+    return make
+
+
+@pytest.fixture
+def cleaned_frame():
+    """
+    Factory for cleaned daily frames as the stages after data_cleaner see them:
+    `cleaned_frame(start, periods=5, Temp_Max_C=5.0)` gives one location's days from
+    `start` (for `periods` days or through `end`), each keyword a column's value or
+    values, and the City and PostalCode of `postal`.
+    """
+    cities = {loc["postal"]: loc["city"] for loc in (HEIDELBERG, BERLIN)}
+
+    def make(
+        start: str = PAYLOAD_START,
+        periods: int | None = None,
+        end: str | None = None,
+        postal: str = HEIDELBERG["postal"],
+        **columns,
+    ) -> pd.DataFrame:
+        df = pd.DataFrame({"Date": pd.date_range(start, end, periods=periods)})
+        df = df.assign(**columns)
+        return df.assign(City=cities.get(postal, f"City {postal}"), PostalCode=postal)
+
+    return make
+
+
+@pytest.fixture
+def json_response():
+    """
+    Factory for stand-ins of requests.Response: `json_response(data)` returns `data`
+    from .json(); a status of 400 or more makes raise_for_status raise HTTPError
+    carrying the response.
+    """
+
+    def make(data=None, status: int = 200, text: str = "") -> Mock:
+        response = Mock(status_code=status, text=text)
+        response.json.return_value = data
+        response.content = b""
+        if status >= 400:
+            response.raise_for_status.side_effect = requests.HTTPError(
+                f"{status} Error", response=response
+            )
+        else:
+            response.raise_for_status.return_value = None
+        return response
+
+    return make
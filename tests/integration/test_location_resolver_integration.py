@@ -1,8 +1,11 @@
 import json
 
+import pytest
+
 from src import config, location_resolver
 
 
+@pytest.mark.network
 def test_resolve_location_real(tmp_path, monkeypatch):
     """
     Full integration test:
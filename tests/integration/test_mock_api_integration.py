@@ -0,0 +1,41 @@
+import pytest
+
+from src import location_resolver, weather_data_fetcher
+from tests.load.harness import pointed_at, run_load
+from tests.load.mock_api_server import MockOptions, running_mock_server
+
+
+def test_fetchers_against_mock_server():
+    """
+    Offline integration test:
+    - Real HTTP calls to the local mock APIs
+    - Weather payload covers the requested range with every daily variable
+    - IP lookup returns a complete location
+    """
+    with running_mock_server() as server, pointed_at(server.base_url):
+        data = weather_data_fetcher.get_weather_data(52.52, 13.405, "2024-01-01", "2024-01-31")
+        location = location_resolver.fetch_location_from_ip()
+
+    assert len(data["daily"]["time"]) == 31
+    assert len(data["daily"]["temperature_2m_mean"]) == 31
+    assert None not in data["daily"]["sunshine_duration"]
+    assert {"city", "postal", "latitude", "longitude"} <= set(location)
+
+
+def test_mock_payload_is_deterministic():
+    with running_mock_server() as server, pointed_at(server.base_url):
+        first = weather_data_fetcher.get_weather_data(49.4, 8.69, "2023-06-01", "2023-06-10")
+        second = weather_data_fetcher.get_weather_data(49.4, 8.69, "2023-06-01", "2023-06-10")
+    assert first == second
+
+
+@pytest.mark.slow
+def test_harness_retries_through_injected_failures():
+    options = MockOptions(error_rate=0.1, seed=7)
+    with running_mock_server(options) as server:
+        report = run_load(server.base_url, "weather", requests=40, concurrency=8, days=30)
+
+    assert report.requests == 40
+    assert report.succeeded == 40
+    assert server.stats["errors"] > 0
+    assert report.p50_ms <= report.p95_ms <= report.max_ms
@@ -1,8 +1,11 @@
 import json
 
-from src import config, weather_data_fetcher
+import pytest
 
+from src import config, data_cleaner, weather_data_fetcher
 
+
+@pytest.mark.network
 def test_weather_fetch_real(tmp_path, monkeypatch):
     """
     Full integration test:
@@ -31,7 +34,6 @@ def test_weather_fetch_real(tmp_path, monkeypatch):
     files = list(raw_data_dir.glob("*.json"))
     assert len(files) == 1
 
-    with open(files[0], "r", encoding="utf-8") as f:
-        data = json.load(f)
-        assert "daily" in data
-        assert "time" in data["daily"]
+    data = data_cleaner.load_raw_weather(files[0])
+    assert "daily" in data
+    assert "time" in data["daily"]
@@ -0,0 +1,175 @@
+"""
+Drives the real fetch code against the local mock APIs at high concurrency and reports
+throughput and latency percentiles.
+
+    python -m tests.load.harness --target weather --requests 2000 --concurrency 64 \
+        --latency-ms 40 --jitter-ms 20 --error-rate 0.01
+"""
+
+import argparse
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import date, timedelta
+from typing import Callable, Iterator, Optional
+
+import numpy as np
+
+from src import location_resolver, weather_data_fetcher, weather_providers
+from tests.load.mock_api_server import (
+    ARCHIVE_PATH,
+    IP_PATH,
+    MockOptions,
+    add_mock_arguments,
+    options_from_args,
+    running_mock_server,
+)
+
+
+@dataclass
+class LoadReport:
+    target: str
+    requests: int
+    concurrency: int
+    succeeded: int
+    failed: int
+    elapsed_s: float
+    throughput_rps: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+
+    def format(self) -> str:
+        return (
+            f"{self.target}: {self.requests} requests @ concurrency {self.concurrency} → "
+            f"{self.succeeded} ok, {self.failed} failed in {self.elapsed_s:.2f}s "
+            f"({self.throughput_rps:.1f} req/s) | latency ms p50 {self.p50_ms:.1f}, "
+            f"p95 {self.p95_ms:.1f}, p99 {self.p99_ms:.1f}, max {self.max_ms:.1f}"
+        )
+
+
+@contextmanager
+def pointed_at(base_url: str) -> Iterator[None]:
+    """
+    Temporarily points the fetch modules at `base_url` instead of the public APIs.
+    """
+    original = (weather_providers.OPEN_METEO_ARCHIVE_URL, location_resolver.IPINFO_URL)
+    weather_providers.OPEN_METEO_ARCHIVE_URL = f"{base_url}{ARCHIVE_PATH}"
+    location_resolver.IPINFO_URL = f"{base_url}{IP_PATH}"
+    try:
+        yield
+    finally:
+        weather_providers.OPEN_METEO_ARCHIVE_URL, location_resolver.IPINFO_URL = original
+
+
+@contextmanager
+def quiet_loggers(enabled: bool = True) -> Iterator[None]:
+    loggers = [
+        logging.getLogger(m.__name__)
+        for m in (weather_providers, weather_data_fetcher, location_resolver)
+    ]
+    levels = [lg.level for lg in loggers]
+    if enabled:
+        for lg in loggers:
+            lg.setLevel(logging.CRITICAL)
+    try:
+        yield
+    finally:
+        for lg, level in zip(loggers, levels):
+            lg.setLevel(level)
+
+
+def make_call(target: str, days: int) -> Callable[[int], bool]:
+    end = date(2024, 12, 31)
+    start = (end - timedelta(days=days - 1)).isoformat()
+
+    if target == "weather":
+
+        def call(i: int) -> bool:
+            lat, lon = 47.5 + (i % 50) * 0.1, 6.0 + (i // 50 % 80) * 0.1
+            return (
+                weather_data_fetcher.get_weather_data(lat, lon, start, end.isoformat()) is not None
+            )
+
+    elif target == "ip":
+
+        def call(i: int) -> bool:
+            return location_resolver.fetch_location_from_ip() is not None
+
+    else:
+        raise ValueError(f"Unknown target '{target}'")
+    return call
+
+
+def run_load(
+    base_url: str,
+    target: str = "weather",
+    requests: int = 200,
+    concurrency: int = 16,
+    days: int = 365,
+) -> LoadReport:
+    call = make_call(target, days)
+    latencies = np.zeros(requests)
+    outcomes = np.zeros(requests, dtype=bool)
+
+    def timed(i: int) -> None:
+        t0 = time.perf_counter()
+        outcomes[i] = call(i)
+        latencies[i] = (time.perf_counter() - t0) * 1000
+
+    with pointed_at(base_url):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(timed, range(requests)))
+        elapsed = time.perf_counter() - started
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if requests else (0.0, 0.0, 0.0)
+    return LoadReport(
+        target=target,
+        requests=requests,
+        concurrency=concurrency,
+        succeeded=int(outcomes.sum()),
+        failed=int(requests - outcomes.sum()),
+        elapsed_s=elapsed,
+        throughput_rps=requests / elapsed if elapsed else 0.0,
+        p50_ms=float(p50),
+        p95_ms=float(p95),
+        p99_ms=float(p99),
+        max_ms=float(latencies.max()) if requests else 0.0,
+    )
+
+
+def main(argv: Optional[list[str]] = None) -> LoadReport:
+    parser = argparse.ArgumentParser(description="Load-test the fetch layer against mock APIs")
+    parser.add_argument("--target", choices=["weather", "ip"], default="weather")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--url", help="Use an already running mock server instead of starting one")
+    parser.add_argument("--verbose", action="store_true", help="Keep fetch-layer logging on")
+    add_mock_arguments(parser)
+    args = parser.parse_args(argv)
+
+    with quiet_loggers(not args.verbose):
+        if args.url:
+            report = run_load(args.url, args.target, args.requests, args.concurrency, args.days)
+        else:
+            with running_mock_server(options_from_args(args)) as server:
+                report = run_load(
+                    server.base_url, args.target, args.requests, args.concurrency, args.days
+                )
+                print(f"Server stats: {server.stats}")
+
+    print(report.format())
+    print(asdict(report))
+    return report
+
+
+__all__ = ["LoadReport", "MockOptions", "main", "pointed_at", "run_load"]
+
+
+if __name__ == "__main__":
+    main()
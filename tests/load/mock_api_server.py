@@ -0,0 +1,284 @@
+"""
+Local stand-in for the Open-Meteo archive and ipinfo APIs.
+
+Responses are deterministic functions of the request parameters, so repeated load
+tests see identical payloads. Latency, error rate, throttling and payload size are
+configurable per server instance.
+
+    python -m tests.load.mock_api_server --port 8765 --latency-ms 50 --error-rate 0.01
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterator, Optional
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+ARCHIVE_PATH = "/v1/archive"
+IP_PATH = "/json"
+
+MOCK_CITIES = [
+    ("Heidelberg", "69115", 49.4093, 8.6942),
+    ("Berlin", "10115", 52.5321, 13.3849),
+    ("Hamburg", "20095", 53.5511, 9.9937),
+    ("München", "80331", 48.1374, 11.5755),
+    ("Köln", "50667", 50.9384, 6.9599),
+]
+
+
+@dataclass
+class MockOptions:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    # Requests per second before answering 429; 0 disables throttling
+    rate_limit: float = 0.0
+    max_days: int = 36600
+    # Extra bytes appended to every archive payload to simulate larger responses
+    padding_bytes: int = 0
+    seed: int = 42
+
+
+def _noise(ordinals: np.ndarray, lat: float, lon: float, salt: float) -> np.ndarray:
+    # Cheap hash noise in [0, 1): identical for the same day and location on every request
+    x = np.sin(ordinals * 12.9898 + lat * 78.233 + lon * 37.719 + salt) * 43758.5453
+    return x - np.floor(x)
+
+
+def build_archive_payload(
+    lat: float, lon: float, start: date, end: date, variables: list[str], padding_bytes: int = 0
+) -> dict[str, Any]:
+    ordinals = np.arange(start.toordinal(), end.toordinal() + 1)
+    days = [(start + timedelta(days=int(i))).isoformat() for i in range(len(ordinals))]
+    doy = np.array([date.fromordinal(int(o)).timetuple().tm_yday for o in ordinals])
+
+    seasonal = 10 - 9 * np.cos(2 * np.pi * (doy - 15) / 365.25) - (lat - 50) * 0.6
+    mean = seasonal + 4 * (_noise(ordinals, lat, lon, 1.0) - 0.5)
+    spread = 4 + 6 * _noise(ordinals, lat, lon, 2.0)
+    rain = np.where(_noise(ordinals, lat, lon, 3.0) > 0.6, 12 * _noise(ordinals, lat, lon, 4.0), 0)
+    snow = np.where(mean < 0, rain * 0.7, 0.0)
+    sunshine = 3600 * (2 + 10 * _noise(ordinals, lat, lon, 5.0))
+
+    series = {
+        "temperature_2m_max": mean + spread / 2,
+        "temperature_2m_min": mean - spread / 2,
+        "temperature_2m_mean": mean,
+        "precipitation_sum": rain + snow,
+        "rain_sum": rain,
+        "snowfall_sum": snow,
+        "windspeed_10m_max": 8 + 30 * _noise(ordinals, lat, lon, 6.0),
+        "shortwave_radiation_sum": 2 + 20 * _noise(ordinals, lat, lon, 7.0),
+        "sunshine_duration": sunshine,
+    }
+
+    daily: dict[str, Any] = {"time": days}
+    for name in variables:
+        values = series.get(name)
+        daily[name] = np.round(values, 1).tolist() if values is not None else [None] * len(days)
+
+    payload: dict[str, Any] = {
+        "latitude": lat,
+        "longitude": lon,
+        "generationtime_ms": 0.1,
+        "timezone": "Europe/Berlin",
+        "daily_units": {"time": "iso8601"},
+        "daily": daily,
+    }
+    if padding_bytes:
+        payload["padding"] = "x" * padding_bytes
+    return payload
+
+
+def build_ip_payload(ip: Optional[str]) -> dict[str, Any]:
+    key = ip or "127.0.0.1"
+    city, postal, lat, lon = MOCK_CITIES[zlib.crc32(key.encode()) % len(MOCK_CITIES)]
+    return {
+        "ip": key,
+        "city": city,
+        "region": "Mock",
+        "country": "DE",
+        "loc": f"{lat:.4f},{lon:.4f}",
+        "postal": postal,
+        "timezone": "Europe/Berlin",
+    }
+
+
+class TokenBucket:
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class MockAPIServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, address: tuple[str, int], options: MockOptions):
+        super().__init__(address, MockAPIHandler)
+        self.options = options
+        self.bucket = TokenBucket(options.rate_limit) if options.rate_limit > 0 else None
+        self.rng = random.Random(options.seed)
+        self.rng_lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0, "throttled": 0}
+        self.stats_lock = threading.Lock()
+
+    def count(self, key: str) -> None:
+        with self.stats_lock:
+            self.stats[key] += 1
+
+    def draw(self) -> tuple[float, float]:
+        with self.rng_lock:
+            return self.rng.random(), self.rng.gauss(0, 1)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class MockAPIHandler(BaseHTTPRequestHandler):
+    server: MockAPIServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send_json(self, status: int, body: dict[str, Any], headers: Optional[dict] = None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        options = self.server.options
+        self.server.count("requests")
+
+        if self.server.bucket and not self.server.bucket.allow():
+            self.server.count("throttled")
+            self._send_json(
+                429, {"error": True, "reason": "Too many requests"}, {"Retry-After": "0"}
+            )
+            return
+
+        roll, gauss = self.server.draw()
+        delay = max(options.latency_ms + gauss * options.jitter_ms, 0) / 1000
+        if delay:
+            time.sleep(delay)
+
+        if roll < options.error_rate:
+            self.server.count("errors")
+            self._send_json(503, {"error": True, "reason": "Injected failure"})
+            return
+
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if url.path == ARCHIVE_PATH:
+            self._archive(query)
+        elif url.path == IP_PATH or url.path.endswith(IP_PATH):
+            ip = url.path[: -len(IP_PATH)].strip("/") or self.client_address[0]
+            self._send_json(200, build_ip_payload(ip))
+        else:
+            self._send_json(404, {"error": True, "reason": f"Unknown path {url.path}"})
+
+    def _archive(self, query: dict[str, str]) -> None:
+        try:
+            lat, lon = float(query["latitude"]), float(query["longitude"])
+            start = date.fromisoformat(query["start_date"])
+            end = date.fromisoformat(query["end_date"])
+            variables = [v for v in query.get("daily", "").split(",") if v]
+        except (KeyError, ValueError) as e:
+            self._send_json(400, {"error": True, "reason": f"Invalid parameters: {e}"})
+            return
+
+        if end < start or (end - start).days + 1 > self.server.options.max_days:
+            self._send_json(400, {"error": True, "reason": "Invalid date range"})
+            return
+
+        payload = build_archive_payload(
+            lat, lon, start, end, variables, self.server.options.padding_bytes
+        )
+        etag = hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()[:16]
+        self._send_json(200, payload, {"ETag": f'"{etag}"'})
+
+
+@contextmanager
+def running_mock_server(
+    options: Optional[MockOptions] = None, host: str = "127.0.0.1", port: int = 0
+) -> Iterator[MockAPIServer]:
+    """
+    Serves the mock APIs from a background thread for the duration of the block.
+    Port 0 picks a free port; read it back from `server.base_url`.
+    """
+    server = MockAPIServer((host, port), options or MockOptions())
+    thread = threading.Thread(target=server.serve_forever, args=(0.1,), daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+def add_mock_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = MockOptions()
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms)
+    parser.add_argument("--jitter-ms", type=float, default=defaults.jitter_ms)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--rate-limit", type=float, default=defaults.rate_limit)
+    parser.add_argument("--max-days", type=int, default=defaults.max_days)
+    parser.add_argument("--padding-bytes", type=int, default=defaults.padding_bytes)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+
+
+def options_from_args(args: argparse.Namespace) -> MockOptions:
+    return MockOptions(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        max_days=args.max_days,
+        padding_bytes=args.padding_bytes,
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock Open-Meteo archive and ipinfo APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_mock_arguments(parser)
+    cli_args = parser.parse_args()
+
+    mock = MockAPIServer((cli_args.host, cli_args.port), options_from_args(cli_args))
+    print(f"Mock APIs on {mock.base_url}{ARCHIVE_PATH} and {mock.base_url}{IP_PATH}")
+    try:
+        mock.serve_forever()
+    except KeyboardInterrupt:
+        mock.server_close()
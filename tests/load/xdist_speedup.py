@@ -0,0 +1,64 @@
+"""
+Measures how the test suite's wall time scales with pytest-xdist workers, against a
+serial in-process run, and reports the speedup of each worker count.
+
+    python -m tests.load.xdist_speedup --workers 0 2 4 auto --repeat 3
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+
+
+@dataclass
+class SpeedupReport:
+    workers: str
+    best_s: float
+    speedup: float
+
+    def format(self) -> str:
+        label = "serial" if self.workers == "0" else f"-n {self.workers}"
+        return f"{label:>10}: best {self.best_s:.2f}s, speedup ×{self.speedup:.2f}"
+
+
+def time_suite(workers: str, marker: str, pytest_args: list[str]) -> float:
+    command = [sys.executable, "-m", "pytest", "-q", "-p", "no:cacheprovider", "-n", workers]
+    command += ["-m", marker, *pytest_args]
+    start = time.perf_counter()
+    result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise SystemExit(f"pytest -n {workers} failed with exit code {result.returncode}")
+    return elapsed
+
+
+def measure(
+    workers: list[str], repeat: int, marker: str, pytest_args: list[str]
+) -> list[SpeedupReport]:
+    """
+    Best-of-`repeat` wall time per worker count; speedups are relative to `-n 0`.
+    """
+    best = {
+        n: min(time_suite(n, marker, pytest_args) for _ in range(repeat))
+        for n in dict.fromkeys(["0", *workers])
+    }
+    return [SpeedupReport(n, t, best["0"] / t) for n, t in best.items()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", nargs="+", default=["2", "4", "auto"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("-m", dest="marker", default="not network")
+    args, pytest_args = parser.parse_known_args()
+
+    print(f"CPUs: {os.cpu_count()}")
+    for report in measure(args.workers, args.repeat, args.marker, pytest_args):
+        print(report.format())
+
+
+if __name__ == "__main__":
+    main()
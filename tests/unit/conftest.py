@@ -0,0 +1,28 @@
+import ipaddress
+import socket
+
+import pytest
+
+_getaddrinfo = socket.getaddrinfo
+
+
+@pytest.fixture(autouse=True)
+def no_network(monkeypatch):
+    """
+    Fails a unit test as soon as it resolves a non-local host, instead of letting it
+    wait on DNS and HTTP retry backoff. Loopback stays usable for local test servers.
+    """
+
+    def guarded(host, *args, **kwargs):
+        if host not in ("localhost", None) and not _is_loopback(host):
+            raise RuntimeError(f"Unit tests must not reach the network ({host}); mock the call")
+        return _getaddrinfo(host, *args, **kwargs)
+
+    monkeypatch.setattr(socket, "getaddrinfo", guarded)
+
+
+def _is_loopback(host) -> bool:
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
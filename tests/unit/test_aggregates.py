@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import aggregates as agg
+from src.history_store import ingest_frame
+
+
+@pytest.fixture
+def make_frame(cleaned_frame):
+    def make(start="2023-11-29", periods=5, temp=10.0, **kwargs):
+        return cleaned_frame(start, periods, Temp_Mean_C=temp, Precipitation_mm=1.0, **kwargs)
+
+    return make
+
+
+class TestCalendarKeys:
+    def test_december_belongs_to_next_winter(self, make_frame):
+        df = agg.add_calendar_keys(make_frame(start="2023-12-31", periods=2))
+        assert df["Season"].tolist() == ["DJF", "DJF"]
+        assert df["SeasonYear"].tolist() == [2024, 2024]
+
+    def test_day_of_year_is_stable_across_leap_years(self):
+        df = agg.add_calendar_keys(
+            pd.DataFrame({"Date": pd.to_datetime(["2023-03-01", "2024-03-01", "2024-02-29"])})
+        )
+        assert df["DayOfYear"].tolist() == [61, 61, 60]
+
+
+class TestDegreeDays:
+    def test_heating_and_cooling(self):
+        df = agg.add_degree_days(pd.DataFrame({"Temp_Mean_C": [10.0, 18.0, 25.04]}))
+        assert df["HDD"].tolist() == [8.0, 0.0, 0.0]
+        assert df["CDD"].tolist() == [0.0, 0.0, 7.0]
+
+    def test_cleaned_columns_are_kept(self):
+        df = agg.add_degree_days(pd.DataFrame({"Temp_Mean_C": [10.0], "HDD": [7.5]}))
+        assert df["HDD"].tolist() == [7.5]
+        assert df["CDD"].tolist() == [0.0]
+
+
+class TestIncrementalUpdates:
+    def test_incremental_equals_full_recompute(self, tmp_path, make_frame):
+        full = make_frame(periods=60)
+        full["Temp_Mean_C"] = np.arange(60, dtype=float)
+
+        agg.update_aggregates(full.iloc[:25], tmp_path / "inc")
+        agg.update_aggregates(full.iloc[20:], tmp_path / "inc")
+        agg.update_aggregates(full, tmp_path / "full")
+
+        for kind in agg.ROLLUP_KEYS:
+            pd.testing.assert_frame_equal(
+                agg.load_rollup("69115", kind, tmp_path / "inc"),
+                agg.load_rollup("69115", kind, tmp_path / "full"),
+            )
+
+    def test_interrupted_update_does_not_double_count(self, tmp_path, monkeypatch, make_frame):
+        full = make_frame(periods=60)
+        agg.update_aggregates(full.iloc[:30], tmp_path / "inc")
+
+        write_rollup = agg.write_rollup
+
+        def crash_after_monthly(rollup, path, watermark):
+            if path.stem != "monthly":
+                raise OSError("disk full")
+            write_rollup(rollup, path, watermark)
+
+        monkeypatch.setattr(agg, "write_rollup", crash_after_monthly)
+        with pytest.raises(OSError):
+            agg.update_aggregates(full.iloc[30:], tmp_path / "inc")
+        monkeypatch.setattr(agg, "write_rollup", write_rollup)
+
+        assert agg.update_aggregates(full.iloc[30:], tmp_path / "inc") == 30
+        agg.update_aggregates(full, tmp_path / "full")
+        for kind in agg.ROLLUP_KEYS:
+            pd.testing.assert_frame_equal(
+                agg.load_rollup("69115", kind, tmp_path / "inc"),
+                agg.load_rollup("69115", kind, tmp_path / "full"),
+            )
+
+    def test_already_folded_days_are_skipped(self, tmp_path, make_frame):
+        df = make_frame(periods=3)
+        assert agg.update_aggregates(df, tmp_path) == 3
+        assert agg.update_aggregates(df, tmp_path) == 0
+
+    @pytest.mark.parametrize("ingested_first", [False, True])
+    def test_revised_day_is_recomputed_from_history(self, tmp_path, ingested_first, make_frame):
+        history = tmp_path / "history"
+        df = make_frame(start="2023-11-01", periods=45, temp=10.0)
+        ingest_frame(df, history)
+        agg.update_aggregates(df, tmp_path / "agg", history)
+
+        expected = df.copy()
+        expected.loc[expected["Date"] == "2023-11-30", "Temp_Mean_C"] = 40.0
+        revised = expected.iloc[-20:]
+        if ingested_first:
+            ingest_frame(revised, history)
+        assert agg.update_aggregates(revised, tmp_path / "agg", history) == 0
+
+        agg.update_aggregates(expected, tmp_path / "full")
+        for kind in agg.ROLLUP_KEYS:
+            pd.testing.assert_frame_equal(
+                agg.load_rollup("69115", kind, tmp_path / "agg"),
+                agg.load_rollup("69115", kind, tmp_path / "full"),
+            )
+        monthly = agg.load_rollup("69115", "monthly", tmp_path / "agg")
+        assert monthly["Temp_Mean_C_mean"].tolist() == [11.0, 10.0]
+        assert monthly["Temp_Mean_C_max"].tolist() == [40.0, 10.0]
+
+    def test_monthly_rollup_values(self, tmp_path, make_frame):
+        agg.update_aggregates(make_frame(periods=5, temp=8.0), tmp_path)
+        monthly = agg.load_rollup("69115", "monthly", tmp_path)
+
+        assert monthly[["Year", "Month", "Days"]].values.tolist() == [[2023, 11, 2], [2023, 12, 3]]
+        assert monthly["Temp_Mean_C_mean"].tolist() == [8.0, 8.0]
+        assert monthly["Precipitation_mm_sum"].tolist() == [2.0, 3.0]
+        assert monthly["HDD_sum"].tolist() == [20.0, 30.0]
+
+    def test_locations_are_independent(self, tmp_path, make_frame):
+        df = pd.concat([make_frame(postal="69115"), make_frame(postal="10115", temp=20.0)])
+        agg.update_aggregates(df, tmp_path)
+        seasonal = agg.load_rollup("10115", "seasonal", tmp_path)
+        assert seasonal["CDD_sum"].sum() == pytest.approx(10.0)
+
+
+class TestLoadRollup:
+    def test_unknown_kind(self, tmp_path):
+        with pytest.raises(ValueError):
+            agg.load_rollup("69115", "weekly", tmp_path)
+
+    def test_missing_location(self, tmp_path, caplog):
+        assert agg.load_rollup("00000", "monthly", tmp_path).empty
+        assert "[READ] No monthly rollup for postal 00000" in caplog.text
@@ -0,0 +1,178 @@
+from dataclasses import replace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import anomaly_detector as ad
+from src.history_store import HistoryStore, frame_to_table, ingest_frame, partition_path
+from src.settings import AnomalySettings
+
+VARIABLES = ["Temp_Mean_C", "Precipitation_mm"]
+
+
+@pytest.fixture
+def make_frame(cleaned_frame):
+    def make(start="2015-01-01", end="2020-12-31", seed=0, **kwargs):
+        rng = np.random.default_rng(seed)
+        dates = pd.date_range(start, end)
+        seasonal = 10 + 10 * np.sin(2 * np.pi * (dates.dayofyear.to_numpy() - 100) / 365)
+        return cleaned_frame(
+            start,
+            end=end,
+            Temp_Mean_C=seasonal + rng.normal(0, 2, len(dates)),
+            Precipitation_mm=rng.gamma(2.0, 2.0, len(dates)),
+            **kwargs,
+        )
+
+    return make
+
+
+@pytest.fixture
+def params():
+    return AnomalySettings(columns=tuple(VARIABLES), window_days=7, min_samples=30)
+
+
+def test_day_of_year_is_stable_across_leap_years():
+    dates = pd.Series(pd.to_datetime(["2023-03-01", "2024-03-01", "2024-02-29", "2023-12-31"]))
+    assert ad.day_of_year_index(dates).tolist() == [60, 60, 59, 365]
+
+
+class TestClimatology:
+    def test_streamed_state_equals_batch_statistics(self, tmp_path, params, make_frame):
+        df = make_frame()
+        for _, chunk in df.groupby(df["Date"].dt.year):
+            ad.annotate_anomalies(chunk, tmp_path, params)
+
+        state = ad.load_state("69115", VARIABLES, tmp_path)
+        grouped = df.assign(slot=ad.day_of_year_index(df["Date"])).groupby("slot")[VARIABLES]
+        slots = grouped.mean().index.to_numpy()
+        np.testing.assert_allclose(state.count[slots], grouped.count().to_numpy())
+        np.testing.assert_allclose(state.mean[slots], grouped.mean().to_numpy())
+        np.testing.assert_allclose(
+            state.m2[slots], (grouped.var(ddof=0) * grouped.count()).to_numpy(), atol=1e-8
+        )
+        assert state.watermark == pd.Timestamp("2020-12-31")
+
+    def test_pooled_window_wraps_around_the_year(self):
+        count = np.zeros((ad.DAYS_OF_YEAR, 1))
+        mean = np.zeros((ad.DAYS_OF_YEAR, 1))
+        count[0], mean[0] = 4, 2.0
+        count[-1], mean[-1] = 4, 4.0
+
+        n, mu, spread = ad.pooled_climatology(count, mean, np.zeros_like(count), window=1)
+        assert n[0, 0] == n[-1, 0] == 8
+        assert mu[0, 0] == mu[-1, 0] == 3.0
+        assert spread[0, 0] == 8.0
+        assert n[1, 0] == 4 and n[2, 0] == 0
+
+
+class TestAnnotate:
+    def test_flags_outlier_day(self, tmp_path, params, make_frame):
+        history, new = make_frame(end="2019-12-31"), make_frame(start="2020-01-01")
+        new.loc[new["Date"] == "2020-07-15", "Temp_Mean_C"] += 25
+        ad.annotate_anomalies(history, tmp_path, params)
+
+        out = ad.annotate_anomalies(new, tmp_path, params)
+        assert list(out.columns[-4:]) == [
+            "Temp_Mean_C_Z",
+            "Precipitation_mm_Z",
+            "Anomaly_Flag",
+            "Shift_Flag",
+        ]
+        day = out.set_index("Date").loc["2020-07-15"]
+        assert day["Temp_Mean_C_Z"] > 8
+        assert day["Anomaly_Flag"] == 1.0
+        assert out["Anomaly_Flag"].mean() < 0.05
+
+    def test_unscored_until_enough_samples(self, tmp_path, params, make_frame):
+        out = ad.annotate_anomalies(make_frame(end="2015-12-31"), tmp_path, params)
+        assert out["Temp_Mean_C_Z"].isna().all()
+        assert (out["Anomaly_Flag"] == 0).all()
+
+    def test_station_shift_is_flagged(self, tmp_path, params, make_frame):
+        df = make_frame(end="2021-12-31")
+        df.loc[df["Date"] >= "2021-06-01", "Temp_Mean_C"] += 6
+        ad.annotate_anomalies(df[df["Date"] < "2021-01-01"], tmp_path, params)
+
+        out = ad.annotate_anomalies(df[df["Date"] >= "2021-01-01"], tmp_path, params)
+        shifted = out.loc[out["Shift_Flag"] == 1, "Date"]
+        assert not shifted.empty
+        assert shifted.min() >= pd.Timestamp("2021-06-01")
+
+    def test_batch_boundaries_do_not_change_results(self, tmp_path, params, make_frame):
+        # Without pooling the two halves of a year touch disjoint climatology slots, so
+        # splitting the batch may only matter through the carried EWMA state
+        params = replace(params, window_days=0)
+        df = make_frame(end="2021-12-31")
+        history, recent = df[df["Date"] < "2021-01-01"], df[df["Date"] >= "2021-01-01"]
+        for root in ("whole", "split"):
+            ad.annotate_anomalies(history, tmp_path / root, params)
+        whole = ad.annotate_anomalies(recent, tmp_path / "whole", params)
+
+        first = recent["Date"] < "2021-07-01"
+        split = pd.concat(
+            [
+                ad.annotate_anomalies(recent[first], tmp_path / "split", params),
+                ad.annotate_anomalies(recent[~first], tmp_path / "split", params),
+            ],
+            ignore_index=True,
+        )
+
+        pd.testing.assert_frame_equal(split, whole)
+        kept = ad.load_state("69115", VARIABLES, tmp_path / "split")
+        reference = ad.load_state("69115", VARIABLES, tmp_path / "whole")
+        np.testing.assert_allclose(kept.fast, reference.fast)
+        np.testing.assert_allclose(kept.slow, reference.slow)
+        np.testing.assert_allclose(kept.mean, reference.mean)
+
+    def test_republished_days_are_not_folded_twice(self, tmp_path, params, make_frame):
+        df = make_frame(end="2016-12-31")
+        ad.annotate_anomalies(df, tmp_path, params)
+        before = ad.load_state("69115", VARIABLES, tmp_path)
+
+        out = ad.annotate_anomalies(df.tail(30), tmp_path, params)
+        after = ad.load_state("69115", VARIABLES, tmp_path)
+        np.testing.assert_array_equal(before.count, after.count)
+        assert out["Shift_Flag"].isna().all()
+
+    def test_flags_survive_overlapping_rolling_windows(self, tmp_path, params, make_frame):
+        df = make_frame(end="2021-12-31")
+        df.loc[df["Date"] >= "2021-07-01", "Temp_Mean_C"] += 6
+        state, history = tmp_path / "state", tmp_path / "history"
+        ingest_frame(ad.annotate_anomalies(df[df["Date"] <= "2021-06-10"], state, params), history)
+
+        # Nightly runs re-fetch the last 90 days, moving forward by one day each time
+        first = df[(df["Date"] > "2021-06-10") & (df["Date"] <= "2021-09-08")]
+        second = df[(df["Date"] > "2021-06-11") & (df["Date"] <= "2021-09-09")]
+        published = ad.annotate_anomalies(first, state, params, history)
+        ingest_frame(published, history)
+        republished = ad.annotate_anomalies(second, state, params, history)
+        ingest_frame(republished, history)
+
+        stored = HistoryStore(history).read_frame("69115", "2021-06-12", "2021-09-08")
+        expected = published[published["Date"] >= "2021-06-12"].reset_index(drop=True)
+        columns = ["Temp_Mean_C_Z", "Anomaly_Flag", "Shift_Flag"]
+        pd.testing.assert_frame_equal(stored[columns], expected[columns])
+        assert (stored["Shift_Flag"] == 1).any()
+        assert republished["Shift_Flag"].notna().all()
+
+    def test_stale_history_partition_is_not_restored(self, tmp_path, params, make_frame):
+        df = make_frame(end="2016-12-31")
+        state, history = tmp_path / "state", tmp_path / "history"
+        published = ad.annotate_anomalies(df, state, params)
+        # Written before partitions were versioned: HistoryStore.read refuses it
+        history.mkdir()
+        frame_to_table(published).to_pandas().to_feather(partition_path("69115", history))
+
+        out = ad.annotate_anomalies(df.tail(30), state, params, history)
+        assert out["Shift_Flag"].isna().all()
+
+    def test_locations_are_independent(self, tmp_path, params, make_frame):
+        a, b = make_frame(postal="69115"), make_frame(postal="10115", seed=1)
+        together = ad.annotate_anomalies(pd.concat([a, b]), tmp_path / "together", params)
+        alone = ad.annotate_anomalies(b, tmp_path / "alone", params)
+
+        pd.testing.assert_frame_equal(
+            together[together["PostalCode"] == "10115"].reset_index(drop=True), alone
+        )
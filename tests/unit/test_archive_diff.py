@@ -0,0 +1,107 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import archive_diff as ad
+
+
+def payload(temps, rain, start="2024-01-01"):
+    days = pd.date_range(start, periods=len(temps)).strftime("%Y-%m-%d").tolist()
+    return {"daily": {"time": days, "temperature_2m_mean": temps, "rain_sum": rain}}
+
+
+def write_raw(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_text(json.dumps(data))
+    return path
+
+
+class TestDiffFrames:
+    def test_only_changed_cells_are_emitted(self):
+        old = ad.payload_frame(payload([1.0, 2.0, 3.0], [0.0, None, 1.0]))
+        new = ad.payload_frame(payload([1.0, 2.5, 3.0], [0.0, None, 1.2]))
+
+        changes = ad.diff_frames(old, new)
+        assert list(zip(changes["Variable"], changes["Old"], changes["New"])) == [
+            ("temperature_2m_mean", 2.0, 2.5),
+            ("rain_sum", 1.0, 1.2),
+        ]
+        assert changes["Date"].dt.strftime("%Y-%m-%d").tolist() == ["2024-01-02", "2024-01-03"]
+
+    def test_new_dates_and_filled_gaps_count_as_changes(self):
+        old = ad.payload_frame(payload([1.0], [None]))
+        new = ad.payload_frame(payload([1.0, 2.0], [0.4, 0.0]))
+
+        changes = ad.diff_frames(old, new)
+        assert len(changes) == 3
+        assert changes["Old"].isna().all()
+
+    def test_identical_payload_is_empty(self):
+        frame = ad.payload_frame(payload([1.0, 2.0], [None, 0.0]))
+        assert ad.diff_frames(frame, frame).empty
+
+
+class TestDeltaLog:
+    def test_revisions_are_logged_and_snapshot_advances(self, tmp_path):
+        first = write_raw(tmp_path, "raw_1.json", payload([1.0, 2.0], [0.0, 0.0]))
+        second = write_raw(tmp_path, "raw_2.json", payload([1.0, 2.2, 3.0], [0.0, 0.0, 0.5]))
+        root = tmp_path / "deltas"
+
+        assert ad.commit_delta(ad.compute_delta(first, "69115", root), root) == 1
+        delta = ad.compute_delta(second, "69115", root)
+        assert len(delta.changes) == 3
+        assert ad.commit_delta(delta, root) == 2
+
+        again = ad.compute_delta(second, "69115", root)
+        assert again.empty
+        assert ad.commit_delta(again, root) is None
+
+        revised = ad.read_deltas("69115", since_revision=1, root=root)
+        assert revised["Revision"].unique().tolist() == [2]
+        row = revised[revised["Old"].notna()].iloc[0]
+        assert (row["Variable"], row["Old"], row["New"]) == ("temperature_2m_mean", 2.0, 2.2)
+
+    def test_uncommitted_delta_leaves_snapshot_untouched(self, tmp_path):
+        raw = write_raw(tmp_path, "raw.json", payload([1.0], [0.0]))
+        root = tmp_path / "deltas"
+
+        ad.compute_delta(raw, "69115", root)
+        assert not ad.snapshot_path("69115", root).exists()
+        assert not ad.compute_delta(raw, "69115", root).empty
+
+    def test_unreadable_payload_returns_none(self, tmp_path):
+        raw = write_raw(tmp_path, "raw.json", {})
+        assert ad.compute_delta(raw, "69115", tmp_path) is None
+        assert ad.read_deltas("69115", root=tmp_path).empty
+
+    def test_snapshot_keeps_nan_cells(self, tmp_path):
+        raw = write_raw(tmp_path, "raw.json", payload([1.0, None], [None, 0.0]))
+        ad.commit_delta(ad.compute_delta(raw, "69115", tmp_path), tmp_path)
+        snapshot = ad.load_snapshot("69115", tmp_path)
+        assert np.isnan(snapshot["temperature_2m_mean"].iloc[1])
+
+    def test_logged_revision_survives_interrupted_snapshot_write(self, tmp_path, monkeypatch):
+        first = write_raw(tmp_path, "raw_1.json", payload([1.0, 2.0], [0.0, None]))
+        second = write_raw(tmp_path, "raw_2.json", payload([1.0, 2.5, 3.0], [0.0, 0.2, 0.1]))
+        ad.commit_delta(ad.compute_delta(first, "69115", tmp_path), tmp_path)
+
+        def crash(*args, **kwargs):
+            raise OSError("disk full")
+
+        monkeypatch.setattr(ad.feather, "write_feather", crash)
+        with pytest.raises(OSError):
+            ad.commit_delta(ad.compute_delta(second, "69115", tmp_path), tmp_path)
+        monkeypatch.undo()
+
+        assert ad.compute_delta(second, "69115", tmp_path).empty
+        assert ad.read_deltas("69115", since_revision=1, root=tmp_path)[
+            "Revision"
+        ].unique().tolist() == [2]
+
+        with open(ad.log_path("69115", tmp_path), "a", encoding="utf-8") as f:
+            f.write('{"revision": 3, "chan')
+        third = write_raw(tmp_path, "raw_3.json", payload([1.0, 2.5, 3.5], [0.0, 0.2, 0.1]))
+        assert ad.commit_delta(ad.compute_delta(third, "69115", tmp_path), tmp_path) == 3
+        assert ad.read_deltas("69115", root=tmp_path)["Revision"].unique().tolist() == [1, 2, 3]
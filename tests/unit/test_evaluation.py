@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import evaluation as ev
+from src import history_store as hs
+from src import series_store as ss
+
+
+def make_actuals():
+    dates = pd.date_range("2024-01-01", periods=4, freq="D")
+    return pd.concat(
+        [
+            pd.DataFrame(
+                {"PostalCode": "69115", "Date": dates, "Temp_Max_C": [1.0, 2.0, 3.0, 4.0]}
+            ),
+            pd.DataFrame(
+                {"PostalCode": "10115", "Date": dates, "Temp_Max_C": [10.0, 20.0, 30.0, 40.0]}
+            ),
+        ],
+        ignore_index=True,
+    )
+
+
+def make_forecasts():
+    return pd.DataFrame(
+        {
+            "Model": ["sarimax"] * 4 + ["lstm"],
+            "PostalCode": ["69115", "69115", "10115", "10115", "69115"],
+            "Date": pd.to_datetime(
+                ["2024-01-02", "2024-01-03", "2024-01-04", "2025-01-01", "2024-01-01"]
+            ),
+            "Horizon": [1, 1, 1, 1, 2],
+            "Variable": ["Temp_Max_C"] * 5,
+            "Forecast": [3.0, 2.0, 41.0, 0.0, 1.5],
+        }
+    )
+
+
+class TestAttachActuals:
+    def test_sorted_merge_matches_by_postal_and_date(self):
+        joined = ev.attach_actuals(make_forecasts(), make_actuals().sample(frac=1, random_state=0))
+        np.testing.assert_array_equal(joined["Actual"], [2.0, 3.0, 40.0, np.nan, 1.0])
+
+    def test_unknown_variable_is_unmatched(self):
+        forecasts = make_forecasts().assign(Variable="Rain_mm")
+        assert ev.attach_actuals(forecasts, make_actuals())["Actual"].isna().all()
+
+    def test_matches_pandas_merge(self):
+        forecasts, actuals = make_forecasts(), make_actuals()
+        expected = forecasts.merge(actuals, on=["PostalCode", "Date"], how="left")["Temp_Max_C"]
+        np.testing.assert_array_equal(ev.attach_actuals(forecasts, actuals)["Actual"], expected)
+
+
+class TestScore:
+    def test_metrics_per_group(self):
+        metrics = ev.score(ev.attach_actuals(make_forecasts(), make_actuals()))
+        row = metrics[(metrics["Model"] == "sarimax") & (metrics["PostalCode"] == "69115")]
+        assert row["N"].item() == 2
+        assert row["MAE"].item() == pytest.approx(1.0)
+        assert row["RMSE"].item() == pytest.approx(1.0)
+        assert row["Bias"].item() == pytest.approx(0.0)
+        assert set(metrics["Season"]) == {"DJF"}
+        assert metrics["N"].sum() == 4
+
+
+class TestEvaluate:
+    def test_parallel_matches_serial(self):
+        rng = np.random.default_rng(1)
+        actuals = pd.concat(
+            [make_actuals().assign(PostalCode=f"{i:05d}") for i in range(6)], ignore_index=True
+        )
+        forecasts = pd.concat(
+            [make_forecasts().assign(PostalCode=f"{i:05d}") for i in range(6)], ignore_index=True
+        )
+        forecasts["Forecast"] += rng.normal(size=len(forecasts))
+
+        serial = ev.evaluate(forecasts, actuals, max_workers=1)
+        parallel = ev.evaluate(forecasts, actuals, max_workers=2, parallel_min_rows=0)
+        pd.testing.assert_frame_equal(serial, parallel)
+
+    def test_summarize_weights_by_count(self):
+        metrics = pd.DataFrame(
+            {
+                "Model": ["m", "m"],
+                "Variable": ["v", "v"],
+                "Horizon": [1, 1],
+                "N": [1, 3],
+                "MAE": [4.0, 0.0],
+                "RMSE": [2.0, 0.0],
+                "Bias": [4.0, 0.0],
+            }
+        )
+        summary = ev.summarize(metrics)
+        assert summary["N"].item() == 4
+        assert summary["MAE"].item() == pytest.approx(1.0)
+        assert summary["RMSE"].item() == pytest.approx(1.0)
+
+
+class TestRun:
+    def test_end_to_end(self, tmp_path, monkeypatch):
+        actuals = make_actuals().assign(City="X")
+        ss.append_frame(actuals[actuals["PostalCode"] == "69115"], tmp_path / "series")
+        hs.ingest_frame(actuals[actuals["PostalCode"] == "10115"], tmp_path / "history")
+        forecast_path = tmp_path / "forecasts.csv"
+        make_forecasts().to_csv(forecast_path, index=False)
+        monkeypatch.setattr(ev, "SERIES_DATA_DIR", tmp_path / "series")
+        monkeypatch.setattr(ev, "HISTORY_DATA_DIR", tmp_path / "history")
+        monkeypatch.setattr(ev, "EVALUATION_DATA_DIR", tmp_path / "eval")
+
+        assert ev.run(forecast_path) is True
+        assert len(list((tmp_path / "eval").glob("evaluation_*.csv"))) == 2
+
+    def test_actuals_are_read_for_the_forecast_range(self, tmp_path):
+        ss.append_frame(make_actuals().assign(City="X"), tmp_path / "series")
+        actuals = ev.load_actuals(
+            ["69115"], ["Temp_Max_C"], "2024-01-02", "2024-01-03", tmp_path / "series"
+        )
+        assert list(actuals.columns) == ["Date", "Temp_Max_C", "PostalCode"]
+        assert actuals["Temp_Max_C"].tolist() == [2.0, 3.0]
+
+    def test_missing_columns(self, tmp_path, caplog):
+        path = tmp_path / "forecasts.csv"
+        pd.DataFrame({"Model": ["m"]}).to_csv(path, index=False)
+        assert ev.run(path) is False
+        assert "[LOAD] Forecasts missing columns" in caplog.text
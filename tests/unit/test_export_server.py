@@ -0,0 +1,173 @@
+import gzip
+import io
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from src.export_server import ExportRequest, accepts_gzip, etag_matches, make_server
+from src.history_store import write_partition
+
+
+@pytest.fixture
+def history(tmp_path):
+    dates = pd.date_range("2023-01-01", "2024-12-31")
+    for i, (postal, city) in enumerate([("69115", "Heidelberg"), ("10115", "Berlin")]):
+        df = pd.DataFrame(
+            {
+                "Date": dates,
+                "Temp_Max_C": np.arange(len(dates), dtype=float) + i * 1000,
+                "Precipitation_mm": np.where(np.arange(len(dates)) % 10 == 0, np.nan, 1.0),
+                "City": city,
+                "PostalCode": postal,
+            }
+        )
+        write_partition(df, postal, tmp_path / "history")
+    return tmp_path / "history"
+
+
+@pytest.fixture
+def server(history):
+    server = make_server("127.0.0.1", 0, history, batch_rows=100)
+    thread = threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+    )
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def get(server, path, **headers):
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{server.server_port}{path}", headers=headers
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, e.read()
+
+
+def test_streams_arrow_batches(server):
+    status, headers, body = get(server, "/export?postal=69115&start=2024-01-01")
+    assert status == 200
+    assert headers["Content-Type"] == "application/vnd.apache.arrow.stream"
+    assert headers["Transfer-Encoding"] == "chunked"
+
+    reader = pa.ipc.open_stream(body)
+    batches = list(reader)
+    assert max(b.num_rows for b in batches) == 100
+    table = pa.Table.from_batches(batches)
+    assert table.num_rows == 366
+    assert set(table.column("PostalCode").to_pylist()) == {"69115"}
+
+
+def test_gzip_csv_projection_and_limit(server):
+    status, headers, body = get(
+        server,
+        "/export?format=csv&columns=Date,Precipitation_mm&postal=10115&limit=250",
+        **{"Accept-Encoding": "gzip"},
+    )
+    assert status == 200
+    assert headers["Content-Encoding"] == "gzip"
+    df = pd.read_csv(io.BytesIO(gzip.decompress(body)))
+    assert list(df.columns) == ["Date", "Precipitation_mm"]
+    assert len(df) == 250
+    assert df["Date"].iloc[0] == "2023-01-01"
+    assert df["Precipitation_mm"].isna().sum() == 25
+
+
+def test_where_on_a_string_column(server):
+    status, _, body = get(server, "/export?where=PostalCode+%3D+10115&columns=City")
+    assert status == 200
+    assert set(pa.ipc.open_stream(body).read_all().column("City").to_pylist()) == {"Berlin"}
+
+
+def test_aggregates(server):
+    _, _, body = get(server, "/export?group_by=PostalCode,Year&agg=Temp_Max_C:max")
+    df = pa.ipc.open_stream(body).read_all().to_pandas()
+    assert df.to_dict("list") == {
+        "PostalCode": ["10115", "10115", "69115", "69115"],
+        "Year": [2023, 2024, 2023, 2024],
+        "Temp_Max_C_max": [1364.0, 1730.0, 364.0, 730.0],
+    }
+
+
+def test_etag_tracks_only_the_requested_partition(server, history):
+    path = "/export?postal=69115&columns=Date,Temp_Max_C"
+    _, headers, _ = get(server, path)
+    etag = headers["ETag"]
+
+    status, _, body = get(server, path, **{"If-None-Match": etag})
+    assert status == 304 and body == b""
+
+    berlin = pd.DataFrame(
+        {"Date": [pd.Timestamp("2025-01-01")], "Temp_Max_C": [5.0], "PostalCode": ["10115"]}
+    )
+    write_partition(berlin, "10115", history)
+    assert get(server, path, **{"If-None-Match": etag})[0] == 304
+    assert get(server, "/export?postal=10115", **{"If-None-Match": etag})[0] == 200
+
+    heidelberg = berlin.assign(PostalCode="69115")
+    write_partition(heidelberg, "69115", history)
+    status, headers, body = get(server, path, **{"If-None-Match": etag})
+    assert status == 200 and headers["ETag"] != etag
+    assert pa.ipc.open_stream(body).read_all().num_rows == 732
+
+
+def test_partitions_listing(server):
+    status, headers, body = get(server, "/partitions")
+    listing = json.loads(body)
+    assert status == 200
+    assert [p["postal"] for p in listing] == ["10115", "69115"]
+    assert get(server, "/partitions", **{"If-None-Match": headers["ETag"]})[0] == 304
+
+    _, single, _ = get(server, "/export?postal=69115")
+    assert single["ETag"] != listing[1]["etag"]
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "/export?format=xml",
+        "/export?colour=red",
+        "/export?where=Temp_Max_C",
+        "/export?agg=x:median",
+        "/export?limit=-1",
+        "/export?start=yesterday-ish",
+    ],
+)
+def test_bad_requests(server, path):
+    status, headers, body = get(server, path)
+    assert status == 400
+    assert "error" in json.loads(body)
+
+
+def test_unknown_path(server):
+    assert get(server, "/nope")[0] == 404
+
+
+def test_request_parsing():
+    request = ExportRequest("postal=69115,10115&postal=80331&where=City+%3D+Berlin&limit=5")
+    assert request.postals == ["69115", "10115", "80331"]
+    assert request.where == ["City = Berlin"]
+    assert request.limit == 5
+    assert (
+        request.key()
+        == ExportRequest("limit=5&where=City+%3D+Berlin&postal=69115,10115,80331").key()
+    )
+
+
+def test_header_matching():
+    assert etag_matches('"a", W/"b"', 'W/"b"')
+    assert etag_matches("*", 'W/"b"')
+    assert not etag_matches('"c"', 'W/"b"')
+    assert accepts_gzip("br, gzip;q=0.8")
+    assert not accepts_gzip("gzip;q=0, identity")
+    assert not accepts_gzip(None)
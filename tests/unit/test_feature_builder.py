@@ -0,0 +1,127 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import feature_builder as fb
+from src import history_store as hs
+
+
+@pytest.fixture
+def make_frame(cleaned_frame):
+    def make(periods=60, **kwargs):
+        day = np.arange(periods, dtype=float)
+        return cleaned_frame(
+            "2024-01-01", periods, Temp_Max_C=day + 5, Temp_Min_C=day - 5, Temp_Mean_C=day, **kwargs
+        )
+
+    return make
+
+
+class TestLagFeatures:
+    def test_shifts_with_nan_padding(self):
+        lagged = fb.lag_features(np.arange(5, dtype=np.float32), [1, 3, 10])
+        np.testing.assert_array_equal(lagged[:, 0], [np.nan, 0, 1, 2, 3])
+        np.testing.assert_array_equal(lagged[:, 1], [np.nan, np.nan, np.nan, 0, 1])
+        assert np.isnan(lagged[:, 2]).all()
+
+
+class TestRollingFeatures:
+    def test_matches_pandas_rolling(self):
+        values = np.random.default_rng(0).normal(size=50).astype(np.float32)
+        stats = fb.rolling_features(values, 7)
+        expected = pd.Series(values).rolling(7)
+        np.testing.assert_allclose(stats["mean"], expected.mean(), rtol=1e-5)
+        np.testing.assert_allclose(stats["std"], expected.std(ddof=0), rtol=1e-4)
+        np.testing.assert_allclose(stats["max"], expected.max())
+
+    def test_window_longer_than_series(self):
+        assert np.isnan(fb.rolling_features(np.ones(3, dtype=np.float32), 7)["mean"]).all()
+
+
+class TestCalendarFeatures:
+    def test_cyclical_encoding(self):
+        cal = fb.calendar_features(pd.Series(pd.to_datetime(["2023-01-01", "2023-07-02"])))
+        assert cal["DayOfYear"].tolist() == [1, 183]
+        np.testing.assert_allclose(cal["DayOfYear_cos"], [1.0, -1.0], atol=1e-3)
+
+
+class TestSlidingWindows:
+    def test_windows_are_views_with_expected_shape(self):
+        matrix = np.arange(20, dtype=np.float32).reshape(10, 2)
+        target = np.arange(10, dtype=np.float32)
+        X, y, valid = fb.sliding_windows(matrix, target, lookback=3, horizon=2)
+
+        assert X.shape == (6, 3, 2)
+        assert y.shape == (6, 2)
+        assert np.shares_memory(X, matrix)
+        np.testing.assert_array_equal(X[1], matrix[1:4])
+        np.testing.assert_array_equal(y[1], [4, 5])
+        assert valid.all()
+
+    def test_nan_windows_are_masked(self):
+        matrix = np.ones((10, 1), dtype=np.float32)
+        matrix[4] = np.nan
+        _, _, valid = fb.sliding_windows(matrix, np.ones(10, dtype=np.float32), 3, 1)
+        assert valid.tolist() == [True, False, False, False, False, True, True]
+
+    def test_series_too_short(self):
+        X, y, valid = fb.sliding_windows(np.ones((3, 2)), np.ones(3), 3, 1)
+        assert X.shape == (0, 3, 2) and y.shape == (0, 1) and valid.size == 0
+
+
+class TestBuildLocation:
+    def test_writes_tabular_windows_and_manifest(self, tmp_path, make_frame):
+        manifest = fb.build_location(make_frame(), "69115", tmp_path, lookback=10, horizon=3)
+
+        X = np.load(tmp_path / "postal=69115_lstm_X.npy", mmap_mode="r")
+        y = np.load(tmp_path / "postal=69115_lstm_y.npy", mmap_mode="r")
+        assert X.dtype == np.float32
+        assert X.shape == (manifest["windows"], 10, len(manifest["window_features"]))
+        np.testing.assert_array_equal(y[0], [10, 11, 12])
+
+        tabular = pd.read_feather(tmp_path / "postal=69115_tabular.arrow")
+        assert "Temp_Mean_C_lag1" in tabular.columns
+        assert json.loads((tmp_path / "postal=69115_manifest.json").read_text()) == manifest
+
+    def test_interrupted_rebuild_keeps_previous_files(self, tmp_path, monkeypatch, make_frame):
+        manifest = fb.build_location(make_frame(), "69115", tmp_path, lookback=10, horizon=3)
+        files = {p.name: p.read_bytes() for p in tmp_path.iterdir()}
+
+        open_memmap = np.lib.format.open_memmap
+
+        def crash_on_targets(path, *args, **kwargs):
+            if "_y.npy" in str(path):
+                raise OSError("disk full")
+            return open_memmap(path, *args, **kwargs)
+
+        monkeypatch.setattr(np.lib.format, "open_memmap", crash_on_targets)
+        with pytest.raises(OSError):
+            fb.build_location(make_frame(periods=90), "69115", tmp_path, lookback=5, horizon=1)
+
+        leftover = {p.name: p.read_bytes() for p in tmp_path.iterdir()}
+        assert leftover.keys() == files.keys()
+        for name in ("postal=69115_lstm_X.npy", "postal=69115_manifest.json"):
+            assert leftover[name] == files[name]
+        assert json.loads(leftover["postal=69115_manifest.json"]) == manifest
+
+    def test_gaps_are_reindexed_and_masked(self, tmp_path, make_frame):
+        df = make_frame(periods=30).drop(index=[10])
+        manifest = fb.build_location(df, "69115", tmp_path, lookback=5, horizon=1)
+        assert manifest["rows"] == 30
+        assert manifest["windows"] == 30 - 5 - 1 + 1 - 6
+
+    def test_missing_target(self, tmp_path, caplog, make_frame):
+        assert fb.build_location(make_frame().drop(columns="Temp_Mean_C"), "1", tmp_path) is None
+        assert "missing target column" in caplog.text
+
+
+class TestRun:
+    def test_builds_every_location_in_history_store(self, tmp_path, monkeypatch, make_frame):
+        hs.ingest_frame(pd.concat([make_frame(postal="1"), make_frame(postal="2")]), tmp_path)
+        monkeypatch.setattr(fb, "HISTORY_DATA_DIR", tmp_path)
+        monkeypatch.setattr(fb, "FEATURES_DATA_DIR", tmp_path / "features")
+
+        assert fb.run() is True
+        assert len(list((tmp_path / "features").glob("*_manifest.json"))) == 2
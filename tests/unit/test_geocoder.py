@@ -0,0 +1,125 @@
+from unittest.mock import patch
+
+from src import geocoder as gc
+
+
+def write_gazetteer(path, location):
+    path.write_text(
+        "postal,city,latitude,longitude\n"
+        f"{location['postal']},{location['city']},{location['latitude']},{location['longitude']}\n"
+    )
+    return path
+
+
+class TestLocationCache:
+    def test_roundtrip(self, tmp_path, location):
+        with gc.LocationCache(tmp_path / "cache.sqlite") as cache:
+            cache.put_many({"69115": location}, source="test")
+            assert cache.get_many(["69115", "10115"]) == {"69115": location}
+
+    def test_persists_between_connections(self, tmp_path, location):
+        path = tmp_path / "cache.sqlite"
+        with gc.LocationCache(path) as cache:
+            cache.put_many({"heidelberg": location}, source="test")
+        with gc.LocationCache(path) as cache:
+            assert cache.get_many(["heidelberg"]) == {"heidelberg": location}
+
+    def test_get_many_batches_large_key_sets(self, tmp_path, location):
+        keys = [str(i) for i in range(gc.SQLITE_BATCH_SIZE * 2 + 1)]
+        with gc.LocationCache(tmp_path / "cache.sqlite") as cache:
+            cache.put_many({k: location for k in keys}, source="test")
+            assert len(cache.get_many(keys)) == len(keys)
+
+
+class TestReadLocationQueries:
+    def test_skips_blanks_and_comments(self, tmp_path):
+        f = tmp_path / "locations.txt"
+        f.write_text("69115\n\n# comment\nBerlin  # capital\n")
+        assert gc.read_location_queries(f) == ["69115", "Berlin"]
+
+    def test_missing_file(self, tmp_path, caplog):
+        assert gc.read_location_queries(tmp_path / "missing.txt") == []
+        assert "[INPUT] Could not read location queries" in caplog.text
+
+
+class TestLoadGazetteer:
+    def test_indexes_postal_and_city(self, tmp_path, location):
+        index = gc.load_gazetteer(write_gazetteer(tmp_path / "gaz.csv", location))
+        assert index["69115"] == location
+        assert index["heidelberg"] == location
+
+    def test_malformed_rows_are_skipped(self, tmp_path, location, caplog):
+        path = write_gazetteer(tmp_path / "gaz.csv", location)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("10115,Berlin,north,13.4\n01067,Dresden\n")
+        index = gc.load_gazetteer(path)
+        assert set(index) == {"69115", "heidelberg"}
+        assert "(2 rows skipped)" in caplog.text
+
+    def test_missing_gazetteer(self, tmp_path, caplog):
+        assert gc.load_gazetteer(tmp_path / "missing.csv") == {}
+        assert "skipping offline tier" in caplog.text
+
+
+class TestGeocodeQuery:
+    @patch("src.geocoder.get_with_retry")
+    def test_postal_query(self, mock_get, json_response, location):
+        mock_get.return_value = json_response(
+            {
+                "results": [
+                    {
+                        "name": location["city"],
+                        "latitude": location["latitude"],
+                        "longitude": location["longitude"],
+                    }
+                ]
+            }
+        )
+        assert gc.geocode_query(location["postal"]) == location
+
+    @patch("src.geocoder.get_with_retry")
+    def test_malformed_match(self, mock_get, json_response, caplog):
+        mock_get.return_value = json_response({"results": [{"name": "Heidelberg"}]})
+        assert gc.geocode_query("69115") is None
+        mock_get.return_value = json_response({"results": [{"latitude": None, "longitude": 8.7}]})
+        assert gc.geocode_query("69115") is None
+        assert "[GEOCODE] Malformed match for '69115'" in caplog.text
+
+    @patch("src.geocoder.get_with_retry")
+    def test_no_results(self, mock_get, json_response, caplog):
+        mock_get.return_value = json_response({})
+        assert gc.geocode_query("nowhere") is None
+        assert "[GEOCODE] No match for 'nowhere'" in caplog.text
+
+
+class TestResolveLocations:
+    @patch("src.geocoder.geocode_query")
+    def test_tiers_and_caching(self, mock_geocode, tmp_path, locations):
+        heidelberg, berlin = locations
+        mock_geocode.side_effect = lambda key: berlin if key == "berlin" else None
+        cache_path = tmp_path / "cache.sqlite"
+        gazetteer = write_gazetteer(tmp_path / "gaz.csv", heidelberg)
+
+        result = gc.resolve_locations(["69115", "Berlin", "Atlantis"], cache_path, gazetteer)
+        assert result == {"69115": heidelberg, "Berlin": berlin, "Atlantis": None}
+        assert mock_geocode.call_count == 2
+
+        mock_geocode.reset_mock()
+        warm = gc.resolve_locations(["69115", " berlin "], cache_path, gazetteer)
+        assert warm == {"69115": heidelberg, " berlin ": berlin}
+        mock_geocode.assert_not_called()
+
+    @patch("src.geocoder.save_locations")
+    @patch("src.geocoder.resolve_locations")
+    def test_run_dedupes_by_postal(self, mock_resolve, mock_save, tmp_path, location, caplog):
+        queries = tmp_path / "locations.txt"
+        queries.write_text("69115\nHeidelberg\nAtlantis\n")
+        mock_resolve.return_value = {
+            "69115": location,
+            "Heidelberg": location,
+            "Atlantis": None,
+        }
+
+        assert gc.run(queries) == [location]
+        mock_save.assert_called_once_with([location])
+        assert "[BATCH] 1 queries unresolved" in caplog.text
@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import history_store as hs
+
+
+@pytest.fixture
+def make_frame(cleaned_frame):
+    def make(start="2015-01-01", periods=10, offset=0.0, **kwargs):
+        day = np.arange(periods, dtype=float)
+        return cleaned_frame(
+            start, periods, Temp_Max_C=day + offset, Temp_Min_C=day - 5 + offset, **kwargs
+        )
+
+    return make
+
+
+class TestGetLatestCleanedFile:
+    def test_no_files_found(self, tmp_path, caplog):
+        assert hs.get_latest_cleaned_file(tmp_path) is None
+        assert "[FILE] No cleaned weather files found." in caplog.text
+
+
+class TestWritePartition:
+    def test_upsert_prefers_newer_rows(self, tmp_path, make_frame):
+        hs.write_partition(make_frame(periods=5), "69115", tmp_path)
+        hs.write_partition(make_frame(start="2015-01-04", periods=4, offset=100), "69115", tmp_path)
+
+        df = hs.HistoryStore(tmp_path).read_frame("69115")
+        assert len(df) == 7
+        assert df["Date"].is_monotonic_increasing
+        assert df["Temp_Max_C"].tolist() == [0.0, 1.0, 2.0, 100.0, 101.0, 102.0, 103.0]
+
+    def test_ingest_splits_by_postal(self, tmp_path, make_frame):
+        df = pd.concat([make_frame(postal="69115"), make_frame(postal="10115")])
+        hs.ingest_frame(df, tmp_path)
+        assert hs.HistoryStore(tmp_path).locations() == ["10115", "69115"]
+
+    def test_partitions_of_another_schema_version_are_refused(self, tmp_path, caplog, make_frame):
+        path = hs.partition_path("69115", tmp_path)
+        hs.frame_to_table(make_frame()).to_pandas().to_feather(path)
+        assert hs.partition_version(path) == hs.UNVERSIONED
+
+        with pytest.raises(ValueError, match="make migrate"):
+            hs.write_partition(make_frame(start="2015-02-01"), "69115", tmp_path)
+        assert hs.HistoryStore(tmp_path).read_frame("69115").empty
+        assert f"expected {hs.SCHEMA_VERSION}; run `make migrate`" in caplog.text
+
+        hs.replace_partition(make_frame(), "69115", tmp_path)
+        assert hs.partition_version(path) == hs.SCHEMA_VERSION
+        assert len(hs.HistoryStore(tmp_path).read_frame("69115")) == 10
+
+
+class TestHistoryStore:
+    def test_read_slice_and_projection(self, tmp_path, make_frame):
+        hs.write_partition(make_frame(periods=30), "69115", tmp_path)
+        store = hs.HistoryStore(tmp_path)
+
+        view = store.read("69115", "2015-01-05", "2015-01-09", ["Temp_Max_C"])
+        assert view.column_names == ["Date", "Temp_Max_C"]
+        assert view.column("Temp_Max_C").to_pylist() == [4.0, 5.0, 6.0, 7.0, 8.0]
+
+    def test_read_arrays_are_zero_copy_views(self, tmp_path, make_frame):
+        hs.write_partition(make_frame(periods=30), "69115", tmp_path)
+        arrays = hs.HistoryStore(tmp_path).read_arrays("69115", "2015-01-10", None, ["Temp_Min_C"])
+        temps = arrays["Temp_Min_C"]
+        assert not temps.flags.owndata
+        assert not temps.flags.writeable
+        np.testing.assert_array_equal(temps, np.arange(9, 30, dtype=float) - 5)
+
+    def test_nan_values_survive_roundtrip(self, tmp_path, make_frame):
+        df = make_frame(periods=3)
+        df.loc[1, "Temp_Max_C"] = np.nan
+        hs.write_partition(df, "69115", tmp_path)
+        temps = hs.HistoryStore(tmp_path).read_arrays("69115")["Temp_Max_C"]
+        assert np.isnan(temps[1])
+
+    def test_reopens_rewritten_partition(self, tmp_path, make_frame):
+        store = hs.HistoryStore(tmp_path)
+        hs.write_partition(make_frame(periods=3), "69115", tmp_path)
+        assert store.read("69115").num_rows == 3
+
+        hs.write_partition(make_frame(start="2015-01-04", periods=2), "69115", tmp_path)
+        store._open["69115"] = (0, *store._open["69115"][1:])
+        assert store.read("69115").num_rows == 5
+
+    def test_evicts_least_recently_used_partitions(self, tmp_path, make_frame):
+        for postal in ("01067", "10115", "69115"):
+            hs.write_partition(make_frame(postal=postal), postal, tmp_path)
+        store = hs.HistoryStore(tmp_path, max_open=2)
+
+        store.read("01067")
+        store.read("10115")
+        store.read("01067")
+        store.read("69115")
+        assert list(store._open) == ["01067", "69115"]
+
+    def test_missing_location(self, tmp_path, caplog):
+        store = hs.HistoryStore(tmp_path)
+        assert store.read("00000") is None
+        assert store.read_frame("00000").empty
+        assert "[READ] No history for postal 00000" in caplog.text
+
+
+class TestRun:
+    def test_ingests_latest_cleaned_csv(self, tmp_path, monkeypatch, make_frame):
+        staging = tmp_path / "staging"
+        staging.mkdir()
+        make_frame(postal="01067").to_csv(
+            staging / "cleaned_weather_20240101_000000.csv", index=False
+        )
+        monkeypatch.setattr(hs, "STAGING_DATA_DIR", staging)
+        monkeypatch.setattr(hs, "HISTORY_DATA_DIR", tmp_path / "history")
+
+        assert hs.run() is True
+        df = hs.HistoryStore(tmp_path / "history").read_frame("01067")
+        assert len(df) == 10
+        assert df["PostalCode"].iloc[0] == "01067"
+
+    def test_ingests_latest_cleaned_arrow(self, tmp_path, monkeypatch, make_frame):
+        staging = tmp_path / "staging"
+        staging.mkdir()
+        make_frame(postal="01067").to_csv(
+            staging / "cleaned_weather_20240101_000000.csv", index=False
+        )
+        make_frame(postal="10115").to_feather(staging / "cleaned_weather_20240102_000000.arrow")
+        monkeypatch.setattr(hs, "STAGING_DATA_DIR", staging)
+        monkeypatch.setattr(hs, "HISTORY_DATA_DIR", tmp_path / "history")
+
+        assert hs.run() is True
+        assert hs.HistoryStore(tmp_path / "history").locations() == ["10115"]
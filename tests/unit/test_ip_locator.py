@@ -0,0 +1,126 @@
+import ipaddress
+import time
+from unittest.mock import patch
+
+import pytest
+
+from src import ip_locator as ipl
+from src.geocoder import LocationCache
+
+HEIDELBERG = {"city": "Heidelberg", "postal": "69115", "latitude": 49.41, "longitude": 8.69}
+BERLIN = {"city": "Berlin", "postal": "10115", "latitude": 52.53, "longitude": 13.38}
+MUNICH = {"city": "München", "postal": "80331", "latitude": 48.14, "longitude": 11.58}
+
+
+def write_ranges(path):
+    path.write_text(
+        "start_ip,end_ip,city,postal,latitude,longitude\n"
+        "81.0.0.0,81.0.255.255,Berlin,10115,52.53,13.38\n"
+        "5.1.0.0,5.1.0.255,Heidelberg,69115,49.41,8.69\n"
+        "2a02:810::,2a02:810:ffff:ffff:ffff:ffff:ffff:ffff,Berlin,10115,52.53,13.38\n"
+        "9.9.9.9,1.1.1.1,Broken,00000,0,0\n"
+        "not-an-ip,5.1.1.0,Broken,00000,0,0\n"
+    )
+    return path
+
+
+def test_address_value():
+    assert ipl.address_value("5.1.0.255") == (4, int(ipaddress.ip_address("5.1.0.255")))
+    assert ipl.address_value(" 2a02:810::1 ") == (6, int(ipaddress.ip_address("2a02:810::1")))
+    with pytest.raises(ValueError):
+        ipl.address_value("5.1.0")
+
+
+class TestIpRangeTable:
+    def test_lookup_by_binary_search(self, tmp_path):
+        table = ipl.IpRangeTable.load(write_ranges(tmp_path / "ranges.csv"))
+        assert len(table) == 3
+
+        def lookup(text):
+            return table.lookup(ipaddress.ip_address(text))
+
+        assert lookup("5.1.0.0") == HEIDELBERG
+        assert lookup("5.1.0.255") == HEIDELBERG
+        assert lookup("81.0.17.4") == BERLIN
+        assert lookup("2a02:810:1::7") == BERLIN
+        # Between ranges, before the first and after the last
+        assert lookup("5.1.1.0") is None
+        assert lookup("1.0.0.1") is None
+        assert lookup("200.0.0.1") is None
+        assert lookup("2a03::1") is None
+
+    def test_missing_table(self, tmp_path, caplog):
+        table = ipl.IpRangeTable.load(tmp_path / "missing.csv")
+        assert len(table) == 0
+        assert table.lookup(ipaddress.ip_address("81.0.0.1")) is None
+        assert "skipping offline tier" in caplog.text
+
+    def test_thousands_of_lookups_take_milliseconds(self):
+        ranges = [(4, i << 8, (i << 8) + 255, HEIDELBERG) for i in range(1 << 16, 1 << 17)]
+        table = ipl.IpRangeTable(ranges)
+        ips = [ipaddress.ip_address((i << 8) + 7) for i in range(1 << 16, (1 << 16) + 5000)]
+        started = time.perf_counter()
+        assert all(table.lookup(ip) == HEIDELBERG for ip in ips)
+        assert time.perf_counter() - started < 0.5
+
+
+class TestResolveIps:
+    @patch("src.ip_locator.fetch_location_from_ip")
+    def test_tiers_and_cache(self, mock_fetch, tmp_path):
+        table = ipl.IpRangeTable.load(write_ranges(tmp_path / "ranges.csv"))
+        cache_path = tmp_path / "cache.sqlite"
+        with LocationCache(cache_path) as cache:
+            cache.put_many({"ip:8.8.4.4": BERLIN}, source="test")
+        mock_fetch.side_effect = lambda ip: MUNICH if ip == "8.8.8.8" else None
+
+        ips = ["5.1.0.10", "8.8.4.4", "8.8.8.8", "1.2.3.4", "10.0.0.1", "bogus", " 81.0.0.1 "]
+        results = ipl.resolve_ips(ips, table, cache_path)
+
+        assert results == {
+            "5.1.0.10": HEIDELBERG,
+            "8.8.4.4": BERLIN,
+            "8.8.8.8": MUNICH,
+            "1.2.3.4": None,
+            "10.0.0.1": None,
+            "bogus": None,
+            " 81.0.0.1 ": BERLIN,
+        }
+        # Only public cache misses reach the API
+        assert sorted(c.args[0] for c in mock_fetch.call_args_list) == ["1.2.3.4", "8.8.8.8"]
+        with LocationCache(cache_path) as cache:
+            stored = cache.get_many(["ip:5.1.0.10", "ip:8.8.8.8", "ip:1.2.3.4"])
+        assert stored == {"ip:5.1.0.10": HEIDELBERG, "ip:8.8.8.8": MUNICH}
+
+    @patch("src.ip_locator.fetch_location_from_ip")
+    def test_cached_results_need_no_table_or_api(self, mock_fetch, tmp_path):
+        table = ipl.IpRangeTable.load(write_ranges(tmp_path / "ranges.csv"))
+        cache_path = tmp_path / "cache.sqlite"
+        ipl.resolve_ips(["5.1.0.10"], table, cache_path)
+
+        assert ipl.resolve_ips(["5.1.0.10"], ipl.IpRangeTable(), cache_path) == {
+            "5.1.0.10": HEIDELBERG
+        }
+        mock_fetch.assert_not_called()
+
+    @patch("src.ip_locator.fetch_location_from_ip", return_value=None)
+    def test_cached_table_hits_are_not_rewritten(self, mock_fetch, tmp_path):
+        table = ipl.IpRangeTable.load(write_ranges(tmp_path / "ranges.csv"))
+        cache_path = tmp_path / "cache.sqlite"
+        ipl.resolve_ips(["5.1.0.10"], table, cache_path)
+
+        with patch.object(LocationCache, "put_many") as put_many:
+            ipl.resolve_ips(["5.1.0.10", "81.0.0.1"], table, cache_path)
+        table_writes = [c.args[0] for c in put_many.call_args_list if c.args[0]]
+        assert table_writes == [{"ip:81.0.0.1": BERLIN}]
+
+
+@patch("src.ip_locator.resolve_ips")
+def test_run_saves_unique_locations(mock_resolve, tmp_path):
+    ips = tmp_path / "ips.txt"
+    ips.write_text("5.1.0.10\n5.1.0.11  # second site\n81.0.0.1\n")
+    mock_resolve.return_value = {"5.1.0.10": HEIDELBERG, "5.1.0.11": HEIDELBERG, "81.0.0.1": None}
+
+    locations = ipl.run(ips, tmp_path / "ip_locations.json")
+    assert locations == [HEIDELBERG]
+    mock_resolve.assert_called_once_with(["5.1.0.10", "5.1.0.11", "81.0.0.1"])
+    assert (tmp_path / "ip_locations.json").exists()
@@ -1,17 +1,17 @@
 import json
-from unittest.mock import Mock, mock_open, patch
+from unittest.mock import mock_open, patch
 
 import requests
-from requests.exceptions import HTTPError, Timeout
+from requests.exceptions import Timeout
 
 from src import location_resolver as lr
+from src.settings import LocationSettings, Settings
 
 
 class TestGetWithRetry:
     @patch("src.location_resolver.requests.Session.get")
-    def test_successful_get(self, mock_get):
-        mock_response = Mock()
-        mock_response.raise_for_status.return_value = None
+    def test_successful_get(self, mock_get, json_response):
+        mock_response = json_response()
         mock_get.return_value = mock_response
 
         result = lr.get_with_retry("http://example.com")
@@ -20,10 +20,8 @@ class TestGetWithRetry:
         assert mock_get.call_count == 1
 
     @patch("src.location_resolver.requests.Session.get")
-    def test_http_error_returns_none(self, mock_get):
-        mock_response = Mock()
-        mock_response.raise_for_status.side_effect = HTTPError("Bad request")
-        mock_get.return_value = mock_response
+    def test_http_error_returns_none(self, mock_get, json_response):
+        mock_get.return_value = json_response(status=400)
 
         result = lr.get_with_retry("http://example.com", retries=1)
 
@@ -42,23 +40,17 @@ class TestGetWithRetry:
 
 class TestFetchLocationFromIP:
     @patch("src.location_resolver.requests.Session.get")
-    def test_successful_fetch(self, mock_get, caplog):
-        mock_response = Mock()
-        mock_response.json.return_value = {
-            "city": "Heidelberg",
-            "postal": "69115",
-            "loc": "52.5200,13.4050",
-        }
-        mock_response.raise_for_status.return_value = None
-        mock_get.return_value = mock_response
+    def test_successful_fetch(self, mock_get, caplog, json_response, location):
+        mock_get.return_value = json_response(
+            {
+                "city": location["city"],
+                "postal": location["postal"],
+                "loc": f"{location['latitude']:.4f},{location['longitude']:.4f}",
+            }
+        )
 
         result = lr.fetch_location_from_ip()
-        assert result == {
-            "city": "Heidelberg",
-            "postal": "69115",
-            "latitude": 52.52,
-            "longitude": 13.405,
-        }
+        assert result == location
         assert "[FETCH] Location fetched from IP" in caplog.text
 
     @patch("src.location_resolver.requests.Session.get")
@@ -69,29 +61,24 @@ class TestFetchLocationFromIP:
         assert "Request to https://ipinfo.io/json failed" in caplog.text
 
     @patch("src.location_resolver.requests.Session.get")
-    def test_incomplete_response(self, mock_get, caplog):
-        mock_response = Mock()
-        mock_response.json.return_value = {
-            "city": "Heidelberg",
-            "postal": "69115",
-        }
-        mock_response.raise_for_status.return_value = None
-        mock_get.return_value = mock_response
+    def test_fetch_given_ip(self, mock_get, caplog):
+        mock_get.side_effect = requests.exceptions.Timeout
+        assert lr.fetch_location_from_ip("8.8.8.8") is None
+        assert "Request to https://ipinfo.io/8.8.8.8/json failed" in caplog.text
+
+    @patch("src.location_resolver.requests.Session.get")
+    def test_incomplete_response(self, mock_get, caplog, json_response):
+        mock_get.return_value = json_response({"city": "Heidelberg", "postal": "69115"})
 
         result = lr.fetch_location_from_ip()
         assert result is None
         assert "[FETCH] Incomplete location info from IP API" in caplog.text
 
     @patch("src.location_resolver.requests.Session.get")
-    def test_malformed_coordinates(self, mock_get, caplog):
-        mock_response = Mock()
-        mock_response.json.return_value = {
-            "city": "Heidelberg",
-            "postal": "69115",
-            "loc": "invalid,coord",
-        }
-        mock_response.raise_for_status.return_value = None
-        mock_get.return_value = mock_response
+    def test_malformed_coordinates(self, mock_get, caplog, json_response):
+        mock_get.return_value = json_response(
+            {"city": "Heidelberg", "postal": "69115", "loc": "invalid,coord"}
+        )
 
         result = lr.fetch_location_from_ip()
         assert result is None
@@ -99,13 +86,7 @@ class TestFetchLocationFromIP:
 
 
 class TestSaveLocation:
-    def test_save_valid_location(self, tmp_path, caplog):
-        location = {
-            "city": "Heidelberg",
-            "postal": "69115",
-            "latitude": 52.52,
-            "longitude": 13.405,
-        }
+    def test_save_valid_location(self, tmp_path, caplog, location):
         file_path = tmp_path / "loc.json"
 
         result = lr.save_location(location, path=file_path)
@@ -124,14 +105,8 @@ class TestSaveLocation:
         assert "[SAVE] No location information provided." in caplog.text
 
     @patch("builtins.open", new_callable=mock_open)
-    def test_save_raises_permission_error(self, mock_file, caplog):
+    def test_save_raises_permission_error(self, mock_file, caplog, location):
         mock_file.side_effect = PermissionError("No permission")
-        location = {
-            "city": "Heidelberg",
-            "postal": "69115",
-            "latitude": 52.52,
-            "longitude": 13.405,
-        }
         result = lr.save_location(location, path="fake_path.json")
         assert result is False
         assert "[SAVE] File system error while saving" in caplog.text
@@ -151,13 +126,7 @@ class TestSaveLocation:
 
 
 class TestReadLocationFile:
-    def test_read_valid_location(self, tmp_path, caplog):
-        location = {
-            "city": "Heidelberg",
-            "postal": "69115",
-            "latitude": 52.52,
-            "longitude": 13.405,
-        }
+    def test_read_valid_location(self, tmp_path, caplog, location):
         file_path = tmp_path / "loc.json"
         file_path.write_text(json.dumps(location))
 
@@ -198,7 +167,7 @@ class TestReadLocationFile:
 class TestResolveLocation:
     @patch(
         "src.location_resolver.SETTINGS",
-        {"location": {"latitude": 1.0, "longitude": 2.0, "postal": "12345", "city": "Ankara"}},
+        Settings(location=LocationSettings(1.0, 2.0, "12345", "Ankara")),
     )
     def test_resolve_from_settings(self, caplog):
         result = lr.resolve_location()
@@ -210,7 +179,7 @@ class TestResolveLocation:
         }
         assert "[CONFIG] Location loaded from settings.yaml" in caplog.text
 
-    @patch("src.location_resolver.SETTINGS", {"location": {}})
+    @patch("src.location_resolver.SETTINGS", Settings())
     @patch("src.location_resolver.Path.exists", return_value=True)
     @patch("src.location_resolver.read_location_file")
     def test_resolve_from_cached_file(self, mock_read, mock_exists, caplog):
@@ -224,23 +193,18 @@ class TestResolveLocation:
         assert result == mock_read.return_value
         assert "[CONFIG] Using cached location from disk" in caplog.text
 
-    @patch("src.location_resolver.SETTINGS", {"location": {}})
+    @patch("src.location_resolver.SETTINGS", Settings())
     @patch("src.location_resolver.Path.exists", return_value=False)
     @patch("src.location_resolver.fetch_location_from_ip")
     @patch("src.location_resolver.save_location")
-    def test_resolve_fallback_to_ip(self, mock_save, mock_fetch, mock_exists, caplog):
-        mock_fetch.return_value = {
-            "latitude": 52.52,
-            "longitude": 13.405,
-            "postal": "69115",
-            "city": "Heidelberg",
-        }
+    def test_resolve_fallback_to_ip(self, mock_save, mock_fetch, mock_exists, caplog, location):
+        mock_fetch.return_value = location
         result = lr.resolve_location()
         assert result == mock_fetch.return_value
         mock_save.assert_called_once_with(mock_fetch.return_value)
         assert "[CONFIG] No config or cache found. Falling back to IP-based location" in caplog.text
 
-    @patch("src.location_resolver.SETTINGS", {"location": {}})
+    @patch("src.location_resolver.SETTINGS", Settings())
     @patch("src.location_resolver.Path.exists", return_value=False)
     @patch("src.location_resolver.fetch_location_from_ip", return_value=None)
     def test_resolve_returns_none_if_all_fail(self, mock_exists, mock_fetch, caplog):
@@ -0,0 +1,210 @@
+import json
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from src import main
+from src.settings import Settings, WeatherSettings
+from src.weather_schema import SOURCE_COLUMNS
+
+LOCATION = {"city": "Heidelberg", "postal": "69115", "latitude": 49.41, "longitude": 8.69}
+
+
+def fake_fetch(tmp_path):
+    def fetch(lat, lon, postal, start_date, end_date):
+        path = tmp_path / f"raw_weather_{postal}_{start_date}_{end_date}.json"
+        path.write_text("{}")
+        return path
+
+    return fetch
+
+
+def fake_clean(raw_file, city, postal):
+    path = raw_file.with_suffix(".csv")
+    row = {"Date": "2024-01-01", **{spec.column: 1.0 for spec in SOURCE_COLUMNS}}
+    pd.DataFrame([{**row, "City": city, "PostalCode": postal}]).to_csv(path, index=False)
+    return path
+
+
+@pytest.fixture(autouse=True)
+def warehouse_dirs(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "ANOMALY_DATA_DIR", tmp_path / "anomalies")
+    monkeypatch.setattr(main, "SERIES_DATA_DIR", tmp_path / "series")
+
+
+@patch("src.main.update_previews")
+@patch("src.main.update_aggregates")
+@patch("src.main.ingest_frame")
+@patch("src.main.process_raw_file", side_effect=fake_clean)
+@patch("src.main.prepare_date_range", return_value=("2024-01-01", "2024-03-31"))
+@patch("src.main.resolve_location", return_value=LOCATION)
+class TestMain:
+    def test_runs_every_chunk(
+        self, _loc, _range, mock_clean, mock_ingest, _agg, _preview, tmp_path
+    ):
+        with (
+            patch("src.main.JOURNAL_PATH", tmp_path / "journal.jsonl"),
+            patch(
+                "src.main.prepare_date_chunks",
+                side_effect=lambda s, e, days: [(s, "2024-02-15"), ("2024-02-16", e)],
+            ),
+            patch(
+                "src.main.fetch_and_store_weather", side_effect=fake_fetch(tmp_path)
+            ) as mock_fetch,
+        ):
+            assert main.main([]) is True
+        assert mock_fetch.call_count == 2
+        assert mock_clean.call_count == 2
+        assert mock_ingest.call_count == 2
+
+    def test_trace_records_location_and_stage_spans(
+        self, _loc, _range, _clean, _ingest, _agg, _preview, tmp_path
+    ):
+        trace_file = tmp_path / "trace.json"
+        with (
+            patch("src.main.JOURNAL_PATH", tmp_path / "journal.jsonl"),
+            patch("src.main.fetch_and_store_weather", side_effect=fake_fetch(tmp_path)),
+        ):
+            assert main.main(["--trace", str(trace_file)]) is True
+
+        events = json.loads(trace_file.read_text())["traceEvents"]
+        spans = {e["name"]: e for e in events if e["ph"] == "X"}
+        assert {"resolve_locations", "pipeline", "stage.fetch", "stage.publish"} <= set(spans)
+        assert spans["stage.fetch"]["args"]["postal"] == "69115"
+        assert (
+            spans["stage.fetch"]["args"]["parent_span_id"] == spans["pipeline"]["args"]["span_id"]
+        )
+
+    @pytest.mark.slow
+    def test_profile_writes_reports_under_run_id(
+        self, _loc, _range, _clean, _ingest, _agg, _preview, tmp_path
+    ):
+        with (
+            patch("src.main.JOURNAL_PATH", tmp_path / "journal.jsonl"),
+            patch("src.main.PROFILE_DIR", tmp_path / "profiles"),
+            patch("src.main.fetch_and_store_weather", side_effect=fake_fetch(tmp_path)),
+        ):
+            assert main.main(["--profile"]) is True
+
+        run_id = json.loads((tmp_path / "journal.jsonl").read_text().splitlines()[0])["run_id"]
+        out_dir = tmp_path / "profiles" / run_id
+        summary = json.loads((out_dir / "summary.json").read_text())
+        assert {"resolve", "fetch", "clean", "publish"} <= set(summary["stages"])
+        assert (out_dir / "clean.prof").exists()
+
+    def test_resume_skips_completed_units(
+        self, _loc, _range, mock_clean, mock_ingest, _agg, _preview, tmp_path, caplog
+    ):
+        fetch = fake_fetch(tmp_path)
+
+        def flaky_fetch(lat, lon, postal, start_date, end_date):
+            # Chunks are fetched concurrently, so fail by chunk rather than call order
+            if start_date == "2024-02-16":
+                return None
+            return fetch(lat, lon, postal, start_date, end_date)
+
+        with (
+            patch("src.main.JOURNAL_PATH", tmp_path / "journal.jsonl"),
+            patch(
+                "src.main.prepare_date_chunks",
+                side_effect=lambda s, e, days: [(s, "2024-02-15"), ("2024-02-16", e)],
+            ),
+        ):
+            with patch("src.main.fetch_and_store_weather", side_effect=flaky_fetch):
+                assert main.main([]) is False
+            assert "Re-run with --resume" in caplog.text
+
+            with patch("src.main.fetch_and_store_weather", side_effect=fetch) as mock_fetch:
+                assert main.main(["--resume"]) is True
+
+        mock_fetch.assert_called_once_with(49.41, 8.69, "69115", "2024-02-16", "2024-03-31")
+        assert mock_clean.call_count == 2
+        assert mock_ingest.call_count == 2
+
+    def test_no_location_aborts(
+        self, mock_loc, _range, mock_clean, _ingest, _agg, _preview, caplog
+    ):
+        mock_loc.return_value = None
+        assert main.main([]) is False
+        mock_clean.assert_not_called()
+        assert "[ABORT] Location step failed." in caplog.text
+
+    def test_unchanged_archive_is_not_republished(
+        self, _loc, _range, mock_clean, mock_ingest, _agg, _preview, tmp_path, caplog
+    ):
+        def fetch(lat, lon, postal, start_date, end_date):
+            path = tmp_path / f"raw_weather_{postal}_{start_date}_{end_date}.json"
+            path.write_text(json.dumps({"daily": {"time": [start_date], "rain_sum": [0.4]}}))
+            return path
+
+        with (
+            patch("src.main.JOURNAL_PATH", tmp_path / "journal.jsonl"),
+            patch("src.main.DELTAS_DATA_DIR", tmp_path / "deltas"),
+            patch("src.main.prepare_date_chunks", side_effect=lambda s, e, days: [(s, e)]),
+            patch("src.main.fetch_and_store_weather", side_effect=fetch),
+        ):
+            assert main.main([]) is True
+            assert main.main([]) is True
+
+        assert mock_clean.call_count == 1
+        assert mock_ingest.call_count == 1
+        assert "Archive unchanged, nothing to publish" in caplog.text
+
+    def test_contract_violation_blocks_publish(
+        self, _loc, _range, mock_clean, mock_ingest, _agg, _preview, tmp_path, caplog
+    ):
+        def bad_clean(raw_file, city, postal):
+            path = fake_clean(raw_file, city, postal)
+            df = pd.read_csv(path)
+            pd.concat([df, df]).to_csv(path, index=False)
+            return path
+
+        mock_clean.side_effect = bad_clean
+        with (
+            patch("src.main.JOURNAL_PATH", tmp_path / "journal.jsonl"),
+            patch("src.main.prepare_date_chunks", side_effect=lambda s, e, days: [(s, e)]),
+            patch("src.main.fetch_and_store_weather", side_effect=fake_fetch(tmp_path)),
+        ):
+            assert main.main([]) is False
+
+        mock_ingest.assert_not_called()
+        assert "breaks the contract" in caplog.text
+        assert "duplicate_key" in caplog.text
+
+    def test_daemon_schedules_resolved_locations(
+        self, _loc, _range, mock_clean, _ingest, _agg, _preview, tmp_path
+    ):
+        with (
+            patch("src.main.run_daemon", return_value=True) as mock_daemon,
+            patch("src.main.fetch_and_store_weather", side_effect=fake_fetch(tmp_path)),
+        ):
+            assert main.main(["--daemon"]) is True
+        mock_daemon.assert_called_once_with([LOCATION])
+        mock_clean.assert_not_called()
+
+    def test_daemon_cycle_uses_its_own_journal(
+        self, _loc, _range, mock_clean, _ingest, _agg, _preview, tmp_path
+    ):
+        with (
+            patch("src.main.JOURNAL_PATH", tmp_path / "run_journal.jsonl"),
+            patch("src.main.prepare_date_chunks", side_effect=lambda s, e, days: [(s, e)]),
+            patch("src.main.fetch_and_store_weather", side_effect=fake_fetch(tmp_path)),
+        ):
+            assert main.run_cycle(LOCATION) is True
+        assert (tmp_path / "run_journal_69115.jsonl").exists()
+        assert not (tmp_path / "run_journal.jsonl").exists()
+
+    def test_daemon_cycle_reads_current_settings(
+        self, _loc, _range, mock_clean, _ingest, _agg, _preview, tmp_path
+    ):
+        reloaded = Settings(weather=WeatherSettings(chunk_days=7))
+        with (
+            patch("src.main.JOURNAL_PATH", tmp_path / "run_journal.jsonl"),
+            patch("src.main.get_settings", return_value=reloaded),
+            patch("src.main.prepare_date_chunks", return_value=[]) as mock_chunks,
+            patch("src.main.run_streaming", return_value=["69115"]) as mock_streaming,
+        ):
+            assert main.run_cycle(LOCATION) is False
+        assert mock_chunks.call_args.args[2] == 7
+        mock_streaming.assert_called_once()
@@ -0,0 +1,90 @@
+import os
+
+import pandas as pd
+import pytest
+
+from src import output_validator as ov
+from src.history_store import write_partition
+from src.weather_schema import SOURCE_COLUMNS
+
+
+@pytest.fixture
+def make_frame(cleaned_frame):
+    def make(days=5, **kwargs):
+        values = {spec.column: 1.0 for spec in SOURCE_COLUMNS}
+        return cleaned_frame("2024-01-01", days, **{**values, "Temp_Max_C": 5.0}, **kwargs)
+
+    return make
+
+
+class TestCheckFrame:
+    def test_valid_frame(self, make_frame):
+        assert ov.check_frame(make_frame()) == {}
+
+    def test_counts_each_violation(self, make_frame):
+        df = make_frame()
+        df.loc[1, "Date"] = df.loc[0, "Date"]
+        df.loc[3, "Date"] = pd.Timestamp("2023-12-01")
+        df.loc[2, "Temp_Max_C"] = 75.0
+        df.loc[4, "Temp_Min_C"] = 9.0
+        df.loc[0, "City"] = None
+        assert ov.check_frame(df) == {
+            "duplicate_key": 1,
+            "date_not_increasing": 1,
+            "range:Temp_Max_C": 1,
+            "temp_min_above_max": 1,
+            "null:City": 1,
+        }
+
+    def test_schema_problems(self, make_frame):
+        df = make_frame().drop(columns=["Rain_mm"])
+        df["Snowfall_mm"] = "lots"
+        assert ov.check_frame(df) == {"missing_column:Rain_mm": 1, "dtype:Snowfall_mm": 1}
+
+    def test_interleaved_locations(self, make_frame):
+        df = pd.concat([make_frame(2, postal="69115"), make_frame(2, postal="10115")])
+        assert ov.check_frame(df) == {}
+        df = df.iloc[[0, 2, 1, 3]]
+        assert ov.check_frame(df) == {"location_not_contiguous": 2}
+
+
+class TestValidatePartitions:
+    @pytest.fixture
+    def warehouse(self, tmp_path, make_frame):
+        paths = [write_partition(make_frame(postal=p), p, tmp_path) for p in ("10115", "69115")]
+        bad = tmp_path / "cleaned_weather_80331.csv"
+        make_frame(postal="80331").assign(Temp_Min_C=-40.0).to_csv(bad, index=False)
+        return [*paths, bad]
+
+    def test_reports_and_caches(self, warehouse, tmp_path):
+        cache_path = tmp_path / "cache.json"
+        report = ov.validate_partitions(warehouse, ov.ValidationCache(cache_path), max_workers=2)
+        assert not report.ok
+        assert [r.partition for r in report.failed] == [str(warehouse[2])]
+        assert "cleaned_weather_80331.csv: range:Temp_Min_C=5" in report.summary()
+        assert not any(r.cached for r in report.results)
+
+        again = ov.validate_partitions(warehouse, ov.ValidationCache(cache_path))
+        assert all(r.cached for r in again.results)
+        assert again.failed[0].violations == {"range:Temp_Min_C": 5}
+
+    def test_only_changed_partitions_are_revalidated(
+        self, warehouse, tmp_path, monkeypatch, make_frame
+    ):
+        cache_path = tmp_path / "cache.json"
+        ov.validate_partitions(warehouse, ov.ValidationCache(cache_path), max_workers=1)
+
+        # Touched but identical content: hashed, not re-checked
+        stat = warehouse[0].stat()
+        os.utime(warehouse[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        write_partition(make_frame(7, postal="69115"), "69115", tmp_path)
+
+        checked = []
+        original = ov.check_frame
+        monkeypatch.setattr(
+            ov, "check_frame", lambda df, *a: checked.append(len(df)) or original(df, *a)
+        )
+        report = ov.validate_partitions(warehouse, ov.ValidationCache(cache_path), max_workers=1)
+
+        assert checked == [7]
+        assert [r.cached for r in report.results] == [True, False, True]
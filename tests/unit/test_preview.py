@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import preview
+from src.history_store import write_partition
+
+
+@pytest.fixture
+def daily_frame(cleaned_frame):
+    def make(start, end, **kwargs):
+        day = np.arange(len(pd.date_range(start, end)), dtype=float)
+        return cleaned_frame(
+            start,
+            end=end,
+            Temp_Max_C=10 + 10 * np.sin(day / 58),
+            Precipitation_mm=day % 7,
+            **kwargs,
+        )
+
+    return make
+
+
+class TestLttb:
+    def test_keeps_endpoints_and_spikes(self):
+        x = np.arange(1000, dtype=float)
+        y = np.column_stack([np.sin(x / 50), np.zeros(1000)])
+        y[613, 1] = 40.0
+        picked = preview.lttb_indices(x, y, 50)
+
+        assert picked.shape == (50, 2)
+        assert (picked[0] == 0).all() and (picked[-1] == 999).all()
+        assert (np.diff(picked, axis=0) > 0).all()
+        assert 613 in picked[:, 1]
+
+    def test_short_series_is_kept_whole(self):
+        picked = preview.lttb_indices(np.arange(5.0), np.ones((5, 1)), 10)
+        assert picked[:, 0].tolist() == [0, 1, 2, 3, 4]
+
+
+def test_reservoir_sample_is_uniform_over_chunked_stream():
+    rng = np.random.default_rng(7)
+    positions = []
+    for _ in range(50):
+        sample, seen = pd.DataFrame({"i": pd.Series(dtype=float)}), 0
+        for start in range(0, 10_000, 1_000):
+            chunk = pd.DataFrame({"i": np.arange(start, start + 1_000, dtype=float)})
+            sample = preview.reservoir_update(sample, chunk, seen, 100, rng)
+            seen += len(chunk)
+        assert len(sample) == 100 and sample["i"].is_unique
+        positions.append(sample["i"].to_numpy())
+    assert np.mean(positions) == pytest.approx(5_000, rel=0.05)
+
+
+class TestUpdateLocation:
+    def test_incremental_updates(self, tmp_path, daily_frame):
+        history, root = tmp_path / "history", tmp_path / "preview"
+        first, second = daily_frame("2022-01-01", "2022-12-31"), daily_frame(
+            "2023-01-01", "2023-12-31"
+        )
+        for df in (first, second):
+            write_partition(df, "69115", history)
+
+        assert preview.update_location(first, "69115", root, history, 50, 40) == 365
+        lttb_2022 = preview.load_preview("69115", "lttb", root)
+        assert preview.update_location(second, "69115", root, history, 50, 40) == 365
+
+        lttb = preview.load_preview("69115", "lttb", root)
+        assert lttb.groupby(["Year", "Variable"]).size().tolist() == [40, 40, 40, 40]
+        pd.testing.assert_frame_equal(lttb[lttb["Year"] == 2022].reset_index(drop=True), lttb_2022)
+        sample = preview.load_preview("69115", "sample", root)
+        assert len(sample) == 50 and sample["Date"].is_monotonic_increasing
+        assert list(sample.columns) == ["Date", "Temp_Max_C", "Precipitation_mm"]
+
+    def test_republished_rows_refresh_sample_only(self, tmp_path, daily_frame):
+        history, root = tmp_path / "history", tmp_path / "preview"
+        df = daily_frame("2023-01-01", "2023-03-31")
+        write_partition(df, "69115", history)
+        preview.update_location(df, "69115", root, history, 20, 30)
+
+        revised = df.assign(Temp_Max_C=-5.0)
+        write_partition(revised, "69115", history)
+        assert preview.update_location(revised, "69115", root, history, 20, 30) == 0
+
+        assert (preview.load_preview("69115", "sample", root)["Temp_Max_C"] == -5.0).all()
+        assert (
+            preview.load_preview("69115", "lttb", root).query("Variable == 'Temp_Max_C'")["Value"]
+            == -5.0
+        ).all()
+
+    def test_unknown_kind(self, tmp_path):
+        with pytest.raises(ValueError):
+            preview.load_preview("69115", "full", tmp_path)
@@ -0,0 +1,139 @@
+import cProfile
+import json
+import threading
+
+import pytest
+
+from src import profiling
+from src.profiling import RunProfiler, profile_stage, run_stage
+
+
+def parse_rows(n):
+    return [str(i) * 8 for i in range(n)]
+
+
+@pytest.fixture
+def profiler(tmp_path):
+    active = profiling.start_profiling("run_1", tmp_path)
+    yield active
+    profiling.stop_profiling()
+
+
+def test_disabled_profiling_is_a_passthrough():
+    assert profiling._active is None
+    with profile_stage("clean"):
+        pass
+    assert profiling.stop_profiling() is None
+
+
+def test_stages_collect_calls_time_and_memory(profiler):
+    kept = []
+    for _ in range(3):
+        with profile_stage("clean"):
+            kept.append(parse_rows(5_000))
+
+    stage = profiler.stages["clean"]
+    assert stage.calls == 3
+    assert stage.wall_seconds > 0
+    assert stage.peak_bytes > 250_000
+    assert stage.snapshot is not None
+    assert "parse_rows" in profiler.report(0)
+
+
+def test_concurrent_stages_take_turns(profiler):
+    # From Python 3.12 a second enabled profiler raises; overlapping stages must not
+    inside, seen, errors = [], [], []
+    start = threading.Barrier(4)
+
+    def work(name):
+        start.wait()
+        try:
+            for _ in range(20):
+                with profile_stage(name):
+                    inside.append(name)
+                    seen.append(len(inside))
+                    parse_rows(200)
+                    inside.pop()
+        except Exception as e:
+            errors.append(e)
+
+    workers = [
+        threading.Thread(target=work, args=(n,)) for n in ("fetch", "fetch", "clean", "clean")
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert errors == []
+    assert max(seen) == 1
+    assert profiler.stages["fetch"].calls == profiler.stages["clean"].calls == 40
+    assert "parse_rows" in profiler.report(0)
+
+
+def test_failed_enable_leaves_no_stale_profiler(profiler):
+    class Busy(cProfile.Profile):
+        def enable(self, *args, **kwargs):
+            raise ValueError("Another profiling tool is already active")
+
+    profiler.stages["fetch"] = profiling.StageProfile("fetch", profile=Busy())
+    with profile_stage("publish"):
+        with pytest.raises(ValueError):
+            with profile_stage("fetch"):
+                pass
+        parse_rows(10)
+
+    assert profiler._stack == []
+    assert any(func[2] == "parse_rows" for func in profiler.stages["publish"].stats().stats)
+
+
+def test_nested_stage_resumes_outer_profile(profiler):
+    with profile_stage("publish"):
+        with profile_stage("preview"):
+            parse_rows(10)
+        parse_rows(10)
+
+    outer = profiler.stages["publish"].stats()
+    inner = profiler.stages["preview"].stats()
+    # The outer stage keeps recording after the nested one returns
+    assert any(func[2] == "parse_rows" for func in outer.stats)
+    assert any(func[2] == "parse_rows" for func in inner.stats)
+
+
+def test_finish_writes_reports_under_run_id(profiler, tmp_path):
+    profiling.set_run_id("20240501_083000")
+    with profile_stage("clean"):
+        parse_rows(1000)
+
+    out_dir = profiling.stop_profiling()
+    assert out_dir == tmp_path / "20240501_083000"
+    assert (out_dir / "clean.prof").exists()
+    report = (out_dir / "report.txt").read_text()
+    assert "=== clean: 1 calls" in report
+    assert "cumulative-time hotspots" in report and "allocation sites" in report
+    summary = json.loads((out_dir / "summary.json").read_text())
+    assert summary["stages"]["clean"]["calls"] == 1
+    assert profiling._active is None
+
+
+def test_run_stage_profiles_only_when_asked(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", tmp_path)
+
+    assert run_stage(lambda: "plain", "preview", []) == "plain"
+    assert not any(tmp_path.iterdir())
+
+    assert run_stage(lambda: parse_rows(100), "preview", ["--profile"])[1] == "11111111"
+    (out_dir,) = tmp_path.iterdir()
+    assert out_dir.name.endswith("_preview")
+    assert (out_dir / "preview.prof").exists()
+
+
+def test_profiler_is_reusable_after_stop(tmp_path):
+    first = RunProfiler("a", tmp_path)
+    first.start()
+    first.finish()
+    second = RunProfiler("b", tmp_path)
+    second.start()
+    with second.stage("fetch"):
+        parse_rows(10)
+    assert (second.finish() / "fetch.prof").exists()
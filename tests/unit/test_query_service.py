@@ -0,0 +1,126 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from src import main
+from src.history_store import write_partition
+from src.query_service import QueryService, add_query_arguments, parse_condition, run_query
+
+
+@pytest.fixture
+def history(tmp_path):
+    dates = pd.date_range("2023-06-01", "2024-08-31")
+    for i, (postal, city) in enumerate([("69115", "Heidelberg"), ("10115", "Berlin")]):
+        df = pd.DataFrame(
+            {
+                "Date": dates,
+                "Temp_Max_C": np.arange(len(dates), dtype=float) + i * 100,
+                "Precipitation_mm": 1.0,
+                "City": city,
+                "PostalCode": postal,
+            }
+        )
+        write_partition(df, postal, tmp_path)
+    return tmp_path
+
+
+class TestQueryService:
+    def test_max_per_postal_for_a_month(self, history):
+        result = QueryService(history).query_frame(
+            start="2024-07-01",
+            end="2024-07-31",
+            group_by=["PostalCode"],
+            aggregates=["Temp_Max_C:max"],
+        )
+        july_end = (pd.Timestamp("2024-07-31") - pd.Timestamp("2023-06-01")).days
+        assert result.to_dict("list") == {
+            "PostalCode": ["10115", "69115"],
+            "Temp_Max_C_max": [july_end + 100.0, float(july_end)],
+        }
+
+    def test_derived_keys_and_multiple_aggregates(self, history):
+        result = QueryService(history).query_frame(
+            postals=["69115"],
+            group_by=["Year", "Month"],
+            aggregates=[("Precipitation_mm", "sum"), ("Temp_Max_C", "count")],
+        )
+        assert len(result) == 15
+        june = result[(result["Year"] == 2023) & (result["Month"] == 6)].iloc[0]
+        assert june["Precipitation_mm_sum"] == 30.0
+        assert june["Temp_Max_C_count"] == 30
+
+    def test_filter_and_projection(self, history):
+        table = QueryService(history).query(
+            columns=["Date", "City"], where=["Temp_Max_C >= 450", "City = Berlin"]
+        )
+        assert table.column_names == ["Date", "City"]
+        assert set(table.column("City").to_pylist()) == {"Berlin"}
+        assert table.num_rows == len(pd.date_range("2023-06-01", "2024-08-31")) - 350
+
+    def test_limit(self, history):
+        service = QueryService(history)
+        table = service.query(columns=["Date"], postals=["69115"], start="2024-01-01", limit=3)
+        assert table.column("Date").to_pylist() == list(pd.date_range("2024-01-01", periods=3))
+        assert service.query(limit=0).num_rows == 0
+
+        grouped = service.query(group_by=["PostalCode"], aggregates=["Temp_Max_C:max"], limit=1)
+        assert grouped.column("PostalCode").to_pylist() == ["10115"]
+
+    def test_sees_rewritten_partitions(self, history):
+        service = QueryService(history)
+        assert service.query(postals=["80331"]).num_rows == 0
+        write_partition(
+            pd.DataFrame(
+                {
+                    "Date": pd.to_datetime(["2024-01-01"]),
+                    "Temp_Max_C": [1.0],
+                    "Precipitation_mm": [0.0],
+                    "City": ["München"],
+                    "PostalCode": ["80331"],
+                }
+            ),
+            "80331",
+            history,
+        )
+        assert service.query(postals=["80331"]).num_rows == 1
+
+    def test_numeric_looking_values_follow_the_column_type(self, history):
+        service = QueryService(history)
+        berlin = service.query(columns=["City"], where=["PostalCode = 10115"])
+        assert set(berlin.column("City").to_pylist()) == {"Berlin"}
+        recent = service.query(where=["Date >= 2024-08-30", "PostalCode != '69115'"])
+        assert recent.num_rows == 2
+
+    def test_uncastable_value_is_invalid(self, history):
+        with pytest.raises(pa.ArrowInvalid):
+            QueryService(history).query(where=["Temp_Max_C > warm"])
+
+    def test_empty_store(self, tmp_path):
+        assert QueryService(tmp_path).query().num_rows == 0
+
+    @pytest.mark.parametrize("condition", ["Temp_Max_C", "> 3", "Temp_Max_C ~ 3"])
+    def test_bad_condition(self, condition):
+        with pytest.raises(ValueError):
+            parse_condition(condition)
+
+
+def test_cli_subcommand_writes_csv(history, tmp_path, monkeypatch):
+    output = tmp_path / "out.csv"
+    monkeypatch.setattr(main, "HISTORY_DATA_DIR", history)
+    argv = ["query", "--group-by", "City", "--agg", "Temp_Max_C:min", "--output", str(output)]
+    assert main.main(argv) is True
+    assert pd.read_csv(output).to_dict("list") == {
+        "City": ["Berlin", "Heidelberg"],
+        "Temp_Max_C_min": [100.0, 0.0],
+    }
+
+
+def test_cli_reports_invalid_query(history, caplog):
+    parser = argparse.ArgumentParser()
+    add_query_arguments(parser)
+    for argv in (["--agg", "Temp_Max_C:median"], ["--columns", "Nope"]):
+        assert run_query(parser.parse_args(argv), history) is False
+    assert "[QUERY] Invalid query" in caplog.text
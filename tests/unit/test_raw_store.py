@@ -0,0 +1,84 @@
+import json
+from unittest.mock import patch
+
+from src import data_cleaner as dc
+from src import raw_store as rs
+from src import weather_data_fetcher as wdf
+from src.weather_schema import SCHEMA_VERSION
+
+PAYLOAD = {
+    "latitude": 49.4,
+    "longitude": 8.7,
+    "generationtime_ms": 0.31,
+    "daily": {
+        "time": ["2024-01-01", "2024-01-02"],
+        "temperature_2m_max": [5.0, 6.0],
+        "temperature_2m_min": [-1.0, 0.0],
+        "temperature_2m_mean": [2.0, 3.0],
+        "precipitation_sum": [1.2, 0.8],
+        "rain_sum": [1.0, 0.5],
+        "snowfall_sum": [0.2, 0.3],
+        "windspeed_10m_max": [10.0, 12.0],
+        "shortwave_radiation_sum": [3.5, 3.6],
+        "sunshine_duration": [120, 150],
+    },
+}
+
+
+class TestBlobs:
+    def test_identical_payloads_share_one_blob(self, tmp_path):
+        first, stored_first = rs.write_blob(PAYLOAD, tmp_path)
+        second, stored_second = rs.write_blob({**PAYLOAD, "generationtime_ms": 9.9}, tmp_path)
+
+        assert first == second
+        assert (stored_first, stored_second) == (True, False)
+        assert len(list((tmp_path / rs.BLOB_DIR_NAME).rglob("*.json"))) == 1
+
+    def test_changed_payload_gets_new_blob(self, tmp_path):
+        changed = {**PAYLOAD, "daily": {**PAYLOAD["daily"], "rain_sum": [1.0, 0.6]}}
+        assert rs.write_blob(PAYLOAD, tmp_path)[0] != rs.write_blob(changed, tmp_path)[0]
+
+
+class TestFetchAndClean:
+    def fetch(self, raw_dir, start="2024-01-01", end="2024-01-02"):
+        with (
+            patch.object(wdf, "RAW_DATA_DIR", raw_dir),
+            patch.object(wdf, "get_weather_data", return_value=PAYLOAD),
+        ):
+            return wdf.fetch_and_store_weather(49.4, 8.7, "69115", start, end)
+
+    def test_fetch_writes_ref_that_cleaner_resolves(self, tmp_path):
+        ref_file = self.fetch(tmp_path)
+
+        assert ref_file.name.endswith(rs.REF_SUFFIX)
+        assert rs.is_ref(json.loads(ref_file.read_text()))
+        assert dc.load_raw_weather(ref_file) == rs.normalize_payload(PAYLOAD)
+
+    def test_cleaner_skips_already_processed_blob(self, tmp_path):
+        staging = tmp_path / "staging"
+        first_ref = self.fetch(tmp_path, "2024-01-01", "2024-01-02")
+        second_ref = self.fetch(tmp_path, "2024-01-01", "2024-01-03")
+
+        with patch.object(dc, "STAGING_DATA_DIR", staging):
+            first = dc.process_raw_file(first_ref, "Heidelberg", "69115")
+            with patch.object(dc, "build_dataframe", wraps=dc.build_dataframe) as build:
+                second = dc.process_raw_file(second_ref, "Heidelberg", "69115")
+
+        assert second == first
+        build.assert_not_called()
+        assert len(list(staging.glob("*.csv"))) == 1
+
+    def test_other_city_is_cleaned_again(self, tmp_path):
+        ref_file = self.fetch(tmp_path)
+        with patch.object(dc, "STAGING_DATA_DIR", tmp_path / "staging"):
+            dc.process_raw_file(ref_file, "Heidelberg", "69115")
+            assert rs.processed_output(ref_file, "69115", "Heidelberg", SCHEMA_VERSION)
+            assert rs.processed_output(ref_file, "69115", "Mannheim", SCHEMA_VERSION) is None
+
+    def test_older_schema_version_is_cleaned_again(self, tmp_path):
+        ref_file = self.fetch(tmp_path)
+        cleaned = tmp_path / "cleaned.csv"
+        cleaned.write_text("Date\n")
+        rs.mark_processed(ref_file, "69115", "Heidelberg", cleaned, version="1")
+        assert rs.processed_output(ref_file, "69115", "Heidelberg", "1") == cleaned
+        assert rs.processed_output(ref_file, "69115", "Heidelberg", SCHEMA_VERSION) is None
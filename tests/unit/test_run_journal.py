@@ -0,0 +1,81 @@
+import pytest
+
+from src.file_utils import atomic_path, atomic_write
+from src.run_journal import RunJournal
+
+PLAN = {"start_date": "2024-01-01", "end_date": "2024-12-31"}
+
+
+class TestRunJournal:
+    def test_fresh_run_ignores_previous_units(self, tmp_path):
+        path = tmp_path / "journal.jsonl"
+        first = RunJournal(path)
+        first.start(PLAN)
+        first.mark_done("69115", "c1", "fetch")
+
+        second = RunJournal(path)
+        second.start(PLAN)
+        assert not second.is_done("69115", "c1", "fetch")
+
+    def test_resume_restores_plan_and_units(self, tmp_path):
+        path = tmp_path / "journal.jsonl"
+        artifact = tmp_path / "raw.json"
+        artifact.write_text("{}")
+        first = RunJournal(path)
+        first.start(PLAN)
+        first.mark_done("69115", "c1", "fetch", artifact)
+
+        resumed = RunJournal(path)
+        plan = resumed.start({"start_date": "2025-01-01", "end_date": "2025-12-31"}, resume=True)
+        assert plan == PLAN
+        assert resumed.run_id == first.run_id
+        assert resumed.is_done("69115", "c1", "fetch")
+        assert resumed.artifact("69115", "c1", "fetch") == artifact
+
+    def test_missing_artifact_is_not_reused(self, tmp_path):
+        journal = RunJournal(tmp_path / "journal.jsonl")
+        journal.start(PLAN)
+        journal.mark_done("69115", "c1", "fetch", tmp_path / "deleted.json")
+        assert journal.artifact("69115", "c1", "fetch") is None
+
+    def test_torn_last_line_is_skipped(self, tmp_path, caplog):
+        path = tmp_path / "journal.jsonl"
+        journal = RunJournal(path)
+        journal.start(PLAN)
+        journal.mark_done("69115", "c1", "clean")
+        with open(path, "a", encoding="utf-8") as f:
+            f.write('{"event": "done", "run_')
+
+        resumed = RunJournal(path)
+        resumed.start(PLAN, resume=True)
+        assert resumed.is_done("69115", "c1", "clean")
+        assert "[JOURNAL] Skipping unreadable journal line" in caplog.text
+
+    def test_resume_without_journal_starts_fresh(self, tmp_path, caplog):
+        journal = RunJournal(tmp_path / "journal.jsonl")
+        assert journal.start(PLAN, resume=True) == PLAN
+        assert "[JOURNAL] Nothing to resume" in caplog.text
+
+    def test_mark_done_requires_start(self, tmp_path):
+        with pytest.raises(RuntimeError):
+            RunJournal(tmp_path / "journal.jsonl").mark_done("69115", "c1", "fetch")
+
+
+class TestAtomicWrites:
+    def test_atomic_write_replaces_target(self, tmp_path):
+        target = tmp_path / "out.json"
+        target.write_text("old")
+        with atomic_write(target) as f:
+            f.write("new")
+        assert target.read_text() == "new"
+        assert list(tmp_path.iterdir()) == [target]
+
+    def test_failed_write_keeps_original(self, tmp_path):
+        target = tmp_path / "out.csv"
+        target.write_text("old")
+        with pytest.raises(ValueError):
+            with atomic_path(target) as tmp:
+                tmp.write_text("partial")
+                raise ValueError("boom")
+        assert target.read_text() == "old"
+        assert list(tmp_path.iterdir()) == [target]
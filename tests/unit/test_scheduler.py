@@ -0,0 +1,111 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.scheduler import CronSchedule, Scheduler, stagger_offset
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestCronSchedule:
+    @pytest.mark.parametrize(
+        "expression, after, expected",
+        [
+            ("30 8 * * *", datetime(2024, 5, 1, 8, 30), datetime(2024, 5, 2, 8, 30)),
+            ("30 8 * * *", datetime(2024, 5, 1, 7, 59), datetime(2024, 5, 1, 8, 30)),
+            ("*/15 * * * *", datetime(2024, 5, 1, 10, 16), datetime(2024, 5, 1, 10, 30)),
+            # 2024-05-04 is a Saturday; weekdays only
+            ("0 6 * * 1-5", datetime(2024, 5, 4, 12, 0), datetime(2024, 5, 6, 6, 0)),
+            # Sunday written as 7
+            ("0 0 * * 7", datetime(2024, 5, 1), datetime(2024, 5, 5)),
+            ("0 0 29 2 *", datetime(2024, 3, 1), datetime(2028, 2, 29)),
+            # Both day fields restricted: either may match
+            ("0 12 1 * 1", datetime(2024, 5, 1, 13, 0), datetime(2024, 5, 6, 12, 0)),
+        ],
+    )
+    def test_next_after(self, expression, after, expected):
+        assert CronSchedule(expression).next_after(after) == expected
+
+    @pytest.mark.parametrize("expression", ["* * *", "60 * * * *", "0 0 * 13 *", "*/0 * * * *"])
+    def test_invalid_expressions(self, expression):
+        with pytest.raises(ValueError):
+            CronSchedule(expression)
+
+
+def test_stagger_offset_is_stable_and_bounded():
+    window = timedelta(minutes=60)
+    offsets = [stagger_offset(f"weather:{i:05d}", window) for i in range(200)]
+    assert offsets == [stagger_offset(f"weather:{i:05d}", window) for i in range(200)]
+    assert all(timedelta(0) <= o < window for o in offsets)
+    assert len({o // timedelta(minutes=10) for o in offsets}) == 6
+
+
+class TestScheduler:
+    def test_runs_due_jobs_at_staggered_slots(self):
+        clock = FakeClock(datetime(2024, 5, 1, 8, 0))
+        scheduler = Scheduler(max_workers=2, clock=clock)
+        runs = []
+        job = scheduler.add(
+            "weather:69115",
+            CronSchedule("30 8 * * *"),
+            lambda: runs.append(clock.now),
+            stagger=timedelta(minutes=30),
+        )
+        slot = datetime(2024, 5, 1, 8, 30) + job.offset
+        assert job.next_run == slot
+
+        clock.now = slot - timedelta(seconds=1)
+        assert scheduler.run_pending() == 0
+        clock.now = slot
+        assert scheduler.run_pending() == 1
+        scheduler.pool.shutdown(wait=True)
+
+        assert runs == [slot]
+        assert job.next_run == slot + timedelta(days=1)
+
+    def test_skips_slot_while_previous_run_is_active(self, caplog):
+        clock = FakeClock(datetime(2024, 5, 1, 0, 0))
+        scheduler = Scheduler(max_workers=2, clock=clock)
+        release = threading.Event()
+        scheduler.add("slow", CronSchedule("* * * * *"), release.wait, run_now=True)
+
+        assert scheduler.run_pending() == 1
+        clock.now += timedelta(minutes=1)
+        assert scheduler.run_pending() == 0
+        assert "still running" in caplog.text
+
+        release.set()
+        scheduler.jobs[0].running.result(timeout=5)
+        clock.now += timedelta(minutes=1)
+        assert scheduler.run_pending() == 1
+
+    def test_failing_job_keeps_daemon_alive(self, caplog):
+        clock = FakeClock(datetime(2024, 5, 1, 0, 0))
+        scheduler = Scheduler(clock=clock)
+        scheduler.add("boom", CronSchedule("* * * * *"), lambda: 1 / 0, run_now=True)
+
+        stopper = threading.Timer(0.2, scheduler.stop)
+        stopper.start()
+        scheduler.run_forever(poll_seconds=0.05)
+        assert "[JOB] boom raised" in caplog.text
+
+    def test_reconfigure_replans_jobs_and_resizes_pool(self):
+        clock = FakeClock(datetime(2024, 5, 1, 8, 0))
+        scheduler = Scheduler(max_workers=1, clock=clock)
+        job = scheduler.add("weather:69115", CronSchedule("30 8 * * *"), lambda: None)
+        old_pool = scheduler.pool
+
+        scheduler.reconfigure(CronSchedule("0 9 * * *"), timedelta(0), max_workers=3)
+
+        assert job.next_run == datetime(2024, 5, 1, 9, 0)
+        assert scheduler.pool is not old_pool and scheduler.pool._max_workers == 3
+        clock.now = datetime(2024, 5, 1, 9, 0)
+        assert scheduler.run_pending() == 1
+        scheduler.pool.shutdown(wait=True)
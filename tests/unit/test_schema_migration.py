@@ -0,0 +1,85 @@
+import pandas as pd
+import pytest
+
+from src import aggregates, preview
+from src import schema_migration as sm
+from src.history_store import HistoryStore, frame_to_table, partition_path
+from src.query_service import QueryService
+from src.weather_schema import add_derived_metrics
+
+
+@pytest.fixture
+def legacy_frame(cleaned_frame):
+    def make(start="2023-01-01", periods=60, **kwargs):
+        return cleaned_frame(
+            start,
+            periods,
+            Temp_Max_C=4.0,
+            Temp_Min_C=-2.0,
+            Temp_Mean_C=1.0,
+            Precipitation_mm=2.0,
+            Snowfall_mm=1.5,
+            Radiation_Sum_kWh=3.6,
+            Sunshine_Minutes=7200.0,
+            Temp_Max_C_Z=0.5,
+            **kwargs,
+        )
+
+    return make
+
+
+@pytest.fixture
+def roots(tmp_path, legacy_frame):
+    history = tmp_path / "history"
+    history.mkdir()
+    # Written as before versioning: no schema metadata, version "1" units
+    frame_to_table(legacy_frame()).to_pandas().to_feather(partition_path("69115", history))
+    return history, tmp_path / "aggregates", tmp_path / "preview"
+
+
+def test_legacy_partition_is_hidden_until_migrated(roots):
+    history, aggregates_root, preview_root = roots
+    assert HistoryStore(history).read_frame("69115").empty
+    assert QueryService(history).partitions() == []
+
+    assert sm.migrate_location("69115", history, aggregates_root, preview_root) == 60
+    df = HistoryStore(history).read_frame("69115")
+    assert df["Snowfall_mm"].unique().tolist() == [15.0]
+    assert df["Radiation_Sum_kWh"].unique().tolist() == [1.0]
+    assert df["Sunshine_Minutes"].unique().tolist() == [120.0]
+    assert df["Sunshine_Hours"].unique().tolist() == [2.0]
+    assert df["Frost_Day"].unique().tolist() == [1.0]
+    assert df["Temp_Max_C_Z"].unique().tolist() == [0.5]
+    assert QueryService(history).query(columns=["Snowfall_mm"]).num_rows == 60
+
+    assert sm.migrate_location("69115", history, aggregates_root, preview_root) == 0
+
+
+def test_rollups_and_previews_are_rebuilt(roots, legacy_frame):
+    history, aggregates_root, preview_root = roots
+    aggregates.update_location(legacy_frame(), "69115", aggregates_root)
+    sm.migrate_location("69115", history, aggregates_root, preview_root)
+
+    monthly = aggregates.load_rollup("69115", "monthly", aggregates_root)
+    assert monthly["Snowfall_mm_sum"].tolist() == [465.0, 420.0, 15.0]
+    assert monthly["Days"].tolist() == [31, 28, 1]
+    assert "Temp_Max_C_Z_mean" not in monthly.columns
+
+    lttb = preview.load_preview("69115", "lttb", preview_root)
+    snow = lttb.loc[lttb["Variable"] == "Snowfall_mm", "Value"]
+    assert snow.unique().tolist() == [15.0]
+
+
+def test_rows_already_in_current_units_are_kept(roots, legacy_frame):
+    history, aggregates_root, preview_root = roots
+    path = partition_path("69115", history)
+    current = add_derived_metrics(
+        legacy_frame(start="2023-03-01", periods=2).assign(Snowfall_mm=30.0, Sunshine_Minutes=60.0)
+    )
+    mixed = pd.concat([pd.read_feather(path), current], ignore_index=True)
+    frame_to_table(mixed).to_pandas().to_feather(path)
+
+    assert sm.migrate_location("69115", history, aggregates_root, preview_root) == 60
+    df = HistoryStore(history).read_frame("69115", start="2023-03-01")
+    assert df["Snowfall_mm"].tolist() == [30.0, 30.0]
+    assert df["Sunshine_Hours"].tolist() == [1.0, 1.0]
@@ -0,0 +1,150 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import series_store as ss
+
+
+@pytest.fixture
+def daily_frame(cleaned_frame):
+    def make(start="2023-01-01", periods=100, seed=0, **kwargs):
+        rng = np.random.default_rng(seed)
+        return cleaned_frame(
+            start,
+            periods,
+            Temp_Max_C=np.round(rng.normal(15, 5, periods), 1),
+            Radiation_Sum_kWh=np.round(rng.gamma(2, 1, periods), 2),
+            Sunshine_Hours=rng.normal(size=periods),
+            **kwargs,
+        )
+
+    return make
+
+
+class TestCodec:
+    def test_bit_packing_round_trip(self):
+        rng = np.random.default_rng(1)
+        widths = rng.integers(1, 65, 500)
+        values = rng.integers(0, 2**63, 500, dtype=np.uint64) >> (64 - widths).astype(np.uint64)
+
+        packed = ss.pack_bits(values, widths)
+        assert len(packed) == (widths.sum() + 7) // 8
+        np.testing.assert_array_equal(ss.unpack_bits(packed, widths), values)
+
+    @pytest.mark.parametrize(
+        "values",
+        [
+            np.array([12.3, 12.3, 12.4, -3.1, np.nan, 0.0, 1e3]),
+            np.array([0.1 + 0.2, np.pi, -np.e, np.nan, np.inf, 5e-324]),
+            np.array([np.nan, np.nan]),
+            np.array([]),
+        ],
+    )
+    def test_column_round_trip(self, values):
+        meta, blobs = ss.encode_column(values)
+        np.testing.assert_array_equal(ss.decode_column(len(values), meta, blobs), values)
+
+    def test_codec_choice(self):
+        assert ss.encode_column(np.array([1.25, 1.5]))[0]["codec"] == "delta"
+        assert ss.encode_column(np.array([np.pi, 1.5]))[0]["codec"] == "xor"
+
+    def test_regular_dates_and_repeats_compress_to_bits(self, tmp_path):
+        days = np.arange(19000, 19366)
+        size = ss.write_segment(tmp_path / "seg.bin", days, {"Flag": np.zeros(366)})
+        read_days, values = ss.read_segment(tmp_path / "seg.bin")
+
+        np.testing.assert_array_equal(read_days, days)
+        np.testing.assert_array_equal(values["Flag"], np.zeros(366))
+        assert size < 366 * 16 / 20
+
+
+class TestSeriesStore:
+    def test_round_trip_across_segments_and_head(self, tmp_path, daily_frame):
+        store = ss.SeriesStore(tmp_path, segment_rows=30)
+        df = daily_frame()
+        store.append(df.iloc[:45])
+        for i in range(45, 100):
+            store.append(df.iloc[i : i + 1])
+
+        assert len(store.index("69115")["segments"]) == 3
+        pd.testing.assert_frame_equal(store.read_frame("69115")[df.columns], df)
+
+    def test_daily_append_only_grows_head(self, tmp_path, daily_frame):
+        store = ss.SeriesStore(tmp_path, segment_rows=30)
+        df = daily_frame(periods=40)
+        store.append(df.iloc[:31])
+        head = tmp_path / "postal=69115" / "head.bin"
+        before = head.stat().st_size
+
+        store.append(df.iloc[31:32])
+        assert head.stat().st_size - before == 8 * 4
+        assert [p.name for p in sorted(head.parent.glob("seg-*"))] == ["seg-000001.bin"]
+
+    def test_range_read_decodes_only_overlapping_segments(self, tmp_path, monkeypatch, daily_frame):
+        store = ss.SeriesStore(tmp_path, segment_rows=30)
+        df = daily_frame()
+        store.append(df)
+        decoded = []
+        read_segment = ss.read_segment
+        monkeypatch.setattr(
+            ss,
+            "read_segment",
+            lambda path, columns=None: decoded.append(path.name) or read_segment(path, columns),
+        )
+
+        out = store.read_frame("69115", "2023-02-05", "2023-02-10", columns=["Temp_Max_C"])
+        assert decoded == ["seg-000002.bin"]
+        assert out["Date"].dt.day.tolist() == [5, 6, 7, 8, 9, 10]
+        assert list(out.columns) == ["Date", "Temp_Max_C", "City", "PostalCode"]
+
+    def test_republished_rows_append_only_revisions(self, tmp_path, daily_frame):
+        store = ss.SeriesStore(tmp_path, segment_rows=30)
+        df = daily_frame(periods=60)
+        store.append(df)
+        revised = df.copy()
+        revised.loc[10, "Temp_Max_C"] = 99.0
+
+        assert store.append(revised) == 1
+        out = store.read_frame("69115")
+        assert len(out) == 60
+        assert out.loc[10, "Temp_Max_C"] == 99.0
+
+    def test_republished_annotations_are_not_revisions(self, tmp_path, daily_frame):
+        store = ss.SeriesStore(tmp_path, segment_rows=30)
+        df = daily_frame(periods=60)
+        store.append(df.assign(Temp_Max_C_Z=0.5, Anomaly_Flag=0))
+
+        assert store.append(df.assign(Temp_Max_C_Z=-1.5, Anomaly_Flag=1)) == 0
+        assert "Anomaly_Flag" not in store.read_frame("69115").columns
+
+        # Scores of a variable added to the anomaly settings by a reload
+        assert store.append(df.assign(Sunshine_Hours_Z=2.0)) == 0
+        assert "Sunshine_Hours_Z" not in store.read_frame("69115").columns
+
+    def test_new_columns_seal_the_open_segment(self, tmp_path, daily_frame):
+        store = ss.SeriesStore(tmp_path, segment_rows=30)
+        df = daily_frame(periods=40)
+        store.append(df.iloc[:35].drop(columns="Sunshine_Hours"))
+        store.append(df.iloc[35:])
+
+        segments = store.index("69115")["segments"]
+        assert [s["rows"] for s in segments] == [30, 5]
+        out = store.read_frame("69115")
+        assert out["Sunshine_Hours"].isna().sum() == 35
+        np.testing.assert_array_equal(out["Temp_Max_C"], df["Temp_Max_C"])
+
+    def test_torn_head_record_is_ignored(self, tmp_path, daily_frame):
+        store = ss.SeriesStore(tmp_path, segment_rows=30)
+        store.append(daily_frame(periods=5))
+        with open(tmp_path / "postal=69115" / "head.bin", "ab") as f:
+            f.write(b"\x01\x02\x03")
+
+        assert len(store.read_frame("69115")) == 5
+        store.append(daily_frame(start="2023-01-06", periods=1))
+        assert store.read_frame("69115")["Date"].dt.day.tolist() == [1, 2, 3, 4, 5, 6]
+
+    def test_locations(self, tmp_path, daily_frame):
+        store = ss.SeriesStore(tmp_path)
+        store.append(pd.concat([daily_frame(postal="69115"), daily_frame(postal="10115")]))
+        assert store.locations() == ["10115", "69115"]
+        assert store.read_frame("00000").empty
@@ -0,0 +1,106 @@
+import os
+
+import pytest
+
+from src.settings import (
+    LocationSettings,
+    Settings,
+    SettingsError,
+    SettingsStore,
+    changed_keys,
+    load_settings,
+    parse_settings,
+)
+
+
+def test_repository_settings_file_is_valid():
+    settings = load_settings()
+    assert settings.weather.chunk_days == 365
+    assert settings.pipeline.cleaned_format in ("csv", "arrow")
+
+
+def test_defaults_and_coercion():
+    settings = parse_settings(
+        {
+            "weather": {"providers": ["open_meteo", "era5"]},
+            "scheduler": {"run_on_start": "yes", "stagger_minutes": 5},
+            "locations": [69115, "Berlin", {"latitude": 1.0, "longitude": 2.0, "postal": 10115}],
+        }
+    )
+    assert settings.evaluation == Settings().evaluation
+    assert settings.weather.providers == ("open_meteo", "era5")
+    assert settings.scheduler.run_on_start is True
+    assert settings.scheduler.stagger_minutes == 5.0
+    assert settings.locations == ("69115", "Berlin", LocationSettings(1.0, 2.0, "10115", None))
+    assert settings.locations[2].as_location()["city"] == "Unknown"
+
+
+@pytest.mark.parametrize(
+    "data, message",
+    [
+        ({"pipeline": {"fetch_workers": 0}}, "pipeline.fetch_workers: must be >= 1"),
+        ({"pipeline": {"fetch_workers": 2.5}}, "pipeline.fetch_workers: expected int"),
+        ({"pipeline": {"cleaned_format": "xlsx"}}, "pipeline.cleaned_format: must be one of"),
+        ({"pipline": {}}, "unknown keys ['pipline']"),
+        ({"scheduler": {"run_on_start": "maybe"}}, "expected true/false"),
+        ({"features": {"lags": "1,x"}}, "features.lags[1]: expected int"),
+    ],
+)
+def test_invalid_settings_name_the_key(data, message):
+    with pytest.raises(SettingsError, match=message.replace("[", r"\[").replace("]", r"\]")):
+        parse_settings(data)
+
+
+def test_environment_overrides_file(monkeypatch):
+    monkeypatch.setenv("PIPELINE_FETCH_WORKERS", "9")
+    monkeypatch.setenv("WEATHER_PROVIDERS", "era5, local_dump")
+    settings = parse_settings({"pipeline": {"fetch_workers": 2}})
+    assert settings.pipeline.fetch_workers == 9
+    assert settings.weather.providers == ("era5", "local_dump")
+
+
+class TestSettingsStore:
+    def write(self, path, body, bump=0):
+        path.write_text(body)
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + bump))
+
+    def test_reload_notifies_listeners_with_changes(self, tmp_path):
+        path = tmp_path / "settings.yaml"
+        self.write(path, "pipeline:\n  fetch_workers: 2\n")
+        store = SettingsStore(path)
+        changes = []
+        store.on_change(lambda old, new: changes.append(changed_keys(old, new)))
+
+        assert store.reload_if_changed() is False
+        self.write(path, "pipeline:\n  fetch_workers: 6\n", bump=10**9)
+        assert store.reload_if_changed() is True
+        assert store.current.pipeline.fetch_workers == 6
+        assert changes == [["pipeline.fetch_workers"]]
+
+    def test_invalid_edit_keeps_last_good_settings(self, tmp_path, caplog):
+        path = tmp_path / "settings.yaml"
+        self.write(path, "pipeline:\n  queue_size: 4\n")
+        store = SettingsStore(path)
+
+        self.write(path, "pipeline:\n  queue_size: -1\n", bump=10**9)
+        assert store.reload_if_changed() is False
+        assert store.current.pipeline.queue_size == 4
+        assert "Reload rejected" in caplog.text
+
+    def test_watch_picks_up_edits(self, tmp_path):
+        path = tmp_path / "settings.yaml"
+        self.write(path, "scheduler:\n  max_workers: 1\n")
+        store = SettingsStore(path)
+        seen = []
+        store.on_change(lambda old, new: seen.append(new.scheduler.max_workers))
+        stop = store.watch(0.01)
+        try:
+            self.write(path, "scheduler:\n  max_workers: 3\n", bump=10**9)
+            for _ in range(200):
+                if seen:
+                    break
+                stop.wait(0.01)
+        finally:
+            stop.set()
+        assert seen == [3]
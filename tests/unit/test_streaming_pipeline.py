@@ -0,0 +1,89 @@
+import threading
+import time
+
+import pytest
+
+from src.streaming_pipeline import Stage, StreamingPipeline, WorkItem
+
+
+def items(keys, per_key):
+    return [WorkItem(key, seq, (key, seq)) for key in keys for seq in range(per_key)]
+
+
+def test_ordered_stage_sees_each_key_in_sequence():
+    published = []
+
+    def jitter(payload):
+        # Later items of a key finish earlier upstream
+        time.sleep(0.002 * (5 - payload[1]))
+        return payload
+
+    pipeline = StreamingPipeline(
+        [Stage("fetch", jitter, workers=5), Stage("publish", published.append, ordered=True)]
+    )
+    assert pipeline.run(items(["a", "b"], 5)) == set()
+    for key in ("a", "b"):
+        assert [seq for k, seq in published if k == key] == list(range(5))
+
+
+def test_failure_drops_later_items_of_that_key_only():
+    published = []
+
+    def fetch(payload):
+        return False if payload == ("a", 2) else payload
+
+    def clean(payload):
+        if payload == ("b", 1):
+            raise RuntimeError("bad payload")
+        return payload
+
+    pipeline = StreamingPipeline(
+        [
+            Stage("fetch", fetch, workers=3),
+            Stage("clean", clean, workers=2),
+            Stage("publish", published.append, ordered=True),
+        ]
+    )
+    assert pipeline.run(items(["a", "b", "c"], 4)) == {"a", "b"}
+    assert sorted(published) == [("a", 0), ("a", 1), ("b", 0), *[("c", i) for i in range(4)]]
+
+
+def test_stages_overlap():
+    def wait(payload):
+        time.sleep(0.02)
+        return payload
+
+    pipeline = StreamingPipeline(
+        [Stage("fetch", wait, workers=4), Stage("clean", wait, workers=4), Stage("write", wait)]
+    )
+    started = time.perf_counter()
+    pipeline.run(items(["a"], 12))
+    # Sequential: 12 × 3 × 20 ms; streamed: bounded by the single writer (~240 ms)
+    assert time.perf_counter() - started < 0.5
+
+
+def test_bounded_queues_apply_backpressure():
+    release = threading.Event()
+    fetched = []
+
+    def fetch(payload):
+        fetched.append(payload)
+        return payload
+
+    pipeline = StreamingPipeline(
+        [Stage("fetch", fetch, workers=1), Stage("write", lambda p: release.wait(5))],
+        queue_size=2,
+    )
+    runner = threading.Thread(target=pipeline.run, args=(items(["a"], 20),))
+    runner.start()
+    time.sleep(0.1)
+    # One item in the writer, two queued before it, one held by the blocked fetcher
+    assert len(fetched) <= 4
+    release.set()
+    runner.join(timeout=5)
+    assert len(fetched) == 20
+
+
+def test_needs_a_stage():
+    with pytest.raises(ValueError):
+        StreamingPipeline([])
@@ -0,0 +1,117 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src import tracing
+from src.tracing import current_span, propagate, span, start_tracing, stop_tracing
+
+
+@pytest.fixture
+def traced():
+    start_tracing()
+    yield tracing.tracer
+    tracing.tracer.stop()
+
+
+def by_name(spans):
+    return {s.name: s for s in spans}
+
+
+def test_disabled_tracing_records_nothing():
+    with span("fetch", postal="69115") as s:
+        s.set(rows=3)
+        assert current_span() is None
+    assert tracing.tracer.spans == []
+
+
+def test_spans_nest_and_carry_attributes(traced):
+    with span("location", postal="69115"):
+        with span("http.get", url="https://example.org") as s:
+            s.set(bytes=512)
+        with span("write.cleaned"):
+            pass
+    spans = by_name(traced.stop())
+
+    root = spans["location"]
+    assert root.parent_id is None
+    assert spans["http.get"].parent_id == root.span_id
+    assert spans["write.cleaned"].parent_id == root.span_id
+    assert {s.trace_id for s in spans.values()} == {root.trace_id}
+    assert spans["http.get"].attributes == {"url": "https://example.org", "bytes": 512}
+    assert root.duration_ns >= spans["http.get"].duration_ns
+
+
+def test_exception_marks_span_as_error(traced):
+    with pytest.raises(ValueError):
+        with span("parse.json"):
+            raise ValueError("bad payload")
+    (recorded,) = traced.stop()
+    assert recorded.status == "ERROR"
+    assert recorded.attributes["exception.type"] == "ValueError"
+
+
+def test_explicit_parent_links_work_on_long_lived_threads(traced):
+    with span("pipeline") as root:
+        worker = threading.Thread(target=_run_stage, args=(root,))
+        worker.start()
+        worker.join()
+    spans = by_name(traced.stop())
+    assert spans["stage.clean"].parent_id == root.span_id
+    assert spans["stage.clean"].thread_id != root.thread_id
+
+
+def _run_stage(root):
+    with span("stage.clean", parent=root):
+        pass
+
+
+def test_pool_thread_spans_nest_under_submitter(traced):
+    def work(name):
+        with span(name):
+            return threading.current_thread().name
+
+    with span("fetch") as parent:
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix="provider") as pool:
+            names = list(pool.map(propagate(work), ["open_meteo", "era5"]))
+    spans = by_name(traced.stop())
+    assert spans["open_meteo"].parent_id == parent.span_id
+    assert spans["era5"].parent_id == parent.span_id
+    assert all(n.startswith("provider") for n in names)
+
+
+def test_propagated_function_runs_concurrently(traced):
+    # Both calls are inside the wrapper at once, which a shared Context refuses
+    barrier = threading.Barrier(2, timeout=5)
+
+    def work(name):
+        with span(name) as s:
+            barrier.wait()
+            return s.parent_id
+
+    with span("fetch") as parent:
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            parents = list(pool.map(propagate(work), ["open_meteo", "era5"]))
+    assert parents == [parent.span_id, parent.span_id]
+
+
+def test_export_writes_chrome_trace(traced, tmp_path):
+    with span("location", postal="69115"):
+        with span("http.get", bytes=10):
+            pass
+
+    path = stop_tracing(tmp_path / "traces" / "run.json")
+    trace = json.loads(path.read_text())
+    events = [e for e in trace["traceEvents"] if e["ph"] == "X"]
+    assert [e["name"] for e in events] == ["location", "http.get"]
+    outer, inner = events
+    assert outer["ts"] <= inner["ts"] and inner["dur"] <= outer["dur"]
+    assert inner["args"]["parent_span_id"] == outer["args"]["span_id"]
+    assert inner["args"]["bytes"] == 10 and inner["cat"] == "http"
+    assert any(e["ph"] == "M" and e["name"] == "thread_name" for e in trace["traceEvents"])
+
+
+def test_export_without_spans_writes_nothing(traced, tmp_path):
+    assert stop_tracing(tmp_path / "run.json") is None
+    assert not (tmp_path / "run.json").exists()
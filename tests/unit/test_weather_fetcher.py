@@ -1,54 +1,23 @@
 import json
 from datetime import date, timedelta
-from unittest.mock import Mock, mock_open, patch
+from unittest.mock import mock_open, patch
 
-import pytest
 import requests
-from requests.exceptions import HTTPError, Timeout
 
 from src import weather_data_fetcher as wdf
 
 
-class TestGetWithRetry:
-    @patch("src.weather_data_fetcher.requests.Session.get")
-    def test_successful_get(self, mock_get):
-        mock_response = Mock()
-        mock_response.raise_for_status.return_value = None
-        mock_get.return_value = mock_response
-
-        result = wdf.get_with_retry("http://example.com", params={})
-        assert result == mock_response
-        assert mock_get.call_count == 1
-
-    @patch("src.weather_data_fetcher.requests.Session.get")
-    def test_http_error_raises(self, mock_get):
-        mock_response = Mock()
-        mock_response.raise_for_status.side_effect = HTTPError("Bad request")
-        mock_get.return_value = mock_response
-
-        with pytest.raises(HTTPError):
-            wdf.get_with_retry("http://example.com", params={}, retries=1)
-
-        assert mock_get.call_count == 1
-
-    @patch("src.weather_data_fetcher.requests.Session.get")
-    def test_exceeds_retries(self, mock_get):
-        mock_get.side_effect = Timeout("Still timing out")
-
-        with pytest.raises(Timeout):
-            wdf.get_with_retry("http://example.com", params={}, retries=2, backoff_factor=0)
-
-        assert mock_get.call_count == 1
-
-
 class TestGetLocationInfo:
-    def test_valid_location_file(self, tmp_path, caplog):
-        loc = {"latitude": 52.52, "longitude": 13.405, "postal": "69115"}
+    def test_valid_location_file(self, tmp_path, caplog, location):
         file_path = tmp_path / "loc.json"
-        file_path.write_text(json.dumps(loc))
+        file_path.write_text(json.dumps(location))
 
         lat, lon, postal = wdf.get_location_info(str(file_path))
-        assert (lat, lon, postal) == (52.52, 13.405, "69115")
+        assert (lat, lon, postal) == (
+            location["latitude"],
+            location["longitude"],
+            location["postal"],
+        )
         assert "[CONFIG] Location info loaded" in caplog.text
 
     def test_missing_file(self, tmp_path, caplog):
@@ -76,30 +45,25 @@ class TestGetLocationInfo:
 
 
 class TestGetWeatherData:
-    @patch("src.weather_data_fetcher.requests.Session.get")
-    def test_successful_fetch(self, mock_get, caplog):
-        mock_resp = Mock()
-        mock_resp.raise_for_status.return_value = None
-        mock_resp.json.return_value = {"daily": {"temperature_2m_max": [20]}}
-        mock_get.return_value = mock_resp
+    @patch("src.weather_providers.requests.Session.get")
+    def test_successful_fetch(self, mock_get, caplog, json_response, raw_payload):
+        payload = raw_payload(days=5, start="2023-01-01")
+        mock_get.return_value = json_response(payload)
 
         data = wdf.get_weather_data(52.52, 13.405, "2023-01-01", "2023-01-05")
-        assert data == {"daily": {"temperature_2m_max": [20]}}
+        assert data == payload
         assert "[FETCH] Data fetched successfully" in caplog.text
 
-    @patch("src.weather_data_fetcher.requests.Session.get")
-    def test_http_error(self, mock_get, caplog):
-        mock_resp = Mock()
-        mock_resp.raise_for_status.side_effect = requests.exceptions.HTTPError(
-            response=Mock(status_code=500, text="Internal Server Error")
-        )
-        mock_get.return_value = mock_resp
+    @patch("src.weather_providers.requests.Session.get")
+    def test_http_error(self, mock_get, caplog, json_response):
+        mock_get.return_value = json_response(status=500, text="Internal Server Error")
 
         data = wdf.get_weather_data(0, 0, "2023-01-01", "2023-01-05")
         assert data is None
         assert "[FETCH] HTTP error" in caplog.text
+        assert "500: Internal Server Error" in caplog.text
 
-    @patch("src.weather_data_fetcher.requests.Session.get")
+    @patch("src.weather_providers.requests.Session.get")
     def test_timeout_error(self, mock_get, caplog):
         mock_get.side_effect = requests.exceptions.Timeout("timeout")
         data = wdf.get_weather_data(0, 0, "2023-01-01", "2023-01-05")
@@ -141,3 +105,18 @@ class TestPrepareDateRange:
         start, end = wdf.prepare_date_range()
         assert start == start_expected.isoformat()
         assert end == today.isoformat()
+
+
+class TestPrepareDateChunks:
+    def test_splits_inclusive_range(self):
+        chunks = wdf.prepare_date_chunks("2024-01-01", "2024-01-10", chunk_days=4)
+        assert chunks == [
+            ("2024-01-01", "2024-01-04"),
+            ("2024-01-05", "2024-01-08"),
+            ("2024-01-09", "2024-01-10"),
+        ]
+
+    def test_single_chunk_when_range_is_short(self):
+        assert wdf.prepare_date_chunks("2024-01-01", "2024-01-02", chunk_days=365) == [
+            ("2024-01-01", "2024-01-02")
+        ]
@@ -0,0 +1,187 @@
+import threading
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+from requests.exceptions import HTTPError, Timeout
+
+from src import weather_providers as wp
+
+
+class StubProvider(wp.WeatherProvider):
+    def __init__(self, name, cost=1.0, payload=None, delay=None, error=None):
+        self.name = name
+        self.cost = cost
+        self.payload = payload
+        self.delay = delay
+        self.error = error
+        self.release = threading.Event()
+
+    def fetch(self, lat, lon, start_date, end_date):
+        if self.delay is not None:
+            self.release.wait(self.delay)
+        if self.error:
+            raise self.error
+        return self.payload
+
+
+class TestGetWithRetry:
+    @patch("src.weather_providers.requests.Session.get")
+    def test_successful_get(self, mock_get, json_response):
+        mock_response = json_response()
+        mock_get.return_value = mock_response
+
+        result = wp.get_with_retry("http://example.com", params={})
+        assert result == mock_response
+        assert mock_get.call_count == 1
+
+    @patch("src.weather_providers.requests.Session.get")
+    def test_http_error_raises(self, mock_get, json_response):
+        mock_get.return_value = json_response(status=400)
+
+        with pytest.raises(HTTPError):
+            wp.get_with_retry("http://example.com", params={}, retries=1)
+
+        assert mock_get.call_count == 1
+
+    @patch("src.weather_providers.requests.Session.get")
+    def test_exceeds_retries(self, mock_get):
+        mock_get.side_effect = Timeout("Still timing out")
+
+        with pytest.raises(Timeout):
+            wp.get_with_retry("http://example.com", params={}, retries=2, backoff_factor=0)
+
+        assert mock_get.call_count == 1
+
+
+class TestOpenMeteoArchiveProvider:
+    @patch("src.weather_providers.get_with_retry")
+    def test_uses_configured_timezone_and_model(
+        self, mock_get, monkeypatch, json_response, raw_payload
+    ):
+        monkeypatch.setattr(wp, "TIMEZONE_NAME", "UTC")
+        payload = raw_payload(days=2)
+        mock_get.return_value = json_response(payload)
+
+        provider = wp.OpenMeteoArchiveProvider(name="era5", models="era5")
+        assert provider.fetch(1.0, 2.0, "2024-01-01", "2024-01-02") == payload
+
+        params = mock_get.call_args[0][1]
+        assert params["timezone"] == "UTC"
+        assert params["models"] == "era5"
+
+
+class TestFetchFromProviders:
+    def test_first_returns_fastest_success(self):
+        slow = StubProvider("slow", payload={"daily": "slow"}, delay=5)
+        fast = StubProvider("fast", payload={"daily": "fast"})
+        result = wp.fetch_from_providers([slow, fast], 0, 0, "2024-01-01", "2024-01-01", "first")
+        slow.release.set()
+        assert result == {"daily": "fast"}
+
+    def test_first_skips_failures(self):
+        broken = StubProvider("broken", error=RuntimeError("boom"))
+        empty = StubProvider("empty", payload=None)
+        good = StubProvider("good", payload={"daily": "ok"}, delay=0.05)
+        result = wp.fetch_from_providers([broken, empty, good], 0, 0, "2024-01-01", "2024-01-01")
+        assert result == {"daily": "ok"}
+
+    def test_cheapest_waits_for_cheaper_provider(self):
+        cheap = StubProvider("cheap", cost=0, payload={"daily": "cheap"}, delay=0.1)
+        pricey = StubProvider("pricey", cost=5, payload={"daily": "pricey"})
+        result = wp.fetch_from_providers(
+            [pricey, cheap], 0, 0, "2024-01-01", "2024-01-01", "cheapest"
+        )
+        assert result == {"daily": "cheap"}
+
+    def test_cheapest_falls_back_when_cheaper_fails(self):
+        cheap = StubProvider("cheap", cost=0, payload=None)
+        pricey = StubProvider("pricey", cost=5, payload={"daily": "pricey"})
+        result = wp.fetch_from_providers(
+            [cheap, pricey], 0, 0, "2024-01-01", "2024-01-01", "cheapest"
+        )
+        assert result == {"daily": "pricey"}
+
+    def test_all_failing_returns_none(self, caplog):
+        providers = [StubProvider("a"), StubProvider("b", error=RuntimeError("down"))]
+        assert wp.fetch_from_providers(providers, 0, 0, "2024-01-01", "2024-01-01") is None
+        assert "[FETCH] No weather provider could serve the request" in caplog.text
+
+    def test_threads_are_reused_across_calls(self):
+        class ThreadName(StubProvider):
+            def fetch(self, lat, lon, start_date, end_date):
+                return {"thread": threading.current_thread().name}
+
+        providers = [ThreadName("a"), ThreadName("b", payload=None)]
+        seen = set()
+        for _ in range(20):
+            answer = wp.fetch_from_providers(providers, 0, 0, "2024-01-01", "2024-01-01")
+            seen.add(answer["thread"])
+        assert all(name.startswith("provider") for name in seen)
+        assert len(seen) <= wp.PROVIDER_POOL_WORKERS
+
+    def test_unknown_strategy_raises(self):
+        with pytest.raises(ValueError):
+            wp.fetch_from_providers([StubProvider("a")], 0, 0, "2024-01-01", "2024-01-01", "x")
+
+
+class TestLocalDumpProvider:
+    def write_dump(self, directory, days=3):
+        dates = pd.date_range("2024-01-01", periods=days)
+        frames = [
+            pd.DataFrame(
+                {
+                    "latitude": lat,
+                    "longitude": 8.5,
+                    "time": dates.strftime("%Y-%m-%d"),
+                    "temperature_2m_mean": [lat + i for i in range(days)],
+                    "rain_sum": [None] + [1.0] * (days - 1),
+                }
+            )
+            for lat in (49.5, 52.5)
+        ]
+        pd.concat(frames).to_csv(directory / "era5_extract.csv", index=False)
+
+    def test_serves_nearest_grid_point(self, tmp_path):
+        self.write_dump(tmp_path)
+        payload = wp.LocalDumpProvider(tmp_path).fetch(49.45, 8.55, "2024-01-01", "2024-01-03")
+
+        daily = payload["daily"]
+        assert daily["time"] == ["2024-01-01", "2024-01-02", "2024-01-03"]
+        assert daily["temperature_2m_mean"] == [49.5, 50.5, 51.5]
+        assert daily["rain_sum"][0] is None
+        assert daily["sunshine_duration"] == [None, None, None]
+
+    def test_dump_is_parsed_once_per_file_version(self, tmp_path, monkeypatch):
+        self.write_dump(tmp_path)
+        reads = []
+        read_csv = pd.read_csv
+        monkeypatch.setattr(wp.pd, "read_csv", lambda *a, **k: reads.append(a) or read_csv(*a, **k))
+        provider = wp.LocalDumpProvider(tmp_path)
+        for lat in (49.5, 52.5, 49.5):
+            assert provider.fetch(lat, 8.5, "2024-01-02", "2024-01-03") is not None
+        assert len(reads) == 1
+
+        self.write_dump(tmp_path, days=4)
+        assert provider.fetch(49.5, 8.5, "2024-01-01", "2024-01-04") is not None
+        assert len(reads) == 2
+
+    def test_partial_coverage_or_far_location_returns_none(self, tmp_path):
+        self.write_dump(tmp_path)
+        provider = wp.LocalDumpProvider(tmp_path)
+        assert provider.fetch(49.5, 8.5, "2024-01-01", "2024-01-05") is None
+        assert provider.fetch(40.0, 2.0, "2024-01-01", "2024-01-03") is None
+
+
+def test_provider_must_implement_fetch():
+    class Incomplete(wp.WeatherProvider):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_build_providers_rejects_unknown_names():
+    assert [p.name for p in wp.build_providers(["open_meteo", "era5"])] == ["open_meteo", "era5"]
+    with pytest.raises(ValueError):
+        wp.build_providers(["nope"])
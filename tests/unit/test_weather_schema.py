@@ -0,0 +1,61 @@
+import json
+
+import pandas as pd
+import pytest
+
+from src import data_cleaner as dc
+from src.config import HDD_BASE_C
+from src.weather_schema import add_derived_metrics, normalize_units, required_source_keys, units
+
+DAILY = {
+    "time": ["2024-01-01", "2024-01-02", "2024-01-03"],
+    "temperature_2m_max": [5.0, 24.0, 30.0],
+    "temperature_2m_min": [-2.0, 12.0, 12.0],
+    "temperature_2m_mean": [1.0, 18.0, 25.0],
+    "precipitation_sum": [0.4, 3.0, 0.0],
+    "rain_sum": [0.0, None, 0.0],
+    "snowfall_sum": [0.3, 0.0, 0.0],
+    "windspeed_10m_max": [10.0, 12.0, 8.0],
+    "shortwave_radiation_sum": [3.6, 18.0, 25.2],
+    "sunshine_duration": [3600.0, 36000.0, 45000.0],
+}
+
+
+def test_normalize_units_converts_whole_columns():
+    df = normalize_units(DAILY)
+    assert df["Sunshine_Minutes"].tolist() == [60.0, 600.0, 750.0]
+    assert df["Radiation_Sum_kWh"].tolist() == pytest.approx([1.0, 5.0, 7.0])
+    assert df["Snowfall_mm"].tolist() == [3.0, 0.0, 0.0]
+    assert df["Temp_Max_C"].tolist() == DAILY["temperature_2m_max"]
+    assert pd.isna(df.loc[1, "Rain_mm"])
+
+
+def test_derived_metrics():
+    df = add_derived_metrics(normalize_units(DAILY).fillna(0.0))
+    assert df["Temp_Range_C"].tolist() == [7.0, 12.0, 18.0]
+    assert df["HDD"].tolist() == [max(HDD_BASE_C - t, 0.0) for t in (1.0, 18.0, 25.0)]
+    assert df["Frost_Day"].tolist() == [1.0, 0.0, 0.0]
+    assert df["Wet_Day"].tolist() == [0.0, 1.0, 0.0]
+    assert df["Sunshine_Hours"].tolist() == [1.0, 10.0, 12.5]
+
+
+def test_build_dataframe_reports_missing_source_keys(caplog):
+    daily = {k: v for k, v in DAILY.items() if k != "sunshine_duration"}
+    assert dc.build_dataframe({"daily": daily}, "Heidelberg", "69115").empty
+    assert "sunshine_duration" in caplog.text
+    assert set(required_source_keys()) == set(DAILY)
+
+
+def test_process_raw_file_writes_converted_units(tmp_path, monkeypatch):
+    raw_file = tmp_path / "raw_weather_69115_2024-01-01_2024-01-03.json"
+    raw_file.write_text(json.dumps({"daily": DAILY}))
+    monkeypatch.setattr(dc, "STAGING_DATA_DIR", tmp_path / "staging")
+
+    cleaned = pd.read_csv(dc.process_raw_file(raw_file, "Heidelberg", "69115"))
+
+    assert cleaned["Sunshine_Minutes"].tolist() == [60.0, 600.0, 750.0]
+    assert cleaned["Radiation_Sum_kWh"].tolist() == [1.0, 5.0, 7.0]
+    # Interpolation fills the gap before derived metrics are computed
+    assert cleaned["Rain_mm"].tolist() == [0.0, 0.0, 0.0]
+    assert cleaned["Temp_Range_C"].tolist() == [7.0, 12.0, 18.0]
+    assert set(units()) <= set(cleaned.columns)